@@ -1,7 +1,6 @@
 from abc import ABC, abstractmethod
-import json
-import os
-import git_utils
+from state_store import StateStore
+from replication import get_replicator
 
 class BaseStrategy(ABC):
     def __init__(self, name):
@@ -10,6 +9,8 @@ class BaseStrategy(ABC):
         import config
         mode = config.TRADING_MODE.lower()
         self.state_file = f"{name}_{mode}_state.json"
+        # Snapshot + write-ahead log: unchanged saves are skipped, deltas appended, snapshot replaced atomically
+        self.state_store = StateStore(self.state_file)
 
     @abstractmethod
     def update(self, market_data, order_callback):
@@ -32,24 +33,79 @@ class BaseStrategy(ABC):
         Saves current state to persistent storage.
         """
         try:
-            with open(self.state_file, 'w') as f:
-                json.dump(state_dict, f, indent=4)
-            # Push new state to Git
-            git_utils.sync_push(self.state_file)
+            # Every change goes to the replication backend (STATE_REPLICATION) without blocking; Git only takes
+            # snapshot rewrites (one commit + push per GIT_SYNC_INTERVAL_SECONDS), WAL deltas reach it via flush_state()
+            written = self.state_store.save(state_dict)
+            if written:
+                get_replicator().publish(self.state_file, self.state_store.state, snapshot=written == 'snapshot')
         except Exception as e:
             print(f"Error saving state for {self.name}: {e}")
 
-    def load_previous_state(self):
+    def flush_state(self, force=False):
+        """
+        Compacts the state WAL into the snapshot once it is due (force=True on shutdown) and replicates it.
+        """
+        try:
+            if self.state_store.compact(force=force):
+                get_replicator().publish(self.state_file, self.state_store.state, snapshot=True)
+        except Exception as e:
+            print(f"Error compacting state for {self.name}: {e}")
+
+    def load_previous_state(self, pull=True):
         """
         Loads state from persistent storage.
+        pull=False: the caller already pulled (startup pulls once for all strategies).
         """
-        # Pull latest state from Git before loading
-        git_utils.sync_pull()
+        # Pull latest state (Git pull / replica DB) before loading
+        if pull:
+            get_replicator().pull()
         
-        if os.path.exists(self.state_file):
-            try:
-                with open(self.state_file, 'r') as f:
-                    return json.load(f)
-            except Exception as e:
-                print(f"Error loading state for {self.name}: {e}")
+        try:
+            return self.state_store.load()   # snapshot + WAL replay
+        except Exception as e:
+            print(f"Error loading state for {self.name}: {e}")
         return None
+
+    def reconcile_with_broker(self, market_data):
+        """
+        Per-tick reconciliation. With the loop's shared PositionSnapshot, pull_from_broker only runs when a broker
+        position this strategy owns (or nobody owns yet) changed since its last run, and only sees those positions
+        (other strategies' legs are never offered to it). The executor hands each worker that as a frozen
+        'position_view'. Without a snapshot: on the raw list as before.
+        """
+        view = market_data.get('position_view')
+        if view is None and market_data.get('position_snapshot') is not None:
+            view = market_data['position_snapshot'].view_for(self.name)
+        if view is not None:
+            if not view.changes:
+                return False
+            return self.pull_from_broker(list(view.positions), master=market_data.get('master'), silent=True)
+        if market_data.get('broker_positions') is not None:
+            return self.pull_from_broker(market_data.get('broker_positions'), master=market_data.get('master'), silent=True)
+        return False
+
+    def held_keys(self):
+        """instrument_keys of every leg held, including legs still missing strike / expiry (not in open_legs yet)."""
+        keys = [p['instrument_key'] for p in (getattr(self, 'weekly_position', None), getattr(self, 'monthly_position', None)) if p]
+        keys += [p['instrument_key'] for p in getattr(self, 'positions', None) or []]
+        return keys
+
+    def open_legs(self):
+        """
+        Open option legs in one shape for portfolio-level risk: list of
+        {'instrument_key', 'strike', 'type' ('c'/'p'), 'qty' (+long / -short), 'expiry_dt', 'entry_price', 'iv', 'leg'}.
+        Default reads self.positions (Ironfly / Batman style list of position dicts).
+        """
+        return [leg for leg in (self._as_leg(p) for p in getattr(self, 'positions', None) or []) if leg]
+
+    @staticmethod
+    def _as_leg(pos, side=None):
+        if not pos or not pos.get('strike'):
+            return None
+        import config
+        qty = abs(pos.get('qty', config.ORDER_QUANTITY))
+        side = (side or pos.get('side', 'BUY')).upper()
+        return {'instrument_key': pos.get('instrument_key'), 'strike': float(pos['strike']),
+                'type': str(pos.get('type', 'p'))[0].lower(), 'qty': qty if side == 'BUY' else -qty,
+                'expiry_dt': pos.get('expiry_dt'), 'entry_price': pos.get('entry_price'), 'iv': pos.get('iv'),
+                'leg': pos.get('leg', pos.get('tag'))}
@@ -0,0 +1,79 @@
+"""
+Benchmark: per-tick strike selection with the old linear scans over the chain rows vs the shared ChainIndex.
+
+    python bench_chain_index.py [--strikes 120] [--queries 12] [--ticks 2000]
+
+Each tick builds fresh chains (as the data feed does) and runs --queries selections (entry legs, roll candidates,
+hedges across the strategies). The index cost includes building it once per chain.
+"""
+import argparse
+import time
+import numpy as np
+from chain_index import index_for
+from option_chain import OptionChain
+
+
+def make_chain(n, spot, rng):
+    strikes = np.arange(n) * 50.0 + round(spot / 50) * 50 - n // 2 * 50
+    strikes = np.concatenate([strikes, strikes])
+    types = ['c'] * n + ['p'] * n
+    moneyness = (strikes - spot) / (spot * 0.03)
+    call_delta = 1 / (1 + np.exp(1.6 * moneyness))
+    delta = np.where(np.array(types) == 'c', call_delta, call_delta - 1) + rng.normal(0, 0.002, 2 * n)
+    keys = [f'NSE_FO|{i}' for i in range(2 * n)]
+    return OptionChain(keys, strikes, types, np.ones(2 * n), np.full(2 * n, 0.14), np.full(2 * n, 7 / 365),
+                       ['2026-11-09'] * (2 * n), delta, np.full(2 * n, np.nan))
+
+
+def scan_delta(rows, option_type, target):
+    best, min_diff = None, float('inf')
+    for opt in rows:
+        if opt['type'] != option_type or opt['iv'] <= 0:
+            continue
+        diff = abs(abs(opt['delta']) - target)
+        if diff < min_diff:
+            best, min_diff = opt, diff
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--strikes', type=int, default=120, help='strikes per option type')
+    parser.add_argument('--queries', type=int, default=12, help='selections per tick')
+    parser.add_argument('--ticks', type=int, default=2000)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    spots = 24000 + np.cumsum(rng.normal(0, 8, args.ticks))
+    chains = [make_chain(args.strikes, s, rng) for s in spots]
+    targets = rng.uniform(0.05, 0.6, (args.ticks, args.queries))
+    types = rng.choice(['c', 'p'], (args.ticks, args.queries))
+    for chain in chains:
+        chain.rows()    # the dict view exists either way (strategies iterate it)
+
+    for chain, tt, ts in zip(chains[:50], targets, types):
+        for target, t in zip(tt, ts):
+            assert scan_delta(chain.rows(), t, target) is index_for(chain).nearest_delta(t, target, require_iv=True)
+        chain._selection = None
+
+    t0 = time.perf_counter()
+    for chain, tt, ts in zip(chains, targets, types):
+        rows = chain.rows()
+        for target, t in zip(tt, ts):
+            scan_delta(rows, t, target)
+    scan_us = (time.perf_counter() - t0) / args.ticks * 1e6
+
+    t0 = time.perf_counter()
+    for chain, tt, ts in zip(chains, targets, types):
+        idx = index_for(chain)
+        for target, t in zip(tt, ts):
+            idx.nearest_delta(t, target, require_iv=True)
+    index_us = (time.perf_counter() - t0) / args.ticks * 1e6
+
+    print(f"Chain: {2 * args.strikes} rows, {args.queries} selections per tick, {args.ticks} ticks")
+    print(f"Per tick : linear scans {scan_us:8.1f} us | index (incl. build) {index_us:8.1f} us "
+          f"-> {scan_us / index_us:.1f}x faster")
+
+
+if __name__ == '__main__':
+    main()
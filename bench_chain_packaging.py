@@ -0,0 +1,49 @@
+"""
+Benchmark: old per-row package_chain (iterrows + scalar IV/delta) vs vectorized option_chain.build_chain.
+
+    python bench_chain_packaging.py                 # 500 strikes x 6 expiries, no broker greeks (worst case)
+    python bench_chain_packaging.py --broker-greeks # broker IV/delta present for every option
+"""
+import argparse
+import time
+from datetime import datetime
+from chain_fixtures import legacy_package_chain, make_chain
+from option_chain import build_chain
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--strikes', type=int, default=500)
+    parser.add_argument('--expiries', type=int, default=6)
+    parser.add_argument('--broker-greeks', action='store_true')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    spot = 24000.0
+    now = datetime(2026, 10, 19, 10, 30)
+    pe, ce, quotes, greeks = make_chain(args.strikes, args.expiries, spot, args.broker_greeks)
+    print(f"Chain: {len(pe) + len(ce)} options ({args.strikes} strikes x {args.expiries} expiries x CE/PE), broker greeks: {args.broker_greeks}")
+
+    t0 = time.perf_counter()
+    old = legacy_package_chain(pe, ce, quotes, greeks, spot, now)
+    legacy_s = time.perf_counter() - t0
+
+    timings = []
+    for _ in range(args.repeat):
+        t0 = time.perf_counter()
+        new = build_chain(pe, ce, quotes, greeks, spot, now)
+        timings.append(time.perf_counter() - t0)
+    vec_s = min(timings)
+    t0 = time.perf_counter()
+    rows = new.rows()
+    rows_s = time.perf_counter() - t0
+
+    max_delta_diff = max(abs(a['delta'] - b['delta']) for a, b in zip(old, rows))
+    print(f"legacy iterrows : {legacy_s * 1000:9.1f} ms")
+    print(f"build_chain     : {vec_s * 1000:9.1f} ms  (best of {args.repeat})  -> {legacy_s / vec_s:.0f}x faster")
+    print(f"  + dict view   : {rows_s * 1000:9.1f} ms  (only paid if a strategy iterates the chain)")
+    print(f"max |delta diff|: {max_delta_diff:.2e}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+"""
+Benchmark: expiry queries by re-filtering the master (the old InstrumentMaster methods and run_strategy month
+arithmetic) vs ExpiryCalendar bisect queries. Also checks both give the same answers for every day of the range.
+
+    python bench_expiry_calendar.py [--data-dir ./data]
+
+Uses <data-dir>/NSE_FO.json (decompressed from NSE_FO.json.gz into a temp dir if only the .gz is there).
+"""
+import argparse
+import time
+from datetime import timedelta
+import pandas as pd
+import config
+from bench_instrument_lookup import prepare_master_dir
+from expiry_calendar import ExpiryCalendar
+from instrument_manager import InstrumentMaster
+from utils import get_next_trading_day
+
+
+def legacy_expiry_dates(df, underlying, today):
+    mask = (df['name'] == underlying) & (df['instrument_type'].isin(['CE', 'PE']))
+    unique_expiries = sorted(df[mask]['expiry_dt'].unique())
+    return [d for d in unique_expiries if pd.notna(d) and d >= today]
+
+
+def _next_month(year, month):
+    return (year + 1, 1) if month == 12 else (year, month + 1)
+
+
+def legacy_queries(df, underlying, today):
+    """Old get_target_expiries / get_special_entry_expiries / is_monthly_expiry_today + run_strategy T-1 logic."""
+    expiries = legacy_expiry_dates(df, underlying, today)
+    if len(expiries) < 3:
+        return None
+    weekly = expiries[0]
+    ty, tm = _next_month(weekly.year, weekly.month)
+    nm = [d for d in expiries if (d.year, d.month) == (ty, tm)]
+    target = (weekly, nm[-1] if nm else expiries[-1])
+
+    ny, nmo = _next_month(today.year, today.month)
+    nny, nnm = _next_month(ny, nmo)
+    first_next = [d for d in expiries if (d.year, d.month) == (ny, nmo)]
+    nn = [d for d in expiries if (d.year, d.month) == (nny, nnm)]
+    special = (first_next[0] if first_next else None, nn[-1] if nn else None)
+
+    this_month = [d for d in expiries if (d.year, d.month) == (today.year, today.month)]
+    is_monthly_today = bool(this_month) and this_month[-1] == today
+
+    curr_weekly = expiries[1] if expiries[0] == today else expiries[0]
+    ty, tm = _next_month(curr_weekly.year, curr_weekly.month)
+    m_expiries = [d for d in expiries if (d.year, d.month) == (ty, tm)]
+    if not m_expiries:
+        ty, tm = _next_month(ty, tm)
+        m_expiries = [d for d in expiries if (d.year, d.month) == (ty, tm)]
+    monthly = m_expiries[-1] if m_expiries else expiries[-1]
+    tomorrow = get_next_trading_day(today)
+    pre_expiry = bool(m_expiries) and tomorrow == curr_weekly and not [
+        d for d in expiries if (d.year, d.month) == (tomorrow.year, tomorrow.month) and d > tomorrow]
+    return target, special, is_monthly_today, monthly, pre_expiry
+
+
+def calendar_queries(cal, today):
+    expiries = cal.upcoming(today)
+    if len(expiries) < 3:
+        return None
+    target = (expiries[0], cal.monthly_after(expiries[0], 1) or expiries[-1])
+    special = (cal.first_of_month_after(today, 1), cal.monthly_after(today, 2))
+    curr_weekly, _ = cal.weeklies(today, skip_today=expiries[0] == today)
+    monthly = cal.monthly_after(curr_weekly, 1) or cal.monthly_after(curr_weekly, 2)
+    pre_expiry = monthly is not None and cal.next_trading_day(today) == curr_weekly and cal.is_next_trading_day_monthly_expiry(today)
+    return target, special, cal.is_last_expiry_of_month(today), monthly or expiries[-1], pre_expiry
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--data-dir', default=config.DATA_DIR)
+    args = parser.parse_args()
+
+    master = InstrumentMaster(data_dir=prepare_master_dir(args.data_dir), auto_refresh=False)
+    master.load_master()
+    df = master.df
+    name = config.UNDERLYING_NAME
+
+    t0 = time.perf_counter()
+    cal = ExpiryCalendar.from_master(df, name)
+    build_ms = (time.perf_counter() - t0) * 1000
+    print(f"Calendar build: {build_ms:.1f} ms ({len(cal)} expiries)")
+
+    days = [cal.expiries[0] - timedelta(days=7) + timedelta(days=i) for i in range(400)]
+    for day in days:
+        assert legacy_queries(df, name, day) == calendar_queries(cal, day), day
+
+    t0 = time.perf_counter()
+    for day in days:
+        legacy_queries(df, name, day)
+    legacy_us = (time.perf_counter() - t0) / len(days) * 1e6
+    t0 = time.perf_counter()
+    for day in days:
+        calendar_queries(cal, day)
+    cal_us = (time.perf_counter() - t0) / len(days) * 1e6
+    print(f"All expiry queries for one day: legacy {legacy_us:8.1f} us | calendar {cal_us:6.1f} us  -> {legacy_us / cal_us:.0f}x faster")
+
+
+if __name__ == '__main__':
+    main()
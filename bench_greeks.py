@@ -0,0 +1,86 @@
+"""
+Benchmark: per-option scipy.stats Black-Scholes (the old utils.black_scholes_price / _vega and greeks.calculate_delta,
+extended to all greeks) vs greeks.bs_greeks on arrays, for batches of 1, 100 and 10,000 options.
+Also checks both give the same numbers.
+
+    python bench_greeks.py [--sizes 1 100 10000]
+"""
+import argparse
+import time
+import numpy as np
+from scipy.stats import norm
+import config
+from greeks import GREEK_NAMES, bs_greeks, calculate_delta
+
+
+def legacy_greeks(flag, S, K, t, r, sigma):
+    sigma = np.clip(sigma, 0.001, 10.0)
+    d1 = (np.log(S / K) + (r + 0.5 * sigma ** 2) * t) / (sigma * np.sqrt(t))
+    d2 = d1 - sigma * np.sqrt(t)
+    disc_K = K * np.exp(-r * t)
+    pdf = norm.pdf(d1)
+    gamma = pdf / (S * sigma * np.sqrt(t))
+    vega = S * pdf * np.sqrt(t)
+    if flag == 'c':
+        price = S * norm.cdf(d1) - disc_K * norm.cdf(d2)
+        delta = norm.cdf(d1)
+        theta = -S * pdf * sigma / (2 * np.sqrt(t)) - r * disc_K * norm.cdf(d2)
+        rho = t * disc_K * norm.cdf(d2)
+    else:
+        price = disc_K * norm.cdf(-d2) - S * norm.cdf(-d1)
+        delta = norm.cdf(d1) - 1
+        theta = -S * pdf * sigma / (2 * np.sqrt(t)) + r * disc_K * norm.cdf(-d2)
+        rho = -t * disc_K * norm.cdf(-d2)
+    return price, delta, gamma, vega, theta, rho
+
+
+def make_batch(n, spot=24000.0, seed=0):
+    rng = np.random.default_rng(seed)
+    strikes = spot + 50 * rng.integers(-60, 61, n)
+    flags = np.where(rng.random(n) < 0.5, 'c', 'p')
+    tte = rng.uniform(1, 60, n) / 365
+    iv = rng.uniform(0.08, 0.40, n)
+    return flags, spot, strikes.astype(float), tte, iv
+
+
+def timed(fn, min_seconds=0.2):
+    runs = 0
+    start = time.perf_counter()
+    while True:
+        fn()
+        runs += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_seconds:
+            return elapsed / runs
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1, 100, 10000])
+    args = parser.parse_args()
+    r = config.RISK_FREE_RATE
+
+    print(f"{'options':>8} {'scipy loop':>12} {'vectorized':>12} {'speedup':>8} {'max abs diff':>13}")
+    for n in args.sizes:
+        flags, spot, strikes, tte, iv = make_batch(n)
+
+        def legacy():
+            return [legacy_greeks(flags[i], spot, strikes[i], tte[i], r, iv[i]) for i in range(n)]
+
+        def vectorized():
+            return bs_greeks(flags, spot, strikes, tte, r, iv)
+
+        old = np.array(legacy()).T
+        new = vectorized()
+        diff = max(np.max(np.abs(old[i] - new[name])) for i, name in enumerate(GREEK_NAMES))
+        old_s, new_s = timed(legacy), timed(vectorized)
+        print(f"{n:8d} {old_s * 1e6:10.1f}us {new_s * 1e6:10.1f}us {old_s / new_s:7.0f}x {diff:13.2e}")
+
+    # Scalar wrapper (what the strategies call per leg)
+    old_s = timed(lambda: norm.cdf((np.log(24000 / 24100) + (r + 0.5 * 0.15 ** 2) * 0.05) / (0.15 * np.sqrt(0.05))))
+    new_s = timed(lambda: calculate_delta('c', 24000.0, 24100.0, 0.05, r, 0.15))
+    print(f"\ncalculate_delta (one option): scipy {old_s * 1e6:.1f}us | wrapper {new_s * 1e6:.1f}us")
+
+
+if __name__ == '__main__':
+    main()
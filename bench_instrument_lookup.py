@@ -0,0 +1,74 @@
+"""
+Benchmark: instrument metadata lookup by boolean DataFrame scan vs InstrumentMaster.lookup().
+
+    python bench_instrument_lookup.py [--data-dir ./data]
+
+Uses <data-dir>/NSE_FO.json (decompressed from NSE_FO.json.gz into a temp dir if only the .gz is there).
+"""
+import argparse
+import gzip
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+import numpy as np
+import config
+from instrument_manager import InstrumentMaster
+
+
+def prepare_master_dir(data_dir):
+    if os.path.exists(os.path.join(data_dir, 'NSE_FO.json')):
+        return data_dir
+    gz_path = os.path.join(data_dir, 'NSE_FO.json.gz')
+    if not os.path.exists(gz_path):
+        sys.exit(f"No NSE_FO.json(.gz) in {data_dir}")
+    tmp_dir = tempfile.mkdtemp(prefix='master_bench_')
+    with gzip.open(gz_path, 'rb') as f_in, open(os.path.join(tmp_dir, 'NSE_FO.json'), 'wb') as f_out:
+        shutil.copyfileobj(f_in, f_out)
+    return tmp_dir
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--data-dir', default=config.DATA_DIR)
+    parser.add_argument('--lookups', type=int, default=20000)
+    args = parser.parse_args()
+
+    master = InstrumentMaster(data_dir=prepare_master_dir(args.data_dir), auto_refresh=False)
+    master.load_master()
+    df = master.df
+    print(f"Master: {len(df)} instruments")
+
+    tracemalloc.start()
+    master._build_lookup_index(df)
+    index_bytes, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    t0 = time.perf_counter()
+    master._build_lookup_index(df)
+    build_ms = (time.perf_counter() - t0) * 1000
+    print(f"Index build     : {build_ms:8.1f} ms, {index_bytes / 1e6:.1f} MB")
+
+    rng = np.random.default_rng(0)
+    keys = df['instrument_key'].to_numpy()[rng.integers(0, len(df), args.lookups)].tolist()
+
+    n_scan = min(200, args.lookups)
+    t0 = time.perf_counter()
+    for key in keys[:n_scan]:
+        match = df[df['instrument_key'] == key]
+        if not match.empty:
+            _ = match.iloc[0]['expiry_dt']
+    scan_us = (time.perf_counter() - t0) / n_scan * 1e6
+
+    t0 = time.perf_counter()
+    for key in keys:
+        _ = master.lookup(key).expiry
+    lookup_us = (time.perf_counter() - t0) / len(keys) * 1e6
+
+    print(f"DataFrame scan  : {scan_us:8.1f} us / lookup")
+    print(f"master.lookup() : {lookup_us:8.2f} us / lookup  -> {scan_us / lookup_us:.0f}x faster")
+
+
+if __name__ == '__main__':
+    main()
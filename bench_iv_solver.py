@@ -0,0 +1,132 @@
+"""
+Benchmark: implied volatility for a chain without broker IV (a greeks-API outage).
+
+  scalar  - the old calculate_implied_volatility: scipy Newton from sigma=0.5, one option at a time
+  array   - the old calculate_implied_volatility_array: same Newton from 0.5, vectorized
+  cold    - iv_solver.solve_iv from the rational (Corrado-Miller) guess
+  warm    - IVSolver warm-started from the previous tick's IVs, after a 0.1% spot move
+
+    python bench_iv_solver.py [--options 600]
+"""
+import argparse
+import time
+import numpy as np
+from scipy.special import ndtr
+from scipy.stats import norm
+import config
+from greeks import bs_greeks
+from iv_solver import IVSolver, solve_iv
+
+
+def legacy_scalar_iv(price, S, K, t, r, flag):
+    def bs(sigma):
+        d1 = (np.log(S / K) + (r + 0.5 * sigma ** 2) * t) / (sigma * np.sqrt(t))
+        d2 = d1 - sigma * np.sqrt(t)
+        if flag == 'c':
+            return S * norm.cdf(d1) - K * np.exp(-r * t) * norm.cdf(d2), S * norm.pdf(d1) * np.sqrt(t)
+        return K * np.exp(-r * t) * norm.cdf(-d2) - S * norm.cdf(-d1), S * norm.pdf(d1) * np.sqrt(t)
+
+    intrinsic = max(K - S, 0) if flag == 'p' else max(S - K, 0)
+    if t <= 0 or price < intrinsic:
+        return 0.001, 0
+    sigma = 0.5
+    for i in range(100):
+        bs_price, v = bs(sigma)
+        diff = price - bs_price
+        if abs(diff) < 1e-5:
+            return sigma, i + 1
+        if v == 0:
+            break
+        sigma = np.clip(sigma + diff / v, 0.001, 10.0)
+    return sigma, 100
+
+
+def legacy_array_iv(price, S, K, t, r, is_call):
+    sigma = np.full(price.shape, 0.5)
+    active = np.ones(price.shape, dtype=bool)
+    sqrt_t = np.sqrt(t)
+    disc_K = K * np.exp(-r * t)
+    log_sk = np.log(S / K)
+    iters = 0
+    for _ in range(100):
+        if not active.any():
+            break
+        iters += 1
+        sig = sigma[active]
+        st = sqrt_t[active]
+        d1 = (log_sk[active] + (r + 0.5 * sig ** 2) * t[active]) / (sig * st)
+        d2 = d1 - sig * st
+        dk = disc_K[active]
+        bs_price = np.where(is_call[active], S * ndtr(d1) - dk * ndtr(d2), dk * ndtr(-d2) - S * ndtr(-d1))
+        diff = price[active] - bs_price
+        done = np.abs(diff) < 1e-5
+        v = S * np.exp(-0.5 * d1 ** 2) / np.sqrt(2 * np.pi) * st
+        sigma[active] = np.clip(sigma[active] + np.where(done, 0.0, diff / np.maximum(v, 1e-300)), 0.001, 10.0)
+        idx = np.flatnonzero(active)
+        active[idx[done]] = False
+    return sigma, iters
+
+
+def make_chain(n, spot=24000.0, seed=0):
+    """Strikes around spot on three expiries, priced off a smile, rounded to the 0.05 tick."""
+    rng = np.random.default_rng(seed)
+    strikes = spot + 50 * (np.arange(n) % (n // 6) - n // 12)
+    tte = np.array([3, 10, 31])[np.arange(n) % 3] / 365
+    is_call = np.arange(n) % 2 == 0
+    moneyness = np.log(strikes / spot)
+    true_iv = 0.13 + 0.8 * moneyness ** 2 - 0.1 * moneyness + rng.normal(0, 0.002, n)
+    price = np.maximum(np.round(bs_greeks(is_call, spot, strikes, tte, config.RISK_FREE_RATE, true_iv)['price'] / 0.05) * 0.05, 0.05)
+    return price, spot, strikes.astype(float), tte, is_call
+
+
+def timed(fn, repeat=5):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        out = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, out
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--options', type=int, default=600)
+    args = parser.parse_args()
+    r = config.RISK_FREE_RATE
+    price, spot, strikes, tte, is_call = make_chain(args.options)
+    keys = [f"NSE_FO|{40000 + i}" for i in range(len(price))]
+    flags = np.where(is_call, 'c', 'p')
+
+    scalar_s, scalar = timed(lambda: [legacy_scalar_iv(price[i], spot, strikes[i], tte[i], r, flags[i]) for i in range(len(price))], repeat=1)
+    scalar_iters = np.mean([it for _, it in scalar])
+    array_s, (_, array_iters) = timed(lambda: legacy_array_iv(price, spot, strikes, tte, r, is_call))
+    cold_s, cold = timed(lambda: solve_iv(price, spot, strikes, tte, r, is_call))
+
+    # Next tick: spot moved 0.1%, IVs moved up to 0.2 vol points, prices rounded to the tick again
+    spot2 = spot * 1.001
+    iv2 = cold.iv + np.random.default_rng(1).uniform(-0.002, 0.002, len(price))
+    price2 = np.maximum(np.round(bs_greeks(is_call, spot2, strikes, tte, r, iv2)['price'] / 0.05) * 0.05, 0.05)
+
+    def warm_tick():
+        solver = IVSolver()
+        solver.solve(keys, price, spot, strikes, tte, r, is_call)
+        start = time.perf_counter()
+        res = solver.solve(keys, price2, spot2, strikes, tte, r, is_call)
+        return time.perf_counter() - start, res
+    warm_s, warm = min((warm_tick() for _ in range(5)), key=lambda x: x[0])
+
+    print(f"{len(price)} options, no broker IV")
+    solvable = int((cold.iterations > 0).sum())
+    print(f"{'solver':8} {'time':>10} {'iterations':>22} {'converged/solvable':>19}")
+    print(f"{'scalar':8} {scalar_s * 1e3:8.2f}ms {scalar_iters:10.1f} avg/option")
+    print(f"{'array':8} {array_s * 1e3:8.2f}ms {array_iters:10d} rounds")
+    for name, secs, res in (('cold', cold_s, cold), ('warm', warm_s, warm)):
+        print(f"{name:8} {secs * 1e3:8.2f}ms {res.iterations[cold.iterations > 0].mean():10.1f} avg, {res.iterations.max():3d} max  "
+              f"{res.converged.sum():10d}/{solvable}")
+    cold2 = solve_iv(price2, spot2, strikes, tte, r, is_call).iterations
+    print(f"second tick solved cold instead: {cold2[cold2 > 0].mean():.1f} avg iterations")
+    print(f"max |IV diff| cold vs scalar: {np.max(np.abs(cold.iv - np.array([s for s, _ in scalar]))):.2e}")
+
+
+if __name__ == '__main__':
+    main()
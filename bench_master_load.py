@@ -0,0 +1,91 @@
+"""
+Benchmark: instrument master load time and peak RSS.
+
+  legacy  - json.load of the decompressed file into a full DataFrame (the old load_master)
+  stream  - streaming gzip parse keeping only the traded underlyings / instrument types (first startup)
+  cache   - the .npz columnar cache written by the streaming load (every later startup)
+
+    python bench_master_load.py [--data-dir ./data]
+
+Each mode runs in a fresh interpreter so peak RSS is not shared between them.
+"""
+import argparse
+import gzip
+import json
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import config
+
+
+def peak_rss_mb():
+    # ru_maxrss is KB on Linux, bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == 'darwin' else rss / 1024
+
+
+def run_mode(mode, gz_path, work_dir):
+    import pandas as pd
+    from master_loader import load_master_frame
+
+    underlyings = getattr(config, 'TRADED_UNDERLYINGS', [config.UNDERLYING_NAME])
+    types = getattr(config, 'MASTER_INSTRUMENT_TYPES', ['CE', 'PE', 'FUT'])
+    cache_path = os.path.join(work_dir, 'NSE_FO.npz')
+    base_rss = peak_rss_mb()
+
+    start = time.perf_counter()
+    if mode == 'legacy':
+        json_path = os.path.join(work_dir, 'NSE_FO.json')
+        with open(json_path, 'r') as f:
+            data = json.load(f)
+        df = pd.DataFrame(data)
+        df['expiry_dt'] = pd.to_datetime(df['expiry'], unit='ms', errors='coerce').dt.date
+    else:
+        if mode == 'stream' and os.path.exists(cache_path):
+            os.remove(cache_path)
+        df = load_master_frame(gz_path, cache_path, underlyings, types)
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    print(json.dumps({'mode': mode, 'rows': len(df), 'ms': elapsed_ms, 'peak_rss_mb': peak_rss_mb(),
+                      'base_rss_mb': base_rss, 'df_mb': df.memory_usage(deep=True).sum() / 1e6}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--data-dir', default=config.DATA_DIR)
+    parser.add_argument('--mode', help=argparse.SUPPRESS)
+    parser.add_argument('--work-dir', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    gz_path = os.path.join(args.data_dir, 'NSE_FO.json.gz')
+    if args.mode:
+        run_mode(args.mode, gz_path, args.work_dir)
+        return
+    if not os.path.exists(gz_path):
+        sys.exit(f"No NSE_FO.json.gz in {args.data_dir}")
+
+    work_dir = tempfile.mkdtemp(prefix='master_load_bench_')
+    try:
+        with gzip.open(gz_path, 'rb') as f_in, open(os.path.join(work_dir, 'NSE_FO.json'), 'wb') as f_out:
+            shutil.copyfileobj(f_in, f_out)
+
+        results = []
+        for mode in ('legacy', 'stream', 'cache'):
+            out = subprocess.run([sys.executable, os.path.abspath(__file__), '--data-dir', args.data_dir,
+                                  '--mode', mode, '--work-dir', work_dir],
+                                 capture_output=True, text=True, check=True).stdout
+            results.append(json.loads(out.strip().splitlines()[-1]))
+
+        print(f"{'mode':8} {'rows':>7} {'load ms':>9} {'peak RSS MB':>12} {'(+ over imports)':>17} {'df MB':>7}")
+        for r in results:
+            print(f"{r['mode']:8} {r['rows']:7d} {r['ms']:9.1f} {r['peak_rss_mb']:12.1f} "
+                  f"{r['peak_rss_mb'] - r['base_rss_mb']:17.1f} {r['df_mb']:7.2f}")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
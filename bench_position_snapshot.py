@@ -0,0 +1,63 @@
+"""
+Benchmark: per-tick broker position reconciliation, three strategies re-parsing get_positions() each
+(the old loop) vs one shared PositionSnapshot parse plus changes_for() per strategy.
+
+Positions are PositionData-like objects with no strike_price, so every parse goes through the symbol regex.
+Most ticks nothing changes; --change-every sets how often one position's quantity moves.
+
+    python bench_position_snapshot.py [--positions 12 40] [--ticks 2000] [--change-every 50]
+"""
+import argparse
+import time
+from types import SimpleNamespace
+from position_snapshot import PositionSnapshot, parse_position
+
+STRATEGIES = ('CalendarPEWeekly', 'WeeklyIronfly', 'BatmanStrategy')
+
+
+def make_positions(n):
+    return [SimpleNamespace(instrument_token=f"NSE_FO|{40000 + i}", trading_symbol=f"NIFTY26NOV{23000 + 50 * i}PE",
+                            net_quantity=-75 if i % 2 else 75, quantity=-75 if i % 2 else 75, average_price=0.0,
+                            buy_value=7500.0 if i % 2 == 0 else 0.0, sell_value=7500.0 if i % 2 else 0.0,
+                            strike_price=0.0, expiry='2026-11-26') for i in range(n)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--positions', type=int, nargs='+', default=[12, 40])
+    parser.add_argument('--ticks', type=int, default=2000)
+    parser.add_argument('--change-every', type=int, default=50)
+    args = parser.parse_args()
+
+    print(f"{'positions':>9} {'old us/tick':>12} {'snapshot us/tick':>17} {'reconciles old':>15} {'reconciles new':>15}")
+    for n in args.positions:
+        positions = make_positions(n)
+
+        start = time.perf_counter()
+        for tick in range(args.ticks):
+            if tick % args.change_every == 0:
+                positions[0].net_quantity = positions[0].quantity = -75 * (1 + tick // args.change_every % 2)
+            for _ in STRATEGIES:
+                sorted((parse_position(p) for p in positions), key=lambda r: (r.expiry, r.symbol))
+        old = (time.perf_counter() - start) / args.ticks
+
+        snapshot = PositionSnapshot()
+        owners = {name: [{'instrument_key': f"NSE_FO|{40000 + i}"} for i in range(n) if i % 3 == k]
+                  for k, name in enumerate(STRATEGIES)}
+        reconciles = 0
+        start = time.perf_counter()
+        for tick in range(args.ticks):
+            if tick % args.change_every == 0:
+                positions[0].net_quantity = positions[0].quantity = -75 * (1 + tick // args.change_every % 2)
+            snapshot.update(positions)
+            snapshot.index_owners(owners)
+            for name in STRATEGIES:
+                if snapshot.changes_for(name):
+                    reconciles += 1
+                    sorted(snapshot.positions(), key=lambda r: (r.expiry, r.symbol))
+        new = (time.perf_counter() - start) / args.ticks
+        print(f"{n:9d} {old * 1e6:12.1f} {new * 1e6:17.1f} {args.ticks * len(STRATEGIES):15d} {reconciles:15d}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,155 @@
+"""
+Benchmark: state replication lag and throughput per backend, with a local peer process as the standby machine.
+
+    python bench_replication.py [--backends tcp,sqlite,git] [--paced 40] [--rate 20] [--burst 2000] [--files 3]
+
+Paced: --paced changes at --rate per second; lag = standby receive time - publish time (median / p95 / max).
+Burst: --burst changes spread over --files state files as fast as possible; throughput = changes/s published, and
+what the standby saw (per file only the latest state matters, so coalesced intermediate states are not "lost").
+Git uses a local bare repo as the remote and a second clone as the standby (commit interval 0.2s, pull every 0.5s).
+"""
+import argparse
+import json
+import multiprocessing as mp
+import os
+import queue
+import shutil
+import subprocess
+import tempfile
+import time
+import numpy as np
+from replication import GitReplicator, SQLiteReplicator, TcpReplicator
+
+PAYLOAD = [{'leg': f'LEG{i}', 'instrument_key': f'NSE_FO|{40000 + i}', 'strike': 23000.0 + 100 * i, 'qty': 75,
+            'side': 'SELL', 'entry_price': 101.25, 'delta': 0.25, 'expiry_dt': '2026-11-26'} for i in range(6)]
+
+
+def make_backend(backend, params, standby=False):
+    if backend == 'tcp':
+        return TcpReplicator(host='127.0.0.1', port=params['port'], secret=params['secret'])
+    if backend == 'sqlite':
+        return SQLiteReplicator(params['db'], poll_interval=0.01)
+    return GitReplicator(repo_dir=params['standby'] if standby else params['primary'], interval=0.2, remote='origin', branch='main')
+
+
+def peer(backend, params, ready, out):
+    """The standby: subscribes and reports (file, seq, receive time) for every state it gets."""
+    replicator = make_backend(backend, params, standby=True)
+    on_state = lambda path, state, meta: out.put((os.path.basename(path), state['seq'], state['ts'], time.time()))
+    if backend == 'git':
+        replicator.subscribe(on_state, interval=0.5)
+    else:
+        replicator.subscribe(on_state)
+    ready.set()
+    time.sleep(3600)
+
+
+def git(cwd, *args):
+    subprocess.run(['git', *args], cwd=cwd, check=True, capture_output=True)
+
+
+def setup(backend, tmp):
+    if backend == 'tcp':
+        primary = TcpReplicator(host='127.0.0.1', port=0, secret='bench')
+        return primary, {'port': primary.start_server(), 'secret': 'bench'}
+    if backend == 'sqlite':
+        params = {'db': os.path.join(tmp, 'state_replica.db')}
+        return make_backend(backend, params), params
+    remote = os.path.join(tmp, 'remote.git')
+    git(tmp, 'init', '--bare', '-b', 'main', remote)
+    params = {}
+    for name in ('primary', 'standby'):
+        params[name] = os.path.join(tmp, name)
+        git(tmp, 'clone', remote, params[name])
+        for args in (('config', 'user.email', 'bench@example.com'), ('config', 'user.name', 'bench'), ('checkout', '-b', 'main')):
+            git(params[name], *args)
+    git(params['primary'], 'commit', '--allow-empty', '-m', 'init')
+    git(params['primary'], 'push', 'origin', 'main')
+    return make_backend(backend, params), params
+
+
+def publish(primary, backend, params, name, seq):
+    state = {'seq': seq, 'ts': time.time(), 'positions': PAYLOAD}
+    if backend == 'git':
+        path = os.path.join(params['primary'], name)
+        with open(path, 'w') as f:
+            json.dump(state, f)
+        primary.publish(path, state, snapshot=True)
+    else:
+        primary.publish(name, state)
+
+
+def drain(out, until, stop_when):
+    got = []
+    while time.time() < until and not stop_when(got):
+        try:
+            got.append(out.get(timeout=0.05))
+        except queue.Empty:
+            pass
+    return got
+
+
+def run(backend, args):
+    tmp = tempfile.mkdtemp()
+    ctx = mp.get_context('spawn')
+    proc = None
+    primary = None
+    try:
+        primary, params = setup(backend, tmp)
+        ready, out = ctx.Event(), ctx.Queue()
+        if backend == 'sqlite':
+            publish(primary, backend, params, 'warmup_live_state.json', -1)    # create the DB before the peer polls it
+            primary.flush()
+        proc = ctx.Process(target=peer, args=(backend, params, ready, out), daemon=True)
+        proc.start()
+        ready.wait(30)
+        time.sleep(0.5 if backend != 'git' else 1.0)
+        drain(out, time.time() + 0.5, lambda got: False)
+
+        paced = args.paced if backend != 'git' else min(args.paced, 8)
+        rate = args.rate if backend != 'git' else 1.0
+        for seq in range(paced):
+            publish(primary, backend, params, 'Calendar_live_state.json', seq)
+            time.sleep(1.0 / rate)
+        got = drain(out, time.time() + 10, lambda got: any(g[1] == paced - 1 for g in got))
+        lags = np.array([(recv - sent) * 1000 for _, _, sent, recv in got]) if got else np.array([np.nan])
+
+        burst = args.burst if backend != 'git' else min(args.burst, 50)
+        names = [f'S{i}_live_state.json' for i in range(args.files)]
+        t0 = time.perf_counter()
+        for seq in range(burst):
+            publish(primary, backend, params, names[seq % args.files], paced + seq)
+        publish_s = time.perf_counter() - t0
+        primary.flush(60)
+        sent_s = time.perf_counter() - t0
+        last = {names[i % args.files]: paced + i for i in range(max(0, burst - args.files), burst)}
+        got_burst = drain(out, time.time() + 30, lambda got: all(any(g[0] == n and g[1] == s for g in got) for n, s in last.items()))
+        caught_up_s = time.perf_counter() - t0
+        print(f"{backend:6s}: lag median {np.median(lags):8.1f} ms | p95 {np.percentile(lags, 95):8.1f} ms | max {lags.max():8.1f} ms "
+              f"({len(got)}/{paced} paced seen) | burst {burst / publish_s:9.0f}/s published, flushed in {sent_s * 1000:7.1f} ms, "
+              f"standby current after {caught_up_s * 1000:7.1f} ms ({len(got_burst)} states received)")
+    finally:
+        if primary is not None:
+            primary.stop(10)
+        if proc is not None:
+            proc.terminate()
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--backends', default='tcp,sqlite,git')
+    parser.add_argument('--paced', type=int, default=40)
+    parser.add_argument('--rate', type=float, default=20.0, help='paced changes per second')
+    parser.add_argument('--burst', type=int, default=2000)
+    parser.add_argument('--files', type=int, default=3)
+    args = parser.parse_args()
+    for backend in args.backends.split(','):
+        if backend == 'git' and not shutil.which('git'):
+            print("git   : skipped (git not installed)")
+            continue
+        run(backend, args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+"""
+Benchmark: portfolio risk grid (spot x IV scale x days ahead) over a synthetic book of option legs.
+
+The book mixes calls and puts on three expiries (3, 10 and 31 days) around spot, long and short.
+Reports the time of one full revaluation (RiskGrid.revalue, including the per-strategy P&L aggregation),
+the same grid done scenario by scenario with bs_greeks, and the max price difference between the two.
+
+    python bench_risk_grid.py [--legs 24 36 48] [--spot-steps 50]
+"""
+import argparse
+import time
+from datetime import datetime, timedelta
+import numpy as np
+import config
+from greeks import bs_greeks
+from risk_grid import RiskGrid
+
+NOW = datetime(2026, 11, 2, 10, 0)
+SPOT = 24000.0
+
+
+def make_book(n_legs, seed=0, strategies=3):
+    rng = np.random.default_rng(seed)
+    book = {}
+    for i in range(n_legs):
+        days = int(rng.choice([3, 10, 31]))
+        leg = {'instrument_key': f"NSE_FO|{50000 + i}", 'strike': float(SPOT + 50 * rng.integers(-20, 21)),
+               'type': 'c' if rng.random() < 0.5 else 'p', 'qty': int(rng.choice([-75, 75, -150])),
+               'expiry_dt': (NOW + timedelta(days=days)).strftime('%Y-%m-%d'), 'entry_price': float(rng.uniform(20, 300)),
+               'iv': round(float(rng.uniform(0.10, 0.20)), 4)}
+        book.setdefault(f"Strategy{i % strategies}", []).append(leg)
+    return book
+
+
+def best_of(fn, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--legs', type=int, nargs='+', default=[24, 36, 48])
+    parser.add_argument('--spot-steps', type=int, default=50)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+    grid = RiskGrid(spot_steps=args.spot_steps)
+    n_s, n_v, n_t = grid.shape
+    print(f"Grid: {n_s} spot x {n_v} IV x {n_t} days = {n_s * n_v * n_t} scenarios, r={config.RISK_FREE_RATE}")
+    print(f"{'legs':>5} {'grid ms':>8} {'per-scenario ms':>16} {'speedup':>8} {'max price diff':>15}")
+
+    for n_legs in args.legs:
+        book = make_book(n_legs)
+        legs = [leg for strat_legs in book.values() for leg in strat_legs]
+        grid_s = best_of(lambda: grid.revalue(book, SPOT, NOW), args.repeat)
+
+        strike = np.array([leg['strike'] for leg in legs])
+        flags = np.array([leg['type'] for leg in legs])
+        sigma = np.array([leg['iv'] for leg in legs])
+        tte = np.array([(datetime.fromisoformat(leg['expiry_dt']) - NOW).total_seconds() / (365 * 24 * 3600) for leg in legs])
+        is_call = flags == 'c'
+        values = grid.values(SPOT, strike, is_call, tte, sigma)
+
+        def per_scenario():
+            out = np.empty((n_s, n_v, n_t, len(legs)))
+            for i, move in enumerate(grid.moves_pct):
+                s = SPOT * (1 + move / 100)
+                for j, scale in enumerate(grid.iv_scales):
+                    for k, days in enumerate(grid.days_ahead):
+                        t = tte - days / 365
+                        live = t > 0
+                        price = bs_greeks(flags, s, strike, np.where(live, t, 1.0), config.RISK_FREE_RATE, sigma * scale)['price']
+                        out[i, j, k] = np.where(live, price, np.maximum(np.where(is_call, s - strike, strike - s), 0.0))
+            return out
+        start = time.perf_counter()
+        reference = per_scenario()
+        loop_s = time.perf_counter() - start
+
+        print(f"{n_legs:5d} {grid_s * 1000:8.2f} {loop_s * 1000:16.1f} {loop_s / grid_s:7.0f}x "
+              f"{np.max(np.abs(values - reference)):15.2e}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+"""
+Benchmark: strategy state saves as full indent=4 JSON rewrites (the old save_current_state) vs the StateStore
+(hash + skip unchanged, WAL deltas, atomic snapshot), and restart time (snapshot + WAL replay).
+
+    python bench_state_store.py [--saves 2000] [--changed 0.2] [--positions 6] [--fsync]
+
+--changed: fraction of saves whose state actually differs (the rest are repeat saves within a tick).
+"""
+import argparse
+import json
+import os
+import shutil
+import tempfile
+import time
+import numpy as np
+from state_store import StateStore
+
+
+def make_state(rng, n):
+    return {'positions': [{'leg': f'LEG{i}', 'instrument_key': f'NSE_FO|{40000 + i}', 'strike': 23000.0 + 100 * i,
+                           'qty': 75, 'side': 'SELL' if i % 2 else 'BUY', 'entry_price': float(rng.uniform(20, 300)),
+                           'delta': float(rng.uniform(0.05, 0.5)), 'expiry_dt': '2026-11-26', 'type': 'p'} for i in range(n)],
+            'adjustment_count': 0}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--saves', type=int, default=2000)
+    parser.add_argument('--changed', type=float, default=0.2)
+    parser.add_argument('--positions', type=int, default=6)
+    parser.add_argument('--fsync', action='store_true', help='fsync every write (as in production)')
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    tmp = tempfile.mkdtemp()
+    try:
+        state = make_state(rng, args.positions)
+        states = []
+        for _ in range(args.saves):
+            if rng.random() < args.changed:
+                state = json.loads(json.dumps(state))
+                leg = state['positions'][rng.integers(args.positions)]
+                leg['delta'] = float(rng.uniform(0.05, 0.5))
+                state['adjustment_count'] += 1
+            states.append(state)
+
+        legacy_path = os.path.join(tmp, 'legacy_live_state.json')
+        t0 = time.perf_counter()
+        for s in states:
+            with open(legacy_path, 'w') as f:
+                json.dump(s, f, indent=4)
+                if args.fsync:
+                    f.flush()
+                    os.fsync(f.fileno())
+        legacy_us = (time.perf_counter() - t0) / args.saves * 1e6
+
+        path = os.path.join(tmp, 'store_live_state.json')
+        store = StateStore(path, max_wal_records=10 ** 9, compact_seconds=10 ** 9, fsync=args.fsync)
+        t0 = time.perf_counter()
+        for s in states:
+            store.save(s)
+        store_us = (time.perf_counter() - t0) / args.saves * 1e6
+        stats = store.stats()
+
+        restarted = StateStore(path, fsync=args.fsync)
+        assert restarted.load() == states[-1]
+        print(f"{args.saves} saves, {stats['saves'] - stats['skipped']} changed, {args.positions} positions")
+        print(f"Per save : full rewrite {legacy_us:7.1f} us | state store {store_us:7.1f} us "
+              f"({stats['skipped']} skipped, {stats['wal_appends']} WAL appends) -> {legacy_us / store_us:.1f}x")
+        print(f"Restart  : snapshot + {restarted.replayed} WAL records replayed in {restarted.load_ms:.1f} ms")
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+"""
+Benchmark: per-tick ATM strike-window selection with DataFrame isin() filters vs the StrikeIndex bisect slices,
+plus the startup cost of get_option_symbols for the six expiry/type frames.
+
+    python bench_strike_window.py [--data-dir ./data] [--ticks 2000]
+
+Uses <data-dir>/NSE_FO.json (decompressed from NSE_FO.json.gz into a temp dir if only the .gz is there).
+"""
+import argparse
+import time
+import numpy as np
+import config
+from bench_instrument_lookup import prepare_master_dir
+from instrument_manager import InstrumentMaster
+from strike_index import StrikeIndex
+
+
+def legacy_option_symbols(df, underlying, expiry, option_type):
+    """The per-call filter get_option_symbols used before the strike index."""
+    mask = (df['name'] == underlying) & (df['instrument_type'].isin(['CE', 'PE']))
+    mask = mask & (df['expiry_dt'] == expiry) & (df['instrument_type'] == option_type)
+    filtered = df[mask].copy()
+    filtered['strike'] = filtered['strike_price']
+    return filtered[['instrument_key', 'trading_symbol', 'strike', 'expiry_dt']]
+
+
+def legacy_window_keys(frames, atm, width):
+    strikes = range(atm - width, atm + width + 50, 50)
+    keys = []
+    for df in frames:
+        keys += df[df['strike'].isin(strikes)]['instrument_key'].tolist()
+    return set(keys)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--data-dir', default=config.DATA_DIR)
+    parser.add_argument('--ticks', type=int, default=2000)
+    parser.add_argument('--width', type=int, default=500)
+    args = parser.parse_args()
+
+    master = InstrumentMaster(data_dir=prepare_master_dir(args.data_dir), auto_refresh=False)
+    master.load_master()
+    df = master.df
+    name = config.UNDERLYING_NAME
+    # Nearest expiries in the file (not relative to today, so an older master still exercises the dense weekly chains)
+    expiries = sorted(e for e in df.loc[df['name'] == name, 'expiry_dt'].dropna().unique())[:3]
+    print(f"Master: {len(df)} instruments, expiries {[str(e) for e in expiries]}")
+
+    t0 = time.perf_counter()
+    frames = [legacy_option_symbols(df, name, exp, t) for exp in expiries for t in ('PE', 'CE')]
+    legacy_startup_ms = (time.perf_counter() - t0) * 1000
+
+    t0 = time.perf_counter()
+    index = StrikeIndex.from_master(df, [name])
+    index_build_ms = (time.perf_counter() - t0) * 1000
+    print(f"Startup (6 frames)  : legacy filters {legacy_startup_ms:7.1f} ms | index build {index_build_ms:7.1f} ms "
+          f"({len(index)} series)")
+
+    mid = float(np.median(index.get(name, expiries[0], 'PE').strikes))
+    rng = np.random.default_rng(0)
+    atms = (np.round((mid + rng.normal(0, 300, args.ticks)) / 50) * 50).astype(int).tolist()
+
+    for atm in atms[:50]:
+        assert legacy_window_keys(frames, atm, args.width) == set(index.select_keys(name, expiries, atm, args.width))
+
+    n_legacy = min(200, args.ticks)
+    t0 = time.perf_counter()
+    for atm in atms[:n_legacy]:
+        legacy_window_keys(frames, atm, args.width)
+    legacy_us = (time.perf_counter() - t0) / n_legacy * 1e6
+
+    t0 = time.perf_counter()
+    for atm in atms:
+        index.select_keys(name, expiries, atm, args.width)
+    index_us = (time.perf_counter() - t0) / len(atms) * 1e6
+
+    print(f"Window per tick     : isin() {legacy_us:8.1f} us | bisect {index_us:6.1f} us  -> {legacy_us / index_us:.0f}x faster")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+"""
+Benchmark: trade journal startup and SYNC_EXISTING dedupe, CSV-only journal vs the SQLite journal.
+
+    python bench_trade_journal.py [--rows 50000] [--days 250] [--dedupes 200]
+
+Startup: TradeJournal() on a trade_log CSV of --rows rows (CSV: sum every pnl cell; SQLite: first run migrates
+the CSV, later runs read the materialized daily P&L). Dedupe: log_trade(check_duplicate=True) for positions
+already logged today, as pull_from_broker does every sync (CSV: full file scan each call; SQLite: index seek).
+"""
+import argparse
+import csv
+import os
+import shutil
+import tempfile
+import time
+from datetime import datetime, timedelta
+from unittest.mock import patch
+import numpy as np
+import config
+from trade_logger import TradeJournal
+
+
+def write_log(path, rows, days, rng):
+    start = datetime.now() - timedelta(days=days)
+    tags = ['WEEKLY_ENTRY', 'WEEKLY_EXIT_ADJ', 'WEEKLY_ROLL_ENTRY', 'MONTHLY_ENTRY', 'SYNC_EXISTING']
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['timestamp', 'instrument_key', 'side', 'qty', 'price', 'expiry', 'tag', 'pnl'])
+        for i in range(rows):
+            ts = start + timedelta(seconds=int(days * 86400 * i / rows))
+            tag = tags[i % len(tags)]
+            pnl = round(float(rng.normal(0, 1500)), 2) if 'EXIT' in tag else None
+            writer.writerow([ts.strftime("%Y-%m-%d %H:%M:%S"), f"NSE_FO|{40000 + i % 400}", 'SELL', 65,
+                             round(float(rng.uniform(20, 300)), 2), '2026-11-26', tag, pnl])
+
+
+def timed_journal(filename):
+    t0 = time.perf_counter()
+    journal = TradeJournal(filename=filename)
+    return journal, (time.perf_counter() - t0) * 1000
+
+
+def dedupe_ms(journal, n):
+    journal.log_trade('NSE_FO|99999', 'SELL', 65, 71.75, 'SYNC_EXISTING', check_duplicate=True)
+    t0 = time.perf_counter()
+    for _ in range(n):
+        journal.log_trade('NSE_FO|99999', 'SELL', 65, 71.75, 'SYNC_EXISTING', check_duplicate=True)
+    return (time.perf_counter() - t0) / n * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=50000)
+    parser.add_argument('--days', type=int, default=250)
+    parser.add_argument('--dedupes', type=int, default=200)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    tmp = tempfile.mkdtemp()
+    try:
+        base = os.path.join(tmp, 'trade_log_calendar.csv')
+        log = os.path.join(tmp, f'trade_log_calendar_{config.TRADING_MODE.lower()}.csv')
+        write_log(log, args.rows, args.days, rng)
+        pristine = log + '.orig'
+        shutil.copyfile(log, pristine)
+        with patch('trade_logger.git_utils.request_push'):
+            with patch.object(config, 'TRADE_JOURNAL_DB', None, create=True):
+                legacy, legacy_start = timed_journal(base)
+                legacy_dedupe = dedupe_ms(legacy, args.dedupes)
+
+            shutil.copyfile(pristine, log)
+            with patch.object(config, 'TRADE_JOURNAL_DB', os.path.join(tmp, 'trade_journal.db'), create=True), \
+                    patch('builtins.print'):
+                _, migrate = timed_journal(base)
+                journal, db_start = timed_journal(base)
+                db_dedupe = dedupe_ms(journal, args.dedupes)
+        assert abs(journal.closed_pnl - legacy.closed_pnl) < 1e-6
+        print(f"{args.rows} rows over {args.days} days, closed P&L INR {journal.closed_pnl:,.2f}")
+        print(f"Startup : CSV sum {legacy_start:8.1f} ms | SQLite {db_start:8.1f} ms (one-time migration {migrate:.1f} ms)"
+              f" -> {legacy_start / db_start:.0f}x")
+        print(f"Dedupe  : CSV scan {legacy_dedupe:8.3f} ms | SQLite {db_dedupe:8.3f} ms per check"
+              f" -> {legacy_dedupe / db_dedupe:.0f}x")
+        journal.db.close()
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+"""
+Benchmark: SVI smile fit per expiry (cold and warm-started incremental refit) on a synthetic chain.
+
+Quotes are generated from a known SVI smile for strikes inside spot ± --window (what the loop fetches),
+rounded to the 0.05 tick, then turned back into IVs. Reports fit time and the IV / delta error of the fitted
+smile at strikes out to spot ± --far, i.e. where Batman's 0.05-delta hedge usually lies.
+
+    python bench_vol_surface.py [--window 500] [--far 2000] [--days 3 7 28]
+"""
+import argparse
+import time
+import numpy as np
+import config
+from greeks import bs_greeks
+from iv_solver import solve_iv
+from option_chain import OptionChain
+from vol_surface import VolSurface, fit_svi, svi_total_variance
+
+# a, b, rho, m, sigma in total variance per year of expiry (scaled by t below)
+TRUE_SVI = np.array([0.010, 0.10, -0.55, 0.01, 0.04])
+
+
+def true_iv(strikes, spot, t, r):
+    k = np.log(strikes / (spot * np.exp(r * t)))
+    a, b, rho, m, sigma = TRUE_SVI
+    return np.sqrt(svi_total_variance([a * t, b * t ** 0.5, rho, m * t ** 0.5, sigma * t ** 0.5], k) / t)
+
+
+def make_chain(spot, t, r, window, seed=0, shift=0.0):
+    strikes = np.arange(spot - window, spot + window + 1, 50.0)
+    strikes = np.repeat(strikes, 2)
+    types = np.tile(np.array(['p', 'c']), len(strikes) // 2)
+    iv = true_iv(strikes, spot, t, r) + shift
+    price = np.maximum(np.round(bs_greeks(types, spot, strikes, t, r, iv)['price'] / 0.05) * 0.05, 0.05)
+    solved = solve_iv(price, spot, strikes, t, r, types)
+    n = len(strikes)
+    keys = [f"NSE_FO|{seed * 10000 + i}" for i in range(n)]
+    return OptionChain(keys, strikes, types, price, solved.iv, np.full(n, t), [f"2026-11-{int(t * 365) + 1:02d}"] * n,
+                       np.zeros(n), np.zeros(n))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--window', type=float, default=500)
+    parser.add_argument('--far', type=float, default=2000)
+    parser.add_argument('--days', type=int, nargs='+', default=[3, 7, 28])
+    args = parser.parse_args()
+    r = config.RISK_FREE_RATE
+    spot = 24000.0
+
+    print(f"{'days':>4} {'quotes':>6} {'cold ms':>8} {'iters':>5} {'warm ms':>8} {'iters':>5} {'rmse':>7} "
+          f"{'max IV err far':>15} {'max |delta| err far':>20}")
+    for days in args.days:
+        t = days / 365
+        surface = VolSurface(r=r)
+        chain = make_chain(spot, t, r, args.window)
+        cold = min((VolSurface(r=r).update(chain, spot) for _ in range(5)), key=lambda f: next(iter(f.values())).fit_ms)
+        cold = next(iter(cold.values()))
+        surface.update(chain, spot)
+
+        # Next tick: spot +0.1%, vols +0.3 points
+        spot2 = spot * 1.001
+        chain2 = make_chain(spot2, t, r, args.window, shift=0.003)
+        warm_ms, warm = float('inf'), None
+        for _ in range(5):
+            s = VolSurface(r=r)
+            s.slices = dict(surface.slices)
+            fitted = next(iter(s.update(chain2, spot2).values()))
+            if fitted.fit_ms < warm_ms:
+                warm_ms, warm = fitted.fit_ms, fitted
+
+        far = np.arange(spot2 - args.far, spot2 + args.far + 1, 50.0)
+        model_iv = warm.iv(far)
+        exact_iv = true_iv(far, spot2, t, r) + 0.003
+        types = np.where(far < spot2, 'p', 'c')
+        model_delta = bs_greeks(types, spot2, far, t, r, model_iv)['delta']
+        exact_delta = bs_greeks(types, spot2, far, t, r, exact_iv)['delta']
+        print(f"{days:4d} {warm.n_quotes:6d} {cold.fit_ms:8.2f} {cold.iterations:5d} {warm_ms:8.2f} {warm.iterations:5d} "
+              f"{warm.rmse:7.4f} {np.max(np.abs(model_iv - exact_iv)):15.4f} {np.max(np.abs(model_delta - exact_delta)):20.4f}")
+
+    # Raw fit cost without the chain bookkeeping
+    chain = make_chain(spot, 7 / 365, r, args.window)
+    use = chain.iv > 0.005
+    k = np.log(chain.strike[use] / (spot * np.exp(r * 7 / 365)))
+    start = time.perf_counter()
+    for _ in range(20):
+        fit_svi(k, chain.iv[use], 7 / 365)
+    print(f"\nfit_svi cold on {use.sum()} quotes: {(time.perf_counter() - start) / 20 * 1000:.2f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+"""
+Synthetic option chains shared by test_option_chain.py and bench_chain_packaging.py: master-style PE/CE frames with
+quotes (and optionally broker greeks), plus the pre-vectorization package_chain they are compared against.
+"""
+from datetime import date, datetime, timedelta
+import numpy as np
+import pandas as pd
+import config
+from greeks import calculate_delta
+from utils import black_scholes_price, calculate_implied_volatility
+
+
+class _Q:
+    __slots__ = ('last_price',)
+
+    def __init__(self, p):
+        self.last_price = p
+
+
+def make_chain(n_strikes=500, n_expiries=6, spot=24000.0, broker_greeks=False, seed=0):
+    rng = np.random.default_rng(seed)
+    today = date(2026, 10, 19)
+    strikes = spot + 50 * (np.arange(n_strikes) - n_strikes // 2)
+    pe_rows, ce_rows, quotes, greeks = [], [], {}, {}
+    token = 40000
+    for e in range(n_expiries):
+        expiry = today + timedelta(days=7 * (e + 1))
+        t = (7 * (e + 1)) / 365
+        for k in strikes:
+            for flag, rows in (('p', pe_rows), ('c', ce_rows)):
+                key = f"NSE_FO|{token}"
+                token += 1
+                sigma = 0.12 + 0.1 * abs(np.log(k / spot)) + rng.uniform(0, 0.02)
+                price = max(0.05, round(float(black_scholes_price(flag, spot, k, t, config.RISK_FREE_RATE, sigma)), 2))
+                rows.append({'instrument_key': key, 'trading_symbol': key, 'strike': float(k), 'expiry_dt': expiry})
+                quotes[key] = _Q(price)
+                if broker_greeks:
+                    greeks[key] = {'delta': float(calculate_delta(flag, spot, k, t, config.RISK_FREE_RATE, sigma)), 'iv': sigma * 100,
+                                   'theta': None, 'gamma': None, 'vega': None}
+    return pd.DataFrame(pe_rows), pd.DataFrame(ce_rows), quotes, greeks
+
+
+def legacy_package_chain(pe_df, ce_df, q_dict, g_dict, spot, t_now):
+    """
+    The pre-vectorization package_chain from run_strategy.main, kept verbatim for comparison. It used the broker IV
+    as given (percent): hand it greeks with decimal IVs to compare it with build_chain.
+    """
+    chain = []
+    for df, opt_type in [(pe_df, 'p'), (ce_df, 'c')]:
+        df_relevant = df[df['instrument_key'].isin(q_dict.keys())]
+        for _, row in df_relevant.iterrows():
+            key = row['instrument_key']
+            ltp = q_dict[key].last_price
+            tte = (datetime.combine(row['expiry_dt'], datetime.min.time()) - t_now).total_seconds() / (365*24*3600)
+            if tte <= 0: tte = 0.0001
+            broker_data = g_dict.get(key, {})
+            broker_delta = broker_data.get('delta')
+            iv_val = broker_data.get('iv')
+            if not iv_val:
+                iv_val = calculate_implied_volatility(ltp, spot, row['strike'], tte, config.RISK_FREE_RATE, opt_type)
+            calc_delta = calculate_delta(opt_type, spot, row['strike'], tte, config.RISK_FREE_RATE, iv_val)
+            final_delta = broker_delta if broker_delta is not None else calc_delta
+            chain.append({
+                'strike': row['strike'], 'iv': iv_val, 'time_to_expiry': tte,
+                'expiry_dt': row['expiry_dt'].strftime('%Y-%m-%d') if isinstance(row['expiry_dt'], (date, datetime)) else str(row['expiry_dt']),
+                'instrument_key': key, 'ltp': ltp, 'type': opt_type, 'delta': final_delta, 'calculated_delta': calc_delta
+            })
+    return chain
@@ -0,0 +1,133 @@
+from bisect import bisect_left
+import numpy as np
+from option_chain import OptionChain
+
+
+class _Group:
+    """Rows of one (type, expiry, round-only, IV filter) slice, sorted by strike and by |delta| (chain order on ties)."""
+    __slots__ = ('by_strike', 'strikes', 'by_delta', 'deltas')
+
+    def __init__(self, by_strike, strikes, by_delta, deltas):
+        self.by_strike = by_strike
+        self.strikes = strikes
+        self.by_delta = by_delta
+        self.deltas = deltas
+
+
+def _nearest(values, order, target):
+    """Position (in chain order) of the value closest to target in a sorted list; first in chain order on ties."""
+    n = len(values)
+    if n == 0:
+        return None
+    i = bisect_left(values, target)
+    best = None
+    for j in (i - 1, i):
+        if 0 <= j < n:
+            j = bisect_left(values, values[j])      # start of a run of equal values = earliest row of the run
+            cand = (abs(values[j] - target), order[j])
+            if best is None or cand < best:
+                best = cand
+    return best[1]
+
+
+def _column(rows, field):
+    out = np.full(len(rows), np.nan)
+    for i, row in enumerate(rows):
+        value = row.get(field)
+        if value is not None:
+            try:
+                out[i] = float(value)
+            except (TypeError, ValueError):
+                pass
+    return out
+
+
+class ChainIndex:
+    """
+    Strike-selection index over one chain: per option type (optionally per expiry), rows pre-sorted by strike and by
+    |delta|, with a precomputed round-100 mask. Nearest-delta / nearest-strike / distance-from-spot queries are
+    bisections instead of scans over the dict rows, and return the same row dicts the chain iterates over.
+
+    An OptionChain builds its index once (OptionChain.selection_index()), so every strategy, and every adjustment
+    within a tick, queries the same one. Ties go to the row that comes first in the chain, as the old scans did.
+
+        idx = index_for(chain)
+        opt = idx.nearest_delta('p', 0.5, round_only=True)
+    """
+    def __init__(self, rows, strike, type, delta, iv, expiry):
+        self.rows = rows
+        self.strike = np.asarray(strike, dtype=float)
+        self.type = np.asarray(type, dtype=object)
+        self.abs_delta = np.abs(np.asarray(delta, dtype=float))
+        self.iv = np.asarray(iv, dtype=float)
+        self.expiry = np.asarray(expiry, dtype=object)
+        with np.errstate(invalid='ignore'):
+            self.is_round = np.trunc(self.strike) % 100 == 0
+        self._groups = {}
+
+    @classmethod
+    def from_chain(cls, chain):
+        """OptionChain or list of chain dicts. Delta is the broker one, else the calculated one (NaN: not selectable by delta)."""
+        if isinstance(chain, OptionChain):
+            delta = np.where(np.isnan(chain.delta), chain.calculated_delta, chain.delta)
+            return cls(chain.rows(), chain.strike, chain.type, delta, chain.iv, chain.expiry_dt)
+        rows = list(chain)
+        delta = _column(rows, 'delta')
+        delta = np.where(np.isnan(delta), _column(rows, 'calculated_delta'), delta)
+        return cls(rows, _column(rows, 'strike'), [r.get('type') for r in rows], delta, _column(rows, 'iv'),
+                   [r.get('expiry_dt') for r in rows])
+
+    def __len__(self):
+        return len(self.rows)
+
+    def _group(self, option_type, expiry=None, round_only=False, require_iv=False):
+        key = (option_type, expiry, round_only, require_iv)
+        group = self._groups.get(key)
+        if group is None:
+            mask = self.type == option_type
+            if expiry is not None:
+                mask &= self.expiry == expiry
+            if round_only:
+                mask &= self.is_round
+            pos = np.nonzero(mask)[0]
+            by_strike = pos[np.lexsort((pos, self.strike[pos]))]
+            usable = ~np.isnan(self.abs_delta[pos])
+            if require_iv:
+                usable &= ~(self.iv[pos] <= 0)
+            valid = pos[usable]
+            by_delta = valid[np.lexsort((valid, self.abs_delta[valid]))]
+            group = self._groups[key] = _Group(by_strike.tolist(), self.strike[by_strike].tolist(),
+                                               by_delta.tolist(), self.abs_delta[by_delta].tolist())
+        return group
+
+    def has_round(self, option_type, expiry=None):
+        return bool(self._group(option_type, expiry, round_only=True).by_strike)
+
+    def nearest_delta(self, option_type, target_delta, expiry=None, round_only=False, require_iv=False):
+        """Row whose |delta| is closest to target_delta, or None."""
+        group = self._group(option_type, expiry, round_only, require_iv)
+        i = _nearest(group.deltas, group.by_delta, target_delta)
+        return self.rows[i] if i is not None else None
+
+    def nearest_strike(self, option_type, target_strike, expiry=None, round_only=False):
+        """Row whose strike is closest to target_strike, or None."""
+        group = self._group(option_type, expiry, round_only)
+        i = _nearest(group.strikes, group.by_strike, target_strike)
+        return self.rows[i] if i is not None else None
+
+    def exact_strike(self, option_type, strike, expiry=None):
+        """Row with exactly this strike, or None."""
+        row = self.nearest_strike(option_type, strike, expiry)
+        return row if row is not None and float(row['strike']) == float(strike) else None
+
+    def by_distance(self, option_type, spot, distance, step=50, expiry=None):
+        """Row nearest to spot + distance (calls) / spot - distance (puts), rounded to `step`."""
+        target = spot + distance if option_type == 'c' else spot - distance
+        return self.nearest_strike(option_type, round(target / step) * step, expiry)
+
+
+def index_for(chain):
+    """Shared index of an OptionChain (built once per chain, i.e. per tick); a throwaway one for plain lists."""
+    if isinstance(chain, OptionChain):
+        return chain.selection_index()
+    return ChainIndex.from_chain(chain or [])
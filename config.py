@@ -27,6 +27,23 @@ USE_GIT_STATE_SYNC = True  # Set to True to enable Git-based state synchronizati
 GIT_REMOTE_NAME = "origin"
 GIT_BRANCH_NAME = "main"
 GIT_COMMIT_MESSAGE = "Update strategy state"
+GIT_SYNC_ASYNC = True            # Saves only mark files dirty; a background worker commits + pushes them (False = push inline on every save)
+GIT_SYNC_INTERVAL_SECONDS = 30   # All files saved within this window go into one commit and one push
+
+# --- STATE STORE ---
+STATE_WAL_MAX_RECORDS = 50       # State deltas are appended to <state file>.wal; compacted into the JSON snapshot after this many...
+STATE_WAL_COMPACT_SECONDS = 60   # ...or once the oldest is this old (only the snapshot is pushed to Git)
+STATE_FSYNC = True               # fsync every snapshot / WAL write (crash safety)
+
+# --- STATE REPLICATION (primary -> standby machine) ---
+STATE_REPLICATION = 'git'        # 'git' (commit + push, GIT_SYNC_*), 'sqlite' (shared DB file), 'tcp' (push to standby subscribers), 'none'
+STATE_REPLICATION_SQLITE_PATH = './replica/state_replica.db'   # sqlite: put it on the drive both machines see
+STATE_REPLICATION_TCP_HOST = '127.0.0.1'   # tcp: the primary listens here (set its LAN address to serve another machine); standby: python replication.py --backend tcp --connect <primary>:8766
+STATE_REPLICATION_TCP_PORT = 8766
+STATE_REPLICATION_TCP_SECRET = ''          # tcp: shared secret, same on primary and standby. Required: the primary does not serve state without it
+
+# --- TRADE JOURNAL ---
+TRADE_JOURNAL_DB = './trade_journal.db'   # SQLite journal (indexed dedupe, P&L per strategy/day); trade_log_*.csv is still written and pushed. None = CSV only
 
 # ==========================================
 # BACKTEST CONFIGURATION
@@ -59,8 +76,10 @@ EARLY_ROLLOVER_TIME = "15:00" # Time HH:MM to roll on day before expiry
 # STRATEGY PARAMETERS
 # ==========================================
 UNDERLYING_NAME = 'NIFTY'
+TRADED_UNDERLYINGS = [UNDERLYING_NAME] # Only these underlyings are indexed from the instrument master
 SPOT_INSTRUMENT_KEY = 'NSE_INDEX|Nifty 50'
 RISK_FREE_RATE = 0.07 # 7% used for Greeks
+STRIKE_WINDOW_POINTS = 500 # Options within ATM ± this many points are quoted every tick (held legs always are)
 
 # ENTRY LOGIC
 ENTRY_WEEKLY_DELTA_TARGET = 0.50  # Sell Weekly ATM
@@ -128,11 +147,76 @@ ORDER_PRODUCT = 'D' # Delivery (D) or Intraday (I)
 ORDER_VALIDITY = 'DAY'
 ORDER_TAG_PREFIX = 'algo'
 
+# --- API RATE LIMITS ---
+# Upstox publishes limits per API per user (Standard APIs: 50/sec, 500/min).
+# Each endpoint family gets its own token bucket: (max calls per second, max calls per minute).
+# Order placement is additionally capped at 10/sec (exchange algo order-rate threshold).
+API_RATE_LIMITS = {
+    'quote':        (50, 500),  # LTP / Market Quote
+    'greeks':       (50, 500),  # Option Greeks (v3)
+    'option_chain': (50, 500),  # Put/Call Option Chain
+    'order':        (10, 500),  # Place / Cancel Order
+    'order_status': (50, 500),  # Order Details
+    'portfolio':    (50, 500),  # Positions
+    'funds':        (50, 500),  # Funds & Margin
+}
+
+# --- STREAMING MARKET DATA (Upstox V3 WebSocket Feed) ---
+USE_MARKET_DATA_STREAM = True
+MARKET_STREAM_URL = None            # None = Upstox V3 feed. For offline runs point at feed_replay_server, e.g. "ws://127.0.0.1:8765"
+MARKET_STREAM_MAX_AGE_SECONDS = 5   # Streamed quotes older than this are treated as missing and fetched over REST
+STREAM_POLL_INTERVAL_SECONDS = 2    # Loop interval while the stream is connected (POLL_INTERVAL_SECONDS otherwise)
+
+# --- OPTION CHAIN ---
+# One Put/Call Option Chain call returns LTP, OI, IV and greeks for every strike of an expiry.
+# Keys it doesn't cover (e.g. held legs in another expiry) still go through the LTP + Greeks APIs.
+USE_OPTION_CHAIN_API = True
+
+# --- GREEKS SOURCE ---
+# 'broker': Option Greeks API for every key the stream/chain didn't cover (3+ calls of 50 keys per tick)
+# 'local':  never call the Greeks API; delta/gamma/vega/theta from LTP-implied IV + Black-Scholes
+# 'hybrid': local greeks, with the Greeks API sampled every GREEKS_BROKER_SAMPLE_TICKS ticks and every tick for held legs
+GREEKS_SOURCE = 'hybrid'
+GREEKS_BROKER_SAMPLE_TICKS = 10   # hybrid: full broker sample every N ticks
+GREEKS_DRIFT_TOLERANCE = 0.05     # hybrid: |broker delta - local delta| above this -> that instrument uses broker greeks every tick
+GREEKS_FALLBACK_TICKS = 30        # hybrid: median drift above tolerance -> behave like 'broker' for this many ticks
+
+# --- VOLATILITY SURFACE ---
+# An SVI smile is fitted per expiry from the fetched chain every tick, so delta-based strike selection
+# (e.g. Batman's far OTM hedge) can look at master strikes outside STRIKE_WINDOW_POINTS.
+VOL_SURFACE_MAX_RMSE = 0.02       # Fits worse than this (IV RMSE, 0.02 = 2 vol points) are not used for selection
+
+# --- PORTFOLIO RISK GRID ---
+# All open legs of all strategies are revalued every tick over spot x IV x days-ahead scenarios
+# (market_data['risk']): worst-case loss, breakevens, P&L on a further gap of RISK_GAP_PCTS.
+RISK_GRID_SPOT_PCT = 5.0          # Spot axis: -5% .. +5%
+RISK_GRID_SPOT_STEPS = 51         # odd, so the current spot is on the grid
+RISK_GRID_IV_SCALES = [round(0.70 + 0.05 * i, 2) for i in range(20)]  # IV multipliers 0.70 .. 1.65 (1.0 = today's IVs)
+RISK_GRID_DAYS_AHEAD = [0, 1, 2, 3, 5]
+RISK_GAP_PCTS = [1.0, 2.0, 3.0]   # Reported P&L on a +/- move of these sizes
+GAP_EXIT_ON_PROJECTED_LOSS = False  # Opening window: exit Calendar if the grid projects a loss > MAX_LOSS_VALUE on a further GAP_FORCED_ROLL_THRESHOLD_PCT move
+
+# --- ORDER UPDATE STREAM (Upstox Portfolio Stream Feed) ---
+USE_ORDER_UPDATE_STREAM = True
+ORDER_STREAM_URL = None               # None = Upstox portfolio stream. For offline runs point at order_stream_stub
+ORDER_FILL_TIMEOUT_SECONDS = 60       # Cancel the order if it is not filled within this time
+ORDER_STREAM_REST_CHECK_SECONDS = 5   # While the stream is up, still check a pending order over REST this often (lost updates)
+ORDER_TRACKER_TTL_SECONDS = 900       # Forget updates of orders nobody waits on (manual / settled) this long after their last update
+
+# --- STRATEGY EXECUTION ---
+PARALLEL_STRATEGY_EXECUTION = True    # Each strategy's update runs in its own worker thread: a LIVE order waiting for its fill only blocks that strategy
+STRATEGY_TICK_DEADLINE_SECONDS = 10   # The loop waits this long for the strategies each tick; ones still running are reported as overruns
+STRATEGY_QUEUE_SIZE = 1               # Ticks a busy strategy keeps waiting; older ones are dropped, so it resumes on the latest data
+
 # ==========================================
 # SYSTEM / PATHS
 # ==========================================
 DATA_DIR = './data'
 INSTRUMENT_MASTER_URL = "https://assets.upstox.com/market-quote/instruments/exchange/NSE.json.gz"
+MASTER_INSTRUMENT_TYPES = ['CE', 'PE', 'FUT'] # Only these instrument types (of TRADED_UNDERLYINGS) are loaded from the master
+MASTER_AUTO_REFRESH = True # Re-check INSTRUMENT_MASTER_URL (ETag/Last-Modified) once per trading day; False = use NSE_FO.json(.gz) in DATA_DIR
+MASTER_REFRESH_TIME = "08:30" # IST, before the open. A running algo swaps the new master in without a restart
+MASTER_REFRESH_RETRY_SECONDS = 300 # Wait this long after a failed refresh before trying again
 PREFER_ROUND_STRIKES = True
 
 # HOLIDAY CALENDAR (YYYY-MM-DD)
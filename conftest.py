@@ -0,0 +1,2 @@
+# Manual Git sync checks: they commit and push test files in this repo. Run them directly (python test_git_sync.py).
+collect_ignore = ["test_git_sync.py", "test_git_sync_manual.py", "test_csv_sync.py"]
@@ -79,11 +79,12 @@ def get_upcoming_warnings(lookahead_days=5):
             
     return warnings
 
-def print_event_summary():
+def print_event_summary(warnings=None):
     """
-    Prints a warning summary to console.
+    Prints a warning summary to console. warnings: already fetched get_upcoming_warnings() (startup loads it in the background).
     """
-    warnings = get_upcoming_warnings()
+    if warnings is None:
+        warnings = get_upcoming_warnings()
     if warnings:
         print("\n" + "!"*60)
         print("  STRATEGY ALERT: UPCOMING MARKET EVENTS/HOLIDAYS")
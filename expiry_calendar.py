@@ -0,0 +1,100 @@
+from bisect import bisect_left, bisect_right
+from datetime import date, timedelta
+import config
+from utils import is_trading_day
+
+
+def _month_key(year, month):
+    return year * 12 + month - 1
+
+
+def _add_months(day, n):
+    """(year, month) n months after day's month."""
+    key = _month_key(day.year, day.month) + n
+    return key // 12, key % 12 + 1
+
+
+class ExpiryCalendar:
+    """
+    Sorted option expiries of one underlying, built once per master load and shared by the loop and the strategies.
+    Every query is a bisect over the sorted expiry list (or its parallel month-key list) instead of re-filtering
+    the master. The monthly expiry of a month is its last listed expiry (the master already reflects holiday shifts);
+    trading days skip weekends and NSE_HOLIDAYS.
+    """
+    def __init__(self, expiries, holidays=None):
+        self.expiries = sorted(set(expiries))
+        self._month_keys = [_month_key(d.year, d.month) for d in self.expiries]
+        self.holidays = set(str(h) for h in (config.NSE_HOLIDAYS if holidays is None else holidays))
+
+    @classmethod
+    def from_master(cls, df, underlying, holidays=None):
+        """Expiries of the CE/PE contracts of `underlying` in the master DataFrame."""
+        if df is None or df.empty or 'expiry_dt' not in df.columns:
+            return cls([], holidays)
+        mask = (df['name'] == underlying) & df['instrument_type'].isin(['CE', 'PE'])
+        return cls([d for d in df.loc[mask, 'expiry_dt'].unique() if isinstance(d, date)], holidays)
+
+    def __len__(self):
+        return len(self.expiries)
+
+    def __repr__(self):
+        return f"ExpiryCalendar({len(self)} expiries, {self.expiries[0] if self.expiries else None}..{self.expiries[-1] if self.expiries else None})"
+
+    # --- Expiries from a day ---
+    def upcoming(self, day):
+        """Expiries on or after `day`."""
+        return self.expiries[bisect_left(self.expiries, day):]
+
+    def next_expiry(self, day, n=0, include_day=True):
+        """n-th expiry (0 = first) on/after `day` (strictly after if not include_day), or None."""
+        i = (bisect_left if include_day else bisect_right)(self.expiries, day) + n
+        return self.expiries[i] if i < len(self.expiries) else None
+
+    def weeklies(self, day, skip_today=False):
+        """(current weekly, next weekly) as seen on `day`. With skip_today an expiry falling on `day` is passed over."""
+        return self.next_expiry(day, 0, not skip_today), self.next_expiry(day, 1, not skip_today)
+
+    # --- Months ---
+    def month_expiries(self, year, month):
+        key = _month_key(year, month)
+        return self.expiries[bisect_left(self._month_keys, key):bisect_right(self._month_keys, key)]
+
+    def monthly(self, year, month):
+        """Monthly expiry (last expiry) of a month, or None if nothing is listed in it."""
+        i = bisect_right(self._month_keys, _month_key(year, month)) - 1
+        return self.expiries[i] if i >= 0 and self._month_keys[i] == _month_key(year, month) else None
+
+    def first_of_month(self, year, month):
+        key = _month_key(year, month)
+        i = bisect_left(self._month_keys, key)
+        return self.expiries[i] if i < len(self.expiries) and self._month_keys[i] == key else None
+
+    def first_of_month_after(self, day, months_ahead):
+        """First expiry of the month `months_ahead` months after day's month."""
+        return self.first_of_month(*_add_months(day, months_ahead))
+
+    def monthly_after(self, day, months_ahead):
+        """Monthly expiry of the month `months_ahead` months after day's month (0 = day's own month)."""
+        return self.monthly(*_add_months(day, months_ahead))
+
+    def is_last_expiry_of_month(self, day):
+        """True if `day` is a listed expiry and no later expiry falls in the same month (i.e. the monthly expiry)."""
+        i = bisect_left(self.expiries, day)
+        if i >= len(self.expiries) or self.expiries[i] != day:
+            return False
+        return i + 1 == len(self.expiries) or self._month_keys[i + 1] != self._month_keys[i]
+
+    # --- Trading days ---
+    def is_trading_day(self, day):
+        return is_trading_day(day, self.holidays)
+
+    def next_trading_day(self, day):
+        """Next trading day after `day` (skips weekends and holidays)."""
+        nxt = day + timedelta(days=1)
+        while not self.is_trading_day(nxt):
+            nxt += timedelta(days=1)
+        return nxt
+
+    def is_next_trading_day_monthly_expiry(self, day):
+        """True on T-1 of a monthly expiry (holiday-aware: a Friday before a Monday expiry counts)."""
+        return self.is_last_expiry_of_month(self.next_trading_day(day))
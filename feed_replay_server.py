@@ -0,0 +1,304 @@
+import base64
+import hashlib
+import json
+import random
+import socket
+import socketserver
+import struct
+import threading
+import time
+from upstox_client.feeder.proto import MarketDataFeedV3_pb2 as feed_pb
+from market_stream import iter_recorded_frames
+
+WS_MAGIC = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+OP_TEXT = 0x1
+OP_BINARY = 0x2
+OP_CLOSE = 0x8
+OP_PING = 0x9
+OP_PONG = 0xA
+
+
+def _recv_exact(sock, n):
+    buf = b''
+    while len(buf) < n:
+        chunk = sock.recv(n - len(buf))
+        if not chunk:
+            raise ConnectionError("Client closed connection")
+        buf += chunk
+    return buf
+
+
+def _read_frame(sock):
+    """Reads one (masked) client frame. Returns (opcode, payload)."""
+    b0, b1 = _recv_exact(sock, 2)
+    opcode = b0 & 0x0F
+    masked = b1 & 0x80
+    length = b1 & 0x7F
+    if length == 126:
+        (length,) = struct.unpack('>H', _recv_exact(sock, 2))
+    elif length == 127:
+        (length,) = struct.unpack('>Q', _recv_exact(sock, 8))
+    mask = _recv_exact(sock, 4) if masked else None
+    payload = _recv_exact(sock, length) if length else b''
+    if mask:
+        payload = bytes(b ^ mask[i % 4] for i, b in enumerate(payload))
+    return opcode, payload
+
+
+def _encode_frame(payload, opcode=OP_BINARY):
+    """Encodes an unmasked server frame."""
+    header = bytes([0x80 | opcode])
+    n = len(payload)
+    if n < 126:
+        header += bytes([n])
+    elif n < 65536:
+        header += bytes([126]) + struct.pack('>H', n)
+    else:
+        header += bytes([127]) + struct.pack('>Q', n)
+    return header + payload
+
+
+def _accept_websocket(sock):
+    """Performs the server side of the HTTP Upgrade handshake. Returns the request headers (lower-cased), or None."""
+    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    request = b''
+    while b'\r\n\r\n' not in request:
+        chunk = sock.recv(4096)
+        if not chunk:
+            return None
+        request += chunk
+    lines = request.decode('latin-1').split('\r\n')
+    headers = {'path': lines[0].split(' ')[1] if len(lines[0].split(' ')) > 1 else '/'}
+    for line in lines[1:]:
+        if ':' in line:
+            k, v = line.split(':', 1)
+            headers[k.strip().lower()] = v.strip()
+    accept = base64.b64encode(hashlib.sha1((headers.get('sec-websocket-key', '') + WS_MAGIC).encode()).digest()).decode()
+    sock.sendall(("HTTP/1.1 101 Switching Protocols\r\n"
+                  "Upgrade: websocket\r\nConnection: Upgrade\r\n"
+                  f"Sec-WebSocket-Accept: {accept}\r\n\r\n").encode())
+    return headers
+
+
+class _FeedHandler(socketserver.BaseRequestHandler):
+    def handle(self):
+        server = self.server.replay
+        sock = self.request
+
+        # 1. HTTP Upgrade handshake
+        headers = _accept_websocket(sock)
+        if headers is None:
+            return
+        server.last_headers = headers
+
+        session = _Session(server, sock)
+        server._sessions.append(session)
+        sender = threading.Thread(target=session.send_loop, daemon=True)
+        sender.start()
+
+        # 2. Read subscription requests until the client goes away
+        try:
+            while not session.closed.is_set():
+                opcode, payload = _read_frame(sock)
+                if opcode == OP_CLOSE:
+                    session.send(_encode_frame(payload[:2], OP_CLOSE))
+                    break
+                if opcode == OP_PING:
+                    session.send(_encode_frame(payload, OP_PONG))
+                elif opcode in (OP_TEXT, OP_BINARY):
+                    session.on_request(payload)
+        except (ConnectionError, OSError):
+            pass
+        finally:
+            session.closed.set()
+            sender.join(timeout=2)
+            if session in server._sessions:
+                server._sessions.remove(session)
+
+
+class _Session:
+    def __init__(self, server, sock):
+        self.server = server
+        self.sock = sock
+        self.subscriptions = {}
+        self.lock = threading.Lock()
+        self.send_lock = threading.Lock()
+        self.closed = threading.Event()
+        self.subscribed = threading.Event()
+
+    def send(self, frame):
+        with self.send_lock:
+            self.sock.sendall(frame)
+
+    def on_request(self, payload):
+        try:
+            req = json.loads(payload.decode('utf-8'))
+        except ValueError:
+            return
+        self.server.requests.append(req)
+        keys = req.get('data', {}).get('instrumentKeys', [])
+        mode = req.get('data', {}).get('mode', 'ltpc')
+        with self.lock:
+            if req.get('method') == 'unsub':
+                for k in keys:
+                    self.subscriptions.pop(k, None)
+            else:
+                for k in keys:
+                    self.subscriptions[k] = mode
+        if req.get('method') != 'unsub' and keys:
+            # Upstox answers a subscription with an initial snapshot of the new keys
+            self.send(_encode_frame(self.server.build_snapshot(keys)))
+            self.subscribed.set()
+
+    def send_loop(self):
+        server = self.server
+        try:
+            if server.recording_path:
+                frames = iter_recorded_frames(server.recording_path)
+            else:
+                self.subscribed.wait()
+                frames = server.synthetic_frames(self)
+            interval = (server.batch_size / server.ticks_per_second) if server.ticks_per_second else 0
+            next_send = time.perf_counter()
+            for frame in frames:
+                if self.closed.is_set() or server._stop.is_set():
+                    return
+                if server.max_frames is not None and server.frames_sent >= server.max_frames:
+                    return
+                self.send(_encode_frame(frame))
+                server.frames_sent += 1
+                if interval:
+                    next_send += interval
+                    delay = next_send - time.perf_counter()
+                    if delay > 0:
+                        time.sleep(delay)
+        except (ConnectionError, OSError):
+            self.closed.set()
+
+
+class ReplayFeedServer:
+    """
+    Local stand-in for the Upstox V3 market-data WebSocket.
+    Speaks the same wire protocol (JSON sub/unsub requests in, FeedResponse protobuf frames out) and either
+    replays a recorded session (see MarketDataStream(record_path=...)) or generates a synthetic random walk
+    for every subscribed key at `ticks_per_second` (0 = as fast as possible).
+    """
+    def __init__(self, host='127.0.0.1', port=0, recording_path=None, ticks_per_second=1000,
+                 batch_size=50, base_prices=None, max_frames=None, seed=None):
+        self.recording_path = recording_path
+        self.ticks_per_second = ticks_per_second
+        self.batch_size = batch_size
+        self.base_prices = dict(base_prices or {})
+        self.max_frames = max_frames
+        self.rng = random.Random(seed)
+
+        self.frames_sent = 0
+        self.requests = []
+        self.last_headers = {}
+        self._sessions = []
+        self._stop = threading.Event()
+
+        socketserver.ThreadingTCPServer.allow_reuse_address = True
+        self._server = socketserver.ThreadingTCPServer((host, port), _FeedHandler)
+        self._server.daemon_threads = True
+        self._server.replay = self
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address
+        return f"ws://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name="feed-replay", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        for session in list(self._sessions):
+            session.closed.set()
+            try:
+                session.sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+        self._server.shutdown()
+        self._server.server_close()
+
+    def drop_connections(self):
+        """Simulates a network drop: closes every client socket without a close frame."""
+        for session in list(self._sessions):
+            session.closed.set()
+            try:
+                session.sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+    # --- Synthetic data ---
+    def _price(self, key):
+        if key not in self.base_prices:
+            self.base_prices[key] = 24000.0 if key.startswith('NSE_INDEX') else round(self.rng.uniform(20, 400), 2)
+        return self.base_prices[key]
+
+    def _fill_feed(self, feed, key, mode, price):
+        if mode == 'ltpc':
+            feed.ltpc.ltp = price
+            feed.ltpc.ltt = int(time.time() * 1000)
+        else:
+            fl = feed.firstLevelWithGreeks
+            fl.ltpc.ltp = price
+            fl.ltpc.ltt = int(time.time() * 1000)
+            sign = -1.0 if key.endswith('PE') else 1.0
+            fl.optionGreeks.delta = sign * min(0.99, max(0.01, price / 800.0))
+            fl.optionGreeks.theta = -price / 50.0
+            fl.optionGreeks.gamma = 0.001
+            fl.optionGreeks.vega = price / 20.0
+            fl.iv = 15.0       # percent, like the broker
+            fl.oi = 100000.0
+
+    def build_snapshot(self, keys, mode=None):
+        response = feed_pb.FeedResponse()
+        response.type = feed_pb.Type.Value('initial_feed')
+        response.currentTs = int(time.time() * 1000)
+        for key in keys:
+            self._fill_feed(response.feeds[key], key, mode or self._mode_for(key), self._price(key))
+        return response.SerializeToString()
+
+    @staticmethod
+    def _mode_for(key):
+        return 'ltpc' if key.startswith('NSE_INDEX') else 'option_greeks'
+
+    def synthetic_frames(self, session):
+        while True:
+            with session.lock:
+                subs = list(session.subscriptions.items())
+            if not subs:
+                time.sleep(0.01)
+                continue
+            response = feed_pb.FeedResponse()
+            response.type = feed_pb.Type.Value('live_feed')
+            response.currentTs = int(time.time() * 1000)
+            for _ in range(min(self.batch_size, len(subs))):
+                key, mode = subs[self.rng.randrange(len(subs))]
+                price = max(0.05, round(self._price(key) * (1 + self.rng.gauss(0, 0.001)), 2))
+                self.base_prices[key] = price
+                self._fill_feed(response.feeds[key], key, mode, price)
+            yield response.SerializeToString()
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Local replay server for the Upstox V3 market-data feed")
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--recording', default=None, help="File written by MarketDataStream(record_path=...)")
+    parser.add_argument('--tps', type=int, default=1000, help="Ticks per second (0 = unthrottled)")
+    args = parser.parse_args()
+
+    srv = ReplayFeedServer(port=args.port, recording_path=args.recording, ticks_per_second=args.tps).start()
+    print(f"Replay feed listening on {srv.url} (set MARKET_STREAM_URL to this to point the algo at it)")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        srv.stop()
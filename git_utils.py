@@ -2,8 +2,13 @@ import subprocess
 import os
 import config
 import shutil
+import threading
+import time
+import atexit
 
 _git_available = None
+# Strategies save state from their own worker threads (strategy_executor): one git command sequence at a time
+_git_lock = threading.Lock()
 
 def _is_git_installed():
     global _git_available
@@ -13,25 +18,32 @@ def _is_git_installed():
             print("[GIT SYNC] Warning: 'git' command not found in PATH. State synchronization disabled.")
     return _git_available
 
+def _git(*args, cwd=None, timeout=30):
+    """Run one git command (argv, no shell). Raises CalledProcessError with stderr on failure."""
+    return subprocess.run(["git", *args], cwd=cwd, check=True, capture_output=True, text=True, timeout=timeout)
+
+def _is_syncable(file_path):
+    """Only state files and trade logs are ever committed."""
+    return (file_path.endswith("_live_state.json") or
+            file_path.endswith("_state.json") or
+            "trade_log_" in file_path and file_path.endswith(".csv"))
+
 def sync_pull():
     """
     Performs a git pull --rebase to fetch latest state changes from the remote.
     """
+    with _git_lock:
+        return _sync_pull()
+
+def _sync_pull():
     if not config.USE_GIT_STATE_SYNC or not _is_git_installed():
         return True
         
     try:
         # 1. Fetch latest
-        subprocess.run(["git", "fetch", config.GIT_REMOTE_NAME], check=True, capture_output=True, timeout=30, shell=True)
-        # 2. Pull rebase to avoid merge commits for simple JSON sync
-        result = subprocess.run(
-            ["git", "pull", "--rebase", config.GIT_REMOTE_NAME, config.GIT_BRANCH_NAME],
-            check=True,
-            capture_output=True,
-            text=True,
-            timeout=30,
-            shell=True
-        )
+        _git("fetch", config.GIT_REMOTE_NAME)
+        # 2. Pull rebase to avoid merge commits for simple JSON sync (autostash: local unsaved state edits survive)
+        _git("pull", "--rebase", "--autostash", config.GIT_REMOTE_NAME, config.GIT_BRANCH_NAME)
         return True
     except subprocess.CalledProcessError as e:
         print(f"[GIT SYNC] Pull failed: {e.stderr}")
@@ -44,17 +56,18 @@ def sync_push(file_path):
     """
     Commits and pushes a specific file to the remote repository.
     """
+    with _git_lock:
+        return _sync_push(file_path)
+
+def _sync_push(file_path):
     if not config.USE_GIT_STATE_SYNC or not _is_git_installed():
         return True
         
     if not os.path.exists(file_path):
         return False
         
-    # Safety Check: strict restriction to state files only
     # Safety Check: strict restriction to state files and trade logs
-    if not (file_path.endswith("_live_state.json") or 
-            file_path.endswith("_state.json") or 
-            "trade_log_" in file_path and file_path.endswith(".csv")):
+    if not _is_syncable(file_path):
         # print(f"[GIT SYNC] Skipping push for non-state file: {file_path}")
         return True
 
@@ -62,22 +75,22 @@ def sync_push(file_path):
     try:
         # 1. Add file (Check existence again to be safe against race conditions)
         if os.path.exists(file_path):
-            subprocess.run(["git", "add", file_path], check=True, capture_output=True, timeout=10, shell=True)
+            _git("add", "--", file_path, timeout=10)
         else:
             return False
         
         # 2. Check if there are changes to commit
-        status = subprocess.run(["git", "status", "--porcelain", file_path], check=True, capture_output=True, text=True, shell=True)
+        status = _git("status", "--porcelain", "--", file_path, timeout=10)
         if not status.stdout.strip():
             # No changes to commit
             return True
             
         # 3. Commit
         commit_msg = f"{config.GIT_COMMIT_MESSAGE}: {os.path.basename(file_path)}"
-        subprocess.run(["git", "commit", "-m", commit_msg], check=True, capture_output=True, timeout=10, shell=True)
+        _git("commit", "-m", commit_msg, timeout=10)
         
         # 4. Push
-        subprocess.run(["git", "push", config.GIT_REMOTE_NAME, config.GIT_BRANCH_NAME], check=True, capture_output=True, timeout=30, shell=True)
+        _git("push", config.GIT_REMOTE_NAME, config.GIT_BRANCH_NAME)
         return True
     except subprocess.CalledProcessError as e:
         print(f"[GIT SYNC] Push failed for {file_path}: {e.stderr}")
@@ -85,3 +98,189 @@ def sync_push(file_path):
     except Exception as e:
         print(f"[GIT SYNC] Error during push for {file_path}: {e}")
         return False
+
+
+class GitSyncWorker:
+    """
+    Background state sync: callers only mark files dirty (mark_dirty, never blocks), and the worker thread commits
+    everything marked during one GIT_SYNC_INTERVAL_SECONDS window in a single commit with a single push.
+    A failed push pulls (rebase) once and retries; if it still fails the files stay dirty for the next interval.
+
+    lag(): seconds the oldest unpushed change has been waiting. stats(): commits / pushes / failures / lag figures.
+    flush() pushes what is pending now and waits for it (shutdown).
+    """
+    def __init__(self, repo_dir=None, interval=None, remote=None, branch=None, message=None):
+        self.repo_dir = repo_dir
+        self.interval = getattr(config, 'GIT_SYNC_INTERVAL_SECONDS', 30) if interval is None else interval
+        self.remote = remote or config.GIT_REMOTE_NAME
+        self.branch = branch or config.GIT_BRANCH_NAME
+        self.message = message or config.GIT_COMMIT_MESSAGE
+        self._dirty = {}            # path -> monotonic time it was first marked since its last push
+        self._in_flight = {}        # batch being committed / pushed right now
+        self._cond = threading.Condition()
+        self._flush_requested = False
+        self._stopping = False
+        self._retry_at = 0.0        # after a failed push, nothing is tried again before this (monotonic)
+        self._thread = None
+        self.marks = 0
+        self.commits = 0
+        self.pushes = 0
+        self.failures = 0
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+
+    def _git(self, *args, timeout=30):
+        return _git(*args, cwd=self.repo_dir, timeout=timeout)
+
+    def mark_dirty(self, file_path):
+        if not _is_syncable(file_path):
+            return False
+        with self._cond:
+            self._dirty.setdefault(file_path, time.monotonic())
+            self.marks += 1
+            if self._thread is None or not self._thread.is_alive():
+                self._stopping = False
+                self._thread = threading.Thread(target=self._run, name="git-sync", daemon=True)
+                self._thread.start()
+            self._cond.notify_all()
+        return True
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._dirty and not self._stopping:
+                    self._cond.wait()
+                if not self._dirty:
+                    return
+                # Let the interval's other saves (the rest of an entry / roll) join the same commit
+                deadline = max(min(self._dirty.values()) + self.interval, self._retry_at)
+                while not (self._flush_requested or self._stopping):
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                batch, self._dirty = self._dirty, {}
+                self._in_flight = batch
+                self._flush_requested = False
+            pushed = self._sync(batch)
+            with self._cond:
+                self._in_flight = {}
+                if not pushed:
+                    self._retry_at = time.monotonic() + self.interval
+                    for path, since in batch.items():
+                        self._dirty[path] = min(since, self._dirty.get(path, since))
+                self._cond.notify_all()
+                if not pushed and self._stopping:
+                    return   # no retry loop on shutdown; flush() reports what is left
+
+    def _sync(self, batch):
+        paths = [p for p in batch if os.path.exists(p)]
+        if not paths:
+            return True
+        try:
+            with _git_lock:
+                self._git("add", "--", *paths, timeout=10)
+                staged = subprocess.run(["git", "diff", "--cached", "--quiet", "--", *paths], cwd=self.repo_dir,
+                                        capture_output=True, timeout=10)
+                if staged.returncode != 0:
+                    names = ", ".join(sorted(os.path.basename(p) for p in paths))
+                    self._git("commit", "-m", f"{self.message}: {names}", "--", *paths, timeout=10)
+                    self.commits += 1
+                try:
+                    self._git("push", self.remote, self.branch)
+                except subprocess.CalledProcessError:
+                    # Remote moved on (other machine): rebase on it once and retry. Other state files
+                    # saved since this batch was taken are still modified in the work tree: stash them across it
+                    self._git("pull", "--rebase", "--autostash", self.remote, self.branch)
+                    self._git("push", self.remote, self.branch)
+                self.pushes += 1
+        except subprocess.CalledProcessError as e:
+            self.failures += 1
+            print(f"[GIT SYNC] Background push failed ({len(paths)} files): {e.stderr}")
+            return False
+        except Exception as e:
+            self.failures += 1
+            print(f"[GIT SYNC] Error during background push: {e}")
+            return False
+        lag = time.monotonic() - min(batch.values())
+        self.last_lag = lag
+        self.max_lag = max(self.max_lag, lag)
+        return True
+
+    def lag(self):
+        """Seconds the oldest change not yet pushed has been waiting (0.0 when everything is pushed)."""
+        with self._cond:
+            pending = list(self._dirty.values()) + list(self._in_flight.values())
+        return time.monotonic() - min(pending) if pending else 0.0
+
+    def pending(self):
+        with self._cond:
+            return len(self._dirty.keys() | self._in_flight.keys())
+
+    def flush(self, timeout=60):
+        """Pushes what is pending without waiting for the interval (one attempt). True once nothing is left."""
+        end = time.monotonic() + timeout
+        with self._cond:
+            if not (self._dirty or self._in_flight):
+                return True
+            failures = self.failures
+            self._flush_requested = True
+            self._cond.notify_all()
+            while (self._dirty or self._in_flight) and self.failures == failures:
+                if self._thread is None or not self._thread.is_alive():
+                    break
+                remaining = end - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            return not (self._dirty or self._in_flight)
+
+    def stop(self, timeout=60):
+        flushed = self.flush(timeout)
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        return flushed
+
+    def stats(self):
+        return {'marks': self.marks, 'commits': self.commits, 'pushes': self.pushes, 'failures': self.failures,
+                'pending': self.pending(), 'lag': self.lag(), 'last_lag': self.last_lag, 'max_lag': self.max_lag}
+
+
+_worker = None
+_worker_lock = threading.Lock()
+
+def get_sync_worker():
+    """The process-wide background sync worker (flushed at exit)."""
+    global _worker
+    with _worker_lock:
+        if _worker is None:
+            _worker = GitSyncWorker()
+            atexit.register(_worker.stop)
+        return _worker
+
+def request_push(file_path):
+    """
+    Non-blocking replacement for sync_push: the file is committed and pushed by the background worker together
+    with everything else saved in the same interval. GIT_SYNC_ASYNC = False pushes inline as before.
+    """
+    if not config.USE_GIT_STATE_SYNC or not _is_git_installed():
+        return True
+    if not getattr(config, 'GIT_SYNC_ASYNC', True):
+        return sync_push(file_path)
+    return get_sync_worker().mark_dirty(file_path)
+
+def sync_lag():
+    """Seconds the oldest unpushed state change has been waiting (0.0 if the worker never ran)."""
+    return _worker.lag() if _worker is not None else 0.0
+
+def stop_sync(timeout=60):
+    """Shutdown: push whatever is still pending. Returns the worker's stats (None if it never ran)."""
+    if _worker is None:
+        return None
+    flushed = _worker.stop(timeout)
+    if not flushed:
+        print(f"[GIT SYNC] {_worker.pending()} file(s) could not be pushed before shutdown.")
+    return _worker.stats()
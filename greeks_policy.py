@@ -0,0 +1,135 @@
+import numpy as np
+import config
+from greeks import bs_greeks, calculate_delta_array
+from iv_solver import solve_iv
+from option_chain import IV_PERCENT
+
+GREEKS_SOURCES = ('broker', 'local', 'hybrid')
+
+
+class GreeksSourcePolicy:
+    """
+    Decides, per tick, which option greeks are requested from the (rate-limited, 50 keys per call) Option Greeks API
+    and which are computed locally from the chain (IV from LTP, Black-Scholes greeks).
+
+      broker - every key without streamed/chain greeks goes to the API (the old behaviour)
+      local  - never calls the API; greeks come from the local model only
+      hybrid - the API is sampled every `sample_every` ticks, plus every tick for held legs and for instruments
+               whose broker delta drifted more than `drift_tolerance` from the local one on the last sample
+
+    In hybrid mode every broker delta received (API, stream or chain call) is compared with a local one
+    (local IV from LTP, not broker IV). If the median drift of a tick exceeds the tolerance the local model is
+    considered off (bad rate, stale quotes...) and the policy behaves like 'broker' for `fallback_ticks` ticks.
+
+        keys = policy.broker_keys(missing_greek_keys, held_keys)   # -> api.get_option_greeks(keys)
+        policy.observe(chains, greeks, spot)                          # after fetch + remap
+        policy.fill_local(chains, greeks, spot)                       # local greeks for what the broker didn't give
+    """
+    def __init__(self, mode=None, sample_every=None, drift_tolerance=None, fallback_ticks=None, r=None):
+        self.mode = (mode or getattr(config, 'GREEKS_SOURCE', 'broker')).lower()
+        if self.mode not in GREEKS_SOURCES:
+            raise ValueError(f"GREEKS_SOURCE must be one of {GREEKS_SOURCES}, got {self.mode!r}")
+        self.sample_every = max(1, sample_every or getattr(config, 'GREEKS_BROKER_SAMPLE_TICKS', 10))
+        self.drift_tolerance = drift_tolerance if drift_tolerance is not None else getattr(config, 'GREEKS_DRIFT_TOLERANCE', 0.05)
+        self.fallback_ticks = fallback_ticks if fallback_ticks is not None else getattr(config, 'GREEKS_FALLBACK_TICKS', 30)
+        self.r = r if r is not None else getattr(config, 'RISK_FREE_RATE', 0.05)
+
+        self.tick = -1
+        self.drift = {}          # instrument_key -> |broker delta - local delta| at its last sample
+        self.pinned = set()      # instrument_keys over tolerance: broker greeks every tick
+        self._fallback_until = -1
+        self.broker_calls_saved = 0
+        self.keys_requested = 0
+        self.keys_local = 0
+
+    @property
+    def in_fallback(self):
+        return self.tick < self._fallback_until
+
+    def is_sample_tick(self):
+        return self.mode == 'broker' or self.in_fallback or (self.mode == 'hybrid' and self.tick % self.sample_every == 0)
+
+    def broker_keys(self, missing_keys, held_keys=()):
+        """Starts a new tick. Of the keys with no streamed/chain greeks, the ones to request from the Greeks API."""
+        self.tick += 1
+        missing_keys = list(missing_keys)
+        if self.is_sample_tick():
+            keys = missing_keys
+        elif self.mode == 'local':
+            keys = []
+        else:
+            wanted = self.pinned.union(held_keys)
+            keys = [k for k in missing_keys if k in wanted]
+        self.keys_requested += len(keys)
+        self.broker_calls_saved += -(-len(missing_keys) // 50) - -(-len(keys) // 50)
+        return keys
+
+    def observe(self, chains, greeks, spot):
+        """
+        Hybrid mode only. Compares broker deltas (greeks: instrument_key -> {'delta', ...}, already remapped to
+        token keys) with local deltas for the chain rows that have both. Updates per-instrument drift, pins/unpins instruments, and starts a
+        fallback period when the median drift is over tolerance. Returns the median drift (None if nothing to compare).
+        """
+        if self.mode != 'hybrid':
+            return None
+        rows = [(c, i, greeks[k]['delta']) for c in chains for i, k in enumerate(c.instrument_key.tolist())
+                if k in greeks and greeks[k].get('delta') is not None]
+        if not rows:
+            return None
+        strike = np.array([c.strike[i] for c, i, _ in rows])
+        tte = np.array([c.time_to_expiry[i] for c, i, _ in rows])
+        ltp = np.array([c.ltp[i] for c, i, _ in rows])
+        is_call = np.array([c.type[i] == 'c' for c, i, _ in rows])
+        broker = np.array([d for _, _, d in rows], dtype=float)
+
+        solved = solve_iv(ltp, spot, strike, tte, self.r, is_call)
+        local = calculate_delta_array(is_call, spot, strike, tte, self.r, solved.iv)
+        # No local IV for deep ITM quotes under forward intrinsic etc.: nothing to compare there
+        drift = np.where(solved.converged, np.abs(broker - local), np.nan)
+        for (c, i, _), d in zip(rows, drift.tolist()):
+            key = c.instrument_key[i]
+            if np.isnan(d):
+                continue
+            self.drift[key] = d
+            if d > self.drift_tolerance:
+                self.pinned.add(key)
+            else:
+                self.pinned.discard(key)
+
+        median = float(np.nanmedian(drift)) if np.isfinite(drift).any() else None
+        if median is not None and median > self.drift_tolerance and not self.in_fallback:
+            self._fallback_until = self.tick + self.fallback_ticks
+            print(f"Greeks: median broker/local delta drift {median:.3f} > {self.drift_tolerance}. "
+                  f"Using broker greeks for the next {self.fallback_ticks} ticks.")
+        return median
+
+    def fill_local(self, chains, greeks, spot):
+        """
+        local/hybrid modes: adds local greeks for chain options the broker gave none for, in the broker's shape and
+        units (theta per day, vega per 1% IV, IV in percent), tagged 'source': 'local'. Returns the number of keys filled.
+        """
+        if self.mode == 'broker':
+            return 0
+        parts = []
+        for c in chains:
+            if not len(c):
+                continue
+            need = np.fromiter((k not in greeks for k in c.instrument_key.tolist()), dtype=bool, count=len(c))
+            if need.any():
+                parts.append((c, need))
+        if not parts:
+            return 0
+        keys = np.concatenate([c.instrument_key[m] for c, m in parts])
+        g = bs_greeks(np.concatenate([c.type[m] for c, m in parts]), spot, np.concatenate([c.strike[m] for c, m in parts]),
+                      np.concatenate([c.time_to_expiry[m] for c, m in parts]), self.r, np.concatenate([c.iv[m] for c, m in parts]))
+        iv = np.concatenate([c.iv[m] for c, m in parts]) * IV_PERCENT
+        delta = np.concatenate([c.calculated_delta[m] for c, m in parts])
+        for key, d, th, ga, ve, v in zip(keys.tolist(), delta.tolist(), (g['theta'] / 365).tolist(), g['gamma'].tolist(),
+                                         (g['vega'] / 100).tolist(), iv.tolist()):
+            greeks[key] = {'delta': d, 'theta': th, 'gamma': ga, 'vega': ve, 'iv': v, 'source': 'local'}
+        self.keys_local += len(keys)
+        return len(keys)
+
+    def stats(self):
+        return {'mode': self.mode, 'ticks': self.tick + 1, 'keys_requested': self.keys_requested, 'keys_local': self.keys_local,
+                'broker_calls_saved': self.broker_calls_saved, 'pinned': len(self.pinned), 'in_fallback': self.in_fallback}
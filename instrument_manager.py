@@ -1,117 +1,286 @@
+import numpy as np
 import pandas as pd
-import gzip
-import shutil
-import requests
 import os
-import json
+import time
 from datetime import datetime, date
+from colorama import Fore, Style
 import config
+from master_loader import load_master_frame, load_cached_download, fetch_master_frame
+from symbol_resolver import SymbolResolver
+from strike_index import StrikeIndex
+from expiry_calendar import ExpiryCalendar
+from utils import get_ist_now, is_trading_day
 
 # NEW JSON URL for NSE FO
 MASTER_URL = config.INSTRUMENT_MASTER_URL
+MASTER_HEADERS = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'}
+
+class InstrumentRecord:
+    """Static metadata of one instrument, as returned by InstrumentMaster.lookup()."""
+    __slots__ = ('instrument_key', 'name', 'expiry', 'strike', 'instrument_type', 'lot_size',
+                 'freeze_quantity', 'tick_size', 'trading_symbol')
+
+    def __init__(self, instrument_key, name, expiry, strike, instrument_type, lot_size, freeze_quantity, tick_size, trading_symbol):
+        self.instrument_key = instrument_key
+        self.name = name
+        self.expiry = expiry
+        self.strike = strike
+        self.instrument_type = instrument_type
+        self.lot_size = lot_size
+        self.freeze_quantity = freeze_quantity
+        self.tick_size = tick_size
+        self.trading_symbol = trading_symbol
+
+    def __repr__(self):
+        return f"InstrumentRecord({self.instrument_key}, {self.trading_symbol}, expiry={self.expiry})"
+
 
 class InstrumentMaster:
-    def __init__(self, data_dir=config.DATA_DIR):
+    def __init__(self, data_dir=config.DATA_DIR, master_url=None, auto_refresh=None):
         self.data_dir = data_dir
         if not os.path.exists(data_dir):
             os.makedirs(data_dir)
+        self.master_url = master_url or MASTER_URL
+        # Auto refresh: the master comes from master_url (checked once per trading day); otherwise from the files below
+        self.auto_refresh = getattr(config, 'MASTER_AUTO_REFRESH', True) if auto_refresh is None else auto_refresh
         self.json_path = os.path.join(data_dir, 'NSE_FO.json')
+        self.gz_path = self.json_path + '.gz'
+        self.cache_path = os.path.join(data_dir, 'NSE_FO.npz')
+        self.source_path = None   # file the current df was loaded from
+        self.symbol_cache_path = os.path.join(data_dir, 'symbol_map.json')
         self.df = None
+        self.refreshed_on = None          # trading date the master was last confirmed against master_url
+        self.last_refresh_status = None   # 'fresh' / 'not_modified' / 'downloaded' / 'failed'
+        self._retry_at = 0.0
+        self._symbol_resolver = None
+        self._strike_index = None
+        self._calendars = {}   # underlying -> ExpiryCalendar
+        # (instrument_key -> row position, column arrays): one attribute, so a refresh swaps both at once
+        # for strategy workers calling lookup() concurrently
+        self._lookup_index = ({}, None)
+
+    def _filters(self):
+        return (getattr(config, 'TRADED_UNDERLYINGS', [config.UNDERLYING_NAME]),
+                getattr(config, 'MASTER_INSTRUMENT_TYPES', ['CE', 'PE', 'FUT']))
 
-    def download_master(self):
-        """Downloads and extracts the NSE FO instrument master file."""
-        print(f"Downloading Instrument Master from {MASTER_URL} ...")
+    def download_master(self, force=False):
+        """
+        Conditional download of the NSE FO master straight into the filtered .npz cache: the response is
+        gunzipped and parsed as it arrives, nothing else is written to disk. Not re-requested if it was
+        already confirmed today (unless force). Returns the master DataFrame, or None if the download failed.
+        """
+        today = get_ist_now().date()
+        print(f"Checking Instrument Master at {self.master_url} ...")
         try:
-            headers = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'}
-            response = requests.get(MASTER_URL, stream=True, headers=headers)
-            if response.status_code != 200:
-                print(f"Error: Failed to download master. Status code: {response.status_code}")
-                return
-
-            gz_path = self.json_path + ".gz"
-            with open(gz_path, 'wb') as f:
-                f.write(response.content)
-            
-            with gzip.open(gz_path, 'rb') as f_in:
-                with open(self.json_path, 'wb') as f_out:
-                    shutil.copyfileobj(f_in, f_out)
-            
-            print("Download and extraction complete.")
+            df, status = fetch_master_frame(self.master_url, self.cache_path, *self._filters(), today=today,
+                                            force=force, headers=MASTER_HEADERS)
         except Exception as e:
             print(f"Error downloading master: {e}")
+            self.last_refresh_status = 'failed'
+            self._retry_at = time.time() + getattr(config, 'MASTER_REFRESH_RETRY_SECONDS', 300)
+            return None
+        self.refreshed_on = today
+        self.last_refresh_status = status
+        return df
 
-    def load_master(self):
-        if not os.path.exists(self.json_path):
-            self.download_master()
-        
+    def master_source(self):
+        """Newest of NSE_FO.json.gz / NSE_FO.json on disk, or None."""
+        candidates = [p for p in (self.gz_path, self.json_path) if os.path.exists(p)]
+        return max(candidates, key=os.path.getmtime) if candidates else None
+
+    def _load_from_disk(self):
+        """(df, source) from the last good download (auto refresh) or the NSE_FO.json(.gz) on disk."""
+        underlyings, types = self._filters()
+        if self.auto_refresh:
+            df, meta = load_cached_download(self.cache_path, self.master_url, underlyings, types)
+            if df is not None:
+                print(f"{Fore.YELLOW}WARNING: Using the instrument master fetched on {meta.get('fetched_on')}.{Style.RESET_ALL}")
+                return df, self.cache_path
+
+        source = self.master_source()
+        if source is None:
+            return None, None
         try:
-            # Parse JSON
-            with open(self.json_path, 'r') as f:
-                data = json.load(f)
-            
-            self.df = pd.DataFrame(data)
-            
-            # Normalize Columns if needed
-            # Upstox JSON usually has keys like 'instrument_key', 'expiry', etc.
-            
-            if 'expiry' in self.df.columns:
-                 self.df['expiry_dt'] = pd.to_datetime(self.df['expiry'], unit='ms', errors='coerce').dt.date
-                 
-                 # If unit='ms' failed (all NaT), try generic parsing
-                 if self.df['expiry_dt'].isnull().all():
-                     self.df['expiry_dt'] = pd.to_datetime(self.df['expiry'], errors='coerce').dt.date
-                     
+            # Only the traded underlyings / instrument types are kept (streamed from the file, or from the .npz cache)
+            return load_master_frame(source, self.cache_path, underlyings, types), source
         except Exception as e:
             print(f"Error loading master JSON: {e}")
+            return None, None
 
-    def get_expiry_dates(self, underlying_symbol='NIFTY'):
+    def load_master(self):
+        df, source = None, None
+        if self.auto_refresh:
+            df = self.download_master()
+            source = self.cache_path if df is not None else None
+        if df is None:
+            df, source = self._load_from_disk()
+        if df is None and not self.auto_refresh:
+            # Nothing on disk: fetch it once
+            df = self.download_master()
+            source = self.cache_path if df is not None else None
+        if df is None:
+            print(f"{Fore.RED}Error: No instrument master available.{Style.RESET_ALL}")
+        self._install(df, source)
+
+    # --- Daily refresh ---
+    def refresh_due(self, now):
+        """True once per trading day from MASTER_REFRESH_TIME (IST, before the open) until a refresh succeeds."""
+        if not self.auto_refresh or not is_trading_day(now.date()):
+            return False
+        if self.refreshed_on == now.date() or time.time() < self._retry_at:
+            return False
+        return now.strftime('%H:%M') >= getattr(config, 'MASTER_REFRESH_TIME', '08:30')
+
+    def refresh_master(self, force=False):
+        """
+        Re-checks the master (conditional request) and swaps the new one in without a restart.
+        Returns True if a different master was installed; on failure the current one stays in place.
+        """
+        df = self.download_master(force=force)
+        if df is None:
+            return False
+        if self.last_refresh_status != 'downloaded' and self.df is not None and self.source_path == self.cache_path:
+            return False
+        self._install(df, self.cache_path)
+        print(f"{Fore.GREEN}Instrument master refreshed ({len(df)} instruments).{Style.RESET_ALL}")
+        return True
+
+    def _install(self, df, source):
+        """
+        Builds every index for `df` first, then swaps them in together, so the main loop never sees
+        a new DataFrame with an old index (or a half-built one if the build fails).
+        """
+        key_index, columns = self._build_lookup_index(df)
+        strike_index = StrikeIndex.from_master(df, self._filters()[0]) if df is not None else None
+        self.df, self.source_path = df, source
+        self._lookup_index = (key_index, columns)
+        self._strike_index = strike_index
+        self._calendars = {}
+        # Master changed (or first load): symbol map must be re-resolved against it
+        self._symbol_resolver = None
+
+    # --- Instrument metadata index ---
+    @staticmethod
+    def _build_lookup_index(df):
+        """
+        Builds the instrument_key -> metadata index used by lookup(): one dict of row positions plus
+        compact column arrays (categorical codes for the repeated strings), instead of scanning the df per key.
+        Returns (key_index, columns).
+        """
+        if df is None or df.empty or 'instrument_key' not in df.columns:
+            return {}, None
+
+        def column(name, default):
+            return df[name] if name in df.columns else pd.Series(default, index=df.index)
+
+        names = pd.Categorical(column('name', ''))
+        types = pd.Categorical(column('instrument_type', ''))
+        expiry = pd.to_datetime(column('expiry_dt', None), errors='coerce')
+        columns = {
+            'name_codes': names.codes.astype(np.int32), 'names': np.asarray(names.categories, dtype=object),
+            'type_codes': types.codes.astype(np.int16), 'types': np.asarray(types.categories, dtype=object),
+            'expiry': expiry.values.astype('datetime64[D]'),
+            'strike': pd.to_numeric(column('strike_price', np.nan), errors='coerce').to_numpy(dtype=np.float64),
+            'lot_size': pd.to_numeric(column('lot_size', 0), errors='coerce').fillna(0).to_numpy(dtype=np.int32),
+            'freeze_quantity': pd.to_numeric(column('freeze_quantity', np.nan), errors='coerce').to_numpy(dtype=np.float64),
+            'tick_size': pd.to_numeric(column('tick_size', np.nan), errors='coerce').to_numpy(dtype=np.float64),
+            'trading_symbol': column('trading_symbol', '').to_numpy(dtype=object),
+        }
+        # Later duplicates win, like the last match of a boolean filter would
+        return dict(zip(df['instrument_key'].tolist(), range(len(df)))), columns
+
+    def lookup(self, instrument_key):
+        """O(1) metadata lookup. Returns an InstrumentRecord, or None if the key isn't in the master."""
+        key_index, c = self._lookup_index
+        i = key_index.get(instrument_key)
+        if i is None:
+            return None
+        name_code, type_code = c['name_codes'][i], c['type_codes'][i]
+        expiry = c['expiry'][i]
+        strike = c['strike'][i]
+        return InstrumentRecord(
+            instrument_key,
+            c['names'][name_code] if name_code >= 0 else None,
+            None if np.isnat(expiry) else expiry.item(),
+            None if np.isnan(strike) else float(strike),
+            c['types'][type_code] if type_code >= 0 else None,
+            int(c['lot_size'][i]),
+            float(c['freeze_quantity'][i]),
+            float(c['tick_size'][i]),
+            c['trading_symbol'][i],
+        )
+
+    @property
+    def _key_index(self):
+        return self._lookup_index[0]
+
+    # --- Strike windows ---
+    @property
+    def strike_index(self):
+        """Sorted strikes per (underlying, expiry, CE/PE) for the traded underlyings. Built with the master (or on first use)."""
+        if self._strike_index is None:
+            if self.df is None:
+                self.load_master()
+            self._strike_index = StrikeIndex.from_master(self.df, getattr(config, 'TRADED_UNDERLYINGS', [config.UNDERLYING_NAME]))
+        return self._strike_index
+
+    # --- Symbol -> Token resolution ---
+    @property
+    def symbol_resolver(self):
+        """Built on first use (or loaded from the on-disk cache if the master file hasn't changed)."""
+        if self._symbol_resolver is None:
+            if self.df is None:
+                self.load_master()
+            self._symbol_resolver = SymbolResolver.load_or_build(self.df, self.source_path, self.symbol_cache_path,
+                                                                 getattr(config, 'TRADED_UNDERLYINGS', [config.UNDERLYING_NAME]))
+        return self._symbol_resolver
+
+    def resolve_symbol(self, key):
+        """Maps a symbol-style key (e.g. NSE_FO|NIFTY26FEB26200PE) to its token key (NSE_FO|40476). None if unknown."""
+        return self.symbol_resolver.resolve(key)
+
+    def remap_symbol_keys(self, data):
+        """
+        The quote/greeks APIs may key results by trading symbol while strategies use token keys.
+        Adds a token-keyed entry for every symbol-keyed one in `data` (in place) and returns it.
+        """
+        if not data:
+            return data
+        resolve = self.symbol_resolver.resolve
+        extra = {}
+        for key, val in data.items():
+            token_key = resolve(key)
+            if token_key:
+                extra[token_key] = val
+        data.update(extra)
+        return data
+
+    # --- Expiries ---
+    def expiry_calendar(self, underlying_symbol='NIFTY'):
+        """ExpiryCalendar for an underlying, built once per master load."""
         if self.df is None:
             self.load_master()
-            
+        calendar = self._calendars.get(underlying_symbol)
+        if calendar is None:
+            calendar = ExpiryCalendar.from_master(self.df, underlying_symbol)
+            self._calendars[underlying_symbol] = calendar
+        return calendar
+
+    def get_expiry_dates(self, underlying_symbol='NIFTY'):
+        calendar = self.expiry_calendar(underlying_symbol)
         if self.df is None:
             print("Display Warning: Master Dataframe is None. Cannot find expiries.")
-            return []
-        
-        # Filter Logic (JSON/DF structure might differ slightly, but assuming fields exist)
-        # name might be 'name' or 'symbol'
-        # instrument_type might be 'instrument_type'
-        
-        # Safe check for columns
-        today = date.today()
-        mask = (self.df['name'] == underlying_symbol) & \
-               (self.df['instrument_type'].isin(['CE', 'PE']))
-        
-        subset = self.df[mask]
-        if subset.empty:
-            return []
-            
-        unique_expiries = sorted(subset['expiry_dt'].unique())
-        # Filter out NaT/None values which cause TypeErrors in comparison
-        valid_expiries = [d for d in unique_expiries if pd.notna(d)]
-        future_expiries = [d for d in valid_expiries if d >= today]
-        return future_expiries
+        return calendar.upcoming(date.today())
 
     def get_target_expiries(self, underlying_symbol='NIFTY'):
-        expiries = self.get_expiry_dates(underlying_symbol)
-        
+        calendar = self.expiry_calendar(underlying_symbol)
+        expiries = calendar.upcoming(date.today())
         if not expiries:
             return None, None
-            
+
+        # Weekly: nearest expiry. Monthly: the month after the weekly's month (last listed expiry as fallback)
         weekly = expiries[0]
-        
-        target_month = weekly.month + 1
-        target_year = weekly.year
-        if target_month > 12:
-            target_month = 1
-            target_year += 1
-            
-        next_month_expiries = [d for d in expiries if d.year == target_year and d.month == target_month]
-        
-        if next_month_expiries:
-            monthly = next_month_expiries[-1]
-        else:
-            monthly = expiries[-1]
-            
+        monthly = calendar.monthly_after(weekly, 1) or expiries[-1]
         return weekly, monthly
 
     def get_special_entry_expiries(self, underlying_symbol='NIFTY'):
@@ -121,60 +290,26 @@ class InstrumentMaster:
         2. Next-Next month's monthly
         Used for entry at 3:15 PM on the current month's expiry day.
         """
-        expiries = self.get_expiry_dates(underlying_symbol)
-        if not expiries:
-            return None, None
-            
+        calendar = self.expiry_calendar(underlying_symbol)
         today = date.today()
-        
-        # 1. Find Next Month
-        current_month = today.month
-        current_year = today.year
-        
-        next_month = current_month + 1
-        next_year = current_year
-        if next_month > 12:
-            next_month = 1
-            next_year += 1
-            
-        # 2. Find Next-Next Month
-        nn_month = next_month + 1
-        nn_year = next_year
-        if nn_month > 12:
-            nn_month = 1
-            nn_year += 1
-            
-        # Select Next Month's First Weekly
-        # (Assuming the first expiry in next month is the one we want)
-        next_month_expiries = [d for d in expiries if d.year == next_year and d.month == next_month]
-        weekly_target = next_month_expiries[0] if next_month_expiries else None
-        
-        # Select Next-Next Month's Monthly (Last of that month)
-        nn_month_expiries = [d for d in expiries if d.year == nn_year and d.month == nn_month]
-        monthly_target = nn_month_expiries[-1] if nn_month_expiries else None
-        
-        return weekly_target, monthly_target
+        if not calendar.upcoming(today):
+            return None, None
+        return calendar.first_of_month_after(today, 1), calendar.monthly_after(today, 2)
 
     def is_monthly_expiry_today(self, underlying_symbol='NIFTY'):
-        """Checks if today is the monthly expiry day for the underlying."""
-        expiries = self.get_expiry_dates(underlying_symbol)
-        if not expiries:
-            return False
-            
-        today = date.today()
-        
-        # A day is a monthly expiry if it is the LAST expiry of the current month
-        current_month_expiries = [d for d in expiries if d.year == today.year and d.month == today.month]
-        if not current_month_expiries:
-            return False
-            
-        last_of_month = current_month_expiries[-1]
-        return today == last_of_month
+        """Checks if today is the monthly expiry day (last expiry of the month) for the underlying."""
+        return self.expiry_calendar(underlying_symbol).is_last_expiry_of_month(date.today())
 
     def get_option_symbols(self, underlying_symbol='NIFTY', expiry_date=None, option_type='PE'):
         if self.df is None:
             self.load_master()
-        
+
+        # Single expiry + type of a traded underlying: served from the strike index (already sorted by strike)
+        if expiry_date and option_type:
+            series = self.strike_index.get(underlying_symbol, expiry_date, option_type)
+            if series is not None:
+                return series.to_frame().copy()
+
         mask = (self.df['name'] == underlying_symbol) & \
                (self.df['instrument_type'].isin(['CE', 'PE']))
                
@@ -0,0 +1,156 @@
+import math
+from collections import namedtuple
+import numpy as np
+from greeks import _is_call, norm_cdf, norm_pdf
+
+SIGMA_MIN = 0.001
+SIGMA_MAX = 10.0
+
+# iv: solved vols (SIGMA_MIN where no solution exists, NaN where the price is missing);
+# converged: |model - market| < tol reached; iterations: Newton/bisection steps spent per option
+IVResult = namedtuple('IVResult', ['iv', 'converged', 'iterations'])
+
+
+def rational_guess(price, S, K, t, r, is_call):
+    """
+    Corrado-Miller closed-form IV approximation (puts go through put-call parity first).
+    Lands within a few vol points for near-the-money options, so Newton usually needs 2-3 steps from it.
+    """
+    disc_K = K * np.exp(-r * t)
+    call_price = np.where(is_call, price, price + S - disc_K)
+    half_gap = call_price - (S - disc_K) / 2
+    with np.errstate(invalid='ignore', divide='ignore'):
+        root = np.sqrt(np.maximum(half_gap ** 2 - (S - disc_K) ** 2 / math.pi, 0.0))
+        guess = math.sqrt(2 * math.pi) / (S + disc_K) * (half_gap + root) / np.sqrt(t)
+    return np.clip(np.where(np.isfinite(guess) & (guess > 0), guess, 0.5), SIGMA_MIN, SIGMA_MAX)
+
+
+def solve_iv(price, S, K, t, r, flag, guess=None, tol=1e-5, max_iter=100):
+    """
+    Implied volatility of a whole batch of options at once.
+
+    Starts from `guess` where it is finite (e.g. the option's IV on the previous tick), the rational
+    approximation elsewhere. Each step is Newton, kept inside a [lo, hi] bracket that shrinks with every
+    evaluation; a step leaving the bracket (or a vanishing vega) is replaced by bisection, so every option
+    converges or runs out of iterations inside [0.001, 10]. Converged options drop out of the update.
+
+    Same conventions as calculate_implied_volatility: 0.001 where t <= 0 or the price is below intrinsic
+    (those are returned with converged False and 0 iterations).
+    """
+    price = np.asarray(price, dtype=float)
+    is_call, S, K, t = np.broadcast_arrays(_is_call(flag), np.asarray(S, dtype=float), np.asarray(K, dtype=float),
+                                           np.asarray(t, dtype=float))
+    shape = np.broadcast_shapes(price.shape, S.shape)
+    price, is_call, S, K, t = (np.broadcast_to(a, shape).ravel() for a in (price, is_call, S, K, t))
+    n = price.size
+
+    sigma = np.full(n, SIGMA_MIN)
+    converged = np.zeros(n, dtype=bool)
+    iterations = np.zeros(n, dtype=np.int32)
+
+    intrinsic = np.where(is_call, np.maximum(S - K, 0.0), np.maximum(K - S, 0.0))
+    # No vol reproduces a price at/below the forward intrinsic (deep ITM quotes rounded to the tick): floor them
+    # up front instead of bisecting down to 0.001
+    with np.errstate(invalid='ignore'):
+        forward_intrinsic = np.where(is_call, S - K * np.exp(-r * t), K * np.exp(-r * t) - S)
+    missing = np.isnan(price)
+    solvable = ~missing & (t > 0) & (price >= intrinsic) & (price > forward_intrinsic + tol)
+    idx = np.flatnonzero(solvable)
+
+    if idx.size:
+        p, s_, k_, t_, c_ = price[idx], S[idx], K[idx], t[idx], is_call[idx]
+        sign = np.where(c_, 1.0, -1.0)
+        sqrt_t = np.sqrt(t_)
+        log_sk = np.log(s_ / k_)
+        disc_k = k_ * np.exp(-r * t_)
+
+        start = rational_guess(p, s_, k_, t_, r, c_)
+        if guess is not None:
+            warm = np.broadcast_to(np.asarray(guess, dtype=float), shape).ravel()[idx]
+            start = np.where(np.isfinite(warm), np.clip(warm, SIGMA_MIN, SIGMA_MAX), start)
+        sig = start
+        lo = np.full(idx.size, SIGMA_MIN)
+        hi = np.full(idx.size, SIGMA_MAX)
+        done = np.zeros(idx.size, dtype=bool)
+        iters = np.zeros(idx.size, dtype=np.int32)
+        active = np.arange(idx.size)
+
+        for _ in range(max_iter):
+            if not active.size:
+                break
+            sg, st = sig[active], sqrt_t[active]
+            d1 = (log_sk[active] + (r + 0.5 * sg ** 2) * t_[active]) / (sg * st)
+            d2 = d1 - sg * st
+            sn = sign[active]
+            model = sn * (s_[active] * norm_cdf(sn * d1) - disc_k[active] * norm_cdf(sn * d2))
+            vega = s_[active] * norm_pdf(d1) * st
+            diff = model - p[active]
+            iters[active] += 1
+
+            ok = np.abs(diff) < tol
+            done[active[ok]] = True
+            # Price is increasing in sigma: too high -> the root is below sigma
+            hi[active] = np.where(diff > 0, sg, hi[active])
+            lo[active] = np.where(diff < 0, sg, lo[active])
+            with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+                newton = sg - diff / vega
+            a_lo, a_hi = lo[active], hi[active]
+            inside = np.isfinite(newton) & (newton > a_lo) & (newton < a_hi)
+            sig[active] = np.where(ok, sg, np.where(inside, newton, 0.5 * (a_lo + a_hi)))
+
+            # Bracket collapsed (no root in [0.001, 10], e.g. price above the max BS price): give up on those
+            stuck = ~ok & (a_hi - a_lo < 1e-12)
+            active = active[~ok & ~stuck]
+
+        sigma[idx] = sig
+        converged[idx] = done
+        iterations[idx] = iters
+
+    sigma[missing] = np.nan
+    return IVResult(sigma.reshape(shape), converged.reshape(shape), iterations.reshape(shape))
+
+
+class IVSolver:
+    """
+    solve_iv with a per-instrument warm start: every converged IV is remembered by instrument_key and used as the
+    next tick's starting point, so quiet options converge in a step or two. Keeps counters for instrumentation.
+
+        iv = solver.solve(keys, ltp, spot, strikes, tte, r, is_call).iv
+    """
+    def __init__(self, tol=1e-5, max_iter=100):
+        self.tol = tol
+        self.max_iter = max_iter
+        self._last_iv = {}
+        self.solves = 0
+        self.options = 0
+        self.warm_starts = 0
+        self.failures = 0
+        self.iterations = 0
+
+    def solve(self, keys, price, S, K, t, r, flag):
+        keys = list(keys)
+        guess = np.array([self._last_iv.get(k, np.nan) for k in keys], dtype=float)
+        result = solve_iv(price, S, K, t, r, flag, guess=guess, tol=self.tol, max_iter=self.max_iter)
+
+        self.solves += 1
+        self.options += len(keys)
+        self.warm_starts += int(np.isfinite(guess).sum())
+        self.iterations += int(result.iterations.sum())
+        self.failures += int(((result.iterations > 0) & ~result.converged).sum())
+        for key, iv, ok in zip(keys, result.iv.tolist(), result.converged.tolist()):
+            if ok:
+                self._last_iv[key] = iv
+            else:
+                self._last_iv.pop(key, None)
+        return result
+
+    def forget(self, keys=None):
+        """Drop the warm-start IVs of `keys` (all of them if None), e.g. after a master refresh."""
+        if keys is None:
+            self._last_iv.clear()
+        for key in keys or ():
+            self._last_iv.pop(key, None)
+
+    def stats(self):
+        return {'solves': self.solves, 'options': self.options, 'warm_starts': self.warm_starts,
+                'failures': self.failures, 'avg_iterations': self.iterations / self.options if self.options else 0.0}
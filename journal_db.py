@@ -0,0 +1,262 @@
+import csv
+import glob
+import hashlib
+import io
+import os
+import sqlite3
+import threading
+import config
+
+HEADERS = ['timestamp', 'instrument_key', 'side', 'qty', 'price', 'expiry', 'tag', 'pnl']
+
+
+def _pnl(value):
+    """CSV pnl cell -> float or None ('' and 'None' are both 'no P&L', as in the old reader)."""
+    if value in (None, '', 'None'):
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+
+def _prefix_digest(data):
+    """Checksum of the CSV bytes already imported: a rewrite of earlier rows changes it."""
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def parse_log_name(path):
+    """trade_log_calendar_live.csv -> ('calendar', 'live')"""
+    name = os.path.basename(path)[:-len('.csv')] if path.endswith('.csv') else os.path.basename(path)
+    strategy, _, mode = name.rpartition('_')
+    if strategy.startswith('trade_log_'):
+        strategy = strategy[len('trade_log_'):]
+    return strategy or name, mode
+
+
+class JournalDB:
+    """
+    Trade journal in SQLite (WAL mode), shared by all strategies and modes.
+
+    trades:    one row per logged trade. Indexed on (date, instrument_key, tag) for the SYNC_EXISTING dedupe
+               check and on (strategy, mode) for per strategy reads.
+    daily_pnl: closed P&L per strategy / mode / day, updated in the same transaction as the trade,
+               so startup reads a few rows instead of summing the whole log.
+    csv_sources: how far each trade_log_*.csv has been imported (byte offset) and a checksum of those bytes. The
+               CSV stays the file that is pushed to Git and opened for reporting. Rows appended to it elsewhere
+               (pulled from the other machine) are imported incrementally. A CSV that shrank, or whose imported
+               part changed (e.g. a rebase rewrote earlier rows), was replaced: that journal is re-imported.
+
+        db = JournalDB('trade_journal.db')
+        db.import_csv('trade_log_calendar_live.csv', 'calendar', 'live')
+        db.exists('calendar', 'live', '2026-01-05', 'NSE_FO|40476', 'SYNC_EXISTING')
+        db.closed_pnl('calendar', 'live')
+    """
+    def __init__(self, path=None, timeout=10):
+        self.path = path or getattr(config, 'TRADE_JOURNAL_DB', './trade_journal.db')
+        folder = os.path.dirname(self.path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        self._lock = threading.Lock()
+        # Strategies log from their executor workers, not the thread that built the journal
+        self._conn = sqlite3.connect(self.path, timeout=timeout, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._create_schema()
+
+    def _create_schema(self):
+        with self._lock:
+            self._conn.executescript("""
+                CREATE TABLE IF NOT EXISTS trades (
+                    id INTEGER PRIMARY KEY, strategy TEXT NOT NULL, mode TEXT NOT NULL,
+                    timestamp TEXT NOT NULL, date TEXT NOT NULL, instrument_key TEXT, side TEXT,
+                    qty, price, expiry TEXT, tag TEXT, pnl REAL);
+                CREATE INDEX IF NOT EXISTS idx_trades_dedupe ON trades (date, instrument_key, tag);
+                CREATE INDEX IF NOT EXISTS idx_trades_strategy ON trades (strategy, mode);
+                CREATE TABLE IF NOT EXISTS daily_pnl (
+                    strategy TEXT NOT NULL, mode TEXT NOT NULL, date TEXT NOT NULL,
+                    closed_pnl REAL NOT NULL, closed_trades INTEGER NOT NULL,
+                    PRIMARY KEY (strategy, mode, date)) WITHOUT ROWID;
+                CREATE TABLE IF NOT EXISTS csv_sources (
+                    path TEXT PRIMARY KEY, strategy TEXT NOT NULL, mode TEXT NOT NULL, offset INTEGER NOT NULL,
+                    digest TEXT);
+            """)
+            columns = [row[1] for row in self._conn.execute("PRAGMA table_info(csv_sources)")]
+            if 'digest' not in columns:     # journal created before the checksum was kept
+                self._conn.execute("ALTER TABLE csv_sources ADD COLUMN digest TEXT")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    # --- writing ---
+    def _insert(self, strategy, mode, row):
+        timestamp = str(row['timestamp'])
+        pnl = _pnl(row.get('pnl'))
+        self._conn.execute(
+            "INSERT INTO trades (strategy, mode, timestamp, date, instrument_key, side, qty, price, expiry, tag, pnl) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (strategy, mode, timestamp, timestamp[:10], row.get('instrument_key'), row.get('side'), row.get('qty'),
+             row.get('price'), None if row.get('expiry') is None else str(row['expiry']), row.get('tag'), pnl))
+        if pnl is not None:
+            self._conn.execute(
+                "INSERT INTO daily_pnl (strategy, mode, date, closed_pnl, closed_trades) VALUES (?, ?, ?, ?, 1) "
+                "ON CONFLICT(strategy, mode, date) DO UPDATE SET closed_pnl = closed_pnl + excluded.closed_pnl, "
+                "closed_trades = closed_trades + 1",
+                (strategy, mode, timestamp[:10], pnl))
+
+    def _set_offset(self, csv_path, strategy, mode, offset, digest):
+        self._conn.execute(
+            "INSERT INTO csv_sources (path, strategy, mode, offset, digest) VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT(path) DO UPDATE SET offset = excluded.offset, digest = excluded.digest",
+            (os.path.abspath(csv_path), strategy, mode, offset, digest))
+
+    def _import(self, csv_path, strategy, mode, end=None):
+        """import_csv inside the caller's transaction, reading the CSV up to byte `end` (default: all of it)."""
+        found = self._conn.execute("SELECT offset, digest FROM csv_sources WHERE path = ?",
+                                   (os.path.abspath(csv_path),)).fetchone()
+        offset, digest = found if found else (0, None)
+        with open(csv_path, 'rb') as f:
+            data = f.read() if end is None else f.read(end)
+        if offset and (len(data) < offset or (digest is not None and _prefix_digest(data[:offset]) != digest)):
+            # Replaced (e.g. a different version pulled from Git): this journal is re-read from scratch
+            print(f"Trade journal: {os.path.basename(csv_path)} was replaced, re-importing it.")
+            self._conn.execute("DELETE FROM trades WHERE strategy = ? AND mode = ?", (strategy, mode))
+            self._conn.execute("DELETE FROM daily_pnl WHERE strategy = ? AND mode = ?", (strategy, mode))
+            offset = 0
+        new = data[offset:]
+        new = new[:new.rfind(b'\n') + 1]       # a row still being written is picked up next time
+        if not new and found and digest is not None:
+            return 0
+        lines = io.StringIO(new.decode('utf-8'), newline='')
+        header = data[:data.find(b'\n') + 1]
+        fieldnames = None if offset == 0 else next(csv.reader([header.decode('utf-8')]), None) or HEADERS
+        count = 0
+        for row in csv.DictReader(lines, fieldnames=fieldnames):
+            if not row.get('timestamp'):
+                continue
+            self._insert(strategy, mode, row)
+            count += 1
+        consumed = offset + len(new)
+        self._set_offset(csv_path, strategy, mode, consumed, _prefix_digest(data[:consumed]))
+        return count
+
+    def insert(self, strategy, mode, row, csv_path=None, csv_span=None):
+        """
+        Add one trade (a dict with the CSV columns). Pass the CSV it was also appended to and the (start, end) byte
+        positions of that append: rows that reached the CSV before it and weren't imported yet (pulled from the
+        other machine) are imported first, then the offset moves past our own row so it isn't read back.
+        """
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                if csv_path is not None and csv_span is not None:
+                    start, end = csv_span
+                    self._import(csv_path, strategy, mode, end=start)
+                    self._insert(strategy, mode, row)
+                    with open(csv_path, 'rb') as f:
+                        self._set_offset(csv_path, strategy, mode, end, _prefix_digest(f.read(end)))
+                else:
+                    self._insert(strategy, mode, row)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def import_csv(self, csv_path, strategy, mode):
+        """Import the rows of a trade_log_*.csv not seen yet. Returns the number of rows imported."""
+        if not os.path.exists(csv_path):
+            return 0
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                count = self._import(csv_path, strategy, mode)
+                self._conn.execute("COMMIT")
+                return count
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    # --- reading ---
+    def exists(self, strategy, mode, date, instrument_key, tag):
+        """Was (instrument_key, tag) already logged on date? One index seek."""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT 1 FROM trades WHERE date = ? AND instrument_key = ? AND tag = ? AND strategy = ? AND mode = ? LIMIT 1",
+                (date, instrument_key, tag, strategy, mode)).fetchone() is not None
+
+    def count(self, strategy, mode):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM trades WHERE strategy = ? AND mode = ?",
+                                      (strategy, mode)).fetchone()[0]
+
+    def closed_pnl(self, strategy, mode, date=None):
+        """Closed P&L of one journal: all days, or only `date`."""
+        query = "SELECT COALESCE(SUM(closed_pnl), 0.0) FROM daily_pnl WHERE strategy = ? AND mode = ?"
+        args = (strategy, mode)
+        if date is not None:
+            query += " AND date = ?"
+            args += (date,)
+        with self._lock:
+            return self._conn.execute(query, args).fetchone()[0]
+
+    def daily_pnl(self, strategy=None, mode=None):
+        """[(strategy, mode, date, closed_pnl, closed_trades)], oldest day first."""
+        query = "SELECT strategy, mode, date, closed_pnl, closed_trades FROM daily_pnl"
+        where, args = [], []
+        if strategy is not None:
+            where.append("strategy = ?")
+            args.append(strategy)
+        if mode is not None:
+            where.append("mode = ?")
+            args.append(mode)
+        if where:
+            query += " WHERE " + " AND ".join(where)
+        with self._lock:
+            return self._conn.execute(query + " ORDER BY date, strategy, mode", args).fetchall()
+
+    def export_csv(self, csv_path, strategy, mode):
+        """Write one journal out as a trade_log CSV (same columns as ever). Returns the number of rows."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT timestamp, instrument_key, side, qty, price, expiry, tag, pnl FROM trades "
+                "WHERE strategy = ? AND mode = ? ORDER BY id", (strategy, mode)).fetchall()
+        tmp = csv_path + '.tmp'
+        with open(tmp, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(HEADERS)
+            writer.writerows(rows)
+        os.replace(tmp, csv_path)
+        with open(csv_path, 'rb') as f:
+            data = f.read()
+        with self._lock:
+            self._set_offset(csv_path, strategy, mode, len(data), _prefix_digest(data))
+        return len(rows)
+
+
+def main():
+    """Migrate / export trade_log_*.csv files and print closed P&L per strategy and day."""
+    import argparse
+    parser = argparse.ArgumentParser(description="SQLite trade journal: CSV migration, export and daily P&L")
+    parser.add_argument('--db', default=None, help="Journal database (default: config.TRADE_JOURNAL_DB)")
+    parser.add_argument('--migrate', nargs='*', metavar='CSV', help="Import trade logs (default: trade_log_*.csv)")
+    parser.add_argument('--export', nargs='+', metavar='CSV', help="Rewrite these trade logs from the database")
+    args = parser.parse_args()
+
+    db = JournalDB(args.db)
+    if args.migrate is not None:
+        for path in args.migrate or sorted(glob.glob('trade_log_*.csv')):
+            strategy, mode = parse_log_name(path)
+            print(f"{path}: {db.import_csv(path, strategy, mode)} rows imported ({strategy}/{mode})")
+    for path in args.export or []:
+        strategy, mode = parse_log_name(path)
+        print(f"{path}: {db.export_csv(path, strategy, mode)} rows exported ({strategy}/{mode})")
+
+    print(f"{'Date':<12}{'Strategy':<12}{'Mode':<8}{'Closed':>8}{'P&L':>14}")
+    for strategy, mode, date, pnl, trades in db.daily_pnl():
+        print(f"{date:<12}{strategy:<12}{mode:<8}{trades:>8}{pnl:>14,.2f}")
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
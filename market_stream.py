@@ -0,0 +1,331 @@
+import json
+import socket
+import ssl
+import struct
+import threading
+import time
+import uuid
+import websocket
+from upstox_client.feeder.proto import MarketDataFeedV3_pb2 as feed_pb
+import config
+
+UPSTOX_FEED_URL = "wss://api.upstox.com/v3/feed/market-data-feed"
+
+# Upstox feed modes
+MODE_LTPC = 'ltpc'
+MODE_OPTION_GREEKS = 'option_greeks'
+MODE_FULL = 'full'
+
+SUBSCRIBE_CHUNK_SIZE = 100
+
+
+class Quote:
+    """
+    Latest streamed values for one instrument.
+    Exposes `last_price` so it can be used anywhere a REST LTP quote object is expected.
+    """
+    __slots__ = ('instrument_token', 'last_price', 'ltt', 'close_price', 'oi', 'iv',
+                 'delta', 'theta', 'gamma', 'vega', 'updated_at')
+
+    def __init__(self, instrument_token):
+        self.instrument_token = instrument_token
+        self.last_price = None
+        self.ltt = None
+        self.close_price = None
+        self.oi = None
+        self.iv = None
+        self.delta = None
+        self.theta = None
+        self.gamma = None
+        self.vega = None
+        self.updated_at = 0.0
+
+    def __repr__(self):
+        return f"Quote({self.instrument_token}, ltp={self.last_price}, delta={self.delta}, iv={self.iv})"
+
+
+class QuoteCache:
+    """
+    Thread-safe in-memory cache of the latest quote and greeks per instrument_key.
+    Written by the streaming thread, read by the main loop / strategies.
+    """
+    def __init__(self):
+        self._quotes = {}
+        self._lock = threading.Lock()
+        self.tick_count = 0
+        self.last_tick_time = 0.0
+
+    def __len__(self):
+        return len(self._quotes)
+
+    def get(self, key, max_age=None):
+        q = self._quotes.get(key)
+        if q is None or q.last_price is None:
+            return None
+        if max_age is not None and (time.time() - q.updated_at) > max_age:
+            return None
+        return q
+
+    def ltp(self, key, max_age=None):
+        q = self.get(key, max_age)
+        return q.last_price if q else None
+
+    def quotes_for(self, keys, max_age=None):
+        """
+        Returns (quotes, missing): quotes maps key -> Quote for every fresh key,
+        missing lists the keys that must be fetched over REST instead.
+        """
+        quotes = {}
+        missing = []
+        for key in keys:
+            q = self.get(key, max_age)
+            if q is not None:
+                quotes[key] = q
+            else:
+                missing.append(key)
+        return quotes, missing
+
+    def greeks_for(self, keys, max_age=None):
+        """Returns greeks in the same shape as UpstoxWrapper.get_option_greeks for keys with streamed greeks."""
+        greeks = {}
+        for key in keys:
+            q = self.get(key, max_age)
+            if q is not None and q.delta is not None:
+                greeks[key] = {'delta': q.delta, 'theta': q.theta, 'gamma': q.gamma, 'vega': q.vega, 'iv': q.iv}
+        return greeks
+
+    def apply_feed_response(self, response):
+        """Merges a decoded FeedResponse protobuf into the cache."""
+        now = time.time()
+        with self._lock:
+            for key, feed in response.feeds.items():
+                q = self._quotes.get(key)
+                if q is None:
+                    q = Quote(key)
+                    self._quotes[key] = q
+
+                kind = feed.WhichOneof('FeedUnion')
+                if kind == 'ltpc':
+                    self._apply_ltpc(q, feed.ltpc)
+                elif kind == 'firstLevelWithGreeks':
+                    fl = feed.firstLevelWithGreeks
+                    self._apply_ltpc(q, fl.ltpc)
+                    self._apply_greeks(q, fl.optionGreeks, fl.iv, fl.oi, fl.HasField('optionGreeks'))
+                elif kind == 'fullFeed':
+                    ff = feed.fullFeed
+                    if ff.WhichOneof('FullFeedUnion') == 'indexFF':
+                        self._apply_ltpc(q, ff.indexFF.ltpc)
+                    else:
+                        mff = ff.marketFF
+                        self._apply_ltpc(q, mff.ltpc)
+                        self._apply_greeks(q, mff.optionGreeks, mff.iv, mff.oi, mff.HasField('optionGreeks'))
+                else:
+                    continue
+
+                q.updated_at = now
+                self.tick_count += 1
+            self.last_tick_time = now
+
+    @staticmethod
+    def _apply_ltpc(q, ltpc):
+        if ltpc.ltp:
+            q.last_price = ltpc.ltp
+        if ltpc.ltt:
+            q.ltt = ltpc.ltt
+        if ltpc.cp:
+            q.close_price = ltpc.cp
+
+    @staticmethod
+    def _apply_greeks(q, og, iv, oi, has_greeks):
+        if has_greeks:
+            q.delta = og.delta
+            q.theta = og.theta
+            q.gamma = og.gamma
+            q.vega = og.vega
+        if iv:
+            q.iv = iv
+        if oi:
+            q.oi = oi
+
+
+def build_request(method, instrument_keys, mode=None):
+    """Builds a subscription request exactly like the Upstox SDK feeder (JSON sent as a binary frame)."""
+    request = {
+        "guid": str(uuid.uuid4()),
+        "method": method,
+        "data": {"instrumentKeys": list(instrument_keys)},
+    }
+    if mode is not None:
+        request["data"]["mode"] = mode
+    return json.dumps(request).encode('utf-8')
+
+
+def write_recorded_frame(f, payload):
+    """Recording format: 4-byte big-endian length prefix + raw protobuf frame."""
+    f.write(struct.pack('>I', len(payload)))
+    f.write(payload)
+
+
+def iter_recorded_frames(path):
+    with open(path, 'rb') as f:
+        while True:
+            header = f.read(4)
+            if len(header) < 4:
+                return
+            (length,) = struct.unpack('>I', header)
+            yield f.read(length)
+
+
+class MarketDataStream:
+    """
+    Upstox V3 market-data feed client (protobuf over WebSocket) that keeps a QuoteCache current.
+    Runs on a background thread with auto-reconnect; subscriptions are diffed and replayed on reconnect.
+    """
+    def __init__(self, access_token=None, url=None, cache=None, record_path=None):
+        self.access_token = access_token or config.UPSTOX_ACCESS_TOKEN
+        self.url = url or getattr(config, 'MARKET_STREAM_URL', None) or UPSTOX_FEED_URL
+        self.cache = cache if cache is not None else QuoteCache()
+        self.record_path = record_path
+        self._record_file = None
+
+        self._subscriptions = {}  # instrument_key -> mode
+        self._sub_lock = threading.Lock()
+        self._ws = None
+        self._thread = None
+        self._stop = threading.Event()
+        self._connected = threading.Event()
+
+        self.frames_received = 0
+        self.decode_errors = 0
+        self.reconnects = 0
+        self._backoff = 1
+
+    # --- Lifecycle ---
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        if self.record_path:
+            self._record_file = open(self.record_path, 'ab')
+        self._thread = threading.Thread(target=self._run, name="market-stream", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        ws = self._ws
+        if ws:
+            ws.keep_running = False
+            try:
+                # Shut the raw socket down so the dispatcher's select() wakes up immediately
+                # (closing the fd from this thread leaves it blocked until ping_timeout)
+                if ws.sock and ws.sock.sock:
+                    ws.sock.sock.shutdown(socket.SHUT_RDWR)
+            except Exception:
+                pass
+        if self._thread:
+            self._thread.join(timeout=5)
+        if self._record_file:
+            self._record_file.close()
+            self._record_file = None
+
+    def is_connected(self):
+        return self._connected.is_set()
+
+    def wait_connected(self, timeout=10):
+        return self._connected.wait(timeout)
+
+    def _run(self):
+        while not self._stop.is_set():
+            headers = {'Authorization': f"Bearer {self.access_token}"} if self.access_token else {}
+            self._ws = websocket.WebSocketApp(self.url,
+                                              header=headers,
+                                              on_open=self._on_open,
+                                              on_message=self._on_message,
+                                              on_error=self._on_error,
+                                              on_close=self._on_close)
+            sslopt = {"cert_reqs": ssl.CERT_REQUIRED} if self.url.startswith('wss') else None
+            try:
+                self._ws.run_forever(sslopt=sslopt, ping_interval=20, ping_timeout=10)
+            except Exception as e:
+                print(f"[STREAM] Connection error: {e}")
+            self._connected.clear()
+
+            if self._stop.is_set():
+                break
+            self.reconnects += 1
+            print(f"[STREAM] Disconnected. Reconnecting in {self._backoff}s...")
+            self._stop.wait(self._backoff)
+            self._backoff = min(self._backoff * 2, 30)
+
+    # --- WebSocket callbacks ---
+    def _on_open(self, ws):
+        self._connected.set()
+        self._backoff = 1
+        with self._sub_lock:
+            by_mode = {}
+            for key, mode in self._subscriptions.items():
+                by_mode.setdefault(mode, []).append(key)
+        for mode, keys in by_mode.items():
+            self._send('sub', keys, mode)
+
+    def _on_message(self, ws, message):
+        if isinstance(message, str):
+            return  # Upstox only sends binary protobuf frames
+        self.frames_received += 1
+        if self._record_file:
+            write_recorded_frame(self._record_file, message)
+        try:
+            response = feed_pb.FeedResponse.FromString(message)
+        except Exception:
+            self.decode_errors += 1
+            return
+        self.cache.apply_feed_response(response)
+
+    def _on_error(self, ws, error):
+        if not self._stop.is_set():
+            print(f"[STREAM] Error: {error}")
+
+    def _on_close(self, ws, status_code, msg):
+        self._connected.clear()
+
+    # --- Subscriptions ---
+    def _send(self, method, keys, mode=None):
+        ws = self._ws
+        if not ws or not self._connected.is_set():
+            return False
+        try:
+            for i in range(0, len(keys), SUBSCRIBE_CHUNK_SIZE):
+                ws.send(build_request(method, keys[i:i + SUBSCRIBE_CHUNK_SIZE], mode), opcode=websocket.ABNF.OPCODE_BINARY)
+            return True
+        except Exception as e:
+            print(f"[STREAM] Failed to send {method}: {e}")
+            return False
+
+    @staticmethod
+    def mode_for(key):
+        """Index keys only need LTP; options get LTP + greeks."""
+        return MODE_LTPC if key.startswith('NSE_INDEX') else MODE_OPTION_GREEKS
+
+    def set_subscriptions(self, keys):
+        """
+        Makes the live subscription set equal to `keys` (ATM window + held legs + spot).
+        Only the difference is sent to the broker; the full set is replayed on reconnect.
+        """
+        wanted = {key: self.mode_for(key) for key in keys if key}
+        with self._sub_lock:
+            added = [k for k in wanted if k not in self._subscriptions]
+            removed = [k for k in self._subscriptions if k not in wanted]
+            self._subscriptions = wanted
+
+        if removed:
+            self._send('unsub', removed)
+        by_mode = {}
+        for key in added:
+            by_mode.setdefault(wanted[key], []).append(key)
+        for mode, mode_keys in by_mode.items():
+            self._send('sub', mode_keys, mode)
+        return added, removed
+
+    def subscriptions(self):
+        with self._sub_lock:
+            return dict(self._subscriptions)
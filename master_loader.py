@@ -0,0 +1,257 @@
+import codecs
+import gzip
+import json
+import os
+import time
+import zlib
+import numpy as np
+import pandas as pd
+import requests
+
+CACHE_VERSION = 1
+
+# Columns kept from the master (everything the strategies / indexes read, plus a few for debugging)
+MASTER_COLUMNS = ('instrument_key', 'name', 'instrument_type', 'segment', 'expiry', 'strike_price', 'lot_size',
+                  'freeze_quantity', 'tick_size', 'trading_symbol', 'exchange_token', 'underlying_key', 'weekly')
+# Few distinct values -> stored as codes + categories and loaded as pandas categoricals
+CATEGORICAL_COLUMNS = ('name', 'instrument_type', 'segment', 'underlying_key')
+STRING_COLUMNS = ('instrument_key', 'trading_symbol', 'exchange_token')
+FLOAT_COLUMNS = ('strike_price', 'freeze_quantity', 'tick_size')
+INT_COLUMNS = ('expiry', 'lot_size')   # expiry: epoch ms, -1 when missing
+BOOL_COLUMNS = ('weekly',)
+
+
+def iter_json_array(text_chunks, label='master'):
+    """
+    Yields the objects of one big JSON array fed in as text chunks (from a file or an HTTP response),
+    decoding object by object, so neither the whole text nor the whole list of 86k dicts is ever held in memory.
+    """
+    decoder = json.JSONDecoder()
+    chunks = iter(text_chunks)
+    buf = ''
+    pos = 0
+    started = False
+    eof = False
+    while True:
+        # Skip separators between objects
+        while pos < len(buf) and buf[pos] in ' \t\r\n,':
+            pos += 1
+        if not started and pos < len(buf):
+            if buf[pos] != '[':
+                raise ValueError(f"{label}: expected a JSON array")
+            started = True
+            pos += 1
+            continue
+        if pos < len(buf) and buf[pos] == ']':
+            return
+        try:
+            record, end = decoder.raw_decode(buf, pos)
+        except ValueError:
+            # Object cut at the chunk boundary (or buffer empty): read more
+            if eof:
+                if buf[pos:].strip():
+                    raise
+                return
+            chunk = next(chunks, '')
+            eof = not chunk
+            buf = buf[pos:] + chunk
+            pos = 0
+            continue
+        pos = end
+        yield record
+
+
+def iter_master_records(path, chunk_size=1 << 20):
+    """Yields the instrument dicts of an Upstox master file (.json or .json.gz) one at a time."""
+    opener = gzip.open if path.endswith('.gz') else open
+    with opener(path, 'rt', encoding='utf-8') as f:
+        yield from iter_json_array(iter(lambda: f.read(chunk_size), ''), label=path)
+
+
+def iter_gzip_text(byte_chunks):
+    """
+    Incrementally gunzips + UTF-8 decodes a stream of byte chunks (e.g. response.iter_content()).
+    Data that isn't gzipped (a server that already applied Content-Encoding) is passed through as is.
+    """
+    text = codecs.getincrementaldecoder('utf-8')()
+    inflate = None
+    for chunk in byte_chunks:
+        if not chunk:
+            continue
+        if inflate is None:
+            inflate = zlib.decompressobj(16 + zlib.MAX_WBITS) if chunk[:2] == b'\x1f\x8b' else False
+        data = inflate.decompress(chunk) if inflate else chunk
+        if data:
+            yield text.decode(data)
+    if inflate:
+        tail = inflate.flush()
+        if not inflate.eof:
+            raise ValueError("Instrument master download truncated (incomplete gzip stream)")
+        if tail:
+            yield text.decode(tail)
+    yield text.decode(b'', final=True)
+
+
+def load_filtered_records(records, underlyings, instrument_types):
+    """Keeps only `instrument_types` of `underlyings` from a stream of master records, as column lists."""
+    underlyings = set(underlyings)
+    instrument_types = set(instrument_types)
+    columns = {c: [] for c in MASTER_COLUMNS}
+    for record in records:
+        if record.get('name') not in underlyings or record.get('instrument_type') not in instrument_types:
+            continue
+        for c, values in columns.items():
+            values.append(record.get(c))
+    return columns
+
+
+def _encode_columns(columns):
+    """Column lists -> dict of NumPy arrays (no object dtype, so the .npz loads without pickle)."""
+    arrays = {}
+    for c in CATEGORICAL_COLUMNS:
+        cat = pd.Categorical(['' if v is None else str(v) for v in columns[c]])
+        arrays[c + '__codes'] = cat.codes.astype(np.int32)
+        arrays[c + '__categories'] = np.asarray(cat.categories, dtype=str)
+    for c in STRING_COLUMNS:
+        arrays[c] = np.asarray(['' if v is None else str(v) for v in columns[c]], dtype=str)
+    for c in FLOAT_COLUMNS:
+        arrays[c] = np.asarray([np.nan if v is None else v for v in columns[c]], dtype=np.float64)
+    for c in INT_COLUMNS:
+        arrays[c] = np.asarray([-1 if v is None else v for v in columns[c]], dtype=np.int64)
+    for c in BOOL_COLUMNS:
+        arrays[c] = np.asarray([bool(v) for v in columns[c]], dtype=bool)
+    return arrays
+
+
+def _decode_columns(arrays):
+    """Arrays (as saved) -> master DataFrame with categoricals and the usual expiry_dt column."""
+    data = {}
+    for c in MASTER_COLUMNS:
+        if c in CATEGORICAL_COLUMNS:
+            categories = arrays[c + '__categories'].astype(object)
+            data[c] = pd.Categorical.from_codes(arrays[c + '__codes'], categories=categories)
+        elif c in STRING_COLUMNS:
+            data[c] = arrays[c].astype(object)
+        elif c == 'expiry':
+            data[c] = np.where(arrays[c] >= 0, arrays[c], np.nan)
+        else:
+            data[c] = arrays[c]
+    df = pd.DataFrame(data)
+    df['expiry_dt'] = pd.to_datetime(df['expiry'], unit='ms', errors='coerce').dt.date
+    return df
+
+
+def source_signature(path):
+    """Cheap identity of a master file version (size + mtime); any re-download invalidates the cache."""
+    st = os.stat(path)
+    return f"{st.st_size}:{st.st_mtime_ns}"
+
+
+def read_cache(cache_path):
+    """(meta, arrays) of a cache file, or (None, None) if it is missing or unreadable."""
+    if not os.path.exists(cache_path):
+        return None, None
+    try:
+        with np.load(cache_path, allow_pickle=False) as npz:
+            arrays = {k: npz[k] for k in npz.files}
+        return json.loads(str(arrays.pop('__meta__'))), arrays
+    except (ValueError, KeyError, OSError) as e:
+        print(f"Instrument master cache unreadable ({e}). Rebuilding...")
+        return None, None
+
+
+def write_cache(cache_path, arrays, meta):
+    """Writes to a temp file and renames it over the cache, so a reader never sees half a file."""
+    try:
+        tmp_path = cache_path + '.tmp.npz'
+        np.savez(tmp_path, __meta__=np.asarray(json.dumps(meta)), **arrays)
+        os.replace(tmp_path, cache_path)
+    except OSError as e:
+        print(f"Could not write instrument master cache: {e}")
+
+
+def _filter_meta(underlyings, instrument_types):
+    return {'version': CACHE_VERSION, 'underlyings': sorted(underlyings), 'instrument_types': sorted(instrument_types)}
+
+
+def load_master_frame(source_path, cache_path, underlyings, instrument_types):
+    """
+    Master DataFrame for the given underlyings / instrument types.
+    Served from the .npz cache when it was built from this exact source file with the same filters,
+    otherwise streamed from the source and cached.
+    """
+    start = time.perf_counter()
+    meta = dict(_filter_meta(underlyings, instrument_types), source=source_signature(source_path))
+
+    cached_meta, arrays = read_cache(cache_path)
+    if cached_meta == meta:
+        df = _decode_columns(arrays)
+        print(f"Instrument master loaded from cache ({len(df)} instruments, {(time.perf_counter() - start) * 1000:.0f} ms).")
+        return df
+
+    arrays = _encode_columns(load_filtered_records(iter_master_records(source_path), underlyings, instrument_types))
+    write_cache(cache_path, arrays, meta)
+    df = _decode_columns(arrays)
+    print(f"Instrument master parsed from {os.path.basename(source_path)} ({len(df)} instruments, {(time.perf_counter() - start) * 1000:.0f} ms).")
+    return df
+
+
+def _cached_download(cache_path, url, underlyings, instrument_types):
+    meta, arrays = read_cache(cache_path)
+    if not meta or meta.get('source') != url:
+        return None, None
+    if {k: meta.get(k) for k in ('version', 'underlyings', 'instrument_types')} != _filter_meta(underlyings, instrument_types):
+        return None, None
+    return meta, arrays
+
+
+def load_cached_download(cache_path, url, underlyings, instrument_types):
+    """(df, meta) of an earlier download of `url` with the same filters, whatever its age; (None, None) otherwise."""
+    meta, arrays = _cached_download(cache_path, url, underlyings, instrument_types)
+    return (_decode_columns(arrays), meta) if meta else (None, None)
+
+
+def fetch_master_frame(url, cache_path, underlyings, instrument_types, today, force=False,
+                       session=None, headers=None, timeout=30, chunk_size=1 << 16):
+    """
+    Refreshes the master from `url` into the .npz cache without writing the download itself to disk:
+    the response body is gunzipped, parsed and filtered as it arrives.
+
+    Conditional: the ETag / Last-Modified of the previous download are sent back, so an unchanged master
+    costs a 304 and no parsing. A master already fetched (or confirmed) on `today` is not requested again unless `force`.
+
+    Returns (df, status) with status 'fresh' (checked today already), 'not_modified' or 'downloaded'.
+    Raises on network / HTTP / parse errors; the existing cache is left untouched in that case.
+    """
+    start = time.perf_counter()
+    session = session or requests
+    today = str(today)
+    meta, arrays = _cached_download(cache_path, url, underlyings, instrument_types)
+    if meta and meta.get('fetched_on') == today and not force:
+        return _decode_columns(arrays), 'fresh'
+
+    request_headers = dict(headers or {})
+    if meta:
+        if meta.get('etag'):
+            request_headers['If-None-Match'] = meta['etag']
+        if meta.get('last_modified'):
+            request_headers['If-Modified-Since'] = meta['last_modified']
+
+    with session.get(url, headers=request_headers, stream=True, timeout=timeout) as response:
+        if response.status_code == 304 and meta:
+            meta['fetched_on'] = today
+            write_cache(cache_path, arrays, meta)
+            print(f"Instrument master not modified since {meta.get('last_modified') or meta.get('etag')}.")
+            return _decode_columns(arrays), 'not_modified'
+        if response.status_code != 200:
+            raise IOError(f"Failed to download master. Status code: {response.status_code}")
+
+        records = iter_json_array(iter_gzip_text(response.iter_content(chunk_size=chunk_size)), label=url)
+        arrays = _encode_columns(load_filtered_records(records, underlyings, instrument_types))
+        new_meta = dict(_filter_meta(underlyings, instrument_types), source=url, fetched_on=today,
+                        etag=response.headers.get('ETag'), last_modified=response.headers.get('Last-Modified'))
+
+    write_cache(cache_path, arrays, new_meta)
+    df = _decode_columns(arrays)
+    print(f"Instrument master downloaded ({len(df)} instruments, {(time.perf_counter() - start) * 1000:.0f} ms).")
+    return df, 'downloaded'
@@ -0,0 +1,233 @@
+from collections.abc import Sequence
+from datetime import date, datetime
+import numpy as np
+import pandas as pd
+import config
+from greeks import calculate_delta_array
+from market_stream import Quote
+from utils import calculate_implied_volatility_array
+
+SECONDS_PER_YEAR = 365 * 24 * 3600
+IV_PERCENT = 100.0   # Upstox greeks carry IV in percent (14.2); chains, the vol surface and risk use decimals (0.142)
+
+
+class OptionChainProvider:
+    """
+    Fetches quotes + greeks per expiry with a single Put/Call Option Chain call instead of
+    chunked LTP (100 keys) + Greeks (50 keys) calls.
+
+    Results are returned in the same shapes the main loop already merges:
+      quotes: instrument_key -> object with .last_price (same as get_option_chain_quotes)
+      greeks: instrument_key -> {'delta', 'theta', 'gamma', 'vega', 'iv'} (same as get_option_greeks, IV in percent)
+    """
+    def __init__(self, api, underlying_key=None):
+        self.api = api
+        self.underlying_key = underlying_key or config.SPOT_INSTRUMENT_KEY
+        self.calls = 0
+        self.failures = 0
+
+    def fetch_expiry(self, expiry_date):
+        """One API call for the whole expiry. Returns (quotes, greeks); both empty if the call failed."""
+        self.calls += 1
+        rows = self.api.get_put_call_option_chain(self.underlying_key, expiry_date)
+        if rows is None:
+            self.failures += 1
+            return {}, {}
+
+        quotes = {}
+        greeks = {}
+        for row in rows:
+            key = row['instrument_key']
+            if row['ltp'] is None:
+                continue
+            q = Quote(key)
+            q.last_price = row['ltp']
+            q.close_price = row['close_price']
+            q.oi = row['oi']
+            q.iv = row['iv']
+            q.delta = row['delta']
+            q.theta = row['theta']
+            q.gamma = row['gamma']
+            q.vega = row['vega']
+            quotes[key] = q
+            if row['delta'] is not None:
+                greeks[key] = {'delta': row['delta'], 'theta': row['theta'], 'gamma': row['gamma'],
+                               'vega': row['vega'], 'iv': row['iv']}
+        return quotes, greeks
+
+    def fetch(self, expiry_keys, wanted_keys, pool=None):
+        """
+        Fetches every expiry in `expiry_keys` (expiry -> set of instrument_keys) that holds at least one of `wanted_keys`.
+        Expiries are fetched concurrently when a ThreadPoolExecutor is given.
+        Returns (quotes, greeks) merged across expiries.
+        """
+        wanted = set(wanted_keys)
+        expiries = [exp for exp, keys in expiry_keys.items() if exp and wanted & keys]
+
+        if pool is not None and len(expiries) > 1:
+            results = [f.result() for f in [pool.submit(self.fetch_expiry, exp) for exp in expiries]]
+        else:
+            results = [self.fetch_expiry(exp) for exp in expiries]
+
+        quotes = {}
+        greeks = {}
+        for q, g in results:
+            quotes.update(q)
+            greeks.update(g)
+        return quotes, greeks
+
+
+class OptionChain(Sequence):
+    """
+    Columnar option chain for one expiry (or several): one NumPy array per field.
+    Still behaves like the old list of dicts ({'strike', 'iv', 'time_to_expiry', 'expiry_dt', 'instrument_key',
+    'ltp', 'type', 'delta', 'calculated_delta'}) so strategies can keep iterating / indexing / concatenating it;
+    the dict rows are only built when first accessed.
+    """
+    FIELDS = ('strike', 'iv', 'time_to_expiry', 'expiry_dt', 'instrument_key', 'ltp', 'type', 'delta', 'calculated_delta')
+
+    def __init__(self, instrument_key, strike, type, ltp, iv, time_to_expiry, expiry_dt, delta, calculated_delta):
+        self.instrument_key = np.asarray(instrument_key, dtype=object)
+        self.strike = np.asarray(strike, dtype=float)
+        self.type = np.asarray(type, dtype='<U1')
+        self.ltp = np.asarray(ltp, dtype=float)
+        self.iv = np.asarray(iv, dtype=float)
+        self.time_to_expiry = np.asarray(time_to_expiry, dtype=float)
+        self.expiry_dt = np.asarray(expiry_dt, dtype=object)
+        self.delta = np.asarray(delta, dtype=float)
+        self.calculated_delta = np.asarray(calculated_delta, dtype=float)
+        self._rows = None
+        self._index = None
+        self._selection = None
+
+    @classmethod
+    def empty(cls):
+        return cls([], [], [], [], [], [], [], [], [])
+
+    def rows(self):
+        """Dict view (list of dicts), built once."""
+        if self._rows is None:
+            columns = [getattr(self, f).tolist() for f in self.FIELDS]
+            self._rows = [dict(zip(self.FIELDS, values)) for values in zip(*columns)]
+        return self._rows
+
+    def index_of(self, instrument_key):
+        """Row position of an instrument_key, or None."""
+        if self._index is None:
+            self._index = {k: i for i, k in enumerate(self.instrument_key.tolist())}
+        return self._index.get(instrument_key)
+
+    def selection_index(self):
+        """Strike-selection index (chain_index.ChainIndex), built once: shared by every strategy for the tick."""
+        if self._selection is None:
+            from chain_index import ChainIndex
+            self._selection = ChainIndex.from_chain(self)
+        return self._selection
+
+    def prepare(self):
+        """
+        Builds the lazy views (rows, key index, selection index) now. The loop calls this before handing the chain
+        to the strategy workers, so they only ever read it. Returns self.
+        """
+        self.rows()
+        self.index_of(None)
+        self.selection_index()
+        return self
+
+    def __len__(self):
+        return len(self.instrument_key)
+
+    def __getitem__(self, i):
+        return self.rows()[i]
+
+    def __iter__(self):
+        return iter(self.rows())
+
+    def __add__(self, other):
+        return list(self) + list(other)
+
+    def __radd__(self, other):
+        return list(other) + list(self)
+
+    def __repr__(self):
+        return f"OptionChain({len(self)} options)"
+
+
+def expiry_to_year_fraction(expiries, now):
+    """
+    Time to expiry in years from `now` to 00:00 on the expiry day (same convention as before), floored at 0.0001,
+    plus the 'YYYY-MM-DD' string for each row. Work is done once per distinct expiry, not per option.
+    """
+    tte = np.empty(len(expiries))
+    labels = np.empty(len(expiries), dtype=object)
+    codes, uniques = pd.factorize(expiries)
+    for code, expiry in enumerate(uniques):
+        rows = codes == code
+        try:
+            expiry_day = pd.Timestamp(expiry).normalize().to_pydatetime().replace(tzinfo=None)
+            t = (expiry_day - now).total_seconds() / SECONDS_PER_YEAR
+        except (ValueError, TypeError):
+            t = 0.0
+        tte[rows] = t if t > 0 else 0.0001
+        labels[rows] = expiry.strftime('%Y-%m-%d') if isinstance(expiry, (date, datetime)) else str(expiry)
+    return tte, labels
+
+
+def build_chain(pe_df, ce_df, quotes, greeks, spot, now, r=None, iv_solver=None):
+    """
+    Vectorized replacement for the old per-row package_chain loop.
+    Keeps only the options we have quotes for, then computes time-to-expiry, IV (where the broker gave none)
+    and Black-Scholes delta for the whole chain in array operations. Broker delta wins over the calculated one.
+    Broker IV (percent) is converted to a decimal here, so chain.iv is a decimal whatever its source.
+    With an iv_solver (iv_solver.IVSolver) the IV solve is warm-started from each option's IV on the previous tick.
+    """
+    if r is None:
+        r = getattr(config, 'RISK_FREE_RATE', 0.05)
+
+    parts = []
+    for df, opt_type in [(pe_df, 'p'), (ce_df, 'c')]:
+        if df is None or df.empty:
+            continue
+        keys = df['instrument_key'].to_numpy(dtype=object)
+        mask = np.fromiter((k in quotes for k in keys), dtype=bool, count=len(keys))
+        if mask.any():
+            parts.append((keys[mask], df['strike'].to_numpy(dtype=float)[mask], df['expiry_dt'].to_numpy(dtype=object)[mask], opt_type))
+    if not parts:
+        return OptionChain.empty()
+
+    keys = np.concatenate([p[0] for p in parts])
+    strikes = np.concatenate([p[1] for p in parts])
+    expiries = np.concatenate([p[2] for p in parts])
+    types = np.concatenate([np.full(len(p[0]), p[3]) for p in parts])
+    is_call = types == 'c'
+    n = len(keys)
+
+    tte, expiry_str = expiry_to_year_fraction(expiries, now)
+
+    ltp = np.empty(n)
+    broker_iv = np.full(n, np.nan)
+    broker_delta = np.full(n, np.nan)
+    for i, key in enumerate(keys):
+        price = quotes[key].last_price
+        ltp[i] = price if price is not None else np.nan
+        g = greeks.get(key)
+        if g:
+            if g.get('iv'):
+                broker_iv[i] = g['iv'] / IV_PERCENT
+            if g.get('delta') is not None:
+                broker_delta[i] = g['delta']
+
+    # IV: broker value where available, Newton-Raphson on the rest
+    iv = broker_iv
+    need_iv = np.isnan(iv)
+    if need_iv.any():
+        iv = iv.copy()
+        if iv_solver is not None:
+            iv[need_iv] = iv_solver.solve(keys[need_iv], ltp[need_iv], spot, strikes[need_iv], tte[need_iv], r, is_call[need_iv]).iv
+        else:
+            iv[need_iv] = calculate_implied_volatility_array(ltp[need_iv], spot, strikes[need_iv], tte[need_iv], r, is_call[need_iv])
+
+    calc_delta = calculate_delta_array(is_call, spot, strikes, tte, r, iv)
+    delta = np.where(np.isnan(broker_delta), calc_delta, broker_delta)
+
+    return OptionChain(keys, strikes, types, ltp, iv, tte, expiry_str, delta, calc_delta)
@@ -0,0 +1,221 @@
+import json
+import socket
+import ssl
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+import websocket
+import config
+
+UPSTOX_ORDER_STREAM_URL = "wss://api.upstox.com/v2/feed/portfolio-stream-feed?update_types=order"
+
+# Broker statuses after which an order can no longer change
+TERMINAL_STATUSES = ('complete', 'rejected', 'cancelled')
+
+
+def order_details_from_update(update):
+    """
+    Converts a portfolio-stream order update into the same dict shape UpstoxWrapper.get_order_details returns,
+    so fills from the stream and from REST can be handled by the same code.
+    """
+    try:
+        avg_price = float(update.get('average_price') or 0.0)
+    except (ValueError, TypeError):
+        avg_price = 0.0
+    return {
+        'status': str(update.get('status', '')).lower(),
+        'avg_price': avg_price,
+        'message': update.get('status_message') or 'No message',
+        'filled_quantity': int(update.get('filled_quantity') or 0),
+        'quantity': int(update.get('quantity') or 0),
+    }
+
+
+def is_order_final(details):
+    """True once an order is complete / rejected / cancelled, or fully filled by quantity (status can lag)."""
+    filled_qty = details.get('filled_quantity', 0)
+    total_qty = details.get('quantity', 0)
+    return details.get('status') in TERMINAL_STATUSES or (total_qty > 0 and filled_qty >= total_qty)
+
+
+class OrderTracker:
+    """
+    Keeps the latest known state of every order seen on the order-update stream and hands out
+    Futures that resolve when an order reaches a final state.
+
+    Updates can arrive before place_order() has even returned the order_id, so updates for
+    untracked orders are kept and a later track() resolves immediately. Orders nobody is waiting on
+    (manual orders, settled ones never forgotten) are dropped once their last update is
+    ORDER_TRACKER_TTL_SECONDS old.
+    """
+    def __init__(self, ttl=None):
+        self._orders = OrderedDict()    # order_id -> latest details dict, least recently updated first
+        self._updated = {}              # order_id -> monotonic time of its last update
+        self._futures = {}              # order_id -> Future
+        self._lock = threading.Lock()
+        self.ttl = getattr(config, 'ORDER_TRACKER_TTL_SECONDS', 900) if ttl is None else ttl
+        self.updates_received = 0
+        self.partial_fills = 0
+        self.evicted = 0
+
+    def _store(self, order_id, details):
+        now = time.monotonic()
+        self._orders[order_id] = details
+        self._orders.move_to_end(order_id)
+        self._updated[order_id] = now
+        while self._orders:
+            oldest = next(iter(self._orders))
+            if now - self._updated[oldest] < self.ttl:
+                break
+            fut = self._futures.get(oldest)
+            if fut is not None and not fut.done():      # still waited on: keep it
+                self._orders.move_to_end(oldest)
+                self._updated[oldest] = now
+                continue
+            del self._orders[oldest], self._updated[oldest]
+            self._futures.pop(oldest, None)
+            self.evicted += 1
+
+    def track(self, order_id):
+        with self._lock:
+            fut = self._futures.get(order_id)
+            if fut is None:
+                fut = Future()
+                self._futures[order_id] = fut
+                details = self._orders.get(order_id)
+                if details and is_order_final(details):
+                    fut.set_result(details)
+            return fut
+
+    def forget(self, order_id):
+        with self._lock:
+            self._futures.pop(order_id, None)
+            self._orders.pop(order_id, None)
+            self._updated.pop(order_id, None)
+
+    def latest(self, order_id):
+        with self._lock:
+            details = self._orders.get(order_id)
+            return dict(details) if details else None
+
+    def on_update(self, update):
+        """Applies one raw order update (dict from the stream)."""
+        order_id = update.get('order_id')
+        if not order_id:
+            return
+        details = order_details_from_update(update)
+        with self._lock:
+            self.updates_received += 1
+            previous = self._orders.get(order_id)
+            if previous and is_order_final(previous):
+                return  # Late / duplicate update after the order was already settled
+            if 0 < details['filled_quantity'] < details['quantity'] and not is_order_final(details):
+                self.partial_fills += 1
+                print(f"[ORDERS] {order_id} partially filled {details['filled_quantity']}/{details['quantity']} @ {details['avg_price']}")
+            self._store(order_id, details)
+            fut = self._futures.get(order_id)
+        if fut is not None and not fut.done() and is_order_final(details):
+            fut.set_result(details)
+
+    def resolve(self, order_id, details):
+        """Settles an order from a REST result (fallback path) so late stream updates are ignored."""
+        with self._lock:
+            self._store(order_id, details)
+            fut = self._futures.get(order_id)
+        if fut is not None and not fut.done():
+            fut.set_result(details)
+
+
+class OrderUpdateStream:
+    """
+    Upstox portfolio-stream client subscribed to order updates only.
+    Runs on a background thread with auto-reconnect and feeds every update into an OrderTracker.
+    Updates missed while disconnected are not replayed by the broker, so callers keep a REST fallback.
+    """
+    def __init__(self, access_token=None, url=None, tracker=None):
+        self.access_token = access_token or config.UPSTOX_ACCESS_TOKEN
+        self.url = url or getattr(config, 'ORDER_STREAM_URL', None) or UPSTOX_ORDER_STREAM_URL
+        self.tracker = tracker if tracker is not None else OrderTracker()
+
+        self._ws = None
+        self._thread = None
+        self._stop = threading.Event()
+        self._connected = threading.Event()
+
+        self.messages_received = 0
+        self.decode_errors = 0
+        self.reconnects = 0
+        self._backoff = 1
+
+    # --- Lifecycle ---
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="order-stream", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        ws = self._ws
+        if ws:
+            ws.keep_running = False
+            try:
+                if ws.sock and ws.sock.sock:
+                    ws.sock.sock.shutdown(socket.SHUT_RDWR)
+            except Exception:
+                pass
+        if self._thread:
+            self._thread.join(timeout=5)
+
+    def is_connected(self):
+        return self._connected.is_set()
+
+    def wait_connected(self, timeout=10):
+        return self._connected.wait(timeout)
+
+    def _run(self):
+        while not self._stop.is_set():
+            headers = {'Authorization': f"Bearer {self.access_token}"} if self.access_token else {}
+            self._ws = websocket.WebSocketApp(self.url,
+                                              header=headers,
+                                              on_open=self._on_open,
+                                              on_message=self._on_message,
+                                              on_error=self._on_error,
+                                              on_close=self._on_close)
+            sslopt = {"cert_reqs": ssl.CERT_REQUIRED} if self.url.startswith('wss') else None
+            try:
+                self._ws.run_forever(sslopt=sslopt, ping_interval=20, ping_timeout=10)
+            except Exception as e:
+                print(f"[ORDERS] Connection error: {e}")
+            self._connected.clear()
+
+            if self._stop.is_set():
+                break
+            self.reconnects += 1
+            print(f"[ORDERS] Order stream disconnected. Reconnecting in {self._backoff}s (REST polling meanwhile)...")
+            self._stop.wait(self._backoff)
+            self._backoff = min(self._backoff * 2, 30)
+
+    # --- WebSocket callbacks ---
+    def _on_open(self, ws):
+        self._connected.set()
+        self._backoff = 1
+
+    def _on_message(self, ws, message):
+        self.messages_received += 1
+        try:
+            update = json.loads(message)
+        except (ValueError, TypeError):
+            self.decode_errors += 1
+            return
+        if isinstance(update, dict) and update.get('update_type', 'order') == 'order':
+            self.tracker.on_update(update)
+
+    def _on_error(self, ws, error):
+        if not self._stop.is_set():
+            print(f"[ORDERS] Error: {error}")
+
+    def _on_close(self, ws, status_code, msg):
+        self._connected.clear()
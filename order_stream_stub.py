@@ -0,0 +1,153 @@
+import itertools
+import json
+import socket
+import socketserver
+import threading
+import time
+from feed_replay_server import _accept_websocket, _read_frame, _encode_frame, OP_CLOSE, OP_PING, OP_PONG, OP_TEXT
+
+# Scenarios a stub order can play out
+SCENARIO_FILL = 'fill'        # open -> complete
+SCENARIO_PARTIAL = 'partial'  # open -> partially filled -> complete
+SCENARIO_REJECT = 'reject'    # rejected by the RMS
+SCENARIO_LOST = 'lost'        # open -> complete, but the 'complete' push never reaches the client (REST still sees it)
+SCENARIO_OPEN = 'open'        # open and never filled (timeout / cancellation path)
+
+
+class _OrderStreamHandler(socketserver.BaseRequestHandler):
+    def handle(self):
+        stub = self.server.stub
+        sock = self.request
+        headers = _accept_websocket(sock)
+        if headers is None:
+            return
+        stub.last_headers = headers
+        send_lock = threading.Lock()
+        conn = (sock, send_lock)
+        stub._connections.append(conn)
+        try:
+            while True:
+                opcode, payload = _read_frame(sock)
+                if opcode == OP_CLOSE:
+                    with send_lock:
+                        sock.sendall(_encode_frame(payload[:2], OP_CLOSE))
+                    break
+                if opcode == OP_PING:
+                    with send_lock:
+                        sock.sendall(_encode_frame(payload, OP_PONG))
+        except (ConnectionError, OSError):
+            pass
+        finally:
+            if conn in stub._connections:
+                stub._connections.remove(conn)
+
+
+class StubOrderStream:
+    """
+    Local stand-in for the broker side of order execution: the Upstox portfolio stream (order updates pushed as JSON
+    text frames) plus the REST order-details view, so place_order's push path and REST fallback can be tested offline.
+
+        stub = StubOrderStream().start()
+        api.start_order_stream(url=stub.url)
+        api.order_api.place_order = lambda body, api_version: stub.place_response(body.quantity, 'partial')
+        api.get_order_details = stub.get_order_details
+    """
+    def __init__(self, host='127.0.0.1', port=0, step_delay=0.01):
+        self.step_delay = step_delay
+        self.orders = {}          # order_id -> details as REST would report them
+        self.pushed = []          # every update actually sent over the stream
+        self.last_headers = {}
+        self._connections = []
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+        socketserver.ThreadingTCPServer.allow_reuse_address = True
+        self._server = socketserver.ThreadingTCPServer((host, port), _OrderStreamHandler)
+        self._server.daemon_threads = True
+        self._server.stub = self
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address
+        return f"ws://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name="order-stub", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.drop_connections()
+        self._server.shutdown()
+        self._server.server_close()
+
+    def drop_connections(self):
+        for sock, _ in list(self._connections):
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+    # --- Order simulation ---
+    def place(self, quantity, scenario=SCENARIO_FILL, price=100.0):
+        """Accepts an order and plays `scenario` out on a background thread. Returns the new order_id."""
+        order_id = f"2601{next(self._ids):011d}"
+        self._set_state(order_id, 'open', quantity, 0, 0.0, push=False)
+        threading.Thread(target=self._play, args=(order_id, quantity, scenario, price), daemon=True).start()
+        return order_id
+
+    def place_response(self, quantity, scenario=SCENARIO_FILL, price=100.0):
+        """Same as place() but shaped like the SDK's PlaceOrderResponse (status + data.order_id)."""
+        order_id = self.place(quantity, scenario, price)
+        data = type('PlaceOrderData', (), {'order_id': order_id})()
+        return type('PlaceOrderResponse', (), {'status': 'success', 'data': data})()
+
+    def get_order_details(self, order_id):
+        """REST view of an order, in UpstoxWrapper.get_order_details shape."""
+        with self._lock:
+            details = self.orders.get(order_id)
+            return dict(details) if details else {'status': 'error', 'message': 'Failed to fetch status'}
+
+    def _play(self, order_id, quantity, scenario, price):
+        time.sleep(self.step_delay)
+        if scenario == SCENARIO_REJECT:
+            self._set_state(order_id, 'rejected', quantity, 0, 0.0, message="Insufficient margin")
+            return
+        self._set_state(order_id, 'open', quantity, 0, 0.0)
+        if scenario == SCENARIO_OPEN:
+            return
+        if scenario == SCENARIO_PARTIAL:
+            time.sleep(self.step_delay)
+            self._set_state(order_id, 'open', quantity, quantity // 2, price)
+        time.sleep(self.step_delay)
+        self._set_state(order_id, 'complete', quantity, quantity, price + 0.05 if scenario == SCENARIO_PARTIAL else price,
+                        push=(scenario != SCENARIO_LOST))
+
+    def _set_state(self, order_id, status, quantity, filled, avg_price, message='', push=True):
+        details = {'status': status, 'avg_price': avg_price, 'message': message or 'No message',
+                   'filled_quantity': filled, 'quantity': quantity}
+        with self._lock:
+            self.orders[order_id] = details
+        if push:
+            self.push({
+                'update_type': 'order',
+                'order_id': order_id,
+                'status': status,
+                'status_message': message,
+                'quantity': quantity,
+                'filled_quantity': filled,
+                'pending_quantity': quantity - filled,
+                'average_price': avg_price,
+                'order_type': 'MARKET',
+            })
+
+    def push(self, update):
+        frame = _encode_frame(json.dumps(update).encode('utf-8'), OP_TEXT)
+        self.pushed.append(update)
+        for sock, send_lock in list(self._connections):
+            try:
+                with send_lock:
+                    sock.sendall(frame)
+            except OSError:
+                pass
@@ -0,0 +1,147 @@
+from collections import defaultdict
+import numpy as np
+import config
+from greeks import bs_greeks
+from option_chain import expiry_to_year_fraction
+from risk_grid import leg_ivs
+
+GREEK_FIELDS = ('delta', 'gamma', 'vega', 'theta')
+
+
+class PortfolioGreeks:
+    """
+    Net delta / gamma / vega / theta across all strategies: per strategy, per expiry and for the whole book.
+    Broker units (theta per day, vega per 1% IV) times signed quantity, so a short 75-lot put of delta -0.3 adds +22.5.
+
+    Kept incrementally: every leg's contribution is added once, and only re-applied (old one out, new one in) when its
+    position changes or the greeks of its instrument change. Unchanged legs cost nothing per tick.
+
+        portfolio_greeks.update({s.name: s.open_legs() for s in strategies}, greeks, spot, now, chains, vol_surface)
+        portfolio_greeks.snapshot()['total']['delta']
+
+    Held instruments with no broker/local greeks this tick get Black-Scholes greeks from the chain / surface IV.
+    """
+    def __init__(self, r=None):
+        self.r = r if r is not None else getattr(config, 'RISK_FREE_RATE', 0.05)
+        self.positions = {}                       # strategy -> {instrument_key: (qty, expiry)}
+        self.holders = defaultdict(set)           # instrument_key -> strategies holding it
+        self.legs = {}                            # instrument_key -> leg dict (strike, type, expiry_dt, iv) for local greeks
+        self.unit = {}                            # instrument_key -> greeks of one unit, np.array in GREEK_FIELDS order
+        self.source = {}                          # instrument_key -> 'broker' / 'local' / 'model'
+        self.by_strategy = {}                     # name -> [legs, np.array]
+        self.by_expiry = {}
+        self.total = np.zeros(len(GREEK_FIELDS))
+        self.changes = 0                          # contributions applied or removed since start
+
+    # --- incremental bookkeeping ---
+    def _apply(self, strategy, key, qty, expiry, sign):
+        unit = self.unit.get(key)
+        if unit is None:
+            return
+        contribution = unit * (qty * sign)
+        for buckets, name in ((self.by_strategy, strategy), (self.by_expiry, expiry)):
+            bucket = buckets.setdefault(name, [0, np.zeros(len(GREEK_FIELDS))])
+            bucket[0] += sign
+            bucket[1] += contribution
+            if bucket[0] <= 0:
+                del buckets[name]
+        self.total += contribution
+        if not self.by_strategy:
+            self.total[:] = 0.0   # no float residue once the book is flat
+        self.changes += 1
+
+    def sync_positions(self, strategy, legs):
+        """Position changes of one strategy (its open_legs()): only added / removed / resized legs are re-applied."""
+        held = self.positions.get(strategy, {})
+        current = {}
+        for leg in legs or []:
+            key = leg.get('instrument_key')
+            if not key:
+                continue
+            qty, _ = current.get(key, (0, None))
+            current[key] = (qty + leg['qty'], str(leg.get('expiry_dt')))
+            self.legs[key] = leg
+        for key, (qty, expiry) in held.items():
+            if current.get(key) != (qty, expiry):
+                self._apply(strategy, key, qty, expiry, -1)
+                if key not in current:
+                    self.holders[key].discard(strategy)
+        for key, (qty, expiry) in current.items():
+            if held.get(key) != (qty, expiry):
+                self._apply(strategy, key, qty, expiry, +1)
+                self.holders[key].add(strategy)
+        self.positions[strategy] = current
+        for key in [k for k, owners in self.holders.items() if not owners]:
+            del self.holders[key]
+            self.legs.pop(key, None)
+            self.unit.pop(key, None)
+            self.source.pop(key, None)
+
+    def set_unit(self, key, unit, source):
+        """New per-unit greeks of a held instrument; every holder's contribution moves by the difference."""
+        old = self.unit.get(key)
+        if old is not None and np.array_equal(old, unit):
+            self.source[key] = source
+            return False
+        for strategy in self.holders.get(key, ()):
+            qty, expiry = self.positions[strategy][key]
+            self._apply(strategy, key, qty, expiry, -1)
+        self.unit[key] = unit
+        self.source[key] = source
+        for strategy in self.holders.get(key, ()):
+            qty, expiry = self.positions[strategy][key]
+            self._apply(strategy, key, qty, expiry, +1)
+        return True
+
+    def update_greeks(self, greeks):
+        """Greek updates (instrument_key -> broker-shaped dict) for held instruments. Returns the held keys without greeks."""
+        missing = []
+        for key in self.holders:
+            g = greeks.get(key)
+            if not g or g.get('delta') is None:
+                missing.append(key)
+                continue
+            unit = np.array([g.get(f) or 0.0 for f in GREEK_FIELDS], dtype=float)
+            self.set_unit(key, unit, 'local' if g.get('source') == 'local' else 'broker')
+        return missing
+
+    def fill_missing(self, keys, spot, now, chains=(), surface=None):
+        """Black-Scholes greeks (broker units) for held instruments the tick's greeks didn't cover."""
+        legs = [self.legs[k] for k in keys]
+        if not legs or not spot:
+            return 0
+        iv = leg_ivs(legs, chains, surface)
+        known = ~np.isnan(iv)
+        if not known.any():
+            return 0
+        legs = [leg for leg, ok in zip(legs, known) if ok]
+        tte, _ = expiry_to_year_fraction(np.array([str(leg.get('expiry_dt')) for leg in legs], dtype=object), now)
+        g = bs_greeks(np.array([leg['type'] for leg in legs]), spot, np.array([leg['strike'] for leg in legs], dtype=float),
+                      tte, self.r, iv[known])
+        units = np.column_stack([g['delta'], g['gamma'], g['vega'] / 100, g['theta'] / 365])
+        for leg, unit in zip(legs, units):
+            self.set_unit(leg['instrument_key'], unit, 'model')
+        return len(legs)
+
+    def update(self, strategy_legs, greeks, spot=None, now=None, chains=(), surface=None):
+        """Per tick: position changes of every strategy, then greek updates, then local greeks for what is missing."""
+        for strategy in [s for s in self.positions if s not in strategy_legs]:
+            self.sync_positions(strategy, [])
+        for strategy, legs in strategy_legs.items():
+            self.sync_positions(strategy, legs)
+        missing = self.update_greeks(greeks)
+        if missing and now is not None:
+            self.fill_missing(missing, spot, now, chains, surface)
+        return self
+
+    # --- reporting ---
+    def snapshot(self):
+        as_dict = lambda v: dict(zip(GREEK_FIELDS, v.tolist()))
+        return {'total': as_dict(self.total),
+                'strategies': {name: as_dict(b[1]) for name, b in self.by_strategy.items()},
+                'expiries': {name: as_dict(b[1]) for name, b in self.by_expiry.items()},
+                'sources': dict(self.source)}
+
+    def summary(self):
+        d, g, v, t = self.total.tolist()
+        return f"Net Delta {d:+.1f} | Gamma {g:+.4f} | Vega {v:+.1f} | Theta {t:+.1f}/day"
@@ -0,0 +1,199 @@
+import re
+from collections import namedtuple
+from types import MappingProxyType
+
+# One open broker position, parsed once per tick (see parse_position). Hashable, so snapshots compare cheaply.
+# token: instrument_key (NSE_FO|...); qty: net quantity (+long / -short); buy_price / sell_price: cost basis of the
+# long / short side (the other one is 0.0); expiry: as the broker sent it, or from the instrument master, else 'N/A'
+BrokerPosition = namedtuple('BrokerPosition', ['token', 'symbol', 'qty', 'buy_price', 'sell_price', 'strike', 'expiry'])
+
+# One strategy's share of a tick's snapshot, handed to its worker: changes ({instrument_key: BrokerPosition or None},
+# read-only) since its previous view, and positions (tuple) it owns or nobody owns. See PositionSnapshot.view_for.
+PositionView = namedtuple('PositionView', ['changes', 'positions'])
+
+_STRIKE_IN_SYMBOL = re.compile(r'(\d{5})(?:PE|CE)')
+
+
+def _float(value):
+    try:
+        return float(value)
+    except Exception:
+        return 0.0
+
+
+def parse_position(p):
+    """
+    Robustly extract attributes from an Upstox PositionData object (or a plain dict with the same fields).
+    Handles missing keys and schema variations. A BrokerPosition is returned as is.
+    """
+    if isinstance(p, BrokerPosition):
+        return p
+    if isinstance(p, dict):
+        get = p.get
+    else:
+        get = lambda name, default=None: getattr(p, name, default)
+
+    # Quantity
+    qty = get('net_quantity', get('quantity', 0))
+    if qty is None:
+        qty = get('quantity', 0) or 0
+
+    # Prices
+    # 1. If 'average_price' (Holdings) is available (non-zero), use it.
+    # 2. Else, calculate Break-Even Price from 'buy_value' and 'sell_value' / net_qty.
+    #    This accounts for intraday scalps affecting the cost basis of the remaining position.
+    avg_price = _float(get('average_price', 0.0))
+    buy_val = _float(get('buy_value', 0.0))
+    sell_val = _float(get('sell_value', 0.0))
+
+    calculated_price = 0.0
+    if qty != 0:
+        calculated_price = abs(buy_val - sell_val) / abs(qty)
+
+    final_price = 0.0
+    if avg_price > 0:
+        final_price = avg_price
+    elif calculated_price > 0:
+        final_price = calculated_price
+    else:
+        # Fallbacks
+        if qty > 0:
+            final_price = get('day_buy_price', 0.0)
+            if final_price == 0.0: final_price = get('buy_price', 0.0)
+        else:
+            final_price = get('day_sell_price', 0.0)
+            if final_price == 0.0: final_price = get('sell_price', 0.0)
+
+    # Assign to buy/sell price based on direction
+    buy_price = final_price if qty > 0 else 0.0
+    sell_price = final_price if qty < 0 else 0.0
+
+    # Token & Symbol
+    token = get('instrument_token', '') or get('instrument_key', '') or get('token', '')
+    token = str(token).upper()
+    symbol = str(get('trading_symbol', get('tradingsymbol', ''))).upper()
+
+    # Strike & Expiry (Fallback if missing)
+    strike = _float(get('strike_price', 0.0))
+    expiry = str(get('expiry', 'N/A'))
+
+    # FALLBACK: If strike is 0.0, attempt to parse from trading_symbol
+    # Expected formats: 'NIFTY26JAN26150PE', 'NIFTY 23 JAN 26150 PE'
+    if strike == 0.0 and symbol:
+        match = _STRIKE_IN_SYMBOL.search(symbol)
+        if match:
+            strike = _float(match.group(1))
+
+    return BrokerPosition(token, symbol, qty, buy_price, sell_price, strike, expiry)
+
+
+def parse_positions(broker_positions):
+    return [parse_position(p) for p in broker_positions or []]
+
+
+def resolve_expiry(record, master):
+    """Fills an 'N/A' expiry from the instrument master (token is the instrument_key)."""
+    if record.expiry != 'N/A' or master is None:
+        return record
+    try:
+        rec = master.lookup(record.token)
+        if rec is not None and rec.expiry is not None:
+            return record._replace(expiry=str(rec.expiry))
+    except Exception as e:
+        print(f"Error resolving expiry from master: {e}")
+    return record
+
+
+class PositionSnapshot:
+    """
+    get_positions() output of the current tick, parsed once for all strategies, plus an ownership index
+    (instrument_key -> owning strategy and leg, from the strategies' open_legs()).
+
+    Strategies don't re-parse the raw list every tick: each asks changes_for(name) for what changed since its own
+    last reconciliation, and only runs pull_from_broker when that is not empty.
+
+        snapshot.update(api.get_positions(), master)     # once per tick
+        snapshot.index_owners({s.name: s.open_legs() for s in strategies})
+        view = snapshot.view_for(strategy.name)           # per strategy worker: its delta + its positions, frozen
+        if view.changes: strategy.pull_from_broker(view.positions, ...)
+    """
+    def __init__(self):
+        self.records = {}       # instrument_key -> BrokerPosition (open positions only)
+        self.version = 0        # bumped on every tick whose positions differ from the previous one
+        self.changed_at = {}    # instrument_key -> version it was last opened / changed / closed in
+        self.owners = {}        # instrument_key -> (strategy name, leg tag)
+        self._seen = {}         # strategy -> (version, owned keys) at its last changes_for()
+        self._expiries = {}     # instrument_key -> expiry resolved from the master
+        self.ticks = 0
+        self.unchanged_ticks = 0
+
+    def update(self, broker_positions, master=None):
+        """
+        Parses this tick's positions. None (API error) keeps the previous snapshot.
+        Returns {instrument_key: BrokerPosition, or None if closed} of what changed.
+        """
+        if broker_positions is None:
+            return {}
+        self.ticks += 1
+        records = {}
+        for p in broker_positions:
+            r = parse_position(p)
+            if r.qty == 0 or not r.token:
+                continue
+            if r.expiry == 'N/A':
+                expiry = self._expiries.get(r.token)
+                if expiry is None:
+                    expiry = resolve_expiry(r, master).expiry
+                    if expiry != 'N/A':
+                        self._expiries[r.token] = expiry
+                r = r._replace(expiry=expiry)
+            records[r.token] = r
+        changed = {k: records.get(k) for k in records.keys() | self.records.keys() if records.get(k) != self.records.get(k)}
+        if not changed:
+            self.unchanged_ticks += 1
+            return changed
+        self.version += 1
+        for key in changed:
+            self.changed_at[key] = self.version
+        self.records = records
+        return changed
+
+    def positions(self):
+        return list(self.records.values())
+
+    def positions_for(self, strategy):
+        """Open broker positions `strategy` owns, plus those nobody owns (to adopt). Other strategies' legs are left out."""
+        return [r for key, r in self.records.items() if self.owners.get(key, (strategy,))[0] == strategy]
+
+    def index_owners(self, strategy_legs):
+        """strategy_legs: {strategy name: open_legs()}. Rebuilds the instrument_key -> (strategy, leg) index."""
+        self.owners = {leg['instrument_key']: (name, leg.get('leg'))
+                       for name, legs in strategy_legs.items() for leg in legs or [] if leg.get('instrument_key')}
+
+    def owner(self, instrument_key):
+        return self.owners.get(instrument_key)
+
+    def changes_for(self, strategy):
+        """
+        What `strategy` has to reconcile since its last call: broker positions it owns or nobody owns (to adopt)
+        that opened / changed / closed, and legs it newly holds that the broker doesn't show.
+        Returns {instrument_key: BrokerPosition or None}; empty means nothing to do.
+        """
+        version, owned_before = self._seen.get(strategy, (0, frozenset()))
+        owned = frozenset(k for k, (name, _) in self.owners.items() if name == strategy)
+        delta = {k: self.records.get(k) for k, v in self.changed_at.items()
+                 if v > version and self.owners.get(k, (strategy,))[0] == strategy}
+        delta.update({k: None for k in owned - owned_before if k not in self.records})
+        self._seen[strategy] = (self.version, owned)
+        return delta
+
+    def view_for(self, strategy):
+        """
+        changes_for + positions_for as one immutable PositionView. The loop thread takes it for each strategy worker,
+        so workers never touch the snapshot the loop keeps updating.
+        """
+        return PositionView(MappingProxyType(self.changes_for(strategy)), tuple(self.positions_for(strategy)))
+
+    def stats(self):
+        return {'ticks': self.ticks, 'unchanged_ticks': self.unchanged_ticks, 'version': self.version,
+                'positions': len(self.records), 'owned': len(self.owners)}
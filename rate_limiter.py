@@ -0,0 +1,114 @@
+import time
+import threading
+import config
+
+# Endpoint families used by UpstoxWrapper. Every API call is charged against exactly one of these.
+FAMILIES = ('quote', 'greeks', 'option_chain', 'order', 'order_status', 'portfolio', 'funds')
+
+
+class TokenBucket:
+    """
+    Classic token bucket: holds up to `capacity` tokens and refills at `capacity / window` tokens per second.
+    Not thread-safe on its own; EndpointBudget serialises access.
+    """
+    def __init__(self, capacity, window_seconds):
+        self.capacity = float(capacity)
+        self.refill_rate = float(capacity) / float(window_seconds)
+        self.tokens = float(capacity)
+        self.last_refill = time.monotonic()
+
+    def refill(self, now):
+        elapsed = now - self.last_refill
+        if elapsed > 0:
+            self.tokens = min(self.capacity, self.tokens + elapsed * self.refill_rate)
+            self.last_refill = now
+
+    def time_until_available(self):
+        """Seconds until one full token is available (0 if already available)."""
+        if self.tokens >= 1.0:
+            return 0.0
+        return (1.0 - self.tokens) / self.refill_rate
+
+
+class EndpointBudget:
+    """
+    Rate budget for one endpoint family: a per-second and a per-minute bucket that must BOTH
+    have a token before a call is allowed, plus an optional penalty window set after a 429.
+    """
+    def __init__(self, name, per_second, per_minute):
+        self.name = name
+        self.buckets = [TokenBucket(per_second, 1.0), TokenBucket(per_minute, 60.0)]
+        self.blocked_until = 0.0
+        self.lock = threading.Lock()
+
+        # Stats (read without lock, best effort)
+        self.calls = 0
+        self.throttles = 0
+        self.total_wait = 0.0
+
+    def _reserve(self):
+        """
+        Reserves the next call slot and returns how long the caller must sleep before using it.
+        Tokens may go negative, so concurrent callers queue up behind each other instead of spinning.
+        """
+        with self.lock:
+            now = time.monotonic()
+            for bucket in self.buckets:
+                bucket.refill(now)
+
+            start = max(now, self.blocked_until)
+            for bucket in self.buckets:
+                start = max(start, now + bucket.time_until_available())
+
+            for bucket in self.buckets:
+                bucket.tokens -= 1.0
+            self.calls += 1
+            return start - now
+
+    def acquire(self):
+        """Blocks the calling thread (only) until this family has budget for one call."""
+        wait = self._reserve()
+        if wait > 0:
+            self.total_wait += wait
+            time.sleep(wait)
+        return wait
+
+    def penalize(self, seconds):
+        """Blocks this family (and only this family) for `seconds`, e.g. after a 429."""
+        with self.lock:
+            now = time.monotonic()
+            self.blocked_until = max(self.blocked_until, now + seconds)
+            # Drain the buckets so we don't burst straight back into the limit once the penalty expires.
+            for bucket in self.buckets:
+                bucket.refill(now)
+                bucket.tokens = min(bucket.tokens, 0.0)
+                bucket.last_refill = self.blocked_until
+            self.throttles += 1
+
+
+class RateLimiter:
+    """
+    Per-endpoint-family rate limiter for the Upstox API.
+    Calls in different families never wait on each other; a 429 in one family only slows that family down.
+    """
+    def __init__(self, limits=None):
+        limits = limits or getattr(config, 'API_RATE_LIMITS', {})
+        self.budgets = {}
+        for family in FAMILIES:
+            per_second, per_minute = limits.get(family, (10, 250))
+            self.budgets[family] = EndpointBudget(family, per_second, per_minute)
+
+    def _budget(self, family):
+        if family not in self.budgets:
+            raise ValueError(f"Unknown rate-limit family: {family}")
+        return self.budgets[family]
+
+    def acquire(self, family):
+        return self._budget(family).acquire()
+
+    def penalize(self, family, seconds):
+        self._budget(family).penalize(seconds)
+
+    def stats(self):
+        return {name: {'calls': b.calls, 'throttles': b.throttles, 'total_wait': round(b.total_wait, 3)}
+                for name, b in self.budgets.items()}
@@ -0,0 +1,526 @@
+import glob
+import hashlib
+import hmac
+import json
+import os
+import socket
+import sqlite3
+import struct
+import subprocess
+import threading
+import time
+import config
+import git_utils
+from state_store import StateStore, _canonical, _digest
+
+
+class StateReplicator:
+    """
+    Ships strategy state to another machine. The primary calls publish(path, state) on every changed save
+    (BaseStrategy.save_current_state); it never blocks: states are queued (latest per file wins) and a sender
+    thread hands them to the backend's _send(). A standby calls subscribe(on_state) and gets
+    on_state(path, state, meta) for every change it receives; pull() brings local files up to date at startup.
+
+    Backends (STATE_REPLICATION): 'git' (GitReplicator), 'sqlite' (SQLiteReplicator), 'tcp' (TcpReplicator),
+    'none' (this class: nothing leaves the machine).
+    """
+    name = 'none'
+    snapshots_only = False     # True: only snapshot rewrites are published (WAL deltas arrive with the next compaction)
+
+    def __init__(self):
+        self._pending = {}               # path -> (state, publish time)
+        self._cond = threading.Condition()
+        self._sending = False
+        self._stopping = False
+        self._thread = None
+        self.published = 0
+        self.coalesced = 0
+        self.sent = 0
+        self.failures = 0
+        self.max_send_ms = 0.0
+
+    # --- primary side ---
+    def publish(self, path, state, snapshot=True):
+        if self.snapshots_only and not snapshot:
+            return False
+        if self.name == 'none':
+            return False
+        with self._cond:
+            if path in self._pending:
+                self.coalesced += 1
+            self._pending[path] = (state, time.time())
+            self.published += 1
+            if self._thread is None or not self._thread.is_alive():
+                self._stopping = False
+                self._thread = threading.Thread(target=self._run, name=f"replicate-{self.name}", daemon=True)
+                self._thread.start()
+            self._cond.notify_all()
+        return True
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending and not self._stopping:
+                    self._cond.wait()
+                if not self._pending:
+                    return
+                batch, self._pending = self._pending, {}
+                self._sending = True
+            t0 = time.perf_counter()
+            try:
+                self._send(batch)
+                self.sent += len(batch)
+            except Exception as e:
+                self.failures += 1
+                print(f"[REPLICATION] {self.name}: send failed for {len(batch)} state(s): {e}")
+            self.max_send_ms = max(self.max_send_ms, (time.perf_counter() - t0) * 1000)
+            with self._cond:
+                self._sending = False
+                self._cond.notify_all()
+
+    def _send(self, batch):
+        """batch: {path: (state, publish time)}. Backends override."""
+
+    def flush(self, timeout=30):
+        end = time.monotonic() + timeout
+        with self._cond:
+            while self._pending or self._sending:
+                remaining = end - time.monotonic()
+                if remaining <= 0 or self._thread is None or not self._thread.is_alive():
+                    break
+                self._cond.wait(remaining)
+            return not (self._pending or self._sending)
+
+    def stop(self, timeout=30):
+        flushed = self.flush(timeout)
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+        return flushed
+
+    def pull(self):
+        """Startup: bring the local state files up to date. Returns the number of files updated (None if unknown)."""
+        return 0
+
+    # --- standby side ---
+    def subscribe(self, on_state):
+        """Nothing is replicated with this backend: says so and returns an already set stop event."""
+        print(f"[REPLICATION] Backend '{self.name}' does not replicate state, there is nothing to receive.")
+        stop = threading.Event()
+        stop.set()
+        return stop
+
+    def stats(self):
+        return {'backend': self.name, 'published': self.published, 'coalesced': self.coalesced, 'sent': self.sent,
+                'failures': self.failures, 'max_send_ms': self.max_send_ms}
+
+
+def _body(state):
+    return json.dumps(state, separators=(',', ':'), default=str)
+
+
+_standby_stores = {}   # path -> StateStore of the files a standby writes
+
+
+def _modified(path):
+    """Last write time of a state file (snapshot or its WAL), None if neither exists."""
+    times = [os.path.getmtime(p) for p in (path, path + '.wal') if os.path.exists(p)]
+    return max(times) if times else None
+
+
+def write_state(path, state):
+    """Applies a received state locally through a StateStore (atomic, unchanged states skipped)."""
+    store = _standby_stores.get(path)
+    if store is None:
+        store = _standby_stores[path] = StateStore(path)
+        store.load()
+    return store.save(state)
+
+
+class GitReplicator(StateReplicator):
+    """
+    The existing Git sync: snapshots are committed and pushed by git_utils' background worker (one commit per
+    GIT_SYNC_INTERVAL_SECONDS). Standby: polls git pull. repo_dir / interval give it its own worker (benchmarks).
+    """
+    name = 'git'
+    snapshots_only = True
+
+    def __init__(self, repo_dir=None, interval=None, remote=None, branch=None):
+        super().__init__()
+        self.repo_dir = repo_dir
+        self.remote = remote or config.GIT_REMOTE_NAME
+        self.branch = branch or config.GIT_BRANCH_NAME
+        self.worker = None
+        if repo_dir is not None:
+            self.worker = git_utils.GitSyncWorker(repo_dir=repo_dir, interval=interval, remote=self.remote, branch=self.branch)
+
+    def publish(self, path, state, snapshot=True):
+        if not snapshot:
+            return False
+        self.published += 1
+        if self.worker is not None:
+            return self.worker.mark_dirty(path)
+        return git_utils.request_push(path)
+
+    def flush(self, timeout=30):
+        worker = self.worker or git_utils._worker
+        return worker.flush(timeout) if worker is not None else True
+
+    def stop(self, timeout=30):
+        return self.worker.stop(timeout) if self.worker is not None else self.flush(timeout)
+
+    def pull(self):
+        if self.repo_dir is None:
+            git_utils.sync_pull()
+            return None
+        subprocess.run(["git", "pull", "--rebase", self.remote, self.branch], cwd=self.repo_dir, check=True,
+                       capture_output=True, text=True, timeout=30)
+        return None
+
+    def subscribe(self, on_state, interval=1.0):
+        """Standby: git pull every `interval` seconds, on_state for every *_state.json whose content changed."""
+        seen = {}
+        stop = threading.Event()
+
+        def poll():
+            while not stop.is_set():
+                try:
+                    self.pull()
+                    for path in glob.glob(os.path.join(self.repo_dir or '.', '*_state.json')):
+                        with open(path) as f:
+                            state = json.load(f)
+                        digest = _digest(_canonical(state))
+                        if seen.get(path) != digest:
+                            seen[path] = digest
+                            on_state(path, state, {'received': time.time()})
+                except Exception as e:
+                    print(f"[REPLICATION] git: poll failed: {e}")
+                stop.wait(interval)
+        thread = threading.Thread(target=poll, name="replicate-git-sub", daemon=True)
+        thread.start()
+        return stop
+
+    def stats(self):
+        out = super().stats()
+        worker = self.worker or git_utils._worker
+        if worker is not None:
+            out.update({'commits': worker.commits, 'pushes': worker.pushes, 'lag': worker.lag(), 'max_lag': worker.max_lag})
+        return out
+
+
+class SQLiteReplicator(StateReplicator):
+    """
+    One row per state file in an SQLite database (e.g. on a shared / synced drive): each batch is one upsert
+    transaction, every row carries a global sequence number. Standby: polls for seq > last seen (poll_interval).
+    """
+    name = 'sqlite'
+
+    def __init__(self, db_path=None, poll_interval=0.1):
+        super().__init__()
+        self.db_path = db_path or getattr(config, 'STATE_REPLICATION_SQLITE_PATH', './replica/state_replica.db')
+        self.poll_interval = poll_interval
+        self._conn = None     # sender thread's connection
+
+    def _connect(self):
+        folder = os.path.dirname(self.db_path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        conn = sqlite3.connect(self.db_path, timeout=10, isolation_level=None, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("CREATE TABLE IF NOT EXISTS states (path TEXT PRIMARY KEY, body TEXT NOT NULL, "
+                     "seq INTEGER NOT NULL, ts REAL NOT NULL)")
+        return conn
+
+    def _send(self, batch):
+        if self._conn is None:
+            self._conn = self._connect()
+        conn = self._conn
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            (seq,) = conn.execute("SELECT COALESCE(MAX(seq), 0) FROM states").fetchone()
+            for path, (state, ts) in batch.items():
+                seq += 1
+                conn.execute("INSERT INTO states (path, body, seq, ts) VALUES (?, ?, ?, ?) "
+                             "ON CONFLICT(path) DO UPDATE SET body = excluded.body, seq = excluded.seq, ts = excluded.ts",
+                             (os.path.basename(path), _body(state), seq, ts))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _rows(self, conn, after=0):
+        return conn.execute("SELECT path, body, seq, ts FROM states WHERE seq > ? ORDER BY seq", (after,)).fetchall()
+
+    def pull(self, directory='.'):
+        """
+        Startup: takes the replica's copy of each state file unless the local one (snapshot or WAL) was written after
+        it was published. On the primary the WAL is fsynced before the sender publishes, so after a crash in between
+        the local file is the newer one and must not be reverted.
+        """
+        if not os.path.exists(self.db_path):
+            return 0
+        conn = self._connect()
+        try:
+            rows = self._rows(conn)
+        finally:
+            conn.close()
+        updated = 0
+        for path, body, _, ts in rows:
+            target = os.path.join(directory, path)
+            local = _modified(target)
+            if local is not None and local > ts:
+                print(f"[REPLICATION] sqlite: local {path} is newer than the replica copy, keeping it.")
+                continue
+            if write_state(target, json.loads(body)):
+                updated += 1
+        return updated
+
+    def subscribe(self, on_state):
+        stop = threading.Event()
+
+        def poll():
+            conn = self._connect()
+            last = 0
+            try:
+                while not stop.is_set():
+                    for path, body, seq, ts in self._rows(conn, last):
+                        last = seq
+                        on_state(path, json.loads(body), {'seq': seq, 'published': ts, 'received': time.time()})
+                    stop.wait(self.poll_interval)
+            finally:
+                conn.close()
+        thread = threading.Thread(target=poll, name="replicate-sqlite-sub", daemon=True)
+        thread.start()
+        return stop
+
+    def stop(self, timeout=30):
+        flushed = super().stop(timeout)
+        if self._conn is not None and not self._sending:
+            self._conn.close()
+            self._conn = None
+        return flushed
+
+
+def _send_frame(sock, message):
+    data = json.dumps(message, separators=(',', ':'), default=str).encode('utf-8')
+    sock.sendall(struct.pack('>I', len(data)) + data)
+
+
+def _recv_exact(sock, n):
+    buf = b''
+    while len(buf) < n:
+        chunk = sock.recv(n - len(buf))
+        if not chunk:
+            raise ConnectionError("Peer closed connection")
+        buf += chunk
+    return buf
+
+
+def _recv_frame(sock, max_length=None):
+    (length,) = struct.unpack('>I', _recv_exact(sock, 4))
+    if max_length is not None and length > max_length:
+        raise ValueError(f"Frame of {length} bytes, expected at most {max_length}")
+    return json.loads(_recv_exact(sock, length))
+
+
+def _auth_digest(secret, nonce):
+    return hmac.new(secret.encode('utf-8'), nonce.encode('utf-8'), hashlib.sha256).hexdigest()
+
+
+class TcpReplicator(StateReplicator):
+    """
+    Push replication to standby subscribers over TCP (length-prefixed JSON frames). The primary listens on
+    STATE_REPLICATION_TCP_HOST:PORT; a standby that connects first gets the latest state of every file, then every
+    change as it is published. A slow or dead subscriber is dropped, never waited on by the strategies.
+
+    Handshake: the primary sends a random nonce, the standby answers with HMAC-SHA256(STATE_REPLICATION_TCP_SECRET,
+    nonce). A wrong or late answer is disconnected before it sees any state; without a secret nothing is served.
+
+        primary: TcpReplicator().start_server()
+        standby: TcpReplicator(host='primary-host').subscribe(on_state)
+    """
+    name = 'tcp'
+    AUTH_TIMEOUT = 5
+
+    def __init__(self, host=None, port=None, secret=None):
+        super().__init__()
+        self.host = host or getattr(config, 'STATE_REPLICATION_TCP_HOST', '127.0.0.1')
+        self.port = getattr(config, 'STATE_REPLICATION_TCP_PORT', 8766) if port is None else port
+        self.secret = getattr(config, 'STATE_REPLICATION_TCP_SECRET', '') if secret is None else secret
+        self.rejected = 0
+        self.latest = {}              # path -> message, replayed to new subscribers
+        self.subscribers = []
+        self._server = None
+        self._seq = 0
+        self._sub_lock = threading.Lock()
+
+    def start_server(self):
+        if self._server is not None:
+            return self.port
+        if not self.secret:
+            raise ValueError("STATE_REPLICATION_TCP_SECRET is not set, not serving state over TCP")
+        server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        server.bind((self.host, self.port))
+        server.listen(8)
+        self._server = server
+        self.port = server.getsockname()[1]
+        threading.Thread(target=self._accept, name="replicate-tcp-accept", daemon=True).start()
+        return self.port
+
+    def _accept(self):
+        while self._server is not None:
+            try:
+                sock, addr = self._server.accept()
+            except OSError:
+                return
+            # Handshake off the accept thread: a peer that never answers can't hold up the next standby
+            threading.Thread(target=self._admit, args=(sock, addr), name="replicate-tcp-auth", daemon=True).start()
+
+    def _admit(self, sock, addr):
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        sock.settimeout(self.AUTH_TIMEOUT)
+        try:
+            nonce = os.urandom(16).hex()
+            _send_frame(sock, {'nonce': nonce})
+            answer = _recv_frame(sock, max_length=256)
+            auth = answer.get('auth') if isinstance(answer, dict) else None
+            if not isinstance(auth, str) or not hmac.compare_digest(auth.encode('utf-8'), _auth_digest(self.secret, nonce).encode('utf-8')):
+                raise ValueError("wrong secret")
+        except (OSError, ValueError) as e:
+            self.rejected += 1
+            print(f"[REPLICATION] Refused standby {addr[0]}:{addr[1]}: {e}")
+            sock.close()
+            return
+        sock.settimeout(5)
+        with self._sub_lock:
+            if self._server is None:
+                sock.close()
+                return
+            try:
+                for message in self.latest.values():
+                    _send_frame(sock, message)
+                self.subscribers.append(sock)
+            except OSError:
+                sock.close()
+
+    def _send(self, batch):
+        with self._sub_lock:
+            messages = []
+            for path, (state, ts) in batch.items():
+                self._seq += 1
+                message = {'path': os.path.basename(path), 'state': state, 'seq': self._seq, 'ts': ts}
+                self.latest[message['path']] = message
+                messages.append(message)
+            for sock in list(self.subscribers):
+                try:
+                    for message in messages:
+                        _send_frame(sock, message)
+                except OSError:
+                    self.subscribers.remove(sock)
+                    sock.close()
+
+    def stop(self, timeout=30):
+        flushed = super().stop(timeout)
+        server, self._server = self._server, None
+        if server is not None:
+            server.close()
+        with self._sub_lock:
+            for sock in self.subscribers:
+                sock.close()
+            self.subscribers = []
+        return flushed
+
+    def subscribe(self, on_state, retry_seconds=1.0):
+        """Standby: connects to host:port (reconnecting), on_state for every frame received."""
+        stop = threading.Event()
+
+        def listen():
+            while not stop.is_set():
+                try:
+                    with socket.create_connection((self.host, self.port), timeout=5) as sock:
+                        challenge = _recv_frame(sock, max_length=256)
+                        if not isinstance(challenge, dict) or not isinstance(challenge.get('nonce'), str):
+                            raise ValueError("No handshake from the primary")
+                        _send_frame(sock, {'auth': _auth_digest(self.secret, challenge['nonce'])})
+                        sock.settimeout(None)
+                        while not stop.is_set():
+                            m = _recv_frame(sock)
+                            on_state(m['path'], m['state'], {'seq': m['seq'], 'published': m['ts'], 'received': time.time()})
+                except (OSError, ValueError):
+                    stop.wait(retry_seconds)
+        thread = threading.Thread(target=listen, name="replicate-tcp-sub", daemon=True)
+        thread.start()
+        return stop
+
+    def stats(self):
+        out = super().stats()
+        out['subscribers'] = len(self.subscribers)
+        out['rejected'] = self.rejected
+        return out
+
+
+BACKENDS = {'none': StateReplicator, 'git': GitReplicator, 'sqlite': SQLiteReplicator, 'tcp': TcpReplicator}
+
+_replicator = None
+_replicator_lock = threading.Lock()
+
+
+def get_replicator():
+    """Process-wide replicator of the configured backend (STATE_REPLICATION; Git if USE_GIT_STATE_SYNC, else none)."""
+    global _replicator
+    with _replicator_lock:
+        if _replicator is None:
+            backend = getattr(config, 'STATE_REPLICATION', None) or ('git' if config.USE_GIT_STATE_SYNC else 'none')
+            if backend not in BACKENDS:
+                print(f"[REPLICATION] Unknown STATE_REPLICATION '{backend}'. State is not replicated.")
+                backend = 'none'
+            _replicator = BACKENDS[backend]()
+            if backend == 'tcp':
+                try:
+                    print(f"[REPLICATION] Serving state to standbys on {_replicator.host}:{_replicator.start_server()}")
+                except (OSError, ValueError) as e:
+                    print(f"[REPLICATION] Could not listen on {_replicator.host}:{_replicator.port}: {e}")
+        return _replicator
+
+
+def main():
+    """Standby: mirror the primary's state files into --dir as they change."""
+    import argparse
+    parser = argparse.ArgumentParser(description="Standby receiver for replicated strategy state")
+    parser.add_argument('--backend', choices=['tcp', 'sqlite', 'git'], default='tcp')
+    parser.add_argument('--connect', default=None, help="tcp: primary host:port")
+    parser.add_argument('--secret', default=None, help="tcp: shared secret (default: config.STATE_REPLICATION_TCP_SECRET)")
+    parser.add_argument('--db', default=None, help="sqlite: database file")
+    parser.add_argument('--repo', default=None, help="git: clone to pull into")
+    parser.add_argument('--dir', default='.', help="Where received state files are written")
+    args = parser.parse_args()
+
+    if args.backend == 'tcp':
+        host, _, port = (args.connect or '127.0.0.1:8766').rpartition(':')
+        replicator = TcpReplicator(host=host, port=int(port), secret=args.secret)
+    elif args.backend == 'sqlite':
+        replicator = SQLiteReplicator(args.db)
+    else:
+        replicator = GitReplicator(repo_dir=args.repo)
+
+    def on_state(path, state, meta):
+        target = os.path.join(args.dir, os.path.basename(path))
+        if args.backend == 'git' and os.path.abspath(target) == os.path.abspath(path):
+            return   # pulled in place
+        write_state(target, state)
+        lag = meta['received'] - meta['published'] if meta.get('published') else None
+        print(f"[{time.strftime('%H:%M:%S')}] {os.path.basename(path)} updated" + (f" (lag {lag * 1000:.0f} ms)" if lag is not None else ""))
+
+    replicator.subscribe(on_state)
+    print(f"Standby receiving {args.backend} state into {os.path.abspath(args.dir)}. Ctrl+C to stop.")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
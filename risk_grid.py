@@ -0,0 +1,209 @@
+import time
+from collections import namedtuple
+import numpy as np
+import config
+from scipy.special import erfc
+from greeks import SQRT_2
+from option_chain import IV_PERCENT, expiry_to_year_fraction
+
+# Grid point of a RiskReport: P&L and the scenario it happens in
+Scenario = namedtuple('Scenario', ['pnl', 'move_pct', 'iv_scale', 'days'])
+
+INV_SQRT_2 = 1.0 / SQRT_2
+
+
+class RiskReport:
+    """
+    P&L (vs entry prices) of one strategy, or of the whole book, on the spot x IV x days-ahead grid.
+    pnl[i, j, k] is the P&L for spot move moves_pct[i], every leg's IV times iv_scales[j], days_ahead[k] days later.
+    """
+    def __init__(self, name, pnl, spot, moves_pct, iv_scales, days_ahead, n_legs):
+        self.name = name
+        self.pnl = pnl
+        self.spot = spot
+        self.moves_pct = moves_pct
+        self.iv_scales = iv_scales
+        self.days_ahead = days_ahead
+        self.n_legs = n_legs
+
+    def _slice(self, iv_scale, days):
+        j = int(np.argmin(np.abs(self.iv_scales - iv_scale)))
+        k = int(np.argmin(np.abs(self.days_ahead - days)))
+        return self.pnl[:, j, k]
+
+    def pnl_at(self, move_pct, iv_scale=1.0, days=0):
+        """P&L on a spot move of move_pct % (interpolated along the spot axis; nearest IV scale / day on the grid)."""
+        return float(np.interp(move_pct, self.moves_pct, self._slice(iv_scale, days)))
+
+    def worst_case(self):
+        i, j, k = np.unravel_index(int(np.argmin(self.pnl)), self.pnl.shape)
+        return Scenario(float(self.pnl[i, j, k]), float(self.moves_pct[i]), float(self.iv_scales[j]), int(self.days_ahead[k]))
+
+    def breakevens(self, iv_scale=1.0, days=0):
+        """Spot levels where P&L crosses zero inside the grid (linear interpolation between spot steps)."""
+        y = self._slice(iv_scale, days)
+        x = self.spot * (1 + self.moves_pct / 100)
+        i = np.nonzero(np.signbit(y[:-1]) != np.signbit(y[1:]))[0]
+        return (x[i] - y[i] * (x[i + 1] - x[i]) / (y[i + 1] - y[i])).tolist()
+
+    def gap_pnl(self, gap_pcts=None):
+        """{gap %: (P&L on a gap down, P&L on a gap up)} at today's IVs."""
+        gap_pcts = gap_pcts if gap_pcts is not None else getattr(config, 'RISK_GAP_PCTS', [1.0, 2.0, 3.0])
+        return {g: (self.pnl_at(-g), self.pnl_at(g)) for g in gap_pcts}
+
+    def summary(self):
+        w = self.worst_case()
+        gaps = ' '.join(f"±{g:g}%: {down:.0f}/{up:.0f}" for g, (down, up) in self.gap_pnl().items())
+        be = ', '.join(f"{b:.0f}" for b in self.breakevens()) or 'none in grid'
+        return (f"{self.name}: worst {w.pnl:.0f} ({w.move_pct:+.1f}%, IV x{w.iv_scale:.2f}, +{w.days}d) | {gaps} | "
+                f"breakevens {be}")
+
+
+class PortfolioRisk:
+    """Result of one RiskGrid.revalue: a RiskReport for the whole book ('total') and one per strategy."""
+    def __init__(self, total, strategies, ms):
+        self.total = total
+        self.strategies = strategies
+        self.ms = ms
+
+    def for_strategy(self, name):
+        return self.strategies.get(name)
+
+
+class RiskGrid:
+    """
+    Revalues every open leg of every strategy over spot x IV x time scenarios in one array operation:
+    Black-Scholes over a (spot, iv scale, days ahead, leg) grid, factored per axis so only the d1/d2 and the two
+    normal CDFs are evaluated on the full grid, then summed per strategy with one matrix product.
+
+        risk = risk_grid.revalue({s.name: s.open_legs() for s in strategies}, spot, now, chains, vol_surface)
+        risk.total.worst_case(); risk.for_strategy('CalendarPEWeekly').pnl_at(-2.0)
+
+    Leg IVs come from the tick's chains, then the vol surface, then the IV stored with the position.
+    Legs that expire within the days-ahead horizon are valued at intrinsic from then on.
+    """
+    def __init__(self, spot_pct=None, spot_steps=None, iv_scales=None, days_ahead=None, r=None):
+        spot_pct = spot_pct if spot_pct is not None else getattr(config, 'RISK_GRID_SPOT_PCT', 5.0)
+        spot_steps = spot_steps or getattr(config, 'RISK_GRID_SPOT_STEPS', 51)
+        self.moves_pct = np.linspace(-spot_pct, spot_pct, spot_steps)
+        self.iv_scales = np.asarray(iv_scales if iv_scales is not None else getattr(config, 'RISK_GRID_IV_SCALES', [1.0]), dtype=float)
+        self.days_ahead = np.asarray(days_ahead if days_ahead is not None else getattr(config, 'RISK_GRID_DAYS_AHEAD', [0]), dtype=float)
+        self.r = r if r is not None else getattr(config, 'RISK_FREE_RATE', 0.05)
+        self.runs = 0
+        self.ms_total = 0.0
+        self.ms_max = 0.0
+
+    @property
+    def shape(self):
+        return len(self.moves_pct), len(self.iv_scales), len(self.days_ahead)
+
+    def values(self, spot, strike, is_call, tte, sigma):
+        """Model value of each leg in every scenario: array of shape (spot steps, iv scales, days ahead, legs)."""
+        r = self.r
+        # Calls only, once per distinct (strike, expiry, IV); puts and repeated legs come from put-call parity / a gather
+        nodes, leg_node = np.unique(np.column_stack([strike, tte, sigma]), axis=0, return_inverse=True)
+        leg_node = leg_node.ravel()
+        k, tte, sigma = nodes[:, 0], nodes[:, 1], nodes[:, 2]
+        t = tte[None, :] - self.days_ahead[:, None] / 365.0                   # (T, N)
+        expired = t <= 0
+        t = np.where(expired, 1e-9, t)
+        sig = self.iv_scales[:, None] * sigma[None, :]                       # (V, N)
+        sst = sig[:, None, :] * np.sqrt(t)[None]                             # (V, T, N)
+        mu = (r * t - np.log(k))[None] + 0.5 * (sig * sig)[:, None, :] * t[None]
+        disc_k = k * np.exp(-r * t)                                          # (T, N)
+        spots = spot * (1 + self.moves_pct / 100)
+
+        # call = S N(d1) - K e^-rt N(d2), N(d) = erfc(-d / sqrt 2) / 2. The -1/sqrt 2 and 1/2 are folded into the small
+        # per-axis arrays, so the full grid only sees: one add, one divide, one add, two erfc (in place), two scales
+        z1 = (np.log(spots) * -INV_SQRT_2)[:, None, None, None] + (mu * -INV_SQRT_2)[None]
+        z1 /= sst
+        z2 = z1 + sst * INV_SQRT_2
+        call = erfc(z1, out=z1)
+        erfc(z2, out=z2)
+        call *= (0.5 * spots)[:, None, None, None]
+        z2 *= (0.5 * disc_k)[None, None]
+        call -= z2
+        if expired.any():
+            tt, nn = np.nonzero(expired)
+            call[:, :, tt, nn] = np.maximum(spots[:, None] - k[None, nn], 0.0)[:, None, :]
+
+        value = call if np.array_equal(leg_node, np.arange(len(strike))) else call[..., leg_node]
+        puts = ~np.asarray(is_call, dtype=bool)
+        if puts.any():
+            # put = call - S + K e^-rt
+            value += np.where(puts, 1.0, 0.0) * (disc_k[:, leg_node][None] - spots[:, None, None])[:, None]
+        return value
+
+    def revalue(self, strategy_legs, spot, now, chains=(), surface=None):
+        """
+        strategy_legs: {strategy name: [open_legs() dicts]}. Returns a PortfolioRisk, or None when nothing is open
+        (or no IV can be found for any leg).
+        """
+        start = time.perf_counter()
+        names, legs = [], []
+        for name, strat_legs in strategy_legs.items():
+            for leg in strat_legs or []:
+                names.append(name)
+                legs.append(leg)
+        if not legs or not spot:
+            return None
+
+        strike = np.array([leg['strike'] for leg in legs], dtype=float)
+        is_call = np.array([leg['type'] == 'c' for leg in legs])
+        qty = np.array([leg['qty'] for leg in legs], dtype=float)
+        tte, _ = expiry_to_year_fraction(np.array([str(leg.get('expiry_dt')) for leg in legs], dtype=object), now)
+        sigma = leg_ivs(legs, chains, surface)
+        if np.isnan(sigma).all():
+            return None
+        sigma = np.where(np.isnan(sigma), np.nanmedian(sigma), sigma)
+
+        value = self.values(spot, strike, is_call, tte, sigma)
+        entry = np.array([leg.get('entry_price') or np.nan for leg in legs], dtype=float)
+        entry = np.where(np.isnan(entry), value[len(self.moves_pct) // 2, int(np.argmin(np.abs(self.iv_scales - 1))), 0], entry)
+
+        groups = list(dict.fromkeys(names))
+        weights = np.zeros((len(legs), len(groups)))
+        weights[np.arange(len(legs)), [groups.index(n) for n in names]] = qty
+        pnl = (value.reshape(-1, len(legs)) @ weights - entry @ weights).reshape(self.shape + (len(groups),))
+
+        counts = {g: names.count(g) for g in groups}
+        axes = (spot, self.moves_pct, self.iv_scales, self.days_ahead)
+        strategies = {g: RiskReport(g, pnl[..., i], *axes, counts[g]) for i, g in enumerate(groups)}
+        total = RiskReport('Portfolio', pnl.sum(axis=-1), *axes, len(legs))
+
+        ms = (time.perf_counter() - start) * 1000
+        self.runs += 1
+        self.ms_total += ms
+        self.ms_max = max(self.ms_max, ms)
+        return PortfolioRisk(total, strategies, ms)
+
+    def stats(self):
+        return {'runs': self.runs, 'avg_ms': self.ms_total / self.runs if self.runs else 0.0, 'max_ms': self.ms_max,
+                'grid': self.shape}
+
+
+def leg_ivs(legs, chains=(), surface=None):
+    """
+    Decimal IV per leg: the tick's chain row (build_chain already converted broker IV), else the vol surface at the
+    leg's strike, else the IV stored with it (NaN if none). Legs saved before chain IVs were decimals may still carry
+    the broker's percent: anything of 5 or more is read as percent.
+    """
+    iv = np.full(len(legs), np.nan)
+    for i, leg in enumerate(legs):
+        for chain in chains:
+            j = chain.index_of(leg.get('instrument_key')) if len(chain) else None
+            if j is not None and 0.005 < chain.iv[j] < 5.0:
+                iv[i] = chain.iv[j]
+                break
+        else:
+            try:
+                fitted = surface.iv(leg['expiry_dt'], [leg['strike']]) if surface is not None else None
+            except (ValueError, TypeError):   # no / 'N/A' expiry
+                fitted = None
+            if fitted is not None:
+                iv[i] = fitted[0]
+            elif leg.get('iv'):
+                stored = leg['iv'] / IV_PERCENT if leg['iv'] >= 5.0 else leg['iv']
+                if 0.005 < stored < 5.0:
+                    iv[i] = stored
+    return iv
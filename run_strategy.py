@@ -1,13 +1,24 @@
 import os
 import pandas as pd
 import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, date, timedelta
-from upstox_wrapper import UpstoxWrapper
-from instrument_manager import InstrumentMaster
+from types import MappingProxyType
+from market_stream import MarketDataStream
+from option_chain import OptionChainProvider, OptionChain, build_chain
+from iv_solver import IVSolver
+from greeks_policy import GreeksSourcePolicy
+from vol_surface import VolSurface
+from risk_grid import RiskGrid
+from portfolio_greeks import PortfolioGreeks
+from position_snapshot import PositionSnapshot, parse_positions
+from strategy_executor import StrategyExecutor
+from startup import StartupTimer, load_startup
+from replication import get_replicator
 from strategies import CalendarPEWeekly, WeeklyIronfly, BatmanStrategy
 import config
-from greeks import calculate_delta
-from utils import calculate_implied_volatility, get_ist_now
+import git_utils
+from utils import get_ist_now
 from event_monitor import print_event_summary
 from colorama import Fore, Style
 
@@ -18,25 +29,71 @@ STRATEGY_CLASSES = {
     'BatmanStrategy': BatmanStrategy
 }
 
+def derive_expiries(expiry_calendar, today, needs_monthly):
+    """
+    Expiries and expiry-day flags for `today` from the (holiday-aware) expiry calendar.
+    Called at startup and again each new day / after a master refresh, so multi-day runs roll forward.
+    Returns None if fewer than two future expiries are listed.
+    """
+    expiries = expiry_calendar.upcoming(today)
+    if not expiries or len(expiries) < 2:
+        print(f"{Fore.RED}CRITICAL ERROR: Could not find at least two future expiries.{Style.RESET_ALL}")
+        return None
+
+    # NEW: Skip today's expiry if executing freshly on an expiry day
+    expiry_skipped = expiries[0] == today
+    curr_weekly, next_weekly = expiry_calendar.weeklies(today, skip_today=expiry_skipped)
+    if expiry_skipped:
+        print(f"{Fore.YELLOW}Today is expiry day ({today}). Shifting to future expiries as per requirement.{Style.RESET_ALL}")
+        if next_weekly is None:
+            print(f"{Fore.RED}WARNING: Not enough future expiries found after shifting.{Style.RESET_ALL}")
+            next_weekly = curr_weekly
+
+    monthly_expiry = None
+    monthly_found = False
+    if needs_monthly:
+        # Last expiry of the month after our (possibly shifted) curr_weekly; the month after that as fallback
+        monthly_expiry = expiry_calendar.monthly_after(curr_weekly, 1) or expiry_calendar.monthly_after(curr_weekly, 2)
+        monthly_found = monthly_expiry is not None
+        if not monthly_found:
+            monthly_expiry = expiries[-1]
+
+    print(f"{Fore.CYAN}Expiries Identified:{Style.RESET_ALL}")
+    print(f" - [Main Weekly]:    {curr_weekly}")
+    print(f" - [Next Weekly]:    {next_weekly} (Target for WeeklyIronfly Entry)")
+    if monthly_expiry:
+        print(f" - [Monthly Hedge]:  {monthly_expiry} (For CalendarPEWeekly)")
+    elif 'WeeklyIronfly' in config.ACTIVE_STRATEGIES:
+        print(f" - [Monthly]:        Not pre-fetched (WeeklyIronfly only needs for adjustments)")
+
+    is_expiry_today = expiry_calendar.is_last_expiry_of_month(today)
+
+    # HOLIDAY AWARENESS: Determine "Effective Tomorrow" (Next Trading Day)
+    effective_tomorrow = expiry_calendar.next_trading_day(today)
+
+    # GENERAL RULE: If the *next trading day* IS the Monthly Expiry, then TODAY is the Exit Day (T-1)
+    # i.e. the next trading day is our current weekly AND no later expiry is listed in its month
+    is_day_before_monthly_expiry = (needs_monthly and monthly_found and effective_tomorrow == curr_weekly
+                                    and expiry_calendar.is_next_trading_day_monthly_expiry(today))
+
+    print(f"{Fore.CYAN}Holiday-Aware check: Today={today}, NextTrading={effective_tomorrow}, IsPreExpiry={is_day_before_monthly_expiry}{Style.RESET_ALL}")
+    return {
+        'curr_weekly': curr_weekly,
+        'next_weekly': next_weekly,
+        'monthly_expiry': monthly_expiry,
+        'expiry_skipped': expiry_skipped,
+        'is_expiry_today': is_expiry_today,
+        'effective_tomorrow': effective_tomorrow,
+        'is_day_before_monthly_expiry': is_day_before_monthly_expiry,
+    }
+
 def main():
     print(f"{Fore.CYAN}Starting Multi-Strategy Algo...{Style.RESET_ALL}")
-    print_event_summary()
-    
-    # 1. Setup API and Master Data
-    api = UpstoxWrapper() # Reads token from Config/Env
-    master = InstrumentMaster()
-    master.load_master()
-    
-    # 2. Instantiate and Initialize Active Strategies
-    active_strategies = []
-    print(f"Loading Active Strategies: {config.ACTIVE_STRATEGIES}")
-    for s_name in config.ACTIVE_STRATEGIES:
-        if s_name in STRATEGY_CLASSES:
-            strat_inst = STRATEGY_CLASSES[s_name]()
-            strat_inst.load_previous_state()
-            active_strategies.append(strat_inst)
-        else:
-            print(f"{Fore.RED}WARNING: Strategy '{s_name}' is not recognized.{Style.RESET_ALL}")
+    startup = StartupTimer()
+
+    # 1-2. One git pull, then strategy states; API, master data, expiry and event calendars load alongside
+    api, master, active_strategies, expiry_calendar, event_warnings = load_startup(STRATEGY_CLASSES, startup)
+    print_event_summary(event_warnings)
 
     if not active_strategies:
         print(f"{Fore.RED}CRITICAL: No valid strategies configured. Exiting.{Style.RESET_ALL}")
@@ -45,10 +102,11 @@ def main():
     # 2.5 Auto-Sync with Broker at startup
     if config.AUTO_SYNC_ON_STARTUP and config.TRADING_MODE == 'LIVE':
         print(f"{Fore.YELLOW}AUTO_SYNC_ON_STARTUP is ENABLED. Reconciling active strategies with broker positions...{Style.RESET_ALL}")
-        broker_positions = api.get_positions()
+        with startup.phase('broker sync'):
+            broker_positions = parse_positions(api.get_positions())  # parsed once for all strategies
         if broker_positions:
             for strat in active_strategies:
-                if strat.pull_from_broker(broker_positions, master_df=master.df):
+                if strat.pull_from_broker(broker_positions, master=master):
                     strat.save_state()
                     print(f"{Fore.GREEN}Successfully synced {strat.name} state from broker.{Style.RESET_ALL}")
                 else:
@@ -72,113 +130,112 @@ def main():
         print(f"{Fore.GREEN}[P] PAPER MODE - Simulation only{Style.RESET_ALL}")
     print("="*60 + "\n")
 
-    # 3. Identify Expiries Dynamically
-    expiries = master.get_expiry_dates(config.UNDERLYING_NAME)
-    if not expiries or len(expiries) < 2:
-        print(f"{Fore.RED}CRITICAL ERROR: Could not find at least two future expiries.{Style.RESET_ALL}")
-        return
-
-    curr_weekly = expiries[0]
-    next_weekly = expiries[1]
-    
-    # NEW: Skip today's expiry if executing freshly on an expiry day
-    today = date.today()
-    expiry_skipped = False
-    if curr_weekly == today:
-        print(f"{Fore.YELLOW}Today is expiry day ({today}). Shifting to future expiries as per requirement.{Style.RESET_ALL}")
-        expiry_skipped = True
-        curr_weekly = expiries[1]
-        if len(expiries) > 2:
-            next_weekly = expiries[2]
-        else:
-            print(f"{Fore.RED}WARNING: Not enough future expiries found after shifting.{Style.RESET_ALL}")
-    
+    # 3. Identify Expiries Dynamically (one holiday-aware calendar per master load, shared with the strategies)
     # Identify Monthly only if needed
     needs_monthly = 'CalendarPEWeekly' in config.ACTIVE_STRATEGIES
-    
-    monthly_expiry = None
-    m_expiries = [] 
-    if needs_monthly:
-        # Find the last expiry of the next month relative to our (possibly shifted) curr_weekly
-        target_month = curr_weekly.month + 1
-        target_year = curr_weekly.year
-        if target_month > 12: target_month = 1; target_year += 1
-        
-        # We look through all expiries, skipping today if it was skipped for weekly
-        search_expiries = expiries[1:] if expiries[0] == today else expiries
-        
-        m_expiries = [d for d in search_expiries if d.year == target_year and d.month == target_month]
-        if not m_expiries:
-            # Fallback: next month after target_month
-            target_month += 1
-            if target_month > 12: target_month = 1; target_year += 1
-            m_expiries = [d for d in search_expiries if d.year == target_year and d.month == target_month]
-            
-        monthly_expiry = m_expiries[-1] if m_expiries else expiries[-1]
+    today = get_ist_now().date()   # the loop compares IST dates (new day -> expiries derived again)
+    expiry_info = derive_expiries(expiry_calendar, today, needs_monthly)
+    if expiry_info is None:
+        return
+    curr_weekly, next_weekly, monthly_expiry = expiry_info['curr_weekly'], expiry_info['next_weekly'], expiry_info['monthly_expiry']
 
-    print(f"{Fore.CYAN}Expiries Identified:{Style.RESET_ALL}")
-    print(f" - [Main Weekly]:    {curr_weekly}")
-    print(f" - [Next Weekly]:    {next_weekly} (Target for WeeklyIronfly Entry)")
-    if monthly_expiry:
-        print(f" - [Monthly Hedge]:  {monthly_expiry} (For CalendarPEWeekly)")
-    elif 'WeeklyIronfly' in config.ACTIVE_STRATEGIES:
-        print(f" - [Monthly]:        Not pre-fetched (WeeklyIronfly only needs for adjustments)")
+    # Pre-fetch instrument lists for all relevant segments (sorted by strike, from the master's strike index)
+    strike_index = master.strike_index
+    strike_window = getattr(config, 'STRIKE_WINDOW_POINTS', 500)
+    # Per-expiry SVI smiles refitted every tick: IV/delta for master strikes outside the fetched window
+    vol_surface = VolSurface(strike_index, config.UNDERLYING_NAME)
+    # Spot x IV x days-ahead revaluation of all open legs, every tick (market_data['risk'])
+    risk_grid = RiskGrid()
+    # Net delta/gamma/vega/theta per strategy, per expiry and overall, updated as positions / greeks change
+    portfolio_greeks = PortfolioGreeks()
+    # Broker positions parsed once per tick; strategies reconcile only when a position they care about changed
+    position_snapshot = PositionSnapshot()
+    # Strategy updates run in per-strategy workers with a tick deadline (PARALLEL_STRATEGY_EXECUTION)
+    executor = StrategyExecutor(active_strategies)
+    def load_option_frames():
+        # Current Weekly
+        cw_pe = master.get_option_symbols(config.UNDERLYING_NAME, curr_weekly, 'PE')
+        cw_ce = master.get_option_symbols(config.UNDERLYING_NAME, curr_weekly, 'CE')
+        # Next Weekly
+        nw_pe = master.get_option_symbols(config.UNDERLYING_NAME, next_weekly, 'PE')
+        nw_ce = master.get_option_symbols(config.UNDERLYING_NAME, next_weekly, 'CE')
+        # Monthly
+        m_pe = master.get_option_symbols(config.UNDERLYING_NAME, monthly_expiry, 'PE') if monthly_expiry else pd.DataFrame()
+        m_ce = master.get_option_symbols(config.UNDERLYING_NAME, monthly_expiry, 'CE') if monthly_expiry else pd.DataFrame()
+        return cw_pe, cw_ce, nw_pe, nw_ce, m_pe, m_ce
+
+    with startup.phase('option frames'):
+        cw_pe, cw_ce, nw_pe, nw_ce, m_pe, m_ce = load_option_frames()
 
-    # Pre-fetch instrument lists for all relevant segments
-    # Current Weekly
-    cw_pe = master.get_option_symbols(config.UNDERLYING_NAME, curr_weekly, 'PE')
-    cw_ce = master.get_option_symbols(config.UNDERLYING_NAME, curr_weekly, 'CE')
-    # Next Weekly
-    nw_pe = master.get_option_symbols(config.UNDERLYING_NAME, next_weekly, 'PE')
-    nw_ce = master.get_option_symbols(config.UNDERLYING_NAME, next_weekly, 'CE')
-    # Monthly
-    m_pe = master.get_option_symbols(config.UNDERLYING_NAME, monthly_expiry, 'PE') if monthly_expiry else pd.DataFrame()
-    m_ce = master.get_option_symbols(config.UNDERLYING_NAME, monthly_expiry, 'CE') if monthly_expiry else pd.DataFrame()
-
-    is_expiry_today = master.is_monthly_expiry_today(config.UNDERLYING_NAME)
-    is_expiry_today = master.is_monthly_expiry_today(config.UNDERLYING_NAME)
-    
-    # HOLIDAY AWARENESS: Determine "Effective Tomorrow" (Next Trading Day)
-    from utils import get_next_trading_day
-    effective_tomorrow = get_next_trading_day(date.today())
-    
-    # Check if this "Effective Tomorrow" is the monthly expiry
-    # Note: If Jan 27 is the last expiry of Jan, m_expiries logic might need to ensure it covers it.
-    # But relies on the fact that if we are HERE, needs_monthly is True.
-    
-    # Needs Monthly?
-    if 'BatmanStrategy' in config.ACTIVE_STRATEGIES:
-         # Batman might technically use monthly if we wanted to be super safe, but it uses Weekly options.
-         # So we don't strictly need it unless we want to monitor.
-         pass
-    
-    # GENERAL RULE: If the *next trading day* IS the Monthly Expiry, then TODAY is the Exit Day (T-1)
-    is_day_before_monthly_expiry = False
-    
-    if needs_monthly and m_expiries:
-        # Check if effective tomorrow matches ANY monitored expiry 
-        # But specifically for 'is_day_before_monthly_expiry', we match the TARGET monthly.
-        
-        # Logic: If next trading day is the current weekly, AND that current weekly is effectively monthly end
-        if effective_tomorrow == curr_weekly:
-             # Check if there are any later expiries in the same month
-             tomorrow_month = effective_tomorrow.month
-             later_in_month = [d for d in expiries if d.year == effective_tomorrow.year and d.month == tomorrow_month and d > effective_tomorrow]
-             
-             if not later_in_month:
-                 # It is the last expiry of the month -> effectively Monthly
-                 is_day_before_monthly_expiry = True
-             elif effective_tomorrow == m_expiries[-1]:
-                 is_day_before_monthly_expiry = True
-                 
-    print(f"{Fore.CYAN}Holiday-Aware check: Today={date.today()}, NextTrading={effective_tomorrow}, IsPreExpiry={is_day_before_monthly_expiry}{Style.RESET_ALL}")
-    
     # 4. Main Polling Loop
     last_adj_minute = -1
+    # Quotes, Greeks and Option Chain use separate rate-limit budgets, so fetch them concurrently (one chain call per expiry)
+    fetch_pool = ThreadPoolExecutor(max_workers=3, thread_name_prefix="fetch")
+    chain_provider = OptionChainProvider(api) if getattr(config, 'USE_OPTION_CHAIN_API', False) else None
+    # Local IV for options without broker IV, warm-started from the previous tick
+    iv_solver = IVSolver()
+    # Which greeks come from the Option Greeks API and which are computed locally (GREEKS_SOURCE)
+    greeks_policy = GreeksSourcePolicy()
+
+    # Streaming market data: strategies read the live cache, REST is only used for missing/stale keys
+    stream = None
+    if getattr(config, 'USE_MARKET_DATA_STREAM', False):
+        stream = MarketDataStream(access_token=api.access_token)
+        stream.set_subscriptions([config.SPOT_INSTRUMENT_KEY])
+        stream.start()
+        with startup.phase('market stream'):
+            connected = stream.wait_connected(timeout=10)
+        if connected:
+            print(f"{Fore.GREEN}Market data stream connected ({stream.url}).{Style.RESET_ALL}")
+        else:
+            print(f"{Fore.YELLOW}WARNING: Market data stream not connected yet. Falling back to REST polling until it is.{Style.RESET_ALL}")
+    stream_max_age = getattr(config, 'MARKET_STREAM_MAX_AGE_SECONDS', 5)
+
+    # Order fills are pushed over the portfolio stream; place_order falls back to REST polling without it
+    if config.TRADING_MODE == 'LIVE' and getattr(config, 'USE_ORDER_UPDATE_STREAM', False):
+        with startup.phase('order stream'):
+            connected = api.start_order_stream()
+        if connected:
+            print(f"{Fore.GREEN}Order update stream connected.{Style.RESET_ALL}")
+        else:
+            print(f"{Fore.YELLOW}WARNING: Order update stream not connected yet. Order fills will be polled over REST.{Style.RESET_ALL}")
+    # Execution callback of one tick, called from the strategy workers
+    def order_callback_for(tick_quotes):
+        def place_trade_callback(instrument_key, qty, side, tag, expiry='N/A'):
+            side_colored = f"{Fore.GREEN}{side}{Style.RESET_ALL}" if side == 'BUY' else f"{Fore.RED}{side}{Style.RESET_ALL}"
+            if config.TRADING_MODE == 'PAPER':
+                quote = tick_quotes.get(instrument_key)
+                if quote is None:
+                    # e.g. a hedge picked off the vol surface, outside the fetched strike window (fetched for this order only)
+                    quote = api.get_option_chain_quotes([instrument_key]).get(instrument_key)
+                price = quote.last_price if quote is not None else 0.0
+                print(f"[{datetime.now()}] [{Fore.CYAN}PAPER{Style.RESET_ALL}] {side_colored} {qty} | Key: {instrument_key} | Price: {price} | Expiry: {expiry}")
+                return {'status': 'success', 'avg_price': price}
+            else:
+                print(f"[{datetime.now()}] [{Fore.RED}LIVE{Style.RESET_ALL}] {side_colored} {qty} | Key: {instrument_key} | Expiry: {expiry}")
+                return api.place_order(instrument_key, qty, side, tag=tag)
+        return place_trade_callback
+
     try:
         while True:
             now = get_ist_now()
 
+            # Daily instrument master refresh before the open: swapped in place, frames re-read from the new master
+            refreshed = master.refresh_due(now) and master.refresh_master()
+            if refreshed:
+                strike_index = master.strike_index
+                vol_surface.strike_index = strike_index
+                expiry_calendar = master.expiry_calendar(config.UNDERLYING_NAME)
+            # New day (multi-day run) or new master: expiries and the expiry-day flags are derived again
+            if refreshed or now.date() != today:
+                new_info = derive_expiries(expiry_calendar, now.date(), needs_monthly)
+                if new_info is not None:
+                    today, expiry_info = now.date(), new_info
+                    curr_weekly, next_weekly, monthly_expiry = expiry_info['curr_weekly'], expiry_info['next_weekly'], expiry_info['monthly_expiry']
+                    # Warm starts of instruments that are gone (expired weekly, old master tokens) are no use
+                    iv_solver.forget()
+                    cw_pe, cw_ce, nw_pe, nw_ce, m_pe, m_ce = load_option_frames()
+
             # MARKET HOURS CHECK (LIVE MODE)
             # Prevent pre-market execution/adjustments
             if config.TRADING_MODE == 'LIVE':
@@ -203,199 +260,116 @@ def main():
                 # But for now, let's mark it so we don't trigger multiple times in the same minute
                 last_adj_minute = now.minute
 
-            # A. Get Spot Price
-            spot_price = api.get_spot_price(config.SPOT_INSTRUMENT_KEY)
+            # A. Get Spot Price (stream cache first, REST fallback)
+            spot_price = stream.cache.ltp(config.SPOT_INSTRUMENT_KEY, max_age=stream_max_age) if stream else None
+            if not spot_price:
+                spot_price = api.get_spot_price(config.SPOT_INSTRUMENT_KEY)
             if not spot_price:
                 print("Waiting for quote...")
                 time.sleep(5)
                 continue
             
+            startup.report()   # launch -> first tick breakdown, once
             adj_status = f"{Fore.GREEN}ADJ WINDOW OPEN{Style.RESET_ALL}" if can_adjust else f"Next Adj: {adj_interval - (now.minute % adj_interval)}m"
             print(f"[{now.strftime('%H:%M:%S')}] Spot: {spot_price} | {adj_status}")
             
             # B. Build Market Data Context
-            # Filter options around ATM (±500 pts)
+            # Options around ATM (±STRIKE_WINDOW_POINTS) from the sorted strike index
             atm = round(spot_price / 50) * 50
-            strikes = range(atm - 500, atm + 550, 50)
-            
-            # Combine all keys for quotes
-            def get_near_df(pe_df, ce_df):
-                p_near = pe_df[pe_df['strike'].isin(strikes)]
-                c_near = ce_df[ce_df['strike'].isin(strikes)]
-                return p_near, c_near
-
-            cw_pe_near, cw_ce_near = get_near_df(cw_pe, cw_ce)
-            nw_pe_near, nw_ce_near = get_near_df(nw_pe, nw_ce)
-            m_pe_near, m_ce_near = get_near_df(m_pe, m_ce) if needs_monthly else (pd.DataFrame(columns=['instrument_key']), pd.DataFrame(columns=['instrument_key']))
-            
-            all_keys = list(set(cw_pe_near['instrument_key'].tolist() + cw_ce_near['instrument_key'].tolist() +
-                                nw_pe_near['instrument_key'].tolist() + nw_ce_near['instrument_key'].tolist() +
-                                m_pe_near['instrument_key'].tolist() + m_ce_near['instrument_key'].tolist()))
-            
+            near_expiries = [curr_weekly, next_weekly] + ([monthly_expiry] if needs_monthly else [])
+
             # Ensure currently held positions are ALWAYS included, even if they drift away from ATM
-            for strat in active_strategies:
-                # CalendarPEWeekly style
-                if hasattr(strat, 'weekly_position') and strat.weekly_position:
-                    all_keys.append(strat.weekly_position['instrument_key'])
-                if hasattr(strat, 'monthly_position') and strat.monthly_position:
-                    all_keys.append(strat.monthly_position['instrument_key'])
+            # (as each strategy published them when its last update finished: a worker may be mid-adjustment)
+            held_keys = executor.held_keys()
 
-                # WeeklyIronfly style
-                if hasattr(strat, 'positions') and strat.positions:
-                   for pos in strat.positions:
-                       all_keys.append(pos['instrument_key'])
-            
-            all_keys = list(set(all_keys))
+            all_keys = strike_index.select_keys(config.UNDERLYING_NAME, near_expiries, atm, strike_window, extra_keys=held_keys)
 
-            # NEW: Perform metadata recovery for held positions using Master DF
+            # NEW: Perform metadata recovery for held positions using the master's instrument index
             for strat in active_strategies:
+                if executor.busy(strat.name):
+                    continue   # mid-update in its worker (e.g. waiting for a fill): its own update recovers it
                 # CalendarPEWeekly style
                 for pos_attr in ['weekly_position', 'monthly_position']:
                     pos = getattr(strat, pos_attr, None)
                     # We check if expiry_dt is missing OR is a float (the old 'expiry' field format)
                     if pos and (not pos.get('expiry_dt') or pos.get('expiry_dt') == 'N/A' or isinstance(pos.get('expiry_dt'), float)):
-                        key = pos['instrument_key']
-                        match = master.df[master.df['instrument_key'] == key]
-                        if not match.empty:
-                            row = match.iloc[0]
-                            pos['expiry_dt'] = str(row['expiry_dt'])
-                            if 'type' not in pos: pos['type'] = row['instrument_type'].lower()
-                            if 'strike' not in pos: pos['strike'] = float(row['strike'])
+                        rec = master.lookup(pos['instrument_key'])
+                        if rec is not None:
+                            pos['expiry_dt'] = str(rec.expiry)
+                            if 'type' not in pos: pos['type'] = rec.instrument_type.lower()
+                            if 'strike' not in pos: pos['strike'] = rec.strike
                             strat.save_state()
+                            executor.publish(strat.name)
 
                 # WeeklyIronfly style
                 if hasattr(strat, 'positions') and strat.positions:
                    changed = False
                    for pos in strat.positions:
                        if not pos.get('expiry_dt') or pos.get('expiry_dt') == 'N/A':
-                            key = pos['instrument_key']
-                            match = master.df[master.df['instrument_key'] == key]
-                            if not match.empty:
-                                row = match.iloc[0]
-                                pos['expiry_dt'] = str(row['expiry_dt'])
-                                if 'type' not in pos: pos['type'] = row['instrument_type']
-                                if 'strike' not in pos: pos['strike'] = float(row['strike'])
+                            rec = master.lookup(pos['instrument_key'])
+                            if rec is not None:
+                                pos['expiry_dt'] = str(rec.expiry)
+                                if 'type' not in pos: pos['type'] = rec.instrument_type
+                                if 'strike' not in pos: pos['strike'] = rec.strike
                                 changed = True
                    if changed:
                        strat.save_state()
+                       executor.publish(strat.name)
 
             if len(all_keys) > 250:
                 print(f"{Fore.YELLOW}WARNING: Requesting high number of symbols ({len(all_keys)}). Possible rate limit risk.{Style.RESET_ALL}")
             
-            quotes = api.get_option_chain_quotes(all_keys)
-            greeks = api.get_option_greeks(all_keys)
+            # Quotes/Greeks: served from the stream cache when fresh, REST only for what is missing
+            if stream:
+                stream.set_subscriptions(all_keys + [config.SPOT_INSTRUMENT_KEY])
+                quotes, missing_quote_keys = stream.cache.quotes_for(all_keys, max_age=stream_max_age)
+                greeks = stream.cache.greeks_for(all_keys, max_age=stream_max_age)
+                missing_greek_keys = [k for k in all_keys if k not in greeks]
+            else:
+                quotes, greeks = {}, {}
+                missing_quote_keys = missing_greek_keys = all_keys
+
+            # Whole-expiry option chain calls next (LTP + greeks in one request); LTP/Greeks APIs only for what they don't cover
+            if chain_provider and (missing_quote_keys or missing_greek_keys):
+                near_keys = strike_index.keys_by_expiry(config.UNDERLYING_NAME, near_expiries, atm, strike_window)
+                chain_quotes, chain_greeks = chain_provider.fetch(near_keys, set(missing_quote_keys) | set(missing_greek_keys), pool=fetch_pool)
+                quotes.update({k: chain_quotes[k] for k in missing_quote_keys if k in chain_quotes})
+                greeks.update({k: chain_greeks[k] for k in missing_greek_keys if k in chain_greeks})
+                missing_quote_keys = [k for k in missing_quote_keys if k not in chain_quotes]
+                missing_greek_keys = [k for k in missing_greek_keys if k not in chain_greeks]
+
+            missing_greek_keys = greeks_policy.broker_keys(missing_greek_keys, held_keys)
+            quotes_future = fetch_pool.submit(api.get_option_chain_quotes, missing_quote_keys) if missing_quote_keys else None
+            greeks_future = fetch_pool.submit(api.get_option_greeks, missing_greek_keys) if missing_greek_keys else None
+            if quotes_future:
+                quotes.update(quotes_future.result())
+            if greeks_future:
+                greeks.update(greeks_future.result())
             
             # REMAPPING FIX: Map NSE_FO|Symbol -> NSE_FO|Token
             # The API returns keys as Symbols (e.g. NSE_FO|NIFTY26FEB...), but Strategy uses Tokens (NSE_FO|40476)
-            # We use master.df to bridge this gap.
-            if not getattr(master, 'symbol_map', None):
-                 # lazy init map
-                 master.symbol_map = {}
-                 if master.df is not None and not master.df.empty:
-                     month_map = {10: 'O', 11: 'N', 12: 'D'}
-                     for i in range(1, 10): month_map[i] = str(i)
-                     
-                     for _, row in master.df.iterrows():
-                         try:
-                             # Base Components
-                             symbol = row['name'] # NIFTY
-                             # CRITICAL FIX: master.df has 'strike_price', not 'strike'
-                             strike = int(float(row['strike_price']))
-                             opt_type = row['instrument_type'] # CE/PE
-                             
-                             # SAFE DATE CONVERSION
-                             # row['expiry_dt'] might be string or date or nan
-                             raw_exp = row['expiry_dt']
-                             if pd.isna(raw_exp): continue
-                             
-                             exp = pd.to_datetime(raw_exp).date()
-                             
-                             yy = exp.strftime('%y')
-                             mmm = exp.strftime('%b').upper()
-                             dd = exp.strftime('%d')
-                             m_char = month_map[exp.month]
-                             
-                             # Format 1: Weekly (NIFTY 26 1 06 26150 PE) -> SYMBOL YY M DD STRIKE TYPE
-                             # Note: Upstox Weekly Format is SYMBOL + YY + M + DD + STRIKE + TYPE
-                             fmt_weekly = f"NSE_FO|{symbol}{yy}{m_char}{dd}{strike}{opt_type}"
-                             master.symbol_map[fmt_weekly] = row['instrument_key']
-                             
-                             # Format 2: Monthly (NIFTY 26 FEB 26200 PE) -> SYMBOL YY MMM STRIKE TYPE
-                             # Note: Upstox Monthly Format is SYMBOL + YY + MMM + STRIKE + TYPE
-                             fmt_monthly = f"NSE_FO|{symbol}{yy}{mmm}{strike}{opt_type}"
-                             master.symbol_map[fmt_monthly] = row['instrument_key']
-                             
-                             # Fallback: Space-stripped Trading Symbol (just in case)
-                             ts = str(row['trading_symbol']).replace(' ', '')
-                             master.symbol_map[f"NSE_FO|{ts}"] = row['instrument_key']
-                             
-                         except Exception:
-                             continue
-            
-            # Inject Token keys into greeks dict
-            if greeks:
-                keys_to_add = {}
-                for key, val in greeks.items():
-                    # If key is likely a symbol (contains letters/dates not just numbers after pipe)
-                    # OR just try looking it up
-                    if key in master.symbol_map:
-                        token_key = master.symbol_map[key]
-                        keys_to_add[token_key] = val
-                
-                greeks.update(keys_to_add)
-            
-            # Helper to package chain data
-            def package_chain(pe_df, ce_df, q_dict, g_dict, spot, t_now):
-                chain = []
-                # Use raw dataframes but only process what we have quotes for
-                for df, opt_type in [(pe_df, 'p'), (ce_df, 'c')]:
-                    # Optimization: only look at keys we actually fetched
-                    df_relevant = df[df['instrument_key'].isin(q_dict.keys())]
-                    for _, row in df_relevant.iterrows():
-                        key = row['instrument_key']
-                        ltp = q_dict[key].last_price
-                        tte = (datetime.combine(row['expiry_dt'], datetime.min.time()) - t_now).total_seconds() / (365*24*3600)
-                        if tte <= 0: tte = 0.0001
-                        
-                        # Restore definition
-                        broker_data = g_dict.get(key, {})
-                        broker_delta = broker_data.get('delta')
-
-                        iv_val = broker_data.get('iv')
-                        if not iv_val:
-                             iv_val = calculate_implied_volatility(ltp, spot, row['strike'], tte, config.RISK_FREE_RATE if hasattr(config, 'RISK_FREE_RATE') else 0.05, opt_type)
-                        
-                        calc_delta = calculate_delta(opt_type, spot, row['strike'], tte, config.RISK_FREE_RATE if hasattr(config, 'RISK_FREE_RATE') else 0.05, iv_val)
-                        
-                        final_delta = broker_delta if broker_delta is not None else calc_delta
-
-                        chain.append({
-                            'strike': row['strike'],
-                            'iv': iv_val,
-                            'time_to_expiry': tte,
-                            'expiry_dt': row['expiry_dt'].strftime('%Y-%m-%d') if isinstance(row['expiry_dt'], (date, datetime)) else str(row['expiry_dt']),
-                            'instrument_key': key,
-                            'ltp': ltp,
-                            'type': opt_type,
-                            'delta': final_delta,
-                            'calculated_delta': calc_delta
-                        })
-                return chain
-
-            cw_chain_data = package_chain(cw_pe, cw_ce, quotes, greeks, spot_price, now)
-            nw_chain_data = package_chain(nw_pe, nw_ce, quotes, greeks, spot_price, now)
-            m_chain_data = package_chain(m_pe, m_ce, quotes, greeks, spot_price, now) if needs_monthly else []
-
-            # Create Execution Callback
-            def place_trade_callback(instrument_key, qty, side, tag, expiry='N/A'):
-                side_colored = f"{Fore.GREEN}{side}{Style.RESET_ALL}" if side == 'BUY' else f"{Fore.RED}{side}{Style.RESET_ALL}"
-                if config.TRADING_MODE == 'PAPER':
-                    price = quotes[instrument_key].last_price if instrument_key in quotes else 0.0
-                    print(f"[{datetime.now()}] [{Fore.CYAN}PAPER{Style.RESET_ALL}] {side_colored} {qty} | Key: {instrument_key} | Price: {price} | Expiry: {expiry}")
-                    return {'status': 'success', 'avg_price': price}
-                else:
-                    print(f"[{datetime.now()}] [{Fore.RED}LIVE{Style.RESET_ALL}] {side_colored} {qty} | Key: {instrument_key} | Expiry: {expiry}")
-                    return api.place_order(instrument_key, qty, side, tag=tag)
+            master.remap_symbol_keys(greeks)
+
+            # Package chains (vectorized TTE / IV / delta; strategies still see a list of dicts)
+            cw_chain_data = build_chain(cw_pe, cw_ce, quotes, greeks, spot_price, now, iv_solver=iv_solver)
+            nw_chain_data = build_chain(nw_pe, nw_ce, quotes, greeks, spot_price, now, iv_solver=iv_solver)
+            m_chain_data = build_chain(m_pe, m_ce, quotes, greeks, spot_price, now, iv_solver=iv_solver) if needs_monthly else OptionChain.empty()
+            chains = (cw_chain_data, nw_chain_data, m_chain_data)
+            for chain in chains:
+                vol_surface.update(chain, spot_price)
+            greeks_policy.observe(chains, greeks, spot_price)
+            greeks_policy.fill_local(chains, greeks, spot_price)
+
+            open_legs = executor.open_legs()
+            risk = risk_grid.revalue(open_legs, spot_price, now, chains, vol_surface)
+            if risk is not None:
+                print(f"Risk: {risk.total.summary()}")
+            portfolio_greeks.update(open_legs, greeks, spot_price, now, chains, vol_surface)
+            if portfolio_greeks.by_strategy:
+                print(f"Greeks: {portfolio_greeks.summary()}")
+            git_lag = git_utils.sync_lag()
+            if git_lag > 3 * getattr(config, 'GIT_SYNC_INTERVAL_SECONDS', 30):
+                print(f"{Fore.YELLOW}WARNING: Git state sync is {git_lag:.0f}s behind (push failing?).{Style.RESET_ALL}")
 
             # Check Global Entry Windows for LIVE
             can_enter_new_cycle = True
@@ -403,7 +377,7 @@ def main():
             if config.TRADING_MODE == 'LIVE' and config.STRICT_MONTHLY_EXPIRY_ENTRY:
                 if getattr(config, 'OVERRIDE_TIMING_CHECKS', False):
                     can_enter_new_cycle = True
-                elif not is_expiry_today:
+                elif not expiry_info['is_expiry_today']:
                     can_enter_new_cycle = False
                 elif current_time_str < config.ENTRY_TIME_HHMM:
                     can_enter_new_cycle = False
@@ -419,36 +393,93 @@ def main():
                     broker_positions = [] # Pure isolation for Paper Mode
             except:
                 pass
+            position_snapshot.update(broker_positions, master)
+            position_snapshot.index_owners(open_legs)
 
+            tick_quotes = MappingProxyType(dict(quotes))   # what this tick's strategies (and PAPER fills) price from
             market_data = {
                 'spot_price': spot_price,
                 'now': now,
                 'cw_chain': cw_chain_data,
                 'nw_chain': nw_chain_data,
                 'm_chain': m_chain_data,
-                'quotes': quotes,
-                'is_day_before_monthly_expiry': is_day_before_monthly_expiry,
-                'is_expiry_today': is_expiry_today,
+                'quotes': tick_quotes,
+                'is_day_before_monthly_expiry': expiry_info['is_day_before_monthly_expiry'],
+                'is_expiry_today': expiry_info['is_expiry_today'],
                 'can_enter_new_cycle': can_enter_new_cycle,
                 'can_adjust': can_adjust,
-                'expiry_skipped': expiry_skipped,
+                'expiry_skipped': expiry_info['expiry_skipped'],
                 'greeks': greeks,
                 'broker_positions': broker_positions,
-                'monthly_expiry_trigger_date': effective_tomorrow if is_day_before_monthly_expiry else None
+                'position_snapshot': position_snapshot,
+                'master': master,
+                'expiry_calendar': expiry_calendar,
+                'vol_surface': vol_surface,
+                'risk': risk,
+                'portfolio_greeks': portfolio_greeks.snapshot(),
+                'monthly_expiry_trigger_date': expiry_info['effective_tomorrow'] if expiry_info['is_day_before_monthly_expiry'] else None
             }
 
-            # C. Update All Strategies
+            # C. Update All Strategies (each in its own worker: a pending LIVE order only blocks its own strategy)
+            for name, seconds, order_key in executor.run_tick(market_data, order_callback_for(tick_quotes)):
+                waiting = f"waiting on order {order_key}" if order_key else "still running"
+                print(f"{Fore.YELLOW}WARNING: Strategy {name} overran the {executor.deadline}s tick deadline ({waiting}, {seconds:.1f}s).{Style.RESET_ALL}")
+            # State deltas of this tick are in the WAL; fold them into the snapshot (and Git) when due
             for strat in active_strategies:
-                try:
-                    strat.update(market_data, place_trade_callback)
-                except Exception as e:
-                    print(f"{Fore.RED}Error in Strategy {strat.name}: {e}{Style.RESET_ALL}")
+                if not executor.busy(strat.name):
+                    strat.flush_state()
+            # Fills / exits of this tick go into the net greeks right away
+            portfolio_greeks.update(executor.open_legs(), greeks, spot_price, now, chains, vol_surface)
             
-            time.sleep(config.POLL_INTERVAL_SECONDS)
+            if stream and stream.is_connected():
+                time.sleep(getattr(config, 'STREAM_POLL_INTERVAL_SECONDS', 2))
+            else:
+                time.sleep(config.POLL_INTERVAL_SECONDS)
             
     except KeyboardInterrupt:
         print(f"\n{Fore.YELLOW}Algo stopping manually...{Style.RESET_ALL}")
         # Option to exit all on manual stop could be added here
+    finally:
+        if iv_solver.options:
+            iv_stats = iv_solver.stats()
+            print(f"IV solver: {iv_stats['options']} options solved, {iv_stats['warm_starts']} warm-started, "
+                  f"{iv_stats['avg_iterations']:.1f} iterations on average, {iv_stats['failures']} not converged.")
+        if vol_surface.fits:
+            vs_stats = vol_surface.stats()
+            print(f"Vol surface: {vs_stats['fits']} SVI fits, {vs_stats['avg_fit_ms']:.2f} ms average, {vs_stats['max_fit_ms']:.2f} ms max.")
+        if risk_grid.runs:
+            rg_stats = risk_grid.stats()
+            print(f"Risk grid: {rg_stats['runs']} revaluations of {'x'.join(map(str, rg_stats['grid']))} scenarios, "
+                  f"{rg_stats['avg_ms']:.2f} ms average, {rg_stats['max_ms']:.2f} ms max.")
+        if portfolio_greeks.by_strategy:
+            print(f"Portfolio greeks at stop: {portfolio_greeks.summary()}")
+            for name, g in portfolio_greeks.snapshot()['strategies'].items():
+                print(f" - {name}: Delta {g['delta']:+.1f} | Gamma {g['gamma']:+.4f} | Vega {g['vega']:+.1f} | Theta {g['theta']:+.1f}/day")
+        executor.stop()
+        for strat in active_strategies:
+            strat.flush_state(force=True)   # WAL -> snapshot, so the pushed state is complete
+        replicator = get_replicator()
+        replicator.stop()
+        r_stats = replicator.stats()
+        if r_stats['published']:
+            print(f"State replication ({r_stats['backend']}): {r_stats['published']} changes published, {r_stats['sent']} sent, "
+                  f"{r_stats['failures']} failures, {r_stats['max_send_ms']:.0f} ms slowest send.")
+        git_stats = git_utils.stop_sync()   # push the state saved since the last interval
+        if git_stats:
+            print(f"Git sync: {git_stats['marks']} saves -> {git_stats['commits']} commits, {git_stats['pushes']} pushes, "
+                  f"{git_stats['failures']} failures, lag {git_stats['last_lag']:.1f}s last / {git_stats['max_lag']:.1f}s max.")
+        for name, e_stats in executor.stats().items():
+            if e_stats['updates']:
+                print(f"Strategy {name}: {e_stats['updates']} updates, {e_stats['avg_ms']:.1f} ms average, {e_stats['max_ms']:.0f} ms max, "
+                      f"{e_stats['orders']} orders ({e_stats['max_order_ms']:.0f} ms max), {e_stats['overruns']} overruns, "
+                      f"{e_stats['dropped']} ticks dropped, {e_stats['errors']} errors.")
+        if greeks_policy.tick >= 0:
+            g_stats = greeks_policy.stats()
+            print(f"Greeks ({g_stats['mode']}): {g_stats['keys_requested']} keys from the Greeks API, {g_stats['keys_local']} computed locally, "
+                  f"~{g_stats['broker_calls_saved']} API calls saved, {g_stats['pinned']} instruments on broker greeks.")
+        if stream:
+            stream.stop()
+        api.stop_order_stream()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,90 @@
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+import config
+from replication import get_replicator
+from upstox_wrapper import UpstoxWrapper
+from instrument_manager import InstrumentMaster
+from event_monitor import get_upcoming_warnings
+from colorama import Fore, Style
+
+
+class StartupTimer:
+    """
+    Wall time of each startup phase, from launch to the first tick. Phases that run concurrently overlap, so their
+    sum can exceed the total.
+
+        timer = StartupTimer()
+        with timer.phase('broker sync'): ...
+        timer.report()    # at the first tick
+    """
+    def __init__(self):
+        self.t0 = time.perf_counter()
+        self.phases = []          # (name, seconds) in completion order
+        self.total = None
+        self._lock = threading.Lock()
+
+    def record(self, name, seconds):
+        with self._lock:
+            self.phases.append((name, seconds))
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def timed(self, name, fn, *args, **kwargs):
+        with self.phase(name):
+            return fn(*args, **kwargs)
+
+    @property
+    def done(self):
+        return self.total is not None
+
+    def report(self):
+        """Prints the breakdown once (first tick)."""
+        if self.done:
+            return
+        self.total = time.perf_counter() - self.t0
+        parts = " | ".join(f"{name} {seconds:.2f}s" for name, seconds in self.phases)
+        print(f"{Fore.CYAN}Startup: launch -> first tick {self.total:.2f}s ({parts}){Style.RESET_ALL}")
+
+
+def _load_strategy(cls):
+    strat = cls()
+    strat.load_previous_state(pull=False)   # the state files were pulled once for all strategies
+    return strat
+
+
+def load_startup(strategy_classes, timer):
+    """
+    One state pull (git pull with the Git backend), then every strategy's state; the instrument master (+ its expiry calendar), the event / holiday
+    calendar and the broker client load concurrently with it instead of one after the other.
+    Returns (api, master, strategies in ACTIVE_STRATEGIES order, expiry_calendar, event warnings).
+    """
+    master = InstrumentMaster()
+    with ThreadPoolExecutor(max_workers=8, thread_name_prefix="startup") as pool:
+        replicator = get_replicator()
+        pull_f = pool.submit(timer.timed, f'{replicator.name} pull', replicator.pull)
+        master_f = pool.submit(timer.timed, 'instrument master', master.load_master)
+        events_f = pool.submit(timer.timed, 'event calendar', get_upcoming_warnings)
+        api_f = pool.submit(timer.timed, 'broker client', UpstoxWrapper)
+
+        print(f"Loading Active Strategies: {config.ACTIVE_STRATEGIES}")
+        pull_f.result()
+        strategy_fs = []
+        for s_name in config.ACTIVE_STRATEGIES:
+            if s_name in strategy_classes:
+                strategy_fs.append(pool.submit(timer.timed, f'state {s_name}', _load_strategy, strategy_classes[s_name]))
+            else:
+                print(f"{Fore.RED}WARNING: Strategy '{s_name}' is not recognized.{Style.RESET_ALL}")
+
+        master_f.result()
+        calendar_f = pool.submit(timer.timed, 'expiry calendar', master.expiry_calendar, config.UNDERLYING_NAME)
+
+        strategies = [f.result() for f in strategy_fs]
+        return api_f.result(), master, strategies, calendar_f.result(), events_f.result()
@@ -0,0 +1,190 @@
+import hashlib
+import json
+import os
+import threading
+import time
+import config
+
+_MISSING = object()
+
+
+def _canonical(state):
+    """Serialisation the change detection hashes: key order and whitespace don't count as changes."""
+    return json.dumps(state, sort_keys=True, separators=(',', ':'), default=str)
+
+
+def _digest(text):
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=16).hexdigest()
+
+
+class StateStore:
+    """
+    Crash-safe JSON state of one strategy: the usual <name>_state.json snapshot plus a <name>_state.json.wal
+    write-ahead log next to it.
+
+    save(state) hashes the state and skips the write if nothing changed. Otherwise the changed top-level keys
+    (a fill, a roll) are appended to the WAL as one line, fsynced. No full rewrite happens.
+    Every STATE_WAL_MAX_RECORDS deltas, or once the oldest is STATE_WAL_COMPACT_SECONDS old, the state is
+    compacted into the snapshot: temp file + os.replace, so a crash never leaves a half-written *_state.json.
+
+    load() reads the snapshot and replays the WAL on top of it. The WAL's first line holds the hash of the
+    snapshot it extends. A WAL left over from before a newer snapshot (crash between replace and truncate) is
+    ignored, and so is a torn last line.
+
+        store = StateStore('CalendarPEWeekly_live_state.json')
+        state = store.load()
+        store.save({'weekly': ..., 'monthly': ...})   # -> None (unchanged) / 'wal' / 'snapshot'
+    """
+    def __init__(self, path, max_wal_records=None, compact_seconds=None, fsync=None):
+        self.path = path
+        self.wal_path = path + '.wal'
+        self.max_wal_records = getattr(config, 'STATE_WAL_MAX_RECORDS', 50) if max_wal_records is None else max_wal_records
+        self.compact_seconds = getattr(config, 'STATE_WAL_COMPACT_SECONDS', 60) if compact_seconds is None else compact_seconds
+        self.fsync = getattr(config, 'STATE_FSYNC', True) if fsync is None else fsync
+        self.state = None            # last saved / loaded state (a detached copy)
+        self.hash = None             # digest of self.state
+        self.snapshot_hash = None    # digest of what the snapshot file holds (the WAL's base)
+        self.wal_records = 0
+        self.wal_since = None        # monotonic time of the oldest delta not in the snapshot yet
+        self._lock = threading.Lock()
+        self.saves = 0
+        self.skipped = 0
+        self.wal_appends = 0
+        self.snapshots = 0
+        self.replayed = 0
+        self.load_ms = 0.0
+
+    # --- writing ---
+    def _sync(self, f):
+        f.flush()
+        if self.fsync:
+            os.fsync(f.fileno())
+
+    def _replace(self, path, text):
+        tmp = path + '.tmp'
+        with open(tmp, 'w') as f:
+            f.write(text)
+            self._sync(f)
+        os.replace(tmp, path)
+
+    def _write_snapshot(self, state, digest):
+        self._replace(self.path, json.dumps(state, indent=4, default=str))
+        self.snapshot_hash = digest
+        self.snapshots += 1
+        # New, empty WAL on top of this snapshot (a crash before this line leaves a WAL whose base no longer matches)
+        self._replace(self.wal_path, json.dumps({'base': digest}) + '\n')
+        self.wal_records = 0
+        self.wal_since = None
+
+    def _append(self, state, digest):
+        old = self.state or {}
+        record = {'set': {k: v for k, v in state.items() if old.get(k, _MISSING) != v},
+                  'del': [k for k in old if k not in state], 'hash': digest}
+        if not os.path.exists(self.wal_path):
+            self._replace(self.wal_path, json.dumps({'base': self.snapshot_hash}) + '\n')
+        with open(self.wal_path, 'a') as f:
+            f.write(json.dumps(record, separators=(',', ':'), default=str) + '\n')
+            self._sync(f)
+        self.wal_records += 1
+        self.wal_appends += 1
+        if self.wal_since is None:
+            self.wal_since = time.monotonic()
+
+    def compaction_due(self):
+        if not self.wal_records:
+            return False
+        return self.wal_records >= self.max_wal_records or time.monotonic() - self.wal_since >= self.compact_seconds
+
+    def save(self, state):
+        """Returns None if unchanged, 'wal' if appended as a delta, 'snapshot' if the snapshot file was rewritten."""
+        text = _canonical(state)
+        digest = _digest(text)
+        with self._lock:
+            self.saves += 1
+            if digest == self.hash:
+                self.skipped += 1
+                return None
+            current = json.loads(text)    # detached from the strategy's live dicts
+            if self.snapshot_hash is None or not isinstance(current, dict) or not isinstance(self.state, dict) \
+                    or self.compaction_due():
+                self._write_snapshot(current, digest)
+                result = 'snapshot'
+            else:
+                self._append(current, digest)
+                result = 'wal'
+            self.state, self.hash = current, digest
+            return result
+
+    def compact(self, force=False):
+        """Folds the WAL into the snapshot when due (force: whenever it holds anything). True if the snapshot was written."""
+        with self._lock:
+            if self.state is None or not self.wal_records or not (force or self.compaction_due()):
+                return False
+            self._write_snapshot(self.state, self.hash)
+            return True
+
+    # --- reading ---
+    def _replay(self, state, base):
+        applied = 0
+        try:
+            with open(self.wal_path) as f:
+                lines = f.read().splitlines()
+        except OSError:
+            return state, applied
+        if not lines:
+            return state, applied
+        try:
+            header = json.loads(lines[0])
+        except ValueError:
+            header = {}
+        if header.get('base') != base:
+            if len(lines) > 1:
+                print(f"[STATE] {self.wal_path} does not extend the current snapshot (older WAL or snapshot pulled from Git). Ignored.")
+            return state, applied
+        for i, line in enumerate(lines[1:], start=2):
+            try:
+                record = json.loads(line)
+                new = dict(state)
+                new.update(record['set'])
+                for key in record['del']:
+                    new.pop(key, None)
+                if _digest(_canonical(new)) != record['hash']:
+                    raise ValueError("hash mismatch")
+            except (ValueError, KeyError, TypeError) as e:
+                print(f"[STATE] {self.wal_path} line {i} unreadable ({e}); replay stops there.")
+                break
+            state = new
+            applied += 1
+        return state, applied
+
+    def load(self):
+        """Last saved state (snapshot + WAL replay), or None if there is none."""
+        t0 = time.perf_counter()
+        with self._lock:
+            state = None
+            if os.path.exists(self.path):
+                try:
+                    with open(self.path) as f:
+                        state = json.load(f)
+                except ValueError as e:
+                    print(f"[STATE] {self.path} is unreadable ({e}).")
+            base = _digest(_canonical(state)) if state is not None else None
+            applied = 0
+            if isinstance(state, dict):
+                state, applied = self._replay(state, base)
+            self.state = state
+            self.hash = _digest(_canonical(state)) if state is not None else None
+            self.snapshot_hash = base
+            if applied:
+                self._write_snapshot(state, self.hash)    # replayed state becomes the snapshot; fresh WAL after it
+            elif state is not None:
+                self._replace(self.wal_path, json.dumps({'base': base}) + '\n')   # drops a stale / torn WAL
+            self.wal_records = 0
+            self.wal_since = None
+            self.replayed += applied
+            self.load_ms = (time.perf_counter() - t0) * 1000
+            return json.loads(_canonical(state)) if state is not None else None
+
+    def stats(self):
+        return {'saves': self.saves, 'skipped': self.skipped, 'wal_appends': self.wal_appends, 'snapshots': self.snapshots,
+                'wal_records': self.wal_records, 'replayed': self.replayed, 'load_ms': self.load_ms}
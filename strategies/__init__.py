@@ -1,2 +1,3 @@
 from .calendar_pe_weekly import CalendarPEWeekly
 from .weekly_ironfly import WeeklyIronfly
+from .batman_strategy import BatmanStrategy
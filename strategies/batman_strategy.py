@@ -4,6 +4,8 @@ from greeks import calculate_delta
 from colorama import init, Fore, Style
 from trade_logger import TradeJournal, EventLogger
 from base_strategy import BaseStrategy
+from position_snapshot import parse_positions
+from chain_index import index_for
 from utils import get_ist_now, get_next_trading_day
 import re
 import math
@@ -28,6 +30,7 @@ class BatmanStrategy(BaseStrategy):
         self.journal = TradeJournal(filename="trade_log_batman.csv")
         self.event_logger = EventLogger()
         self.last_process_date = None
+        self.vol_surface = None
 
     def log(self, message):
         timestamp = get_ist_now().strftime("%Y-%m-%d %H:%M:%S")
@@ -42,11 +45,11 @@ class BatmanStrategy(BaseStrategy):
         Main logic loop.
         """
         # 0. Reconciliation
-        if market_data.get('broker_positions') is not None:
-             self.pull_from_broker(market_data.get('broker_positions'), master_df=market_data.get('master_df'), silent=True)
+        self.reconcile_with_broker(market_data)
 
         spot = market_data.get('spot_price')
         cw_chain = market_data.get('cw_chain', [])
+        self.vol_surface = market_data.get('vol_surface')
         now = market_data.get('now')
         
         if spot is None: return
@@ -85,8 +88,9 @@ class BatmanStrategy(BaseStrategy):
                 expiry_dt = datetime.strptime(expiry_dt_str, '%Y-%m-%d').date()
                 today = now.date()
                 
-                # Holiday-aware T-1
-                next_trading_day_date = get_next_trading_day(today)
+                # Holiday-aware T-1 (shared expiry calendar when the loop provides one)
+                calendar = market_data.get('expiry_calendar')
+                next_trading_day_date = calendar.next_trading_day(today) if calendar is not None else get_next_trading_day(today)
                 
                 # If NEXT trading day is Expiry, AND we are past the exit time on TODAY (T-1), Exit.
                 if next_trading_day_date == expiry_dt:
@@ -127,42 +131,29 @@ class BatmanStrategy(BaseStrategy):
         """
         Finds strike at spot + distance (CE) or spot - distance (PE).
         """
-        target_strike = round((spot + distance) / 50) * 50 if option_type == 'CE' else round((spot - distance) / 50) * 50
-        
-        # Find exact or closest
-        best_opt = None
-        min_diff = float('inf')
-        
-        candidates = [opt for opt in chain if opt['type'] == ('c' if option_type == 'CE' else 'p')]
-        
-        for opt in candidates:
-            diff = abs(opt['strike'] - target_strike)
-            if diff < min_diff:
-                min_diff = diff
-                best_opt = opt
-        
-        return best_opt
+        return index_for(chain).by_distance('c' if option_type == 'CE' else 'p', spot, distance, step=50)
 
-    def select_strike_by_delta(self, chain, target_delta, option_type):
+    def select_strike_by_delta(self, chain, target_delta, option_type, spot=None):
         """
         Finds strike closest to target delta.
+        If the fetched chain can't get within 0.01 of it (e.g. the far OTM hedge lies outside the strike window),
+        the vol surface is asked for the closest strike of the same expiry across the whole master.
         """
-        best_opt = None
+        best_opt = index_for(chain).nearest_delta('c' if option_type == 'CE' else 'p', target_delta)
         min_diff = float('inf')
-        
-        candidates = [opt for opt in chain if opt['type'] == ('c' if option_type == 'CE' else 'p')]
-        
-        for opt in candidates:
-            # Filter bad data
-            if opt.get('delta') is None and opt.get('calculated_delta') is None: continue
-            
-            curr_delta = abs(opt.get('delta', opt.get('calculated_delta')))
-            diff = abs(curr_delta - target_delta)
-            
-            if diff < min_diff:
-                min_diff = diff
-                best_opt = opt
-        
+        if best_opt is not None:
+            curr_delta = best_opt.get('delta')
+            if curr_delta is None or curr_delta != curr_delta:  # None / NaN: calculated delta
+                curr_delta = best_opt.get('calculated_delta')
+            min_diff = abs(abs(curr_delta) - target_delta)
+
+        if self.vol_surface is not None and spot and best_opt is not None and min_diff > 0.01:
+            alt = self.vol_surface.option_by_delta(best_opt['expiry_dt'], option_type, target_delta, spot)
+            if alt is not None and abs(abs(alt['delta']) - target_delta) < min_diff:
+                self.log(f"{option_type} {target_delta} delta is outside the fetched chain (best {best_opt['strike']}). "
+                         f"Using {alt['strike']} from the vol surface (delta {alt['delta']:.3f}, IV {alt['iv']:.3f}).")
+                return alt
+
         return best_opt
 
     def enter_strategy(self, spot, chain, order_callback):
@@ -178,11 +169,11 @@ class BatmanStrategy(BaseStrategy):
         # Identify Legs
         ce_wing = self.select_strike_by_distance(spot, chain, dist_wing, 'CE')
         ce_core = self.select_strike_by_distance(spot, chain, dist_core, 'CE')
-        ce_hedge = self.select_strike_by_delta(chain, config.BATMAN_HEDGE_DELTA, 'CE')
+        ce_hedge = self.select_strike_by_delta(chain, config.BATMAN_HEDGE_DELTA, 'CE', spot)
         
         pe_wing = self.select_strike_by_distance(spot, chain, dist_wing, 'PE')
         pe_core = self.select_strike_by_distance(spot, chain, dist_core, 'PE')
-        pe_hedge = self.select_strike_by_delta(chain, config.BATMAN_HEDGE_DELTA, 'PE')
+        pe_hedge = self.select_strike_by_delta(chain, config.BATMAN_HEDGE_DELTA, 'PE', spot)
         
         if not (ce_wing and ce_core and ce_hedge and pe_wing and pe_core and pe_hedge):
             self.log("ERROR: Could not find all required strikes for Batman Entry.")
@@ -229,17 +220,31 @@ class BatmanStrategy(BaseStrategy):
 
     def update_deltas(self, spot, market_data):
         greeks = market_data.get('greeks', {})
-        chain = market_data.get('cw_chain', []) # Fallback for calc
+        chains = [market_data.get(k) for k in ('cw_chain', 'nw_chain', 'm_chain')]
+        chains = [c for c in chains if c is not None and hasattr(c, 'index_of')]
         
         for p in self.positions:
             key = p['instrument_key']
-            if key in greeks:
-               val = greeks[key].get('delta')
-               if val is not None:
-                   p['delta'] = abs(val) # Store absolute delta for simplicity
-            else:
-                # Recalculate if needed (using chain data or just keep old)
-                pass
+            val = greeks[key].get('delta') if key in greeks else None
+            if val is None:
+                val = self.local_delta(p, spot, chains)
+            if val is not None:
+                p['delta'] = abs(val) # Store absolute delta for simplicity
+
+    def local_delta(self, p, spot, chains):
+        """No broker greeks for a leg: the chain row's local delta (LTP-implied IV), else the vol surface's."""
+        for chain in chains:
+            i = chain.index_of(p['instrument_key'])
+            if i is not None and chain.iv[i] > 0.005:
+                return float(chain.calculated_delta[i])
+        if self.vol_surface is not None and p.get('expiry_dt'):
+            try:
+                g = self.vol_surface.greeks(p['expiry_dt'], [p['strike']], p['type'], spot)
+            except ValueError:
+                g = None
+            if g is not None:
+                return float(g['delta'][0])
+        return None
 
     def check_adjustments(self, spot, chain, order_callback):
         # Trigger: Combined Delta of SELL legs (Cores) drops to 0.35 - 0.40
@@ -298,7 +303,7 @@ class BatmanStrategy(BaseStrategy):
         # 3. Enter New Sold Lots (Target Combined Delta 0.70 => 0.35 per lot)
         target_per_lot = config.BATMAN_ADJ_TARGET_COMBINED_DELTA / 2.0
         
-        new_opt = self.select_strike_by_delta(chain, target_per_lot, side)
+        new_opt = self.select_strike_by_delta(chain, target_per_lot, side, spot)
         if new_opt:
              # Sell 2 lots
              self.place_entry_order(new_opt, 2, 'SELL', f"{side}_CORE_ADJ", order_callback)
@@ -366,11 +371,11 @@ class BatmanStrategy(BaseStrategy):
         }
         super().save_current_state(state) # Saves to json
 
-    def load_previous_state(self):
+    def load_previous_state(self, pull=True):
         """
         Loads state from persistent storage and restores class attributes.
         """
-        state = super().load_previous_state()
+        state = super().load_previous_state(pull=pull)
         
         if state:
             self.positions = state.get('positions', [])
@@ -380,7 +385,7 @@ class BatmanStrategy(BaseStrategy):
             return True
         return False
 
-    def pull_from_broker(self, broker_positions, master_df=None, silent=False):
+    def pull_from_broker(self, broker_positions, master=None, silent=False):
         """
         Reconcile tracked positions with Broker/API positions.
         Primary Goal: Detect manual exits or discrepancies.
@@ -395,21 +400,8 @@ class BatmanStrategy(BaseStrategy):
             if broker_positions is None: return False
             # If it is [], it means really no positions.
         
-        # Create a map of Broker Positions by Token for fast lookup
-        broker_map = {}
-        if broker_positions:
-            for p in broker_positions:
-                # Upstox returns 'instrument_token' or similar. 
-                # wrapper.py usually normalizes to object with attributes or dict
-                # Let's assume wrapper returns list of objects/dicts that have 'instrument_token' or 'instrument_key'
-                # wrapper.py get_positions() returns list of dicts usually?
-                # Let's check wrapper.py if unsure, but standardizing on 'instrument_token' is common.
-                # However, our system uses 'instrument_key' (NSE_FO|...)
-                
-                # Handling variation in Upstox response vs our normalized dict
-                p_key = p.get('instrument_token') or p.get('instrument_key') or p.get('token')
-                if p_key:
-                    broker_map[p_key] = p
+        # Map of Broker Positions by Token for fast lookup (parsed once per tick by the loop's PositionSnapshot)
+        broker_map = {p.token: p for p in parse_positions(broker_positions) if p.token}
         
         # Iterate over OUR tracked positions
         active_positions = []
@@ -420,14 +412,9 @@ class BatmanStrategy(BaseStrategy):
             
             if key in broker_map:
                 broker_p = broker_map[key]
-                # Check Quantity
-                # Broker quantity is Net Intraday + Delivery? usually 'quantity' or 'net_quantity'
-                b_qty = broker_p.get('quantity')
-                if b_qty is None: b_qty = broker_p.get('net_quantity', 0)
-                
-                # Check Side (Net Qty > 0 BUY, < 0 SELL)
+                # Check Quantity (net, > 0 BUY, < 0 SELL)
                 # Our tracked['qty'] is always positive, with tracked['side'] or inferred side.
-                # tracked position structure: {'qty': 50, 'side': 'BUY', ...}
+                b_qty = broker_p.qty
                 
                 # Convert Broker Net Qty to absolute and side
                 b_net_qty = int(b_qty)
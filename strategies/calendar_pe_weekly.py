@@ -4,6 +4,9 @@ from greeks import calculate_delta, get_atm_strike
 from colorama import init, Fore, Style
 from trade_logger import TradeJournal, EventLogger
 from base_strategy import BaseStrategy
+from position_snapshot import parse_positions, resolve_expiry
+from chain_index import index_for
+from option_chain import IV_PERCENT
 from utils import get_ist_now
 import re
 
@@ -63,8 +66,7 @@ class CalendarPEWeekly(BaseStrategy):
         # --- 0. Reconciliation on Every Loop (Silent) ---
         # Ensures that if we manually closed something, the algo knows about it immediately.
         # This prevents "Double Entry" or "Ghost Position" issues.
-        if market_data.get('broker_positions') is not None:
-             self.pull_from_broker(market_data.get('broker_positions'), master_df=market_data.get('master_df'), silent=True)
+        self.reconcile_with_broker(market_data)
 
         spot = market_data.get('spot_price')
         # Standard Chains (Current Week, Current Month)
@@ -162,8 +164,12 @@ class CalendarPEWeekly(BaseStrategy):
                 expiry_dt = datetime.strptime(expiry_dt_str, '%Y-%m-%d').date()
                 today = now.date()
                 # If expiry is the Next Trading Day (T-1 Check)
-                from utils import get_next_trading_day
-                next_trading_day = get_next_trading_day(today)
+                calendar = market_data.get('expiry_calendar')
+                if calendar is not None:
+                    next_trading_day = calendar.next_trading_day(today)
+                else:
+                    from utils import get_next_trading_day
+                    next_trading_day = get_next_trading_day(today)
                 if expiry_dt == next_trading_day:
                     if now.strftime("%H:%M") >= config.EARLY_ROLLOVER_TIME:
                         self.log(f"{Fore.YELLOW}T-1 ROLLOVER: Expiry is Next Trading Day ({next_trading_day}). Scaling out.{Style.RESET_ALL}")
@@ -269,7 +275,7 @@ class CalendarPEWeekly(BaseStrategy):
                 
         if is_opening_window and self.weekly_position and self.monthly_position:
             # Bypass candle delay and check for extreme gaps
-            if self.check_gap_risk(spot, w_ltp, m_ltp, order_callback):
+            if self.check_gap_risk(spot, w_ltp, m_ltp, order_callback, risk=market_data.get('risk')):
                 has_acted = True
                 self.save_state()
                 return
@@ -320,31 +326,21 @@ class CalendarPEWeekly(BaseStrategy):
     def select_strike_by_delta(self, spot, chain, target_delta, option_type='p', tolerance=0.1, force_round=False, force_atm=False):
         """
         Finds a strike in the option chain closest to the target delta.
-        chain: list of dicts {'strike': K, 'iv': sigma, 'expiry': t_years}
+        chain: OptionChain (or list of dicts {'strike': K, 'iv': sigma, 'delta': D, 'type': 'p'/'c', ...})
         force_round: If True, STRICTLY limits search to strikes divisible by 100.
         force_atm: If True, IGNORES delta and finds strike closest to Round-100 Spot.
         """
-        best_strike = None
-        min_diff = float('inf')
-        
-        # Filter candidates by type first
-        candidates = [opt for opt in chain if opt.get('type') == option_type]
+        # Shared per-tick index: pre-sorted by strike / |delta| with a round-100 mask
+        index = index_for(chain)
         
         # 0. Round Strike Optimization (Liquidity)
         # If enabled key is True globaly OR forced locally
         use_round_strikes = getattr(config, 'PREFER_ROUND_STRIKES', False) or force_round or force_atm # force_atm implies round 100
+        round_only = False
         
         if use_round_strikes:
-            round_candidates = []
-            for opt in candidates:
-                try:
-                    if int(float(opt['strike'])) % 100 == 0:
-                        round_candidates.append(opt)
-                except:
-                    pass
-            
-            if round_candidates:
-                candidates = round_candidates
+            if index.has_round(option_type):
+                round_only = True
             elif force_round or force_atm:
                 self.log(f"WARNING: No Round-100 strikes found. Force Round/ATM is ON.")
                 return None
@@ -353,34 +349,16 @@ class CalendarPEWeekly(BaseStrategy):
         if force_atm:
              # Find closest strike to SPOT (rounded to 100)
              target_strike = round(spot / 100) * 100
-             for opt in candidates:
-                 diff = abs(float(opt['strike']) - target_strike)
-                 if diff < min_diff:
-                     min_diff = diff
-                     best_strike = opt
+             best_strike = index.nearest_strike(option_type, target_strike, round_only=round_only)
              
-             if best_strike and min_diff > 200:
+             if best_strike and abs(float(best_strike['strike']) - target_strike) > 200:
                   self.log(f"WARNING: Closest ATM strike ({best_strike['strike']}) is far from Target ({target_strike}).")
              
              return best_strike
 
-        # 2. STANDARD MODE: Delta Based
-        min_diff = float('inf') # Reset
-        for opt in candidates:
-            # Prefer strikes with non-zero IV if possible
-            if opt.get('iv', 0) <= 0:
-                continue
-                
-            delta = opt.get('delta')
-            if delta is None:
-                 delta = opt.get('calculated_delta', 0.5)
-            diff = abs(abs(delta) - target_delta)
-            
-            if diff < min_diff:
-                min_diff = diff
-                best_strike = opt
-        
-        return best_strike
+        # 2. STANDARD MODE: Delta Based (strikes with a usable IV only)
+        return index.nearest_delta(option_type, target_delta, round_only=round_only, require_iv=True)
+
     def enter_strategy(self, spot, weekly_chain, monthly_chain, order_callback=None, market_data=None):
         self.log(f"Attempting Atomic Entry at Spot: {spot}")
         
@@ -497,12 +475,12 @@ class CalendarPEWeekly(BaseStrategy):
                 gd = greeks[key]
                 if gd.get('delta') is not None:
                     self.weekly_position['delta'] = abs(gd['delta'])
-                    source = "BROKER"
+                    source = "LOCAL" if gd.get('source') == 'local' else "BROKER"
                 elif gd.get('iv') is not None and gd.get('iv') > 0:
-                     broker_iv = gd['iv']
+                     broker_iv = gd['iv'] / IV_PERCENT   # broker greeks carry IV in percent
                      source = "CALC(BrokerIV)"
             
-            if source != "BROKER":
+            if source not in ("BROKER", "LOCAL"):
                 p_type = self.weekly_position.get('type', 'p')
                 d = calculate_delta(p_type, spot, self.weekly_position['strike'], current_time_to_expiry_weekly, self.risk_free_rate, broker_iv)
                 self.weekly_position['delta'] = abs(d)
@@ -519,12 +497,12 @@ class CalendarPEWeekly(BaseStrategy):
                 gd = greeks[key]
                 if gd.get('delta') is not None:
                     self.monthly_position['delta'] = abs(gd['delta'])
-                    source = "BROKER"
+                    source = "LOCAL" if gd.get('source') == 'local' else "BROKER"
                 elif gd.get('iv') is not None and gd.get('iv') > 0:
-                     broker_iv = gd['iv']
+                     broker_iv = gd['iv'] / IV_PERCENT   # broker greeks carry IV in percent
                      source = "CALC(BrokerIV)"
             
-            if source != "BROKER":
+            if source not in ("BROKER", "LOCAL"):
                 p_type = self.monthly_position.get('type', 'p')
                 d = calculate_delta(p_type, spot, self.monthly_position['strike'], current_time_to_expiry_monthly, self.risk_free_rate, broker_iv)
                 self.monthly_position['delta'] = abs(d)
@@ -763,10 +741,11 @@ class CalendarPEWeekly(BaseStrategy):
             m_pnl = (monthly_ltp - self.monthly_position['entry_price']) * qty
         return w_pnl + m_pnl
 
-    def check_gap_risk(self, spot, w_ltp, m_ltp, order_callback):
+    def check_gap_risk(self, spot, w_ltp, m_ltp, order_callback, risk=None):
         """
         Logic for mitigating risks from opening gaps.
         Called during the first few minutes of the market session.
+        risk: the loop's PortfolioRisk (market_data['risk']), for the P&L on a further gap.
         """
         if not self.weekly_position or not self.monthly_position:
             return False
@@ -792,8 +771,26 @@ class CalendarPEWeekly(BaseStrategy):
             # However, we can also just call the roll directly for more 'force'
             return False # Let check_adjustments handle it with its bypass
 
+        # 3. Projected Loss Check (portfolio risk grid): what another gap of the roll threshold would cost
+        report = risk.for_strategy(self.name) if risk is not None else None
+        if report is not None:
+            move = config.GAP_FORCED_ROLL_THRESHOLD_PCT
+            down, up = report.pnl_at(-move), report.pnl_at(move)
+            worst = report.worst_case()
+            self.log(f"GAP PROTECT: Projected PnL on a further {move}% gap: {down:.2f} (down) / {up:.2f} (up). "
+                     f"Worst on risk grid: {worst.pnl:.2f} at {worst.move_pct:+.1f}%.")
+            if getattr(config, 'GAP_EXIT_ON_PROJECTED_LOSS', False) and min(down, up) <= -abs(max_loss):
+                self.log(f"{Fore.RED}GAP PROTECT: Projected loss exceeds MAX_LOSS_VALUE ({max_loss}). EMERGENCY EXIT.{Style.RESET_ALL}")
+                self.exit_all_positions(order_callback, reason="GAP_PROJECTED_LOSS_EXIT")
+                return True
+
         return False
 
+    def open_legs(self):
+        """Weekly leg is always the short, monthly the long."""
+        legs = [self._as_leg(self.weekly_position, 'SELL'), self._as_leg(self.monthly_position, 'BUY')]
+        return [leg for leg in legs if leg]
+
     def save_state(self):
         """Saves current state to persistent storage."""
         state = {
@@ -803,9 +800,9 @@ class CalendarPEWeekly(BaseStrategy):
         }
         super().save_current_state(state)
 
-    def load_previous_state(self):
+    def load_previous_state(self, pull=True):
         """Loads state from persistent storage."""
-        state = super().load_previous_state()
+        state = super().load_previous_state(pull=pull)
         
         if state:
             self.weekly_position = state.get('weekly')
@@ -824,96 +821,7 @@ class CalendarPEWeekly(BaseStrategy):
                 return True
         return False
 
-    def _parse_position(self, p):
-        """
-        Robustly extract attributes from Upstox PositionData object.
-        Handles missing keys and schema variations.
-        """
-        # Quantity
-        qty = getattr(p, 'net_quantity', getattr(p, 'quantity', 0))
-        
-        # Prices
-        # Logic: 
-        # 1. If 'average_price' (Holdings) is available (non-zero), use it.
-        # 2. Else, calculate Break-Even Price from 'buy_value' and 'sell_value' / net_qty.
-        #    This accounts for intraday scalps affecting the cost basis of the remaining position.
-        
-        avg_price = getattr(p, 'average_price', 0.0)
-        try: avg_price = float(avg_price)
-        except: avg_price = 0.0
-
-        buy_val = getattr(p, 'buy_value', 0.0)
-        sell_val = getattr(p, 'sell_value', 0.0)
-        try: buy_val = float(buy_val)
-        except: buy_val = 0.0
-        try: sell_val = float(sell_val)
-        except: sell_val = 0.0
-
-        calculated_price = 0.0
-        if qty != 0:
-            calculated_price = abs(buy_val - sell_val) / abs(qty)
-
-        final_price = 0.0
-        if avg_price > 0:
-            final_price = avg_price
-        elif calculated_price > 0:
-            final_price = calculated_price
-        else:
-            # Fallbacks
-            if qty > 0:
-                final_price = getattr(p, 'day_buy_price', 0.0)
-                if final_price == 0.0: final_price = getattr(p, 'buy_price', 0.0)
-            else:
-                final_price = getattr(p, 'day_sell_price', 0.0)
-                if final_price == 0.0: final_price = getattr(p, 'sell_price', 0.0)
-        
-        # Assign to buy/sell price based on direction
-        buy_price = 0.0
-        sell_price = 0.0
-        
-        if qty > 0:
-            buy_price = final_price
-        elif qty < 0:
-            sell_price = final_price
-
-        # Token & Symbol
-        token = str(getattr(p, 'instrument_token', '')).upper()
-        symbol = str(getattr(p, 'trading_symbol', getattr(p, 'tradingsymbol', ''))).upper()
-        
-        # Strike & Expiry (Fallback if missing)
-        strike = getattr(p, 'strike_price', 0.0)
-        expiry = str(getattr(p, 'expiry', 'N/A'))
-        
-        # Safe float conversion
-        try: strike = float(strike)
-        except: strike = 0.0
-
-        # FALLBACK: If strike is 0.0, attempt to parse from trading_symbol
-        # Expected formats: 'NIFTY26JAN26150PE', 'NIFTY 23 JAN 26150 PE'
-        if strike == 0.0 and symbol:
-            import re
-            # Regex to find the strike price (5 digits) followed by PE/CE
-            # Example: NIFTY26010626150PE or NIFTY26JAN26150PE
-            # Looking for 5 digits before PE/CE
-            match = re.search(r'(\d{5})(?:PE|CE)', symbol)
-            if match:
-                try:
-                    strike = float(match.group(1))
-                except:
-                    pass
-
-        return {
-            'qty': qty,
-            'buy_price': buy_price,
-            'sell_price': sell_price,
-            'token': token,
-            'symbol': symbol,
-            'strike': strike,
-            'expiry': expiry,
-            'obj': p # Keep original object for reference
-        }
-
-    def pull_from_broker(self, broker_positions, master_df=None, silent=False):
+    def pull_from_broker(self, broker_positions, master=None, silent=False):
         """
         Robustly identify weekly and monthly legs from broker portfolio.
         Expects: 1 Short Nifty Put (Weekly) and 1 Long Nifty Put (Monthly).
@@ -934,36 +842,22 @@ class CalendarPEWeekly(BaseStrategy):
         existing_weekly = self.weekly_position
         existing_monthly = self.monthly_position
         
+        # Parsed once per tick by the loop's PositionSnapshot; raw PositionData (startup sync) is parsed here
         nifty_puts = []
-        for p in broker_positions:
-            data = self._parse_position(p)
-            
-            if data['qty'] == 0: continue
+        for data in parse_positions(broker_positions):
+            if data.qty == 0: continue
             
             # Match NIFTY or indexing markers
-            if 'NIFTY' in data['token'] or 'NIFTY' in data['symbol']:
-                # Attach parsed data to object for easier sorting later
-                p._parsed = data 
-                
-                # Try to resolve N/A expiry from Master DF
-                if p._parsed['expiry'] == 'N/A' and master_df is not None:
-                    try:
-                        key = p._parsed['token'] # token is the instrument_key here
-                        # Check if key exists in master_df['instrument_key']
-                        match = master_df[master_df['instrument_key'] == key]
-                        if not match.empty:
-                            p._parsed['expiry'] = str(match.iloc[0]['expiry_dt'])
-                    except Exception as e:
-                        print(f"Error resolving expiry from master: {e}")
-
-                nifty_puts.append(p)
+            if 'NIFTY' in data.token or 'NIFTY' in data.symbol:
+                # Try to resolve N/A expiry from the instrument master
+                nifty_puts.append(resolve_expiry(data, master))
         
         if not nifty_puts:
             return False
             
         # Group by side
-        sell_legs = [p for p in nifty_puts if p._parsed['qty'] < 0]
-        buy_legs = [p for p in nifty_puts if p._parsed['qty'] > 0]
+        sell_legs = [p for p in nifty_puts if p.qty < 0]
+        buy_legs = [p for p in nifty_puts if p.qty > 0]
         
         if not sell_legs and not buy_legs:
             return False
@@ -971,9 +865,8 @@ class CalendarPEWeekly(BaseStrategy):
         # Identify Weekly (Earliest Expiry Sell Leg)
         if sell_legs:
             # Sort by expiry if available, else trading_symbol. Use parsed data.
-            sell_legs.sort(key=lambda x: str(x._parsed['expiry']) if x._parsed['expiry'] != 'N/A' else x._parsed['symbol'])
-            w = sell_legs[0]
-            d = w._parsed
+            sell_legs.sort(key=lambda x: str(x.expiry) if x.expiry != 'N/A' else x.symbol)
+            d = sell_legs[0]._asdict()
             
             # Detect Change
             is_new = False
@@ -1011,14 +904,13 @@ class CalendarPEWeekly(BaseStrategy):
             # STABILITY FIX: If we generally have multiple monthly legs, prefer the one we already track.
             def monthly_sort_key(x):
                 # Primary: Is this our existing leg? (Push to front)
-                is_existing = 1 if (self.monthly_position and x._parsed['token'] == self.monthly_position['instrument_key']) else 0
+                is_existing = 1 if (self.monthly_position and x.token == self.monthly_position['instrument_key']) else 0
                 # Secondary: Expiry (Later is better)
-                expiry_val = str(x._parsed['expiry']) if x._parsed['expiry'] != 'N/A' else x._parsed['symbol']
+                expiry_val = str(x.expiry) if x.expiry != 'N/A' else x.symbol
                 return (is_existing, expiry_val)
 
             buy_legs.sort(key=monthly_sort_key, reverse=True)
-            m = buy_legs[0]
-            d = m._parsed
+            d = buy_legs[0]._asdict()
             
             # Detect Change
             is_new = False
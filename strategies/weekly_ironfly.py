@@ -3,6 +3,8 @@ from datetime import datetime
 from colorama import init, Fore, Style
 from trade_logger import TradeJournal
 from base_strategy import BaseStrategy
+from position_snapshot import parse_positions, resolve_expiry
+from chain_index import index_for
 
 # Initialize colorama for Windows support
 init(autoreset=True)
@@ -191,8 +193,9 @@ class WeeklyIronfly(BaseStrategy):
         
         # ATOMIC CHECK: Verify all legs exist in chain before placing any orders
         legs_data = []
+        idx = index_for(weekly_chain)
         for i, strike in enumerate(strikes):
-            opt = next((x for x in weekly_chain if x['strike'] == strike and x['type'] == 'p'), None)
+            opt = idx.exact_strike('p', strike)
             if not opt:
                 self.log(f"ERROR: Cannot find Put option for Leg {i+1} at strike {strike}. Aborting entry.")
                 return
@@ -282,8 +285,8 @@ class WeeklyIronfly(BaseStrategy):
         # Find Call options at adjustment strike
         # Sell: Same expiry as butterfly (current_week_chain)
         # Buy: Next week's expiry (next_week_chain)
-        ce_this_week = next((x for x in current_week_chain if x['strike'] == adj_strike and x['type'] == 'c'), None)
-        ce_next_week = next((x for x in next_week_chain if x['strike'] == adj_strike and x['type'] == 'c'), None)
+        ce_this_week = index_for(current_week_chain).exact_strike('c', adj_strike)
+        ce_next_week = index_for(next_week_chain).exact_strike('c', adj_strike)
 
         if ce_this_week and ce_next_week:
             self.log(f"Executing Call Calendar @ Strike {adj_strike}")
@@ -333,39 +336,36 @@ class WeeklyIronfly(BaseStrategy):
             if not ce_next_week:
                 self.log(f"  Missing: CE {adj_strike} (Next Week)")
 
-    def pull_from_broker(self, broker_positions, master_df=None):
+    def pull_from_broker(self, broker_positions, master=None, silent=False):
         """
         Robustly identify existing butterfly legs from broker portfolio.
         Allows for partial position discovery.
         """
-        self.log(f"PULLING TRADES for {self.name}...")
+        if not silent:
+            self.log(f"PULLING TRADES for {self.name}...")
         
         # Filter Nifty Puts Broadly
         nifty_puts = []
-        for p in broker_positions:
-            data = self._parse_position(p)
-            
-            if data['qty'] == 0: continue
+        for data in parse_positions(broker_positions):
+            if data.qty == 0: continue
             
             # Match NIFTY or indexing markers
-            if 'NIFTY' in data['token'] or 'NIFTY' in data['symbol']:
-                p._parsed = data
-                nifty_puts.append(p)
+            if 'NIFTY' in data.token or 'NIFTY' in data.symbol:
+                nifty_puts.append(resolve_expiry(data, master))
         
         if not nifty_puts:
             return False
             
-        sell_legs = [p for p in nifty_puts if p._parsed['qty'] < 0]
-        buy_legs = [p for p in nifty_puts if p._parsed['qty'] > 0]
+        sell_legs = [p for p in nifty_puts if p.qty < 0]
+        buy_legs = [p for p in nifty_puts if p.qty > 0]
         
         self.positions = []
         
         # 1. Identify Main Short (Latest Expiry Sell Leg)
         if sell_legs:
             # Sort by qty desc (main legs should have higher qty or equal)
-            sell_legs.sort(key=lambda x: abs(x._parsed['qty']), reverse=True)
-            l2 = sell_legs[0]
-            d = l2._parsed
+            sell_legs.sort(key=lambda x: abs(x.qty), reverse=True)
+            d = sell_legs[0]._asdict()
             
             self.positions.append({
                 'instrument_key': d['token'],
@@ -382,11 +382,10 @@ class WeeklyIronfly(BaseStrategy):
         # 2. Identify Buy Hedges
         if buy_legs:
             # Sort by strike desc
-            buy_legs.sort(key=lambda x: x._parsed['strike'], reverse=True)
+            buy_legs.sort(key=lambda x: x.strike, reverse=True)
             
             # Leg 1 (Higher strike)
-            l1 = buy_legs[0]
-            d1 = l1._parsed
+            d1 = buy_legs[0]._asdict()
             
             self.positions.append({
                 'instrument_key': d1['token'],
@@ -402,8 +401,7 @@ class WeeklyIronfly(BaseStrategy):
             
             # Leg 3 (Lower strike) - only if we have at least 2 buy legs
             if len(buy_legs) >= 2:
-                l3 = buy_legs[-1] # Lowest strike
-                d3 = l3._parsed
+                d3 = buy_legs[-1]._asdict() # Lowest strike
                 
                 # Ensure it's not the same as l1
                 if d3['token'] != d1['token']:
@@ -450,8 +448,8 @@ class WeeklyIronfly(BaseStrategy):
     def save_state(self):
         super().save_current_state({'positions': self.positions, 'is_adjusted': self.is_adjusted})
 
-    def load_previous_state(self):
-        state = super().load_previous_state()
+    def load_previous_state(self, pull=True):
+        state = super().load_previous_state(pull=pull)
         if state:
             self.positions = state.get('positions', [])
             self.is_adjusted = state.get('is_adjusted', False)
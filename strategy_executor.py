@@ -0,0 +1,237 @@
+import queue
+import threading
+import time
+from types import MappingProxyType
+import config
+from position_snapshot import PositionView
+from colorama import Fore, Style
+
+
+CHAIN_FIELDS = ('cw_chain', 'nw_chain', 'm_chain')
+
+
+def freeze(market_data):
+    """
+    Read-only copy of one tick's market data, so a strategy still busy with an older tick never sees the next one
+    being assembled, and can't write into anything the loop or another worker reads:
+    - the top level, quotes and greeks are copied into read-only mappings, broker_positions into a tuple
+    - vol_surface: a copy holding this tick's fitted slices (the loop refits the shared one every tick)
+    - chains: their lazy views are built here, in the loop thread, so workers only read them
+    - position_snapshot is left out: the loop keeps updating it, and changes_for() writes to it. Each worker gets
+      its own 'position_view' instead (see for_strategy).
+    """
+    snapshot = dict(market_data)
+    snapshot.pop('position_snapshot', None)
+    for field in ('quotes', 'greeks'):
+        if isinstance(snapshot.get(field), (dict, MappingProxyType)):
+            snapshot[field] = MappingProxyType(dict(snapshot[field]))
+    if isinstance(snapshot.get('broker_positions'), list):
+        snapshot['broker_positions'] = tuple(snapshot['broker_positions'])
+    if hasattr(snapshot.get('vol_surface'), 'frozen'):
+        snapshot['vol_surface'] = snapshot['vol_surface'].frozen()
+    for field in CHAIN_FIELDS:
+        if hasattr(snapshot.get(field), 'prepare'):
+            snapshot[field].prepare()
+    return MappingProxyType(snapshot)
+
+
+def for_strategy(frozen, position_snapshot, name):
+    """One worker's tick: the frozen market data plus its PositionView (delta + positions), taken in the loop thread."""
+    if position_snapshot is None:
+        return frozen
+    return MappingProxyType(dict(frozen, position_view=position_snapshot.view_for(name)))
+
+
+def _carry_changes(dropped, item):
+    """A tick dropped from a busy worker's inbox still had position changes for it: fold them into the newer tick."""
+    old_view, new_view = dropped[1].get('position_view'), item[1].get('position_view')
+    if old_view is None or new_view is None or not old_view.changes:
+        return item
+    changes = dict(old_view.changes)
+    changes.update(new_view.changes)
+    view = PositionView(MappingProxyType(changes), new_view.positions)
+    return (item[0], MappingProxyType(dict(item[1], position_view=view)), item[2])
+
+
+class _Worker:
+    """One strategy's thread and its bounded inbox of ticks (latest wins when full)."""
+    def __init__(self, strategy, queue_size):
+        self.strategy = strategy
+        self.inbox = queue.Queue(maxsize=max(1, queue_size))
+        self.thread = None
+        self.tick = 0               # last tick whose update finished
+        self.started_at = None      # perf_counter of the running update, None when idle
+        self.order_since = None     # (instrument_key, perf_counter) of the order it is waiting on
+        self.overrun_reported = False
+        self.legs = ()              # open_legs() as of its last finished update (read-only dicts)
+        self.held_keys = ()         # held_keys() as of its last finished update
+        self.stats = {'updates': 0, 'dropped': 0, 'errors': 0, 'overruns': 0, 'total_ms': 0.0, 'max_ms': 0.0,
+                      'orders': 0, 'order_ms': 0.0, 'max_order_ms': 0.0}
+
+    def publish(self):
+        """Copies what the loop needs of the strategy's state. Only called while nothing else runs its update."""
+        open_legs = getattr(self.strategy, 'open_legs', None)
+        held_keys = getattr(self.strategy, 'held_keys', None)
+        self.legs = tuple(MappingProxyType(dict(leg)) for leg in (open_legs() if open_legs else ()))
+        self.held_keys = tuple(held_keys() if held_keys else ())
+
+    def offer(self, item):
+        while True:
+            try:
+                self.inbox.put_nowait(item)
+                return
+            except queue.Full:
+                try:
+                    dropped = self.inbox.get_nowait()
+                except queue.Empty:
+                    continue
+                self.stats['dropped'] += 1
+                if item is not None and dropped is not None:    # None: stop() sentinel, no tick to carry into/from
+                    item = _carry_changes(dropped, item)
+
+
+class StrategyExecutor:
+    """
+    Runs every strategy's update() in its own worker thread, so a LIVE order blocking in place_order's fill wait
+    (up to ORDER_FILL_TIMEOUT_SECONDS) only holds up the strategy that placed it; the others, and their max-loss
+    checks, keep getting every tick.
+
+        executor = StrategyExecutor(active_strategies)
+        overruns = executor.run_tick(market_data, place_trade_callback)   # per tick, waits up to the deadline
+
+    Each tick goes to every worker as a frozen snapshot (see freeze) with its own position delta. A busy worker keeps
+    at most STRATEGY_QUEUE_SIZE ticks waiting and drops the oldest (carrying its position changes over), so when its
+    order returns it runs on the latest data, not a backlog. The loop reads a strategy's legs through open_legs() /
+    held_keys() here, as published when its last update finished, never its live attributes.
+    run_tick waits for the workers up to STRATEGY_TICK_DEADLINE_SECONDS and returns the ones still running.
+    With PARALLEL_STRATEGY_EXECUTION off the strategies run one after the other in the loop thread, as before.
+    """
+    def __init__(self, strategies, parallel=None, deadline=None, queue_size=None):
+        self.parallel = getattr(config, 'PARALLEL_STRATEGY_EXECUTION', True) if parallel is None else parallel
+        self.deadline = getattr(config, 'STRATEGY_TICK_DEADLINE_SECONDS', 10) if deadline is None else deadline
+        queue_size = getattr(config, 'STRATEGY_QUEUE_SIZE', 1) if queue_size is None else queue_size
+        self.workers = {s.name: _Worker(s, queue_size) for s in strategies}
+        for worker in self.workers.values():
+            worker.publish()
+        self.tick = 0
+        self._done = threading.Condition()
+        if self.parallel:
+            for worker in self.workers.values():
+                worker.thread = threading.Thread(target=self._loop, args=(worker,), name=f"strategy-{worker.strategy.name}", daemon=True)
+                worker.thread.start()
+
+    def _order_callback(self, worker, order_callback):
+        def place(*args, **kwargs):
+            key = args[0] if args else kwargs.get('instrument_key')
+            worker.order_since = (key, time.perf_counter())
+            try:
+                return order_callback(*args, **kwargs)
+            finally:
+                ms = (time.perf_counter() - worker.order_since[1]) * 1000
+                worker.order_since = None
+                worker.stats['orders'] += 1
+                worker.stats['order_ms'] += ms
+                worker.stats['max_order_ms'] = max(worker.stats['max_order_ms'], ms)
+        return place
+
+    def _run(self, worker, tick, market_data, order_callback):
+        worker.started_at = time.perf_counter()
+        worker.overrun_reported = False
+        try:
+            worker.strategy.update(market_data, self._order_callback(worker, order_callback))
+        except Exception as e:
+            worker.stats['errors'] += 1
+            print(f"{Fore.RED}Error in Strategy {worker.strategy.name}: {e}{Style.RESET_ALL}")
+        finally:
+            try:
+                worker.publish()    # still in the worker thread, before the loop may treat it as idle
+            except Exception as e:
+                print(f"{Fore.RED}Error publishing legs of {worker.strategy.name}: {e}{Style.RESET_ALL}")
+            ms = (time.perf_counter() - worker.started_at) * 1000
+            stats = worker.stats
+            stats['updates'] += 1
+            stats['total_ms'] += ms
+            stats['max_ms'] = max(stats['max_ms'], ms)
+            if ms > self.deadline * 1000 and not worker.overrun_reported:
+                stats['overruns'] += 1
+            with self._done:
+                worker.started_at = None
+                worker.tick = tick
+                self._done.notify_all()
+
+    def _loop(self, worker):
+        while True:
+            item = worker.inbox.get()
+            if item is None:
+                return
+            self._run(worker, *item)
+
+    def run_tick(self, market_data, order_callback):
+        """Hands this tick to every strategy and waits up to the deadline. Returns [(name, seconds running, order key)] still busy."""
+        self.tick += 1
+        frozen = freeze(market_data)
+        positions = market_data.get('position_snapshot')
+        if not self.parallel:
+            for name, worker in self.workers.items():
+                self._run(worker, self.tick, for_strategy(frozen, positions, name), order_callback)
+            return []
+        for name, worker in self.workers.items():
+            worker.offer((self.tick, for_strategy(frozen, positions, name), order_callback))
+        end = time.perf_counter() + self.deadline
+        with self._done:
+            while any(w.tick < self.tick for w in self.workers.values()):
+                remaining = end - time.perf_counter()
+                if remaining <= 0:
+                    break
+                self._done.wait(remaining)
+        return self._overruns()
+
+    def _overruns(self):
+        now = time.perf_counter()
+        late = []
+        for name, worker in self.workers.items():
+            started, order = worker.started_at, worker.order_since
+            if started is None or now - started < self.deadline:
+                continue
+            if not worker.overrun_reported:
+                worker.overrun_reported = True
+                worker.stats['overruns'] += 1
+            late.append((name, now - started, order[0] if order else None))
+        return late
+
+    def busy(self, name):
+        """
+        True until the strategy has finished the latest tick handed to it: inside an update (e.g. waiting for a fill)
+        or with a tick still queued. The loop then leaves its state alone.
+        """
+        worker = self.workers.get(name)
+        return worker is not None and worker.tick < self.tick
+
+    def open_legs(self):
+        """{strategy name: open legs}, as each worker published them when its last update finished."""
+        return {name: list(worker.legs) for name, worker in self.workers.items()}
+
+    def held_keys(self):
+        """instrument_keys every strategy holds, as published when its last update finished."""
+        return [key for worker in self.workers.values() for key in worker.held_keys]
+
+    def publish(self, name):
+        """Re-publishes an idle strategy's legs after the loop thread changed its state (e.g. metadata recovery)."""
+        if not self.busy(name):
+            self.workers[name].publish()
+
+    def stop(self, timeout=5):
+        if not self.parallel:
+            return
+        for worker in self.workers.values():
+            worker.offer(None)
+        for worker in self.workers.values():
+            worker.thread.join(timeout)
+
+    def stats(self):
+        out = {}
+        for name, worker in self.workers.items():
+            s = dict(worker.stats)
+            s['avg_ms'] = s['total_ms'] / s['updates'] if s['updates'] else 0.0
+            out[name] = s
+        return out
@@ -0,0 +1,114 @@
+from bisect import bisect_left, bisect_right
+import pandas as pd
+
+
+class StrikeSeries:
+    """
+    All options of one (underlying, expiry, CE/PE): strikes sorted ascending with parallel
+    instrument_key / trading_symbol lists, so a strike window is a bisect slice.
+    """
+    __slots__ = ('underlying', 'expiry', 'option_type', 'strikes', 'keys', 'trading_symbols', '_frame')
+
+    def __init__(self, underlying, expiry, option_type, strikes, keys, trading_symbols):
+        self.underlying = underlying
+        self.expiry = expiry
+        self.option_type = option_type
+        self.strikes = strikes
+        self.keys = keys
+        self.trading_symbols = trading_symbols
+        self._frame = None
+
+    def __len__(self):
+        return len(self.strikes)
+
+    def bounds(self, lo, hi):
+        """Slice positions of the strikes in [lo, hi]."""
+        return bisect_left(self.strikes, lo), bisect_right(self.strikes, hi)
+
+    def window(self, center, width):
+        """(strikes, instrument_keys) within center ± width."""
+        i, j = self.bounds(center - width, center + width)
+        return self.strikes[i:j], self.keys[i:j]
+
+    def window_keys(self, center, width):
+        i, j = self.bounds(center - width, center + width)
+        return self.keys[i:j]
+
+    def to_frame(self):
+        """Same columns as InstrumentMaster.get_option_symbols (instrument_key, trading_symbol, strike, expiry_dt). Built once."""
+        if self._frame is None:
+            self._frame = pd.DataFrame({
+                'instrument_key': self.keys,
+                'trading_symbol': self.trading_symbols,
+                'strike': self.strikes,
+                'expiry_dt': [self.expiry] * len(self.keys),
+            })
+        return self._frame
+
+    def __repr__(self):
+        return f"StrikeSeries({self.underlying} {self.expiry} {self.option_type}, {len(self)} strikes)"
+
+
+class StrikeIndex:
+    """
+    (underlying, expiry, 'CE'/'PE') -> StrikeSeries for every option in the instrument master,
+    built in one sort + groupby. Replaces per-tick isin() filtering of the option DataFrames.
+
+        keys = index.select_keys('NIFTY', [curr_weekly, next_weekly], atm, 500, extra_keys=held_keys)
+    """
+    def __init__(self, series=None):
+        self._series = series or {}
+
+    def __len__(self):
+        return len(self._series)
+
+    @classmethod
+    def from_master(cls, df, underlyings=None):
+        if df is None or df.empty or 'expiry_dt' not in df.columns:
+            return cls()
+        mask = df['instrument_type'].isin(['CE', 'PE']) & df['expiry_dt'].notna() & df['strike_price'].notna()
+        if underlyings is not None:
+            mask &= df['name'].isin(underlyings)
+        opts = df.loc[mask, ['name', 'expiry_dt', 'instrument_type', 'strike_price', 'instrument_key', 'trading_symbol']]
+        if opts.empty:
+            return cls()
+        opts = opts.sort_values(['name', 'expiry_dt', 'instrument_type', 'strike_price'], kind='mergesort')
+
+        strikes = opts['strike_price'].to_numpy(dtype=float).tolist()
+        keys = opts['instrument_key'].tolist()
+        symbols = opts['trading_symbol'].tolist()
+        series = {}
+        # Groups are contiguous after the sort, so every group is one positional slice
+        for (name, expiry, opt_type), rows in opts.groupby(['name', 'expiry_dt', 'instrument_type'], sort=False, observed=True).indices.items():
+            i, j = rows[0], rows[-1] + 1
+            series[(name, expiry, opt_type)] = StrikeSeries(name, expiry, opt_type, strikes[i:j], keys[i:j], symbols[i:j])
+        return cls(series)
+
+    def get(self, underlying, expiry, option_type):
+        """StrikeSeries for one expiry/type, or None."""
+        return self._series.get((underlying, expiry, option_type))
+
+    def expiries(self, underlying):
+        return sorted({exp for (name, exp, _) in self._series if name == underlying})
+
+    def window_keys(self, underlying, expiry, option_type, center, width):
+        series = self.get(underlying, expiry, option_type)
+        return series.window_keys(center, width) if series is not None else []
+
+    def keys_by_expiry(self, underlying, expiries, center, width, option_types=('PE', 'CE')):
+        """expiry -> set of instrument_keys (both option types) within center ± width."""
+        result = {}
+        for expiry in expiries:
+            if expiry is None:
+                continue
+            keys = result.setdefault(expiry, set())
+            for opt_type in option_types:
+                keys.update(self.window_keys(underlying, expiry, opt_type, center, width))
+        return result
+
+    def select_keys(self, underlying, expiries, center, width, extra_keys=()):
+        """Unique instrument_keys in the strike window of every expiry, plus ad-hoc keys (e.g. held legs far from ATM)."""
+        keys = set(extra_keys)
+        for expiry_keys in self.keys_by_expiry(underlying, expiries, center, width).values():
+            keys |= expiry_keys
+        return list(keys)
@@ -0,0 +1,102 @@
+import hashlib
+import json
+import os
+import time
+import pandas as pd
+
+CACHE_VERSION = 1
+
+# Upstox weekly symbols encode the month as a single character: 1-9, then O/N/D
+WEEKLY_MONTH_CHARS = {i: str(i) for i in range(1, 10)}
+WEEKLY_MONTH_CHARS.update({10: 'O', 11: 'N', 12: 'D'})
+
+
+def file_hash(path, chunk_size=1 << 20):
+    """SHA-1 of a file's contents (identifies one version of the instrument master)."""
+    h = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def build_symbol_map(df, underlyings):
+    """
+    Maps every symbol-style key the quote/greeks APIs may return to the token-style instrument_key:
+      weekly   NSE_FO|NIFTY2610626150PE   -> NSE_FO|NIFTY + YY + M + DD + STRIKE + TYPE
+      monthly  NSE_FO|NIFTY26FEB26200PE   -> NSE_FO|NIFTY + YY + MMM + STRIKE + TYPE
+      trading  NSE_FO|<trading_symbol without spaces>
+    Vectorized over the derivatives of `underlyings` only.
+    """
+    if df is None or df.empty:
+        return {}
+    derivs = df[df['name'].isin(underlyings) & df['expiry_dt'].notna()]
+    if derivs.empty:
+        return {}
+
+    exp = pd.to_datetime(derivs['expiry_dt'])
+    yy = exp.dt.strftime('%y')
+    mmm = exp.dt.strftime('%b').str.upper()
+    dd = exp.dt.strftime('%d')
+    m_char = exp.dt.month.map(WEEKLY_MONTH_CHARS)
+    strike = derivs['strike_price'].astype(float).astype(int).astype(str)
+    name = derivs['name'].astype(str)
+    opt_type = derivs['instrument_type'].astype(str)
+    keys = derivs['instrument_key'].tolist()
+
+    weekly = ("NSE_FO|" + name + yy + m_char + dd + strike + opt_type).tolist()
+    monthly = ("NSE_FO|" + name + yy + mmm + strike + opt_type).tolist()
+    trading = ("NSE_FO|" + derivs['trading_symbol'].astype(str).str.replace(' ', '', regex=False)).tolist()
+
+    symbol_map = dict(zip(weekly, keys))
+    symbol_map.update(zip(monthly, keys))
+    symbol_map.update(zip(trading, keys))
+    return symbol_map
+
+
+class SymbolResolver:
+    """
+    Trading-symbol -> token resolver for one version of the instrument master.
+    The map is persisted next to the master and reused as long as the master file hash and underlyings match.
+    """
+    def __init__(self, symbol_map, master_hash=None):
+        self.symbol_map = symbol_map
+        self.master_hash = master_hash
+
+    def __len__(self):
+        return len(self.symbol_map)
+
+    def resolve(self, key):
+        """Token-style instrument_key for a symbol-style key, or None."""
+        return self.symbol_map.get(key)
+
+    @classmethod
+    def load_or_build(cls, df, master_path, cache_path, underlyings):
+        """Loads the persisted map if it was built from this exact master file, otherwise builds and saves it."""
+        start = time.perf_counter()
+        master_hash = file_hash(master_path) if master_path and os.path.exists(master_path) else None
+        underlyings = sorted(underlyings)
+
+        if master_hash and os.path.exists(cache_path):
+            try:
+                with open(cache_path, 'r') as f:
+                    cached = json.load(f)
+                if (cached.get('version') == CACHE_VERSION and cached.get('master_hash') == master_hash
+                        and cached.get('underlyings') == underlyings):
+                    print(f"Symbol map loaded from cache ({len(cached['map'])} symbols, {(time.perf_counter() - start) * 1000:.0f} ms).")
+                    return cls(cached['map'], master_hash)
+            except (ValueError, KeyError, OSError) as e:
+                print(f"Symbol map cache unreadable ({e}). Rebuilding...")
+
+        symbol_map = build_symbol_map(df, underlyings)
+        if master_hash:
+            try:
+                tmp_path = cache_path + '.tmp'
+                with open(tmp_path, 'w') as f:
+                    json.dump({'version': CACHE_VERSION, 'master_hash': master_hash,
+                               'underlyings': underlyings, 'map': symbol_map}, f)
+                os.replace(tmp_path, cache_path)
+            except OSError as e:
+                print(f"Could not persist symbol map: {e}")
+        print(f"Symbol map built ({len(symbol_map)} symbols, {(time.perf_counter() - start) * 1000:.0f} ms).")
+        return cls(symbol_map, master_hash)
@@ -0,0 +1,95 @@
+import unittest
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+
+from chain_index import ChainIndex, index_for
+from option_chain import OptionChain
+
+
+def make_chain(strikes, types, deltas, ivs=None, calculated=None, expiry='2026-11-09'):
+    n = len(strikes)
+    ivs = ivs if ivs is not None else [0.15] * n
+    calculated = calculated if calculated is not None else [np.nan] * n
+    keys = [f'NSE_FO|{i}' for i in range(n)]
+    return OptionChain(keys, strikes, types, [10.0] * n, ivs, [7 / 365] * n, [expiry] * n, deltas, calculated)
+
+
+def scan_delta(rows, option_type, target, round_only=False, require_iv=False):
+    """The linear scan the strategies used before the index."""
+    best, min_diff = None, float('inf')
+    for opt in rows:
+        if opt['type'] != option_type or (round_only and int(opt['strike']) % 100 != 0):
+            continue
+        if require_iv and opt['iv'] <= 0:
+            continue
+        delta = opt['delta'] if opt['delta'] == opt['delta'] else opt['calculated_delta']
+        diff = abs(abs(delta) - target)
+        if diff < min_diff:
+            best, min_diff = opt, diff
+    return best
+
+
+def scan_strike(rows, option_type, target):
+    best, min_diff = None, float('inf')
+    for opt in rows:
+        if opt['type'] == option_type and abs(opt['strike'] - target) < min_diff:
+            best, min_diff = opt, abs(opt['strike'] - target)
+    return best
+
+
+class TestChainIndex(unittest.TestCase):
+    def test_matches_linear_scans(self):
+        rng = np.random.default_rng(3)
+        strikes = rng.permutation(np.arange(23000, 25050, 50)).astype(float)
+        types = rng.choice(['c', 'p'], len(strikes)).tolist()
+        deltas = np.round(rng.uniform(-1, 1, len(strikes)), 2)     # rounded: plenty of ties
+        ivs = np.where(rng.random(len(strikes)) < 0.2, 0.0, 0.15)
+        chain = make_chain(strikes, types, deltas, ivs)
+        rows = chain.rows()
+        idx = index_for(chain)
+        for target in np.linspace(0.0, 1.0, 41):
+            for t in ('c', 'p'):
+                for round_only in (False, True):
+                    for require_iv in (False, True):
+                        self.assertIs(idx.nearest_delta(t, target, round_only=round_only, require_iv=require_iv),
+                                      scan_delta(rows, t, target, round_only, require_iv))
+        for target in range(22800, 25300, 25):
+            self.assertIs(idx.nearest_strike('p', target), scan_strike(rows, 'p', target))
+            self.assertIs(idx.nearest_strike('c', target), scan_strike(rows, 'c', target))
+
+    def test_shared_per_chain_and_plain_lists(self):
+        chain = make_chain([24000.0, 24050.0], ['p', 'p'], [np.nan, -0.45], calculated=[-0.52, -0.4])
+        self.assertIs(index_for(chain), index_for(chain))          # built once per chain (tick)
+        self.assertEqual(index_for(chain).nearest_delta('p', 0.5)['strike'], 24000.0)   # calculated delta fallback
+        rows = [{'strike': 24000, 'type': 'c', 'delta': 0.5, 'iv': 0.1}, {'strike': 24100, 'type': 'c', 'delta': 0.4, 'iv': 0.1}]
+        self.assertIs(index_for(rows).by_distance('c', 24020, 60), rows[1])
+        self.assertIsNone(index_for([]).nearest_delta('p', 0.5))
+        self.assertIsNone(index_for(rows).exact_strike('c', 24050))
+        self.assertIs(index_for(rows).exact_strike('c', 24100.0), rows[1])
+
+    def test_expiry_filter_and_round_mask(self):
+        a = make_chain([24000.0, 24050.0], ['p', 'p'], [-0.5, -0.52], expiry='2026-11-09')
+        b = make_chain([24100.0], ['p'], [-0.5], expiry='2026-11-16')
+        rows = a.rows() + b.rows()
+        idx = ChainIndex.from_chain(rows)
+        self.assertEqual(idx.nearest_delta('p', 0.52, expiry='2026-11-16')['strike'], 24100.0)
+        self.assertEqual(idx.nearest_delta('p', 0.52, round_only=True)['strike'], 24000.0)
+        self.assertTrue(idx.has_round('p'))
+        self.assertFalse(idx.has_round('c'))
+
+    def test_calendar_selection_uses_index(self):
+        from strategies.calendar_pe_weekly import CalendarPEWeekly
+        with patch('strategies.calendar_pe_weekly.EventLogger'), patch('strategies.calendar_pe_weekly.TradeJournal'):
+            strat = CalendarPEWeekly()
+        strat.save_current_state = MagicMock()
+        chain = make_chain([23900.0, 23950.0, 24000.0, 24050.0], ['p'] * 4, [-0.42, -0.47, -0.5, -0.55],
+                           ivs=[0.15, 0.15, 0.0, 0.15])
+        with patch('config.PREFER_ROUND_STRIKES', False):
+            self.assertEqual(strat.select_strike_by_delta(24010, chain, 0.5)['strike'], 23950.0)   # zero IV skipped
+        self.assertEqual(strat.select_strike_by_delta(24010, chain, 0.5, force_atm=True)['strike'], 24000.0)
+        self.assertEqual(strat.select_strike_by_delta(24010, chain, 0.5, force_round=True)['strike'], 23900.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+import unittest
+from datetime import date
+
+import pandas as pd
+
+from expiry_calendar import ExpiryCalendar
+
+# Tuesday weeklies; Jan 27 is the January monthly. Dec 30 2025 / Jan 6 around the year turn.
+EXPIRIES = [date(2025, 12, 23), date(2025, 12, 30), date(2026, 1, 6), date(2026, 1, 13), date(2026, 1, 20),
+            date(2026, 1, 27), date(2026, 2, 3), date(2026, 2, 10), date(2026, 2, 24), date(2026, 3, 30)]
+
+
+class TestExpiryCalendar(unittest.TestCase):
+    def setUp(self):
+        self.cal = ExpiryCalendar(list(reversed(EXPIRIES)) + EXPIRIES[:2], holidays=['2026-01-26'])
+
+    def test_weeklies_and_skip_today(self):
+        self.assertEqual(self.cal.upcoming(date(2026, 2, 11)), [date(2026, 2, 24), date(2026, 3, 30)])
+        self.assertEqual(self.cal.weeklies(date(2026, 1, 8)), (date(2026, 1, 13), date(2026, 1, 20)))
+        self.assertEqual(self.cal.weeklies(date(2026, 1, 13)), (date(2026, 1, 13), date(2026, 1, 20)))
+        self.assertEqual(self.cal.weeklies(date(2026, 1, 13), skip_today=True), (date(2026, 1, 20), date(2026, 1, 27)))
+        self.assertEqual(self.cal.weeklies(date(2026, 3, 1)), (date(2026, 3, 30), None))
+
+    def test_monthly_queries(self):
+        self.assertEqual(self.cal.monthly(2026, 1), date(2026, 1, 27))
+        self.assertEqual(self.cal.first_of_month(2026, 1), date(2026, 1, 6))
+        self.assertIsNone(self.cal.monthly(2026, 4))
+        self.assertEqual(self.cal.monthly_after(date(2025, 12, 30), 1), date(2026, 1, 27))   # across the year end
+        self.assertEqual(self.cal.monthly_after(date(2025, 12, 30), 2), date(2026, 2, 24))
+        self.assertEqual(self.cal.first_of_month_after(date(2025, 12, 1), 1), date(2026, 1, 6))
+        self.assertEqual(self.cal.month_expiries(2026, 2), [date(2026, 2, 3), date(2026, 2, 10), date(2026, 2, 24)])
+
+        self.assertTrue(self.cal.is_last_expiry_of_month(date(2026, 1, 27)))
+        self.assertTrue(self.cal.is_last_expiry_of_month(date(2026, 3, 30)))
+        self.assertFalse(self.cal.is_last_expiry_of_month(date(2026, 1, 20)))
+        self.assertFalse(self.cal.is_last_expiry_of_month(date(2026, 1, 28)))   # not an expiry at all
+
+    def test_holiday_aware_pre_expiry(self):
+        # Monday Jan 26 is a holiday: Friday Jan 23 is T-1 of the Jan 27 monthly
+        self.assertEqual(self.cal.next_trading_day(date(2026, 1, 23)), date(2026, 1, 27))
+        self.assertTrue(self.cal.is_next_trading_day_monthly_expiry(date(2026, 1, 23)))
+        self.assertFalse(self.cal.is_next_trading_day_monthly_expiry(date(2026, 1, 19)))   # Jan 20 is a weekly
+        no_holiday = ExpiryCalendar(EXPIRIES, holidays=[])
+        self.assertFalse(no_holiday.is_next_trading_day_monthly_expiry(date(2026, 1, 23)))
+        self.assertTrue(no_holiday.is_next_trading_day_monthly_expiry(date(2026, 1, 26)))
+
+    def test_from_master_uses_option_expiries_only(self):
+        df = pd.DataFrame([
+            {'name': 'NIFTY', 'instrument_type': 'PE', 'expiry_dt': date(2026, 1, 13)},
+            {'name': 'NIFTY', 'instrument_type': 'CE', 'expiry_dt': date(2026, 1, 13)},
+            {'name': 'NIFTY', 'instrument_type': 'FUT', 'expiry_dt': date(2026, 1, 29)},
+            {'name': 'NIFTY', 'instrument_type': 'PE', 'expiry_dt': None},
+            {'name': 'BANKNIFTY', 'instrument_type': 'PE', 'expiry_dt': date(2026, 1, 27)},
+        ])
+        self.assertEqual(ExpiryCalendar.from_master(df, 'NIFTY').expiries, [date(2026, 1, 13)])
+        self.assertEqual(len(ExpiryCalendar.from_master(None, 'NIFTY')), 0)
+
+    def test_run_loop_expiries_roll_to_the_next_day(self):
+        from unittest.mock import patch
+        from run_strategy import derive_expiries
+        with patch('builtins.print'):
+            day1 = derive_expiries(self.cal, date(2026, 1, 23), needs_monthly=True)
+            day2 = derive_expiries(self.cal, date(2026, 1, 27), needs_monthly=True)   # multi-day run, monthly expiry day
+        self.assertEqual((day1['curr_weekly'], day1['monthly_expiry']), (date(2026, 1, 27), date(2026, 2, 24)))
+        self.assertTrue(day1['is_day_before_monthly_expiry'])
+        self.assertFalse(day1['is_expiry_today'])
+        self.assertEqual((day2['curr_weekly'], day2['next_weekly']), (date(2026, 2, 3), date(2026, 2, 10)))
+        self.assertTrue(day2['expiry_skipped'] and day2['is_expiry_today'])
+        self.assertFalse(day2['is_day_before_monthly_expiry'])
+        with patch('builtins.print'):
+            self.assertIsNone(derive_expiries(self.cal, date(2026, 3, 1), needs_monthly=False))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,149 @@
+import os
+import shutil
+import subprocess
+import tempfile
+import time
+import unittest
+from unittest.mock import patch
+
+import config
+import git_utils
+from git_utils import GitSyncWorker
+
+
+def git(cwd, *args):
+    return subprocess.run(["git", *args], cwd=cwd, check=True, capture_output=True, text=True).stdout
+
+
+@unittest.skipUnless(shutil.which("git"), "git not installed")
+class TestGitSyncWorker(unittest.TestCase):
+    """A local bare repo is the remote; the work tree is a clone of it."""
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.remote = os.path.join(self.tmp, 'remote.git')
+        self.work = os.path.join(self.tmp, 'work')
+        git(self.tmp, 'init', '--bare', '-b', 'main', self.remote)
+        git(self.tmp, 'clone', self.remote, self.work)
+        for args in (('config', 'user.email', 'algo@example.com'), ('config', 'user.name', 'algo'),
+                     ('checkout', '-b', 'main'), ('commit', '--allow-empty', '-m', 'init'), ('push', 'origin', 'main')):
+            git(self.work, *args)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def write(self, name, text):
+        path = os.path.join(self.work, name)
+        with open(path, 'w') as f:
+            f.write(text)
+        return path
+
+    def push_from_other_machine(self, name, text):
+        other = os.path.join(self.tmp, 'other')
+        if not os.path.isdir(other):
+            git(self.tmp, 'clone', '-b', 'main', self.remote, other)
+            git(other, 'config', 'user.email', 'other@example.com')
+            git(other, 'config', 'user.name', 'other')
+        git(other, 'pull', 'origin', 'main')
+        with open(os.path.join(other, name), 'w') as f:
+            f.write(text)
+        for args in (('add', name), ('commit', '-m', f'other: {name}'), ('push', 'origin', 'main')):
+            git(other, *args)
+
+    def commit_tracked(self, name, text):
+        self.write(name, text)
+        for args in (('add', name), ('commit', '-m', name), ('push', 'origin', 'main')):
+            git(self.work, *args)
+
+    def remote_log(self):
+        return git(self.remote, 'log', '--format=%s', 'main').splitlines()
+
+    def worker(self, interval):
+        return GitSyncWorker(repo_dir=self.work, interval=interval, remote='origin', branch='main', message='Update strategy state')
+
+    def test_saves_coalesce_into_one_commit(self):
+        worker = self.worker(interval=60)
+        a = self.write('Calendar_live_state.json', '{"v": 1}')
+        b = self.write('trade_log_Calendar.csv', 'a,b\n')
+        t0 = time.perf_counter()
+        for v in range(2, 6):                    # several saves within one tick
+            self.write('Calendar_live_state.json', f'{{"v": {v}}}')
+            self.assertTrue(worker.mark_dirty(a))
+        worker.mark_dirty(b)
+        self.assertLess(time.perf_counter() - t0, 0.5)     # callers never wait for git
+        self.assertEqual(len(self.remote_log()), 1)         # nothing pushed before the interval
+        self.assertTrue(worker.stop(timeout=30))            # shutdown flush
+        log = self.remote_log()
+        self.assertEqual(len(log), 2)
+        self.assertIn('Calendar_live_state.json', log[0])
+        self.assertIn('trade_log_Calendar.csv', log[0])
+        self.assertEqual(git(self.remote, 'show', 'main:Calendar_live_state.json'), '{"v": 5}')
+        stats = worker.stats()
+        self.assertEqual((stats['marks'], stats['commits'], stats['pushes'], stats['pending']), (5, 1, 1, 0))
+        self.assertGreater(stats['last_lag'], 0.0)
+
+    def test_interval_push_and_lag(self):
+        worker = self.worker(interval=0.3)
+        path = self.write('Batman_live_state.json', '{}')
+        worker.mark_dirty(path)
+        self.assertGreater(worker.lag(), 0.0)
+        deadline = time.time() + 20
+        while worker.pushes == 0 and time.time() < deadline:
+            time.sleep(0.05)
+        self.assertEqual(worker.pushes, 1)
+        self.assertEqual(worker.lag(), 0.0)
+        self.assertGreaterEqual(worker.last_lag, 0.3)
+        worker.mark_dirty(path)                  # unchanged file: pushed, but no empty commit
+        self.assertTrue(worker.flush(timeout=20))
+        self.assertEqual((worker.commits, len(self.remote_log())), (1, 2))
+        worker.stop()
+
+    def test_only_state_files_and_logs(self):
+        worker = self.worker(interval=60)
+        self.assertFalse(worker.mark_dirty(self.write('notes.txt', 'x')))
+        self.assertEqual(worker.pending(), 0)
+        self.assertTrue(worker.flush(timeout=1))
+
+    def test_failed_push_keeps_files_dirty(self):
+        worker = GitSyncWorker(repo_dir=self.work, interval=60, remote='nowhere', branch='main', message='m')
+        path = self.write('Ironfly_live_state.json', '{}')
+        worker.mark_dirty(path)
+        self.assertFalse(worker.flush(timeout=20))
+        self.assertEqual((worker.failures, worker.pending()), (1, 1))
+        self.assertGreater(worker.lag(), 0.0)
+        worker.remote = 'origin'                 # remote reachable again
+        self.assertTrue(worker.stop(timeout=20))
+        self.assertEqual(len(self.remote_log()), 2)
+
+    def test_retry_rebase_keeps_other_dirty_state_files(self):
+        self.commit_tracked('Batman_live_state.json', '{"v": 1}')
+        self.push_from_other_machine('Ironfly_live_state.json', '{"other": 1}')
+        worker = self.worker(interval=60)
+        worker.mark_dirty(self.write('Calendar_live_state.json', '{"v": 1}'))
+        self.write('Batman_live_state.json', '{"v": 2}')    # saved after the batch was taken, not in it
+        self.assertTrue(worker.stop(timeout=30))
+        self.assertEqual((worker.failures, worker.pushes), (0, 1))
+        self.assertEqual(git(self.remote, 'show', 'main:Calendar_live_state.json'), '{"v": 1}')
+        with open(os.path.join(self.work, 'Batman_live_state.json')) as f:
+            self.assertEqual(f.read(), '{"v": 2}')              # still modified, next batch pushes it
+
+    def test_module_pull_and_push(self):
+        """sync_pull / sync_push (startup pull, GIT_SYNC_ASYNC=False) run git from the current directory."""
+        cwd = os.getcwd()
+        os.chdir(self.work)
+        self.addCleanup(os.chdir, cwd)
+        for p in (patch.object(config, 'USE_GIT_STATE_SYNC', True), patch.object(config, 'GIT_REMOTE_NAME', 'origin'),
+                  patch.object(config, 'GIT_BRANCH_NAME', 'main')):
+            p.start()
+            self.addCleanup(p.stop)
+        self.commit_tracked('Batman_live_state.json', '{"v": 1}')
+        self.push_from_other_machine('Ironfly_live_state.json', '{"other": 1}')
+        self.write('Batman_live_state.json', '{"v": 2}')    # local unsaved edit survives the pull
+        self.assertTrue(git_utils.sync_pull())
+        self.assertTrue(os.path.exists(os.path.join(self.work, 'Ironfly_live_state.json')))
+        self.assertTrue(git_utils.sync_push(os.path.join(self.work, 'Batman_live_state.json')))
+        self.assertEqual(git(self.remote, 'show', 'main:Batman_live_state.json'), '{"v": 2}')
+        self.assertTrue(git_utils.sync_push(os.path.join(self.work, 'Batman_live_state.json')))   # nothing to commit
+
+
+if __name__ == '__main__':
+    unittest.main()
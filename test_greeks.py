@@ -0,0 +1,58 @@
+import math
+import unittest
+
+import numpy as np
+from scipy.stats import norm
+
+from bench_greeks import legacy_greeks, make_batch
+from greeks import GREEK_NAMES, _erfc, bs_greeks, calculate_delta, norm_cdf
+from utils import black_scholes_price
+
+R = 0.07
+
+
+class TestVectorizedGreeks(unittest.TestCase):
+    def test_matches_scipy_per_option(self):
+        flags, spot, strikes, tte, iv = make_batch(200)
+        result = bs_greeks(flags, spot, strikes, tte, R, iv)
+        for i in range(len(flags)):
+            expected = legacy_greeks(flags[i], spot, strikes[i], tte[i], R, iv[i])
+            for name, value in zip(GREEK_NAMES, expected):
+                self.assertAlmostEqual(result[name][i], value, places=6, msg=f"{name} of option {i}")
+
+    def test_erf_cdf_tails(self):
+        x = np.array([-30.0, -8.0, -1.0, 0.0, 1.0, 8.0])
+        np.testing.assert_allclose(norm_cdf(x), norm.cdf(x), rtol=1e-12)
+        self.assertAlmostEqual(norm_cdf(1.0), norm.cdf(1.0), places=14)
+        # numpy-only erfc across Cody's three ranges (|x| / sqrt(2) <= 0.46875, <= 4, > 4) and both signs
+        x = np.concatenate([np.linspace(-12.0, 12.0, 4801), [-np.inf, np.inf]])
+        np.testing.assert_allclose(norm_cdf(x), norm.cdf(x), rtol=1e-13, atol=1e-300)
+        x = np.linspace(-6.0, 26.5, 65001)                 # the bound in _erfc's docstring (math.erfc: glibc, ~1 ulp)
+        np.testing.assert_allclose(_erfc(x), [math.erfc(v) for v in x], rtol=1.5e-15, atol=0)
+
+    def test_put_call_parity_and_finite_differences(self):
+        S, K, t, sigma = 24000.0, np.array([23000.0, 24000.0, 25000.0]), 0.05, 0.15
+        call = bs_greeks('c', S, K, t, R, sigma)
+        put = bs_greeks('p', S, K, t, R, sigma)
+        np.testing.assert_allclose(call['price'] - put['price'], S - K * np.exp(-R * t), atol=1e-8)
+        h = 0.01
+        up, down = bs_greeks('c', S + h, K, t, R, sigma), bs_greeks('c', S - h, K, t, R, sigma)
+        np.testing.assert_allclose(call['delta'], (up['price'] - down['price']) / (2 * h), atol=1e-6)
+        np.testing.assert_allclose(call['gamma'], (up['delta'] - down['delta']) / (2 * h), atol=1e-6)
+        vol_up = bs_greeks('c', S, K, t, R, sigma + 1e-5)
+        np.testing.assert_allclose(call['vega'], (vol_up['price'] - call['price']) / 1e-5, rtol=1e-3)
+
+    def test_expired_and_scalar_wrappers(self):
+        g = bs_greeks(['c', 'p', 'c'], 24000.0, [23900.0, 24100.0, 24100.0], 0.0, R, 0.2)
+        np.testing.assert_allclose(g['price'], [100.0, 100.0, 0.0])
+        np.testing.assert_allclose(g['delta'], [1.0, -1.0, 0.0])
+        np.testing.assert_allclose(g['gamma'], 0.0)
+
+        self.assertAlmostEqual(calculate_delta('p', 24000, 23800, 0.04, R, 0.14), bs_greeks('p', 24000, 23800, 0.04, R, 0.14)['delta'])
+        self.assertEqual(calculate_delta('x', 24000, 23800, 0.04, R, 0.14), 0.0)
+        self.assertEqual(calculate_delta('C', 24000, 23800, 0.0, R, 0.14), 1.0)
+        self.assertIsInstance(black_scholes_price('p', 24000, 23800, 0.04, R, 0.14), float)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,96 @@
+import unittest
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+
+from greeks import bs_greeks, calculate_delta
+from greeks_policy import GreeksSourcePolicy
+from option_chain import OptionChain
+
+R = 0.07
+SPOT = 24000.0
+KEYS = [f"NSE_FO|{40000 + i}" for i in range(120)]
+
+
+def make_chain(iv=0.14, tte=7 / 365):
+    strikes = SPOT + 50 * (np.arange(len(KEYS)) // 2 - 30)
+    types = np.where(np.arange(len(KEYS)) % 2 == 0, 'p', 'c')
+    g = bs_greeks(types, SPOT, strikes, tte, R, iv)
+    n = len(KEYS)
+    return OptionChain(KEYS, strikes, types, g['price'], np.full(n, iv), np.full(n, tte), ['2026-10-27'] * n, g['delta'], g['delta'])
+
+
+def broker_greeks(chain, delta_shift=0.0):
+    return {k: {'delta': d + delta_shift, 'theta': -5.0, 'gamma': 0.001, 'vega': 10.0, 'iv': 14.0}
+            for k, d in zip(chain.instrument_key.tolist(), chain.delta.tolist())}
+
+
+class TestGreeksSourcePolicy(unittest.TestCase):
+    def test_modes_pick_broker_keys(self):
+        held = [KEYS[3]]
+        self.assertEqual(GreeksSourcePolicy('broker', r=R).broker_keys(KEYS, held), KEYS)
+        local = GreeksSourcePolicy('local', r=R)
+        self.assertEqual(local.broker_keys(KEYS, held), [])
+
+        hybrid = GreeksSourcePolicy('hybrid', sample_every=5, r=R)
+        self.assertEqual(hybrid.broker_keys(KEYS, held), KEYS)       # tick 0 samples everything
+        for _ in range(4):
+            self.assertEqual(hybrid.broker_keys(KEYS, held), held)   # then held legs only
+        self.assertEqual(hybrid.broker_keys(KEYS, held), KEYS)       # tick 5
+        self.assertEqual(hybrid.stats()['broker_calls_saved'], 4 * 3 - 4)
+        with self.assertRaises(ValueError):
+            GreeksSourcePolicy('exchange')
+
+    def test_local_fill_matches_broker_units(self):
+        chain = make_chain()
+        greeks = {KEYS[0]: {'delta': -0.3}}
+        policy = GreeksSourcePolicy('local', r=R)
+        self.assertEqual(policy.fill_local([chain, OptionChain.empty()], greeks, SPOT), len(KEYS) - 1)
+        self.assertEqual(greeks[KEYS[0]], {'delta': -0.3})
+        g = greeks[KEYS[61]]
+        self.assertEqual(g['source'], 'local')
+        self.assertAlmostEqual(g['delta'], chain.calculated_delta[61])
+        exact = bs_greeks(chain.type[61], SPOT, chain.strike[61], chain.time_to_expiry[61], R, 0.14)
+        self.assertAlmostEqual(g['theta'], exact['theta'] / 365)
+        self.assertAlmostEqual(g['vega'], exact['vega'] / 100)
+        self.assertAlmostEqual(g['iv'], 14.0)                # percent, like broker entries
+        self.assertEqual(GreeksSourcePolicy('broker', r=R).fill_local([chain], {}, SPOT), 0)
+
+    def test_calendar_reads_broker_iv_in_percent(self):
+        from strategies.calendar_pe_weekly import CalendarPEWeekly
+        with patch('strategies.calendar_pe_weekly.EventLogger'), patch('strategies.calendar_pe_weekly.TradeJournal'):
+            strat = CalendarPEWeekly()
+        strat.log = MagicMock()
+        strat.weekly_position = {'instrument_key': KEYS[0], 'strike': 23800.0, 'type': 'p', 'delta': 0.5}
+        strat.update_deltas(SPOT, {'greeks': {KEYS[0]: {'delta': None, 'iv': 14.0}}}, 7 / 365, 30 / 365, 0.30, 0.30)
+        exact = abs(calculate_delta('p', SPOT, 23800.0, 7 / 365, strat.risk_free_rate, 0.14))
+        self.assertAlmostEqual(strat.weekly_position['delta'], exact)
+
+    def test_drift_pins_instruments_and_unpins_them(self):
+        chain = make_chain()
+        policy = GreeksSourcePolicy('hybrid', sample_every=10, drift_tolerance=0.05, r=R)
+        policy.broker_keys(KEYS)
+        greeks = broker_greeks(chain)
+        greeks[KEYS[60]]['delta'] += 0.2
+        self.assertLess(policy.observe([chain], greeks, SPOT), 1e-3)
+        self.assertEqual(policy.pinned, {KEYS[60]})
+        self.assertFalse(policy.in_fallback)
+        self.assertEqual(policy.broker_keys(KEYS, [KEYS[1]]), [KEYS[1], KEYS[60]])
+
+        policy.observe([chain], broker_greeks(chain), SPOT)
+        self.assertEqual(policy.pinned, set())
+
+    def test_broad_drift_falls_back_to_broker(self):
+        chain = make_chain()
+        policy = GreeksSourcePolicy('hybrid', sample_every=10, drift_tolerance=0.05, fallback_ticks=3, r=R)
+        policy.broker_keys(KEYS)
+        policy.observe([chain], broker_greeks(chain, delta_shift=0.1), SPOT)
+        self.assertTrue(policy.in_fallback)
+        for _ in range(2):
+            self.assertEqual(policy.broker_keys(KEYS), KEYS)
+        policy.broker_keys(KEYS)
+        self.assertFalse(policy.in_fallback)
+
+
+if __name__ == '__main__':
+    unittest.main()
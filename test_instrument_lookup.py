@@ -0,0 +1,69 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import date
+from unittest.mock import MagicMock, patch
+
+from instrument_manager import InstrumentMaster
+from strategies import CalendarPEWeekly
+
+FEB_24 = 1771927199000   # 2026-02-24
+FEB_25 = 1772013599000   # 2026-02-25
+
+
+class TestInstrumentLookup(unittest.TestCase):
+    def setUp(self):
+        self.data_dir = tempfile.mkdtemp()
+        records = [
+            {'name': 'NIFTY', 'instrument_type': 'PE', 'instrument_key': 'NSE_FO|40476', 'strike_price': 26200.0,
+             'expiry': FEB_25, 'trading_symbol': 'NIFTY 26200 PE 25 FEB 26', 'lot_size': 65,
+             'freeze_quantity': 1755.0, 'tick_size': 5.0},
+            {'name': 'NIFTY', 'instrument_type': 'PE', 'instrument_key': 'NSE_FO|40477', 'strike_price': 26150.0,
+             'expiry': FEB_24, 'trading_symbol': 'NIFTY 26150 PE 24 FEB 26', 'lot_size': 65,
+             'freeze_quantity': 1755.0, 'tick_size': 5.0},
+            {'name': 'NIFTY', 'instrument_type': 'FUT', 'instrument_key': 'NSE_FO|NIFTY-FUT',
+             'trading_symbol': 'NIFTY FUT', 'segment': 'NSE_FO'},
+        ]
+        with open(os.path.join(self.data_dir, 'NSE_FO.json'), 'w') as f:
+            json.dump(records, f)
+        self.master = InstrumentMaster(data_dir=self.data_dir, auto_refresh=False)
+        self.master.load_master()
+
+    def tearDown(self):
+        shutil.rmtree(self.data_dir, ignore_errors=True)
+
+    def test_lookup_returns_metadata(self):
+        rec = self.master.lookup('NSE_FO|40476')
+        self.assertEqual(rec.name, 'NIFTY')
+        self.assertEqual(rec.expiry, date(2026, 2, 25))
+        self.assertEqual(rec.strike, 26200.0)
+        self.assertEqual(rec.instrument_type, 'PE')
+        self.assertEqual((rec.lot_size, rec.freeze_quantity, rec.tick_size), (65, 1755.0, 5.0))
+        self.assertEqual(rec.trading_symbol, 'NIFTY 26200 PE 25 FEB 26')
+
+    def test_missing_fields_and_unknown_keys(self):
+        rec = self.master.lookup('NSE_FO|NIFTY-FUT')
+        self.assertIsNone(rec.expiry)
+        self.assertIsNone(rec.strike)
+        self.assertIsNone(self.master.lookup('NSE_FO|does-not-exist'))
+
+    def test_pull_from_broker_resolves_expiry_via_lookup(self):
+        with patch('strategies.calendar_pe_weekly.EventLogger'), patch('strategies.calendar_pe_weekly.TradeJournal'):
+            strat = CalendarPEWeekly()
+        strat.save_current_state = MagicMock()
+        short = MagicMock(instrument_token='NSE_FO|NIFTY-W', trading_symbol='NIFTY2622426150PE', quantity=-65,
+                          net_quantity=-65, average_price=80.0, strike_price=26150.0, expiry='N/A')
+        long = MagicMock(instrument_token='NSE_FO|NIFTY-M', trading_symbol='NIFTY26FEB26200PE', quantity=65,
+                         net_quantity=65, average_price=400.0, strike_price=26200.0, expiry='N/A')
+        self.master._key_index['NSE_FO|NIFTY-W'] = self.master._key_index['NSE_FO|40477']
+        self.master._key_index['NSE_FO|NIFTY-M'] = self.master._key_index['NSE_FO|40476']
+
+        strat.pull_from_broker([short, long], master=self.master, silent=True)
+        self.assertEqual(strat.weekly_position['expiry_dt'], '2026-02-24')
+        self.assertEqual(strat.monthly_position['expiry_dt'], '2026-02-25')
+
+
+if __name__ == '__main__':
+    unittest.main()
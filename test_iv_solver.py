@@ -0,0 +1,65 @@
+import unittest
+
+import numpy as np
+
+from bench_iv_solver import make_chain
+from greeks import bs_greeks
+from iv_solver import IVSolver, rational_guess, solve_iv
+from utils import calculate_implied_volatility, calculate_implied_volatility_array
+
+R = 0.07
+
+
+class TestBatchedIVSolver(unittest.TestCase):
+    def test_recovers_vols_across_the_chain(self):
+        strikes = np.arange(22000.0, 26001.0, 250.0)
+        is_call = strikes >= 24000
+        true_iv = 0.12 + 0.5 * np.log(strikes / 24000) ** 2
+        price = bs_greeks(is_call, 24000.0, strikes, 10 / 365, R, true_iv)['price']
+        result = solve_iv(price, 24000.0, strikes, 10 / 365, R, is_call)
+        self.assertTrue(result.converged.all())
+        np.testing.assert_allclose(result.iv, true_iv, atol=1e-4)
+        self.assertLessEqual(result.iterations.mean(), 8)
+        self.assertLess(result.iterations.max(), 20)
+
+        guess = rational_guess(price, 24000.0, strikes, 10 / 365, R, is_call)
+        atm = strikes == 24000
+        self.assertAlmostEqual(guess[atm][0], true_iv[atm][0], delta=0.005)
+
+    def test_floors_missing_and_unsolvable(self):
+        result = solve_iv([np.nan, 50.0, 10.0, 1e6], 24000.0, [24000.0, 23000.0, 24000.0, 24000.0],
+                          [0.05, 0.05, 0.0, 0.05], R, ['p', 'c', 'p', 'c'])
+        self.assertTrue(np.isnan(result.iv[0]))
+        self.assertEqual(result.iv[1], 0.001)   # below intrinsic
+        self.assertEqual(result.iv[2], 0.001)   # expired
+        self.assertEqual(list(result.iterations[:3]), [0, 0, 0])
+        # Above any BS price: bracket runs up to the cap without converging
+        self.assertFalse(result.converged[3])
+        self.assertAlmostEqual(result.iv[3], 10.0, places=6)
+
+    def test_warm_start_cuts_iterations(self):
+        price, spot, strikes, tte, is_call = make_chain(600)
+        keys = [f"NSE_FO|{i}" for i in range(len(price))]
+        solver = IVSolver()
+        first = solver.solve(keys, price, spot, strikes, tte, R, is_call)
+        # Next tick: small spot / vol move, quotes on the 0.05 tick
+        price2 = np.round(bs_greeks(is_call, spot * 1.001, strikes, tte, R, first.iv + 0.001)['price'] / 0.05) * 0.05
+        cold = solve_iv(price2, spot * 1.001, strikes, tte, R, is_call)
+        warm = solver.solve(keys, price2, spot * 1.001, strikes, tte, R, is_call)
+        solved = first.converged & cold.converged
+        np.testing.assert_allclose(warm.iv[solved], cold.iv[solved], atol=1e-4)
+        self.assertLess(warm.iterations[solved].sum(), cold.iterations[solved].sum())
+        stats = solver.stats()
+        self.assertEqual(stats['warm_starts'], int(first.converged.sum()))
+
+    def test_utils_wrappers(self):
+        price = bs_greeks('p', 21000, 21000, 0.05, R, 0.15)['price']
+        self.assertAlmostEqual(calculate_implied_volatility(float(price), 21000, 21000, 0.05, R, 'p'), 0.15, places=4)
+        self.assertEqual(calculate_implied_volatility(900, 21000, 22000, 0.05, R, 'p'), 0.001)
+        ivs = calculate_implied_volatility_array(np.array([float(price), np.nan]), 21000, 21000, 0.05, R, np.array([False, True]))
+        self.assertAlmostEqual(ivs[0], 0.15, places=4)
+        self.assertTrue(np.isnan(ivs[1]))
+
+
+if __name__ == '__main__':
+    unittest.main()
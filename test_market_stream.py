@@ -0,0 +1,120 @@
+import os
+import tempfile
+import time
+import unittest
+
+from feed_replay_server import ReplayFeedServer
+from market_stream import MarketDataStream, QuoteCache, iter_recorded_frames
+
+SPOT_KEY = 'NSE_INDEX|Nifty 50'
+OPTION_KEYS = [f'NSE_FO|{40000 + i}' for i in range(100)]
+
+
+def wait_for(predicate, timeout=5.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+class TestMarketDataStream(unittest.TestCase):
+    def setUp(self):
+        self.server = ReplayFeedServer(ticks_per_second=0, batch_size=50, seed=7).start()
+        self.stream = MarketDataStream(access_token='test_token', url=self.server.url)
+
+    def tearDown(self):
+        self.stream.stop()
+        self.server.stop()
+
+    def test_subscribe_populates_cache(self):
+        self.stream.set_subscriptions([SPOT_KEY] + OPTION_KEYS)
+        self.stream.start()
+        self.assertTrue(self.stream.wait_connected(5))
+        self.assertTrue(wait_for(lambda: len(self.stream.cache) == 101))
+
+        self.assertEqual(self.server.last_headers.get('authorization'), 'Bearer test_token')
+        modes = {r['data']['mode'] for r in self.server.requests if r['method'] == 'sub'}
+        self.assertEqual(modes, {'ltpc', 'option_greeks'})
+
+        spot = self.stream.cache.get(SPOT_KEY)
+        self.assertIsNotNone(spot.last_price)
+        self.assertIsNone(spot.delta)
+
+        greeks = self.stream.cache.greeks_for(OPTION_KEYS)
+        self.assertEqual(len(greeks), 100)
+        self.assertEqual(set(greeks[OPTION_KEYS[0]].keys()), {'delta', 'theta', 'gamma', 'vega', 'iv'})
+
+    def test_subscription_diff(self):
+        self.stream.start()
+        self.assertTrue(self.stream.wait_connected(5))
+        self.stream.set_subscriptions(OPTION_KEYS[:10])
+        added, removed = self.stream.set_subscriptions(OPTION_KEYS[5:15])
+        self.assertEqual(sorted(added), sorted(OPTION_KEYS[10:15]))
+        self.assertEqual(sorted(removed), sorted(OPTION_KEYS[:5]))
+        self.assertTrue(wait_for(lambda: any(r['method'] == 'unsub' for r in self.server.requests)))
+
+    def test_stale_quotes_reported_missing(self):
+        self.stream.set_subscriptions(OPTION_KEYS[:5])
+        self.stream.start()
+        self.assertTrue(wait_for(lambda: len(self.stream.cache) == 5))
+        for key in OPTION_KEYS[:5]:
+            self.stream.cache._quotes[key].updated_at -= 60
+
+        quotes, missing = self.stream.cache.quotes_for(OPTION_KEYS[:5] + ['NSE_FO|UNKNOWN'], max_age=5)
+        # Ticks may refresh some keys meanwhile; the unknown key must always be missing
+        self.assertIn('NSE_FO|UNKNOWN', missing)
+        self.assertEqual(len(quotes) + len(missing), 6)
+
+    def test_reconnect_resubscribes(self):
+        self.stream._backoff = 0.1
+        self.stream.set_subscriptions(OPTION_KEYS[:3])
+        self.stream.start()
+        self.assertTrue(self.stream.wait_connected(5))
+        subs_before = sum(1 for r in self.server.requests if r['method'] == 'sub')
+
+        self.server.drop_connections()
+        self.assertTrue(wait_for(lambda: self.stream.reconnects >= 1, 5))
+        self.assertTrue(wait_for(lambda: sum(1 for r in self.server.requests if r['method'] == 'sub') > subs_before, 5))
+
+    def test_high_tick_rate(self):
+        # Unthrottled replay: the client must keep up with thousands of ticks per second
+        self.stream.set_subscriptions(OPTION_KEYS)
+        self.stream.start()
+        self.assertTrue(wait_for(lambda: len(self.stream.cache) == 100))
+        start_ticks = self.stream.cache.tick_count
+        time.sleep(1.0)
+        ticks_per_second = self.stream.cache.tick_count - start_ticks
+        print(f"Stream throughput: {ticks_per_second} ticks/s")
+        self.assertGreater(ticks_per_second, 2000)
+        self.assertEqual(self.stream.decode_errors, 0)
+
+
+class TestRecordAndReplay(unittest.TestCase):
+    def test_recorded_session_replays(self):
+        path = os.path.join(tempfile.mkdtemp(), 'feed.bin')
+
+        live = ReplayFeedServer(ticks_per_second=0, seed=1, max_frames=200).start()
+        recorder = MarketDataStream(access_token='t', url=live.url, record_path=path)
+        recorder.set_subscriptions(OPTION_KEYS[:20])
+        recorder.start()
+        self.assertTrue(wait_for(lambda: recorder.frames_received >= 100))
+        recorder.stop()
+        live.stop()
+        recorded = list(iter_recorded_frames(path))
+        self.assertGreaterEqual(len(recorded), 100)
+
+        replay = ReplayFeedServer(recording_path=path, ticks_per_second=0).start()
+        cache = QuoteCache()
+        client = MarketDataStream(access_token='t', url=replay.url, cache=cache)
+        client.start()
+        self.assertTrue(wait_for(lambda: client.frames_received >= len(recorded)))
+        self.assertTrue(wait_for(lambda: len(cache) == 20))
+        self.assertEqual(set(cache._quotes.keys()), set(OPTION_KEYS[:20]))
+        client.stop()
+        replay.stop()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+import gzip
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import date
+from unittest.mock import patch
+
+import pandas as pd
+
+import master_loader
+from master_loader import iter_master_records, load_master_frame
+
+FEB_24 = 1771927199000   # 2026-02-24
+
+
+def master_records():
+    records = []
+    for i in range(40):
+        records.append({'name': 'NIFTY', 'instrument_type': 'PE' if i % 2 else 'CE', 'instrument_key': f'NSE_FO|{40000 + i}',
+                        'strike_price': 25000.0 + 50 * (i // 2), 'expiry': FEB_24, 'lot_size': 65, 'freeze_quantity': 1755.0,
+                        'tick_size': 5.0, 'trading_symbol': f'NIFTY {25000 + 50 * (i // 2)} {"PE" if i % 2 else "CE"} 24 FEB 26',
+                        'segment': 'NSE_FO', 'exchange_token': str(40000 + i), 'weekly': True,
+                        'underlying_key': 'NSE_INDEX|Nifty 50'})
+    records.append({'name': 'NIFTY', 'instrument_type': 'FUT', 'instrument_key': 'NSE_FO|NIFTYFUT', 'expiry': FEB_24,
+                    'lot_size': 65, 'trading_symbol': 'NIFTY FUT 24 FEB 26', 'segment': 'NSE_FO'})
+    records.append({'name': 'BANKNIFTY', 'instrument_type': 'PE', 'instrument_key': 'NSE_FO|60000', 'strike_price': 50000.0,
+                    'expiry': FEB_24, 'trading_symbol': 'BANKNIFTY 50000 PE', 'segment': 'NSE_FO'})
+    records.append({'name': 'Nifty 50', 'instrument_type': 'INDEX', 'instrument_key': 'NSE_INDEX|Nifty 50',
+                    'trading_symbol': 'NIFTY', 'segment': 'NSE_INDEX'})
+    return records
+
+
+class TestMasterLoader(unittest.TestCase):
+    def setUp(self):
+        self.data_dir = tempfile.mkdtemp()
+        self.gz_path = os.path.join(self.data_dir, 'NSE_FO.json.gz')
+        self.cache_path = os.path.join(self.data_dir, 'NSE_FO.npz')
+        with gzip.open(self.gz_path, 'wt', encoding='utf-8') as f:
+            json.dump(master_records(), f, indent=1)
+
+    def tearDown(self):
+        shutil.rmtree(self.data_dir, ignore_errors=True)
+
+    def test_streaming_parser_across_chunk_boundaries(self):
+        # Tiny chunks split objects and strings mid-way
+        self.assertEqual(list(iter_master_records(self.gz_path, chunk_size=7)), master_records())
+        plain = os.path.join(self.data_dir, 'NSE_FO.json')
+        with open(plain, 'w') as f:
+            json.dump(master_records(), f)
+        self.assertEqual(list(iter_master_records(plain, chunk_size=64)), master_records())
+
+    def test_filters_and_dtypes(self):
+        df = load_master_frame(self.gz_path, self.cache_path, ['NIFTY'], ['CE', 'PE', 'FUT'])
+        self.assertEqual(len(df), 41)
+        self.assertEqual(set(df['name']), {'NIFTY'})
+        self.assertEqual(str(df['name'].dtype), 'category')
+        self.assertEqual(str(df['instrument_type'].dtype), 'category')
+        self.assertEqual(df['expiry_dt'].iloc[0], date(2026, 2, 24))
+        fut = df[df['instrument_key'] == 'NSE_FO|NIFTYFUT'].iloc[0]
+        self.assertTrue(fut['strike_price'] != fut['strike_price'])  # NaN when the master has no strike
+
+    def test_cache_reused_until_source_or_filters_change(self):
+        first = load_master_frame(self.gz_path, self.cache_path, ['NIFTY'], ['CE', 'PE', 'FUT'])
+        self.assertTrue(os.path.exists(self.cache_path))
+
+        with patch.object(master_loader, 'load_filtered_records', side_effect=AssertionError('re-parsed')):
+            cached = load_master_frame(self.gz_path, self.cache_path, ['NIFTY'], ['FUT', 'PE', 'CE'])
+        pd.testing.assert_frame_equal(cached, first)
+
+        # Different filters -> rebuilt
+        self.assertEqual(len(load_master_frame(self.gz_path, self.cache_path, ['NIFTY', 'BANKNIFTY'], ['PE'])), 21)
+
+        # New master file -> rebuilt
+        with gzip.open(self.gz_path, 'wt', encoding='utf-8') as f:
+            json.dump(master_records()[:10], f)
+        os.utime(self.gz_path, ns=(0, os.stat(self.gz_path).st_mtime_ns + 10**9))
+        self.assertEqual(len(load_master_frame(self.gz_path, self.cache_path, ['NIFTY'], ['CE', 'PE', 'FUT'])), 10)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,143 @@
+import gzip
+import json
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from instrument_manager import InstrumentMaster
+
+FEB_24 = 1771927199000   # 2026-02-24
+MAR_03 = 1772531999000   # 2026-03-03
+
+
+def option(key, strike, opt_type, expiry):
+    return {'name': 'NIFTY', 'instrument_type': opt_type, 'instrument_key': key, 'strike_price': strike,
+            'expiry': expiry, 'lot_size': 65, 'trading_symbol': f'NIFTY {int(strike)} {opt_type}', 'segment': 'NSE_FO'}
+
+
+class _MasterHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        server = self.server
+        server.requests.append(dict(self.headers))
+        if server.fail:
+            self.send_response(500)
+            self.end_headers()
+            return
+        if self.headers.get('If-None-Match') == server.etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+        body = server.body[:len(server.body) // 2] if server.truncate else server.body
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/gzip')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('ETag', server.etag)
+        self.send_header('Last-Modified', 'Mon, 23 Feb 2026 02:00:00 GMT')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class MasterServer:
+    """Local stand-in for the Upstox instrument master URL (gzipped JSON, ETag / 304 support)."""
+    def __init__(self):
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), _MasterHandler)
+        self.httpd.requests = []
+        self.httpd.fail = False
+        self.httpd.truncate = False
+        self.publish([option('NSE_FO|1', 25000.0, 'PE', FEB_24)] + [option(f'NSE_FO|{i}', 25000.0 + 50 * i, 'CE', FEB_24) for i in range(2, 200)])
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address
+        return f"http://{host}:{port}/NSE.json.gz"
+
+    def publish(self, records):
+        self.httpd.body = gzip.compress(json.dumps(records).encode('utf-8'))
+        self.httpd.etag = f'"v{len(self.httpd.requests)}-{len(records)}"'
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class TestMasterRefresh(unittest.TestCase):
+    def setUp(self):
+        self.data_dir = tempfile.mkdtemp()
+        self.server = MasterServer()
+
+    def tearDown(self):
+        self.server.stop()
+        shutil.rmtree(self.data_dir, ignore_errors=True)
+
+    def _master(self):
+        master = InstrumentMaster(data_dir=self.data_dir, master_url=self.server.url, auto_refresh=True)
+        master.load_master()
+        return master
+
+    def test_download_is_cached_without_writing_the_master_file(self):
+        master = self._master()
+        self.assertEqual(master.last_refresh_status, 'downloaded')
+        self.assertEqual(len(master.df), 199)
+        self.assertEqual(master.lookup('NSE_FO|1').strike, 25000.0)
+        self.assertEqual(sorted(os.listdir(self.data_dir)), ['NSE_FO.npz'])
+
+        # Second start on the same day: served from the cache, no request at all
+        again = self._master()
+        self.assertEqual(again.last_refresh_status, 'fresh')
+        self.assertEqual(len(self.server.httpd.requests), 1)
+        self.assertEqual(len(again.df), 199)
+
+    def test_conditional_request_and_swap(self):
+        master = self._master()
+        self.assertFalse(master.refresh_master(force=True))   # unchanged -> 304
+        self.assertEqual(master.last_refresh_status, 'not_modified')
+        self.assertEqual(self.server.httpd.requests[-1].get('If-None-Match'), self.server.httpd.etag)
+        self.assertEqual(self.server.httpd.requests[-1].get('If-Modified-Since'), 'Mon, 23 Feb 2026 02:00:00 GMT')
+
+        # Expiry rollover: new contracts published
+        self.server.publish([option('NSE_FO|900', 26000.0, 'PE', MAR_03), option('NSE_FO|901', 26050.0, 'PE', MAR_03)])
+        old_index = master.strike_index
+        self.assertTrue(master.refresh_master(force=True))
+        self.assertIsNone(master.lookup('NSE_FO|1'))
+        self.assertEqual(str(master.lookup('NSE_FO|900').expiry), '2026-03-03')
+        self.assertIsNot(master.strike_index, old_index)
+        self.assertEqual(master.strike_index.expiries('NIFTY')[0].isoformat(), '2026-03-03')
+
+    def test_failed_refresh_keeps_current_master(self):
+        master = self._master()
+        cache_before = open(os.path.join(self.data_dir, 'NSE_FO.npz'), 'rb').read()
+
+        self.server.publish([option('NSE_FO|900', 26000.0, 'PE', MAR_03)])
+        self.server.httpd.truncate = True
+        self.assertFalse(master.refresh_master(force=True))
+        self.server.httpd.truncate = False
+        self.server.httpd.fail = True
+        self.assertFalse(master.refresh_master(force=True))
+
+        self.assertEqual(master.last_refresh_status, 'failed')
+        self.assertEqual(master.lookup('NSE_FO|1').strike, 25000.0)
+        self.assertEqual(open(os.path.join(self.data_dir, 'NSE_FO.npz'), 'rb').read(), cache_before)
+        # Restart while the server is down: last good download is used
+        self.assertEqual(len(self._master().df), 199)
+
+    def test_refresh_due_once_per_trading_day_before_open(self):
+        master = self._master()
+        master.refreshed_on = None
+        self.assertFalse(master.refresh_due(datetime(2026, 2, 23, 8, 0)))   # Monday, before refresh time
+        self.assertTrue(master.refresh_due(datetime(2026, 2, 23, 8, 30)))
+        self.assertFalse(master.refresh_due(datetime(2026, 2, 22, 9, 0)))   # Sunday
+        master.refreshed_on = datetime(2026, 2, 23).date()
+        self.assertFalse(master.refresh_due(datetime(2026, 2, 23, 9, 0)))
+        self.assertTrue(master.refresh_due(datetime(2026, 2, 24, 8, 45)))
+
+
+if __name__ == '__main__':
+    unittest.main()
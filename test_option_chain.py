@@ -0,0 +1,128 @@
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from unittest.mock import MagicMock, patch
+
+import upstox_client
+from datetime import datetime
+from chain_fixtures import legacy_package_chain, make_chain
+from option_chain import OptionChainProvider, OptionChain, build_chain
+from upstox_wrapper import UpstoxWrapper
+
+WEEKLY = date(2026, 10, 20)
+MONTHLY = date(2026, 10, 27)
+
+
+def chain_response(expiry, strikes, first_token):
+    data = []
+    token = first_token
+    for strike in strikes:
+        sides = []
+        for _ in ('call', 'put'):
+            sides.append(upstox_client.PutCallOptionChainData(
+                instrument_key=f"NSE_FO:{token}",
+                market_data=upstox_client.MarketData(ltp=100.0 + token % 7, oi=5000.0, close_price=99.0),
+                option_greeks=upstox_client.AnalyticsData(delta=0.5, theta=-10.0, gamma=0.001, vega=12.0, iv=14.2)))
+            token += 1
+        data.append(upstox_client.OptionStrikeData(expiry=expiry, strike_price=strike, underlying_key='NSE_INDEX|Nifty 50',
+                                                   call_options=sides[0], put_options=sides[1]))
+    return upstox_client.GetOptionChainResponse(status='success', data=data)
+
+
+class TestPutCallOptionChain(unittest.TestCase):
+    def setUp(self):
+        with patch('config.UPSTOX_ACCESS_TOKEN', 'fake_token'):
+            self.api = UpstoxWrapper()
+        self.api.options_api = MagicMock()
+
+    def test_normalizes_both_sides(self):
+        self.api.options_api.get_put_call_option_chain.return_value = chain_response(WEEKLY, [25000, 25050], 1000)
+        rows = self.api.get_put_call_option_chain('NSE_INDEX|Nifty 50', WEEKLY)
+
+        self.api.options_api.get_put_call_option_chain.assert_called_once_with('NSE_INDEX|Nifty 50', '2026-10-20')
+        self.assertEqual(len(rows), 4)
+        self.assertEqual([r['type'] for r in rows], ['CE', 'PE', 'CE', 'PE'])
+        self.assertEqual(rows[0]['instrument_key'], 'NSE_FO|1000')
+        self.assertEqual(rows[3]['strike'], 25050.0)
+        self.assertEqual(rows[1]['iv'], 14.2)
+
+    def test_failure_returns_none(self):
+        self.api.options_api.get_put_call_option_chain.side_effect = RuntimeError("boom")
+        self.assertIsNone(self.api.get_put_call_option_chain('NSE_INDEX|Nifty 50', WEEKLY))
+
+
+class TestOptionChainProvider(unittest.TestCase):
+    def setUp(self):
+        with patch('config.UPSTOX_ACCESS_TOKEN', 'fake_token'):
+            self.api = UpstoxWrapper()
+        self.api.options_api = MagicMock()
+        self.api.options_api.get_put_call_option_chain.side_effect = lambda key, exp: (
+            chain_response(exp, range(24500, 25550, 50), 1000 if exp == '2026-10-20' else 5000))
+        self.provider = OptionChainProvider(self.api)
+
+    def test_one_call_per_expiry(self):
+        expiry_keys = {WEEKLY: {f"NSE_FO|{t}" for t in range(1000, 1042)},
+                       MONTHLY: {f"NSE_FO|{t}" for t in range(5000, 5042)}}
+        wanted = set().union(*expiry_keys.values())
+        with ThreadPoolExecutor(max_workers=3) as pool:
+            quotes, greeks = self.provider.fetch(expiry_keys, wanted, pool=pool)
+
+        # 84 options across two expiries in two calls (LTP + Greeks would need 1 + 2 chunked calls)
+        self.assertEqual(self.api.options_api.get_put_call_option_chain.call_count, 2)
+        self.assertTrue(wanted <= set(quotes))
+        self.assertTrue(wanted <= set(greeks))
+        self.assertEqual(quotes['NSE_FO|1000'].last_price, 100.0 + 1000 % 7)
+        self.assertEqual(set(greeks['NSE_FO|5000']), {'delta', 'theta', 'gamma', 'vega', 'iv'})
+
+    def test_expiries_without_wanted_keys_are_skipped(self):
+        expiry_keys = {WEEKLY: {"NSE_FO|1000"}, MONTHLY: {"NSE_FO|5000"}}
+        quotes, _ = self.provider.fetch(expiry_keys, {"NSE_FO|5000"})
+        self.assertEqual(self.api.options_api.get_put_call_option_chain.call_count, 1)
+        self.assertIn("NSE_FO|5000", quotes)
+
+
+class TestBuildChain(unittest.TestCase):
+    NOW = datetime(2026, 10, 19, 10, 30)
+
+    def test_matches_legacy_package_chain(self):
+        pe, ce, quotes, greeks = make_chain(n_strikes=40, n_expiries=2)
+        # Broker greeks for a few options only: the rest must go through the IV solver
+        for key in list(quotes)[::7]:
+            greeks[key] = {'delta': -0.42, 'iv': 17.0, 'theta': None, 'gamma': None, 'vega': None}
+        del quotes[pe['instrument_key'].iloc[3]]  # Unquoted options are dropped
+
+        decimal_greeks = {k: dict(g, iv=g['iv'] / 100) for k, g in greeks.items()}
+        old = legacy_package_chain(pe, ce, quotes, decimal_greeks, 24000.0, self.NOW)
+        new = build_chain(pe, ce, quotes, greeks, 24000.0, self.NOW)
+
+        self.assertEqual(len(new), len(old))
+        for a, b in zip(old, new):
+            self.assertEqual(a['instrument_key'], b['instrument_key'])
+            self.assertEqual((a['type'], a['expiry_dt'], a['strike'], a['ltp']), (b['type'], b['expiry_dt'], b['strike'], b['ltp']))
+            self.assertAlmostEqual(a['time_to_expiry'], b['time_to_expiry'], places=12)
+            self.assertAlmostEqual(a['iv'], b['iv'], places=8)
+            self.assertAlmostEqual(a['delta'], b['delta'], places=8)
+            self.assertAlmostEqual(a['calculated_delta'], b['calculated_delta'], places=8)
+
+    def test_broker_iv_percent_becomes_decimal(self):
+        pe, ce, quotes, greeks = make_chain(n_strikes=5, n_expiries=1, broker_greeks=True)
+        chain = build_chain(pe, ce, quotes, greeks, 24000.0, self.NOW)
+        key = chain.instrument_key[0]
+        self.assertAlmostEqual(chain.iv[0], greeks[key]['iv'] / 100, places=12)
+        self.assertTrue(((chain.iv > 0.1) & (chain.iv < 0.3)).all())
+
+    def test_behaves_like_list_of_dicts(self):
+        pe, ce, quotes, greeks = make_chain(n_strikes=5, n_expiries=1)
+        chain = build_chain(pe, ce, quotes, greeks, 24000.0, self.NOW)
+        self.assertTrue(chain)
+        self.assertFalse(OptionChain.empty())
+        self.assertEqual(len(chain + chain), 20)
+        self.assertEqual(len([] + chain), 10)
+        self.assertEqual(chain[0]['type'], 'p')
+        self.assertEqual([o['instrument_key'] for o in chain if o['type'] == 'c'], ce['instrument_key'].tolist())
+        self.assertEqual(chain.index_of(ce['instrument_key'].iloc[2]), 7)
+        self.assertEqual(chain.strike.shape, (10,))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,104 @@
+import time
+import unittest
+from unittest.mock import MagicMock, patch
+
+from order_stream import OrderTracker
+from order_stream_stub import StubOrderStream, SCENARIO_FILL, SCENARIO_PARTIAL, SCENARIO_REJECT, SCENARIO_LOST
+from upstox_wrapper import UpstoxWrapper
+
+KEY = 'NSE_FO|40476'
+
+
+class TestOrderTracker(unittest.TestCase):
+    def test_update_before_track_resolves_immediately(self):
+        tracker = OrderTracker()
+        tracker.on_update({'order_id': '1', 'status': 'complete', 'quantity': 65, 'filled_quantity': 65, 'average_price': 12.5})
+        fut = tracker.track('1')
+        self.assertTrue(fut.done())
+        self.assertEqual(fut.result()['avg_price'], 12.5)
+
+    def test_late_update_after_final_is_ignored(self):
+        tracker = OrderTracker()
+        fut = tracker.track('1')
+        tracker.on_update({'order_id': '1', 'status': 'open', 'quantity': 65, 'filled_quantity': 30})
+        self.assertFalse(fut.done())
+        self.assertEqual(tracker.partial_fills, 1)
+        tracker.on_update({'order_id': '1', 'status': 'rejected', 'quantity': 65, 'filled_quantity': 0})
+        tracker.on_update({'order_id': '1', 'status': 'open', 'quantity': 65, 'filled_quantity': 0})
+        self.assertEqual(fut.result(timeout=0)['status'], 'rejected')
+        self.assertEqual(tracker.latest('1')['status'], 'rejected')
+
+    def test_orders_nobody_waits_on_are_evicted(self):
+        tracker = OrderTracker(ttl=0.05)
+        waited = tracker.track('mine')
+        tracker.on_update({'order_id': 'mine', 'status': 'open', 'quantity': 65, 'filled_quantity': 0})
+        for i in range(3):                               # manual orders placed in the broker app
+            tracker.on_update({'order_id': f'manual{i}', 'status': 'complete', 'quantity': 65, 'filled_quantity': 65})
+        time.sleep(0.1)
+        tracker.on_update({'order_id': 'manual3', 'status': 'open', 'quantity': 65, 'filled_quantity': 0})
+        self.assertEqual((tracker.evicted, tracker.latest('manual0')), (3, None))
+        self.assertEqual(tracker.latest('mine')['status'], 'open')      # still waited on: kept
+        tracker.on_update({'order_id': 'mine', 'status': 'complete', 'quantity': 65, 'filled_quantity': 65})
+        self.assertEqual(waited.result(timeout=0)['status'], 'complete')
+
+
+class TestPlaceOrderWithStream(unittest.TestCase):
+    def setUp(self):
+        self.stub = StubOrderStream(step_delay=0.02).start()
+        with patch('config.UPSTOX_ACCESS_TOKEN', 'test_token'):
+            self.api = UpstoxWrapper()
+        self.api.order_api = MagicMock()
+        self.rest_calls = 0
+
+        def rest_details(order_id):
+            self.rest_calls += 1
+            return self.stub.get_order_details(order_id)
+        self.api.get_order_details = rest_details
+        self.assertTrue(self.api.start_order_stream(url=self.stub.url))
+
+    def tearDown(self):
+        self.api.stop_order_stream()
+        self.stub.stop()
+
+    def _place(self, scenario):
+        self.api.order_api.place_order.side_effect = lambda body, api_version: self.stub.place_response(body.quantity, scenario)
+        start = time.monotonic()
+        result = self.api.place_order(KEY, 65, 'SELL')
+        return result, time.monotonic() - start
+
+    def test_fill_is_pushed(self):
+        result, elapsed = self._place(SCENARIO_FILL)
+        self.assertEqual(result['status'], 'success')
+        self.assertEqual(result['avg_price'], 100.0)
+        self.assertLess(elapsed, 0.5)
+        self.assertEqual(self.rest_calls, 0)
+        self.assertEqual(self.stub.last_headers.get('authorization'), 'Bearer test_token')
+
+    def test_partial_fill_then_complete(self):
+        result, _ = self._place(SCENARIO_PARTIAL)
+        self.assertEqual(result['status'], 'success')
+        self.assertEqual(result['avg_price'], 100.05)
+        self.assertGreaterEqual(self.api.order_tracker.partial_fills, 1)
+
+    def test_rejection(self):
+        result, elapsed = self._place(SCENARIO_REJECT)
+        self.assertEqual(result['status'], 'error')
+        self.assertIn('Insufficient margin', result['message'])
+        self.assertLess(elapsed, 0.5)
+
+    def test_lost_update_falls_back_to_rest(self):
+        with patch('config.ORDER_STREAM_REST_CHECK_SECONDS', 0.3):
+            result, elapsed = self._place(SCENARIO_LOST)
+        self.assertEqual(result['status'], 'success')
+        self.assertGreaterEqual(self.rest_calls, 1)
+        self.assertLess(elapsed, 2.0)
+
+    def test_stream_down_polls_rest(self):
+        self.api.stop_order_stream()
+        result, _ = self._place(SCENARIO_FILL)
+        self.assertEqual(result['status'], 'success')
+        self.assertGreaterEqual(self.rest_calls, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,98 @@
+import unittest
+from datetime import datetime
+from unittest.mock import patch
+
+import numpy as np
+
+from greeks import bs_greeks
+from option_chain import OptionChain
+from portfolio_greeks import PortfolioGreeks
+
+R = 0.07
+SPOT = 24000.0
+NOW = datetime(2026, 11, 2, 10, 0)
+
+
+def leg(key, strike, qty, expiry='2026-11-09', type='p', iv=0.14):
+    return {'instrument_key': key, 'strike': strike, 'type': type, 'qty': qty, 'expiry_dt': expiry, 'entry_price': 100.0, 'iv': iv}
+
+
+def broker(delta, gamma=0.001, vega=10.0, theta=-5.0):
+    return {'delta': delta, 'gamma': gamma, 'vega': vega, 'theta': theta, 'iv': 14.0}
+
+
+def from_scratch(strategy_legs, greeks):
+    total = np.zeros(4)
+    for legs in strategy_legs.values():
+        for l in legs:
+            g = greeks[l['instrument_key']]
+            total += l['qty'] * np.array([g['delta'], g['gamma'], g['vega'], g['theta']])
+    return total
+
+
+class TestPortfolioGreeks(unittest.TestCase):
+    def test_incremental_matches_full_recompute(self):
+        book = PortfolioGreeks(r=R)
+        greeks = {'A': broker(-0.3), 'B': broker(-0.5), 'C': broker(0.4), 'D': broker(0.1)}
+        legs = {'Calendar': [leg('A', 23800, -75), leg('B', 24000, 75, '2026-11-26')],
+                'Batman': [leg('C', 24200, -150, type='c'), leg('D', 24600, 75, type='c')]}
+        steps = [
+            lambda: None,
+            lambda: greeks.update(A=broker(-0.35, theta=-6.0)),                # quote / greek update
+            lambda: legs['Batman'].append(leg('A', 23800, 75)),                 # same instrument, other strategy
+            lambda: legs['Batman'].__setitem__(0, leg('C', 24200, -75, type='c')),  # partial exit
+            lambda: legs['Calendar'].pop(0),                                    # leg closed
+        ]
+        for step in steps:
+            step()
+            book.update(legs, greeks)
+            np.testing.assert_allclose(book.total, from_scratch(legs, greeks), atol=1e-9)
+        changes = book.changes
+        book.update(legs, greeks)
+        self.assertEqual(book.changes, changes)      # nothing changed: nothing re-applied
+
+        snap = book.snapshot()
+        self.assertAlmostEqual(snap['strategies']['Calendar']['delta'], 75 * -0.5)
+        self.assertAlmostEqual(snap['expiries']['2026-11-26']['vega'], 75 * 10.0)
+        self.assertAlmostEqual(sum(s['theta'] for s in snap['strategies'].values()), snap['total']['theta'])
+
+    def test_flat_book_is_zero(self):
+        book = PortfolioGreeks(r=R)
+        greeks = {'A': broker(-0.3), 'B': broker(0.2)}
+        book.update({'Calendar': [leg('A', 23800, -75)], 'Ironfly': [leg('B', 24200, 75)]}, greeks)
+        book.update({'Calendar': [], 'Ironfly': [leg('B', 24200, 75)]}, greeks)
+        self.assertEqual(list(book.snapshot()['strategies']), ['Ironfly'])
+        book.update({}, greeks)
+        self.assertEqual(book.snapshot()['strategies'], {})
+        self.assertEqual(book.total.tolist(), [0.0, 0.0, 0.0, 0.0])
+        self.assertEqual(book.holders, {})
+
+    def test_missing_greeks_computed_locally(self):
+        book = PortfolioGreeks(r=R)
+        book.update({'Batman': [leg('X', 23500, -75, iv=0.16)]}, {}, SPOT, NOW)
+        self.assertEqual(book.source['X'], 'model')
+        t = (datetime(2026, 11, 9) - NOW).total_seconds() / (365 * 24 * 3600)
+        exact = bs_greeks('p', SPOT, 23500.0, t, R, 0.16)
+        self.assertAlmostEqual(book.total[0], -75 * exact['delta'])
+        self.assertAlmostEqual(book.total[2], -75 * exact['vega'] / 100)
+        self.assertAlmostEqual(book.total[3], -75 * exact['theta'] / 365)
+
+        book.update({'Batman': [leg('X', 23500, -75, iv=0.16)]}, {'X': dict(broker(-0.2), source='local')}, SPOT, NOW)
+        self.assertEqual(book.source['X'], 'local')
+        self.assertAlmostEqual(book.total[0], 15.0)
+
+    def test_batman_delta_falls_back_to_chain(self):
+        from strategies.batman_strategy import BatmanStrategy
+        with patch('strategies.batman_strategy.EventLogger'), patch('strategies.batman_strategy.TradeJournal'):
+            strat = BatmanStrategy()
+        strat.positions = [{'leg': 'CORE_PE', 'strike': 23800.0, 'qty': 75, 'type': 'p', 'side': 'SELL', 'entry_price': 50.0,
+                            'delta': 0.5, 'expiry_dt': '2026-11-09', 'instrument_key': 'NSE_FO|7'}]
+        chain = OptionChain(['NSE_FO|7'], [23800.0], ['p'], [60.0], [0.15], [7 / 365], ['2026-11-09'], [np.nan], [-0.31])
+        strat.update_deltas(SPOT, {'greeks': {}, 'cw_chain': chain})
+        self.assertAlmostEqual(strat.positions[0]['delta'], 0.31)
+        strat.update_deltas(SPOT, {'greeks': {'NSE_FO|7': {'delta': -0.29}}, 'cw_chain': chain})
+        self.assertAlmostEqual(strat.positions[0]['delta'], 0.29)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,113 @@
+import unittest
+from types import SimpleNamespace
+from unittest.mock import MagicMock, call, patch
+
+from position_snapshot import PositionSnapshot, parse_position
+
+
+def upstox(token, symbol, qty, avg=0.0, buy_value=0.0, sell_value=0.0, strike=0.0, expiry='2026-11-26'):
+    return SimpleNamespace(instrument_token=token, trading_symbol=symbol, net_quantity=qty, quantity=qty, average_price=avg,
+                           buy_value=buy_value, sell_value=sell_value, strike_price=strike, expiry=expiry)
+
+
+class TestPositionSnapshot(unittest.TestCase):
+    def test_parse_objects_and_dicts(self):
+        long = parse_position(upstox('NSE_FO|1', 'NIFTY26NOV24000PE', 65, buy_value=79153.75, sell_value=52565.5))
+        self.assertAlmostEqual(long.buy_price, 409.05, places=2)
+        self.assertEqual((long.sell_price, long.strike), (0.0, 24000.0))   # strike from the symbol
+        short = parse_position({'instrument_token': 'NSE_FO|2', 'trading_symbol': 'NIFTY 23800 PE', 'quantity': -75,
+                                'average_price': 71.75, 'strike_price': 23800})
+        self.assertEqual((short.token, short.qty, short.sell_price, short.expiry), ('NSE_FO|2', -75, 71.75, 'N/A'))
+        self.assertIs(parse_position(short), short)
+
+    def test_update_reports_only_changes(self):
+        snap = PositionSnapshot()
+        a = upstox('NSE_FO|1', 'NIFTY26NOV24000PE', -75, avg=80.0)
+        b = upstox('NSE_FO|2', 'NIFTY26DEC24000PE', 75, avg=300.0)
+        self.assertEqual(set(snap.update([a, b])), {'NSE_FO|1', 'NSE_FO|2'})
+        self.assertEqual(snap.update([a, b]), {})
+        self.assertEqual(snap.update(None), {})                  # API error: snapshot kept
+        self.assertEqual((snap.version, snap.unchanged_ticks, len(snap.records)), (1, 1, 2))
+
+        b.net_quantity = 150
+        self.assertEqual(snap.update([a, b])['NSE_FO|2'].qty, 150)
+        a.net_quantity = 0
+        self.assertEqual(snap.update([a, b]), {'NSE_FO|1': None})
+        self.assertEqual(snap.version, 3)
+
+        master = MagicMock()
+        master.lookup.return_value = SimpleNamespace(expiry='2026-11-04')
+        snap.update([b, upstox('NSE_FO|3', 'NIFTY26N0423500PE', -75, avg=40.0, expiry='N/A')], master)
+        snap.update([b, upstox('NSE_FO|3', 'NIFTY26N0423500PE', -75, avg=40.0, expiry='N/A')], master)
+        self.assertEqual(snap.records['NSE_FO|3'].expiry, '2026-11-04')
+        master.lookup.assert_called_once_with('NSE_FO|3')       # cached per instrument
+
+    def test_changes_routed_by_ownership(self):
+        snap = PositionSnapshot()
+        cal = upstox('NSE_FO|1', 'NIFTY26NOV24000PE', -75, avg=80.0)
+        bat = upstox('NSE_FO|2', 'NIFTY26NOV25000CE', -75, avg=50.0)
+        snap.update([cal, bat])
+        snap.index_owners({'Calendar': [{'instrument_key': 'NSE_FO|1', 'leg': 'weekly_sell'}],
+                           'Batman': [{'instrument_key': 'NSE_FO|2', 'leg': 'CORE_CE'}, {'instrument_key': 'NSE_FO|9', 'leg': 'HEDGE'}]})
+        self.assertEqual(snap.owner('NSE_FO|2'), ('Batman', 'CORE_CE'))
+        self.assertEqual(set(snap.changes_for('Calendar')), {'NSE_FO|1'})
+        self.assertEqual(snap.changes_for('Batman'), {'NSE_FO|2': snap.records['NSE_FO|2'], 'NSE_FO|9': None})
+        self.assertEqual(snap.changes_for('Calendar'), {})
+
+        bat.net_quantity = -150                                  # Batman's leg changes: Calendar has nothing to do
+        new = upstox('NSE_FO|5', 'NIFTY26NOV23000PE', 75, avg=10.0)   # unowned: every strategy may adopt it
+        snap.update([cal, bat, new])
+        self.assertEqual(set(snap.changes_for('Calendar')), {'NSE_FO|5'})
+        self.assertEqual(set(snap.changes_for('Batman')), {'NSE_FO|2', 'NSE_FO|5'})
+        self.assertEqual({r.token for r in snap.positions_for('Calendar')}, {'NSE_FO|1', 'NSE_FO|5'})
+        self.assertEqual({r.token for r in snap.positions_for('Batman')}, {'NSE_FO|2', 'NSE_FO|5'})
+
+    def test_strategy_reconciles_only_on_change(self):
+        from strategies.calendar_pe_weekly import CalendarPEWeekly
+        with patch('strategies.calendar_pe_weekly.EventLogger'), patch('strategies.calendar_pe_weekly.TradeJournal'):
+            strat = CalendarPEWeekly()
+        strat.save_current_state = MagicMock()
+        snap = PositionSnapshot()
+        positions = [upstox('NSE_FO|1', 'NIFTY26NOV23800PE', -75, avg=80.0, expiry='2026-11-05'),
+                     upstox('NSE_FO|2', 'NIFTY26NOV23800PE', 75, avg=250.0, expiry='2026-11-26')]
+        snap.update(positions)
+        market_data = {'position_snapshot': snap}
+        self.assertTrue(strat.reconcile_with_broker(market_data))
+        self.assertEqual((strat.weekly_position['entry_price'], strat.monthly_position['expiry_dt']), (80.0, '2026-11-26'))
+
+        snap.update(positions)
+        snap.index_owners({strat.name: strat.open_legs()})
+        with patch.object(strat, 'pull_from_broker', wraps=strat.pull_from_broker) as pull:
+            self.assertFalse(strat.reconcile_with_broker(market_data))
+            pull.assert_not_called()
+            snap.update(positions[1:])                           # weekly leg closed manually
+            strat.reconcile_with_broker(market_data)
+            pull.assert_called_once()
+        self.assertIsNone(strat.weekly_position)
+        self.assertEqual(strat.monthly_position['instrument_key'], 'NSE_FO|2')
+
+    def test_strategies_only_see_their_own_and_unowned_legs(self):
+        from strategies.calendar_pe_weekly import CalendarPEWeekly
+        from strategies.weekly_ironfly import WeeklyIronfly
+        with patch('strategies.calendar_pe_weekly.EventLogger'), patch('strategies.calendar_pe_weekly.TradeJournal'):
+            cal = CalendarPEWeekly()
+        with patch('strategies.weekly_ironfly.TradeJournal'):
+            ironfly = WeeklyIronfly()
+        for strat in (cal, ironfly):
+            strat.save_current_state = MagicMock()
+            strat.log = MagicMock()
+        snap = PositionSnapshot()
+        snap.update([upstox('NSE_FO|1', 'NIFTY26NOV23800PE', -75, avg=80.0, expiry='2026-11-05'),
+                     upstox('NSE_FO|7', 'NIFTY26NOV24500PE', -150, avg=120.0, expiry='2026-11-03')])
+        snap.index_owners({'Batman': [{'instrument_key': 'NSE_FO|7', 'leg': 'CORE_PE'}]})
+        market_data = {'position_snapshot': snap}
+        self.assertTrue(cal.reconcile_with_broker(market_data))
+        self.assertEqual(cal.weekly_position['instrument_key'], 'NSE_FO|1')    # not Batman's earlier-expiry short
+
+        self.assertTrue(ironfly.reconcile_with_broker(market_data))            # silent=True accepted
+        self.assertEqual([p['instrument_key'] for p in ironfly.positions], ['NSE_FO|1'])
+        self.assertNotIn(call(f"PULLING TRADES for {ironfly.name}..."), ironfly.log.call_args_list)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -16,8 +16,10 @@ mock_upstox.rest.ApiException = MockApiException
 sys.modules['upstox_client'] = mock_upstox
 sys.modules['upstox_client.rest'] = mock_upstox.rest
 
-# Now import UpstoxWrapper
+# Now import UpstoxWrapper (fresh, in case another test module already imported it against the real SDK)
+sys.modules.pop('upstox_wrapper', None)
 from upstox_wrapper import UpstoxWrapper
+from rate_limiter import RateLimiter
 
 class TestUpstoxWrapperAggressiveRetry(unittest.TestCase):
     def setUp(self):
@@ -57,22 +59,50 @@ class TestUpstoxWrapperAggressiveRetry(unittest.TestCase):
         self.assertIn(unittest.mock.call(20.0), mock_sleep.call_args_list)
         print("Test passed: Aggressive backoff timing verified.")
 
-    @patch('time.time')
     @patch('time.sleep')
-    def test_inter_call_delay(self, mock_sleep, mock_time):
-        # Mock time to simulate calls exactly 0.1s apart
-        # now will be 100.1, last_call_time was 100.0
-        mock_time.side_effect = [100.1, 101.1] 
-        
-        self.wrapper._last_call_time = 100.0
-        
-        # First call to _wait_for_rate_limit: now=100.1. elapsed=0.1. wait=0.9.
-        self.wrapper._wait_for_rate_limit()
-        
-        # Use assertAlmostEqual for floating point precision
-        mock_sleep.assert_called_once()
-        self.assertAlmostEqual(mock_sleep.call_args[0][0], 0.9, places=7)
-        print("Test passed: Inter-call delay enforced.")
+    def test_bucket_waits_when_empty(self, mock_sleep):
+        # 2 calls/sec budget: the third back-to-back call must wait for a refill
+        limiter = RateLimiter({'quote': (2, 100)})
+        clock = [100.0]
+        with patch('time.monotonic', side_effect=lambda: clock[0]):
+            limiter.budgets['quote'].buckets[0].last_refill = 100.0
+            limiter.budgets['quote'].buckets[1].last_refill = 100.0
+            mock_sleep.side_effect = lambda s: clock.__setitem__(0, clock[0] + s)
+
+            limiter.acquire('quote')
+            limiter.acquire('quote')
+            mock_sleep.assert_not_called()
+
+            limiter.acquire('quote')
+            mock_sleep.assert_called_once()
+            self.assertAlmostEqual(mock_sleep.call_args[0][0], 0.5, places=7)
+        print("Test passed: Token bucket enforces per-second budget.")
+
+    @patch('time.sleep')
+    def test_families_are_independent(self, mock_sleep):
+        # Exhausting / throttling one family must not delay another
+        limiter = RateLimiter({'quote': (1, 100), 'greeks': (1, 100)})
+        limiter.acquire('quote')
+        limiter.penalize('quote', 30.0)
+
+        limiter.acquire('greeks')
+        limiter.acquire('portfolio')
+        mock_sleep.assert_not_called()
+        self.assertEqual(limiter.stats()['quote']['throttles'], 1)
+        self.assertEqual(limiter.stats()['greeks']['throttles'], 0)
+        print("Test passed: Endpoint families rate-limited independently.")
+
+    @patch('time.sleep', return_value=None)
+    @patch('random.randint', return_value=0)
+    def test_429_only_penalizes_quote_family(self, mock_jitter, mock_sleep):
+        mock_success_res = MagicMock(status='success', data={'NSE_INDEX:Nifty 50': MagicMock(last_price=21000.0)})
+        self.wrapper.market_quote_api.ltp = MagicMock(side_effect=[MockApiException(status=429), mock_success_res])
+
+        self.assertEqual(self.wrapper.get_spot_price('NSE_INDEX|Nifty 50'), 21000.0)
+        stats = self.wrapper.rate_limiter.stats()
+        self.assertEqual(stats['quote']['throttles'], 1)
+        self.assertEqual(stats['order']['throttles'], 0)
+        self.assertEqual(stats['greeks']['throttles'], 0)
 
 if __name__ == '__main__':
     unittest.main()
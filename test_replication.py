@@ -0,0 +1,153 @@
+import os
+import queue
+import shutil
+import socket
+import subprocess
+import tempfile
+import time
+import unittest
+from unittest.mock import patch
+
+import replication
+from replication import GitReplicator, SQLiteReplicator, StateReplicator, TcpReplicator
+
+
+def state(i):
+    return {'positions': [{'strike': 24000 + 50 * i, 'qty': 75, 'side': 'SELL'}], 'adjustment_count': i}
+
+
+def wait_for(q, timeout=5):
+    return q.get(timeout=timeout)
+
+
+class TestReplication(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+    def test_tcp_push_and_late_subscriber(self):
+        primary = TcpReplicator(host='127.0.0.1', port=0, secret='s3cret')
+        primary.start_server()
+        received = queue.Queue()
+        try:
+            primary.publish('Batman_live_state.json', state(1))
+            primary.flush()
+            standby = TcpReplicator(host='127.0.0.1', port=primary.port, secret='s3cret')
+            stop = standby.subscribe(lambda path, s, meta: received.put((path, s, meta)))
+            path, s, meta = wait_for(received)           # latest state on connect
+            self.assertEqual((path, s), ('Batman_live_state.json', state(1)))
+            primary.publish(os.path.join('some', 'dir', 'Calendar_live_state.json'), state(2))
+            path, s, meta = wait_for(received)
+            self.assertEqual((path, s['adjustment_count']), ('Calendar_live_state.json', 2))
+            self.assertLess(meta['received'] - meta['published'], 1.0)
+            stop.set()
+        finally:
+            primary.stop()
+        self.assertEqual(primary.stats()['failures'], 0)
+
+    def test_tcp_refuses_wrong_or_missing_secret(self):
+        with patch.object(replication.config, 'STATE_REPLICATION_TCP_SECRET', '', create=True):
+            self.assertEqual(TcpReplicator(port=0).host, '127.0.0.1')
+            with self.assertRaises(ValueError):
+                TcpReplicator(port=0).start_server()       # no secret: nothing served
+        primary = TcpReplicator(host='127.0.0.1', port=0, secret='s3cret')
+        primary.start_server()
+        received = queue.Queue()
+        try:
+            primary.publish('Batman_live_state.json', state(1))
+            primary.flush()
+            with patch('builtins.print'):
+                stop = TcpReplicator(host='127.0.0.1', port=primary.port, secret='guess').subscribe(
+                    lambda path, s, meta: received.put(path), retry_seconds=0.05)
+                with socket.create_connection(('127.0.0.1', primary.port), timeout=5) as sock:
+                    self.assertIn('nonce', replication._recv_frame(sock))
+                    replication._send_frame(sock, {'auth': 'x' * 1000})      # oversized answer
+                    with self.assertRaises(ConnectionError):
+                        replication._recv_frame(sock)
+                deadline = time.time() + 5
+                while primary.stats()['rejected'] < 3 and time.time() < deadline:
+                    time.sleep(0.02)
+                stop.set()
+            self.assertGreaterEqual(primary.stats()['rejected'], 3)
+            self.assertEqual(primary.stats()['subscribers'], 0)
+            self.assertTrue(received.empty())
+        finally:
+            primary.stop()
+
+    def test_sqlite_publish_subscribe_pull(self):
+        db = os.path.join(self.dir, 'replica', 'state.db')
+        primary = SQLiteReplicator(db)
+        for i in range(3):
+            primary.publish('Batman_live_state.json', state(i))
+        primary.publish('Calendar_live_state.json', state(7))
+        self.assertTrue(primary.stop())
+        received = queue.Queue()
+        stop = SQLiteReplicator(db, poll_interval=0.02).subscribe(lambda path, s, meta: received.put((path, s)))
+        got = dict(wait_for(received) for _ in range(2))
+        self.assertEqual(got['Batman_live_state.json'], state(2))   # latest per file
+        stop.set()
+
+        standby_dir = os.path.join(self.dir, 'standby')
+        os.makedirs(standby_dir)
+        self.assertEqual(SQLiteReplicator(db).pull(standby_dir), 2)
+        self.assertEqual(replication.StateStore(os.path.join(standby_dir, 'Calendar_live_state.json')).load(), state(7))
+
+    def test_sqlite_pull_keeps_newer_local_state(self):
+        db = os.path.join(self.dir, 'state.db')
+        primary = SQLiteReplicator(db)
+        primary.publish('Batman_live_state.json', state(1))
+        self.assertTrue(primary.stop())
+        path = os.path.join(self.dir, 'Batman_live_state.json')
+        replication.StateStore(path, fsync=False).save(state(2))     # saved locally, crashed before publishing
+        later = time.time() + 1
+        os.utime(path, (later, later))
+        with patch('builtins.print'):
+            self.assertEqual(SQLiteReplicator(db).pull(self.dir), 0)
+        self.assertEqual(replication.StateStore(path).load(), state(2))
+
+        old = time.time() - 3600                                     # the replica is newer: taken
+        for p in (path, path + '.wal'):
+            if os.path.exists(p):
+                os.utime(p, (old, old))
+        self.assertEqual(SQLiteReplicator(db).pull(self.dir), 1)
+        self.assertEqual(replication.StateStore(path).load(), state(1))
+
+    def test_none_backend_has_nothing_to_subscribe_to(self):
+        with patch('builtins.print') as printed:
+            stop = StateReplicator().subscribe(lambda *args: None)
+        self.assertTrue(stop.is_set())
+        self.assertIn("does not replicate", printed.call_args[0][0])
+
+    @unittest.skipUnless(shutil.which("git"), "git not installed")
+    def test_git_backend_publishes_snapshots_only(self):
+        remote, work = os.path.join(self.dir, 'remote.git'), os.path.join(self.dir, 'work')
+        subprocess.run(['git', 'init', '--bare', '-b', 'main', remote], check=True, capture_output=True)
+        subprocess.run(['git', 'clone', remote, work], check=True, capture_output=True)
+        for args in (['config', 'user.email', 'a@b.c'], ['config', 'user.name', 'a'], ['checkout', '-b', 'main']):
+            subprocess.run(['git', *args], cwd=work, check=True, capture_output=True)
+        primary = GitReplicator(repo_dir=work, interval=60, remote='origin', branch='main')
+        path = os.path.join(work, 'Batman_live_state.json')
+        replication.StateStore(path, fsync=False).save(state(1))
+        self.assertFalse(primary.publish(path, state(1), snapshot=False))     # WAL delta: waits for compaction
+        self.assertTrue(primary.publish(path, state(1)))
+        self.assertTrue(primary.stop(timeout=20))
+        self.assertEqual(primary.stats()['pushes'], 1)
+        log = subprocess.run(['git', 'log', '--format=%s', 'main'], cwd=remote, capture_output=True, text=True).stdout
+        self.assertIn('Batman_live_state.json', log)
+
+    def test_backend_selection(self):
+        with patch.object(replication, '_replicator', None), patch.object(replication.config, 'STATE_REPLICATION', 'none', create=True):
+            self.assertIs(type(replication.get_replicator()), StateReplicator)
+            self.assertFalse(replication.get_replicator().publish('x_state.json', {}))
+        with patch.object(replication, '_replicator', None), patch.object(replication.config, 'STATE_REPLICATION', None, create=True), \
+                patch.object(replication.config, 'USE_GIT_STATE_SYNC', True):
+            self.assertIsInstance(replication.get_replicator(), GitReplicator)
+        with patch.object(replication, '_replicator', None), patch.object(replication.config, 'STATE_REPLICATION', 'carrier-pigeon', create=True), \
+                patch('builtins.print'):
+            self.assertEqual(replication.get_replicator().name, 'none')
+
+
+if __name__ == '__main__':
+    unittest.main()
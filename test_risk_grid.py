@@ -0,0 +1,100 @@
+import unittest
+from datetime import date
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+import pandas as pd
+
+import config
+from bench_risk_grid import NOW, SPOT, make_book
+from greeks import bs_greeks
+from option_chain import build_chain
+from risk_grid import RiskGrid, leg_ivs
+
+R = 0.07
+
+
+def calendar():
+    from strategies.calendar_pe_weekly import CalendarPEWeekly
+    with patch('strategies.calendar_pe_weekly.EventLogger'), patch('strategies.calendar_pe_weekly.TradeJournal'):
+        strat = CalendarPEWeekly()
+    strat.weekly_position = {'strike': 23800, 'type': 'p', 'instrument_key': 'NSE_FO|1', 'entry_price': 60.0,
+                             'expiry_dt': '2026-11-05', 'iv': 0.14, 'entry_spot': SPOT}
+    strat.monthly_position = {'strike': 23800, 'type': 'p', 'instrument_key': 'NSE_FO|2', 'entry_price': 250.0,
+                              'expiry_dt': '2026-11-26', 'iv': 0.13, 'entry_spot': SPOT}
+    return strat
+
+
+class TestRiskGrid(unittest.TestCase):
+    def test_grid_matches_black_scholes_per_scenario(self):
+        grid = RiskGrid(spot_steps=11, iv_scales=[0.8, 1.0, 1.5], days_ahead=[0, 2, 5], r=R)
+        strike = np.array([23500.0, 24000.0, 24000.0, 24500.0, 24000.0])
+        is_call = np.array([False, True, False, True, False])
+        tte = np.array([3, 10, 10, 31, 10]) / 365          # the 3-day leg expires inside the grid
+        sigma = np.array([0.15, 0.13, 0.13, 0.12, 0.13])   # last leg repeats the third
+        values = grid.values(SPOT, strike, is_call, tte, sigma)
+        self.assertEqual(values.shape, (11, 3, 3, 5))
+        for i, j, k in [(0, 0, 0), (5, 1, 0), (10, 2, 1), (3, 1, 2)]:
+            s = SPOT * (1 + grid.moves_pct[i] / 100)
+            t = tte - grid.days_ahead[k] / 365
+            exact = bs_greeks(np.where(is_call, 'c', 'p'), s, strike, np.where(t > 0, t, 1.0), R, sigma * grid.iv_scales[j])['price']
+            exact = np.where(t > 0, exact, np.maximum(np.where(is_call, s - strike, strike - s), 0.0))
+            np.testing.assert_allclose(values[i, j, k], exact, atol=1e-5)
+
+    def test_short_straddle_report(self):
+        legs = [{'instrument_key': f'NSE_FO|{t}', 'strike': SPOT, 'type': t, 'qty': -75, 'expiry_dt': '2026-11-09',
+                 'entry_price': None, 'iv': 0.14} for t in ('c', 'p')]
+        risk = RiskGrid(r=R).revalue({'Straddle': legs}, SPOT, NOW)
+        report = risk.for_strategy('Straddle')
+        self.assertAlmostEqual(report.pnl_at(0.0), 0.0, places=6)   # no entry price: P&L vs today's model value
+        worst = report.worst_case()
+        self.assertEqual(abs(worst.move_pct), config.RISK_GRID_SPOT_PCT)
+        self.assertEqual(worst.iv_scale, max(config.RISK_GRID_IV_SCALES))
+        self.assertEqual(worst.days, 0)
+        self.assertGreater(report.pnl_at(0.0, days=3), 0)            # theta
+        low, high = report.breakevens(days=3)
+        self.assertLess(low, SPOT)
+        self.assertGreater(high, SPOT)
+        self.assertAlmostEqual(SPOT - low, high - SPOT, delta=0.01 * SPOT)
+        down, up = report.gap_pnl([2.0])[2.0]
+        self.assertLess(down, 0)
+        self.assertLess(up, 0)
+
+    def test_leg_iv_from_broker_chain_row(self):
+        """Broker IV arrives in percent; the chain row and a leg copied from it are decimals."""
+        pe = pd.DataFrame([{'instrument_key': 'NSE_FO|1', 'strike': 23800.0, 'expiry_dt': date(2026, 11, 9)}])
+        quotes = {'NSE_FO|1': MagicMock(last_price=60.0)}
+        greeks = {'NSE_FO|1': {'delta': -0.3, 'theta': -5.0, 'gamma': 0.001, 'vega': 10.0, 'iv': 14.2}}
+        chain = build_chain(pe, None, quotes, greeks, SPOT, NOW, r=R)
+        leg = {'instrument_key': 'NSE_FO|1', 'strike': 23800.0, 'type': 'p', 'qty': -75, 'expiry_dt': '2026-11-09',
+               'entry_price': 60.0, 'iv': chain[0]['iv']}
+        np.testing.assert_allclose(leg_ivs([leg], [chain]), [0.142])
+        np.testing.assert_allclose(leg_ivs([leg]), [0.142])                  # no chain this tick: stored IV
+        np.testing.assert_allclose(leg_ivs([dict(leg, iv=14.2)]), [0.142])   # leg saved with the broker's percent
+        report = RiskGrid(r=R).revalue({'Short': [leg]}, SPOT, NOW, chains=[chain]).for_strategy('Short')
+        self.assertTrue(np.isfinite(report.pnl).all())
+        self.assertLess(report.worst_case().pnl, 0)
+
+    def test_strategies_sum_to_portfolio(self):
+        book = make_book(12)
+        book['CalendarPEWeekly'] = calendar().open_legs()
+        self.assertEqual([leg['qty'] for leg in book['CalendarPEWeekly']], [-config.ORDER_QUANTITY, config.ORDER_QUANTITY])
+        risk = RiskGrid(r=R).revalue(book, SPOT, NOW)
+        np.testing.assert_allclose(sum(r.pnl for r in risk.strategies.values()), risk.total.pnl)
+        self.assertEqual(risk.total.n_legs, 14)
+        self.assertIsNone(RiskGrid(r=R).revalue({'Idle': []}, SPOT, NOW))
+
+    def test_calendar_gap_check_uses_projected_loss(self):
+        strat = calendar()
+        strat.exit_all_positions = MagicMock()
+        risk = RiskGrid(r=R).revalue({strat.name: strat.open_legs()}, SPOT, NOW)
+        with patch.object(config, 'GAP_EXIT_ON_PROJECTED_LOSS', True), patch.object(config, 'MAX_LOSS_VALUE', 10 ** 9):
+            self.assertFalse(strat.check_gap_risk(SPOT, 60.0, 250.0, None, risk=risk))
+        projected = min(risk.for_strategy(strat.name).gap_pnl([config.GAP_FORCED_ROLL_THRESHOLD_PCT])[config.GAP_FORCED_ROLL_THRESHOLD_PCT])
+        with patch.object(config, 'GAP_EXIT_ON_PROJECTED_LOSS', True), patch.object(config, 'MAX_LOSS_VALUE', abs(projected) / 2):
+            self.assertTrue(strat.check_gap_risk(SPOT, 60.0, 250.0, None, risk=risk))
+        strat.exit_all_positions.assert_called_once_with(None, reason="GAP_PROJECTED_LOSS_EXIT")
+
+
+if __name__ == '__main__':
+    unittest.main()
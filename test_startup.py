@@ -0,0 +1,96 @@
+import time
+import unittest
+from unittest.mock import MagicMock, patch
+
+import git_utils
+import startup
+from replication import GitReplicator
+from startup import StartupTimer, load_startup
+
+
+def slow(seconds, result=None):
+    def run(*args, **kwargs):
+        time.sleep(seconds)
+        return result
+    return run
+
+
+class FakeStrategy:
+    loads = []
+
+    def __init__(self):
+        self.name = type(self).__name__
+
+    def load_previous_state(self, pull=True):
+        time.sleep(0.2)
+        FakeStrategy.loads.append((self.name, pull))
+
+
+class Calendar(FakeStrategy):
+    pass
+
+
+class Batman(FakeStrategy):
+    pass
+
+
+class TestStartup(unittest.TestCase):
+    def setUp(self):
+        FakeStrategy.loads = []
+        self.master = MagicMock()
+        self.master.load_master.side_effect = slow(0.3)
+        self.master.expiry_calendar.return_value = 'calendar'
+        patches = [patch.object(startup, 'InstrumentMaster', return_value=self.master),
+                   patch.object(startup, 'UpstoxWrapper', side_effect=slow(0.3, 'api')),
+                   patch.object(startup, 'get_upcoming_warnings', side_effect=slow(0.3, ['Holiday'])),
+                   patch('git_utils.sync_pull', side_effect=slow(0.3, True)),
+                   patch.object(startup, 'get_replicator', return_value=GitReplicator()),
+                   patch.object(startup.config, 'ACTIVE_STRATEGIES', ['Calendar', 'Unknown', 'Batman'])]
+        for p in patches:
+            self.addCleanup(p.stop)
+            p.start()
+
+    def test_single_pull_then_states(self):
+        timer = StartupTimer()
+        api, master, strategies, calendar, warnings = load_startup({'Calendar': Calendar, 'Batman': Batman}, timer)
+        git_utils.sync_pull.assert_called_once_with()
+        self.assertEqual(sorted(FakeStrategy.loads), [('Batman', False), ('Calendar', False)])   # no per-strategy pull
+        self.assertEqual([s.name for s in strategies], ['Calendar', 'Batman'])                   # config order
+        self.assertEqual((api, master, calendar, warnings), ('api', self.master, 'calendar', ['Holiday']))
+
+    def test_phases_overlap(self):
+        timer = StartupTimer()
+        t0 = time.perf_counter()
+        load_startup({'Calendar': Calendar, 'Batman': Batman}, timer)
+        elapsed = time.perf_counter() - t0
+        phases = dict(timer.phases)
+        self.assertEqual(set(phases), {'git pull', 'instrument master', 'event calendar', 'broker client',
+                                       'state Calendar', 'state Batman', 'expiry calendar'})
+        self.assertGreater(sum(phases.values()), 1.6)   # 4 x 0.3s + 2 x 0.2s one after the other
+        self.assertLess(elapsed, 1.2)                   # pull -> states is the critical path (~0.5s)
+
+    def test_report_once(self):
+        timer = StartupTimer()
+        with timer.phase('option frames'):
+            pass
+        with patch('builtins.print') as out:
+            timer.report()
+            timer.report()
+        out.assert_called_once()
+        self.assertIn('option frames', out.call_args[0][0])
+        self.assertTrue(timer.done)
+
+    def test_base_strategy_pull_flag(self):
+        from strategies.weekly_ironfly import WeeklyIronfly
+        with patch('strategies.weekly_ironfly.TradeJournal'):
+            strat = WeeklyIronfly()
+        strat.state_store.load = lambda: None
+        with patch('git_utils.sync_pull') as pull, patch('base_strategy.get_replicator', return_value=GitReplicator()):
+            strat.load_previous_state(pull=False)
+            pull.assert_not_called()
+            strat.load_previous_state()
+            pull.assert_called_once()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,108 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from state_store import StateStore
+
+
+def position(strike, entry_price=100.0):
+    return {'instrument_key': f'NSE_FO|{strike}', 'strike': strike, 'qty': 75, 'side': 'SELL', 'entry_price': entry_price}
+
+
+class TestStateStore(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, 'BatmanStrategy_live_state.json')
+
+    def tearDown(self):
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+    def store(self, **kwargs):
+        kwargs.setdefault('max_wal_records', 50)
+        kwargs.setdefault('compact_seconds', 3600)
+        return StateStore(self.path, fsync=False, **kwargs)
+
+    def snapshot(self):
+        with open(self.path) as f:
+            return json.load(f)
+
+    def test_skip_unchanged_and_replay_deltas(self):
+        store = self.store()
+        first = {'positions': [position(24000)], 'adjustment_count': 0}
+        self.assertEqual(store.save(first), 'snapshot')
+        self.assertIsNone(store.save({'adjustment_count': 0, 'positions': [position(24000)]}))   # key order only
+        first['positions'].append(position(24500))          # the strategy keeps mutating its own lists
+        self.assertEqual(store.save(first), 'wal')
+        self.assertEqual(store.save(dict(first, adjustment_count=1)), 'wal')
+        self.assertEqual(len(self.snapshot()['positions']), 1)   # snapshot untouched by the deltas
+        self.assertEqual((store.skipped, store.wal_records), (1, 2))
+
+        restarted = self.store()
+        self.assertEqual(restarted.load(), dict(first, adjustment_count=1))
+        self.assertEqual(restarted.replayed, 2)
+        self.assertEqual(self.snapshot()['adjustment_count'], 1)   # replayed state became the snapshot
+        self.assertIsNone(restarted.save(dict(first, adjustment_count=1)))
+
+    def test_torn_and_stale_wal(self):
+        store = self.store()
+        store.save({'positions': [], 'adjustment_count': 0})
+        store.save({'positions': [position(24000)], 'adjustment_count': 0})
+        with open(store.wal_path, 'a') as f:
+            f.write('{"set": {"adjustment_count": 5')              # crash mid-append
+        with patch('builtins.print'):
+            self.assertEqual(self.store().load(), {'positions': [position(24000)], 'adjustment_count': 0})
+
+        store = self.store()
+        store.load()
+        store.save({'positions': [position(24000)], 'adjustment_count': 3})
+        stale = open(store.wal_path).read()
+        store.compact(force=True)
+        with open(store.wal_path, 'w') as f:                          # crash between snapshot replace and WAL reset
+            f.write(stale)
+        with patch('builtins.print') as out:
+            self.assertEqual(self.store().load()['adjustment_count'], 3)
+        self.assertIn('does not extend', out.call_args[0][0])
+
+    def test_compaction(self):
+        store = self.store(max_wal_records=3)
+        for i in range(4):
+            store.save({'adjustment_count': i})
+        self.assertEqual((store.snapshots, store.wal_records), (1, 3))
+        self.assertEqual(store.save({'adjustment_count': 9}), 'snapshot')    # 3 deltas pending: compacted
+        self.assertEqual((self.snapshot(), store.wal_records), ({'adjustment_count': 9}, 0))
+
+        store = self.store(compact_seconds=0)
+        store.load()
+        store.max_wal_records = 100
+        self.assertFalse(store.compact())
+        store.compact_seconds = 3600
+        self.assertEqual(store.save({'adjustment_count': 10}), 'wal')
+        self.assertFalse(store.compact())
+        self.assertTrue(store.compact(force=True))
+        self.assertEqual(self.snapshot(), {'adjustment_count': 10})
+        self.assertFalse(os.path.exists(self.path + '.tmp'))
+
+    def test_strategy_publishes_changes(self):
+        from strategies.calendar_pe_weekly import CalendarPEWeekly
+        with patch('strategies.calendar_pe_weekly.EventLogger'), patch('strategies.calendar_pe_weekly.TradeJournal'):
+            strat = CalendarPEWeekly()
+        strat.state_store = self.store()
+        with patch('base_strategy.get_replicator') as replicator:
+            strat.weekly_position = position(23800, 80.0)
+            strat.save_state()
+            strat.save_state()
+            strat.monthly_position = position(23800, 250.0)
+            strat.save_state()
+            strat.flush_state(force=True)
+        publish = replicator.return_value.publish
+        self.assertEqual([c.kwargs['snapshot'] for c in publish.call_args_list], [True, False, True])
+        self.assertEqual(publish.call_args[0][1]['monthly']['entry_price'], 250.0)
+        self.assertEqual(strat.state_store.stats()['skipped'], 1)
+        self.assertEqual(self.snapshot()['monthly']['entry_price'], 250.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,171 @@
+import threading
+import time
+import unittest
+
+from strategy_executor import StrategyExecutor, freeze
+
+
+class FakeStrategy:
+    def __init__(self, name, order_key=None):
+        self.name = name
+        self.order_key = order_key
+        self.seen = []
+
+    def update(self, market_data, order_callback):
+        self.seen.append(market_data['tick'])
+        if self.order_key and market_data['tick'] == 1:
+            order_callback(self.order_key, 65, 'SELL', 'algo')
+
+
+class TestStrategyExecutor(unittest.TestCase):
+    def setUp(self):
+        self.release = threading.Event()
+
+    def tearDown(self):
+        self.release.set()
+
+    def slow_order(self, instrument_key, qty, side, tag, expiry='N/A'):
+        self.release.wait(5)
+        return {'status': 'success', 'avg_price': 10.0}
+
+    def test_slow_order_does_not_block_other_strategies(self):
+        slow, fast = FakeStrategy('Batman', order_key='NSE_FO|1'), FakeStrategy('Calendar')
+        executor = StrategyExecutor([slow, fast], parallel=True, deadline=0.2, queue_size=1)
+        try:
+            t0 = time.perf_counter()
+            late = executor.run_tick({'tick': 1}, self.slow_order)
+            self.assertLess(time.perf_counter() - t0, 1.0)
+            self.assertEqual([(name, key) for name, _, key in late], [('Batman', 'NSE_FO|1')])
+            self.assertTrue(executor.busy('Batman'))
+            for tick in (2, 3, 4):
+                executor.run_tick({'tick': tick}, self.slow_order)
+            self.assertEqual(fast.seen, [1, 2, 3, 4])     # every tick, while Batman waits for its fill
+            self.release.set()
+            executor.run_tick({'tick': 5}, self.slow_order)
+            self.assertEqual(slow.seen[0], 1)
+            self.assertEqual(slow.seen[-1], 5)            # resumed on the latest tick, the backlog was dropped
+        finally:
+            executor.stop()
+        stats = executor.stats()
+        self.assertEqual((stats['Batman']['orders'], stats['Batman']['overruns']), (1, 1))
+        self.assertGreaterEqual(stats['Batman']['dropped'], 2)
+        self.assertEqual((stats['Calendar']['updates'], stats['Calendar']['overruns']), (5, 0))
+
+    def test_stop_while_busy_with_a_tick_queued(self):
+        slow = FakeStrategy('Batman', order_key='NSE_FO|1')
+        executor = StrategyExecutor([slow], parallel=True, deadline=0.1, queue_size=1)
+        executor.run_tick({'tick': 1}, self.slow_order)    # waiting for its fill
+        executor.run_tick({'tick': 2}, self.slow_order)    # queued: the inbox is full
+        threading.Timer(0.2, self.release.set).start()
+        executor.stop()                                    # the sentinel replaces the queued tick, then the fill arrives
+        self.assertFalse(executor.workers['Batman'].thread.is_alive())
+        self.assertEqual(slow.seen, [1])
+
+    def test_snapshot_is_read_only(self):
+        quotes = {'NSE_FO|1': 10.0}
+        snap = freeze({'tick': 1, 'quotes': quotes})
+        quotes['NSE_FO|2'] = 20.0                         # the loop keeps filling its own dict
+        self.assertNotIn('NSE_FO|2', snap['quotes'])
+        with self.assertRaises(TypeError):
+            snap['tick'] = 2
+        with self.assertRaises(TypeError):
+            snap['quotes']['NSE_FO|1'] = 0.0
+
+    def test_workers_get_their_own_frozen_positions_and_surface(self):
+        from types import SimpleNamespace
+        from position_snapshot import PositionSnapshot
+        from vol_surface import VolSurface
+
+        class Recorder(FakeStrategy):
+            def update(self, market_data, order_callback):
+                self.got_shared_snapshot = 'position_snapshot' in market_data
+                self.views = getattr(self, 'views', []) + [market_data.get('position_view')]
+                super().update(market_data, order_callback)
+
+        def position(token, qty):
+            return SimpleNamespace(instrument_token=token, trading_symbol='NIFTY', net_quantity=qty, average_price=10.0, expiry='2026-11-26')
+
+        snap, surface = PositionSnapshot(), VolSurface()
+        slow, fast = Recorder('Batman', order_key='NSE_FO|9'), Recorder('Calendar')
+        executor = StrategyExecutor([slow, fast], parallel=True, deadline=0.2, queue_size=1)
+        try:
+            snap.update([position('NSE_FO|1', -75)])
+            snap.index_owners({'Batman': [{'instrument_key': 'NSE_FO|1'}]})
+            data = {'tick': 1, 'position_snapshot': snap, 'vol_surface': surface, 'broker_positions': []}
+            executor.run_tick(data, self.slow_order)
+            self.assertFalse(fast.got_shared_snapshot)
+            self.assertEqual(dict(fast.views[0].changes), {})                    # Batman's leg: not Calendar's business
+            self.assertEqual(set(slow.views[0].changes), {'NSE_FO|1'})
+            for tick, qty in ((2, -150), (3, -150)):                             # Batman stuck on its fill meanwhile
+                snap.update([position('NSE_FO|1', qty), position('NSE_FO|5', 75)] if tick == 2 else [position('NSE_FO|1', qty)])
+                executor.run_tick(dict(data, tick=tick), self.slow_order)
+            self.release.set()
+            executor.run_tick(dict(data, tick=4), self.slow_order)
+        finally:
+            executor.stop()
+        # Ticks 2-3 were dropped from Batman's inbox: their changes (NSE_FO|5 opened and closed again) still reach it
+        self.assertEqual(set(slow.views[-1].changes), {'NSE_FO|1', 'NSE_FO|5'})
+        self.assertIsInstance(slow.views[-1].positions, tuple)
+        with self.assertRaises(TypeError):
+            slow.views[-1].changes['NSE_FO|1'] = None
+        frozen = freeze({'vol_surface': surface, 'broker_positions': [1, 2]})
+        self.assertIsNot(frozen['vol_surface'], surface)
+        self.assertEqual(frozen['broker_positions'], (1, 2))
+
+    def test_loop_reads_legs_published_after_each_update(self):
+        class Adjuster(FakeStrategy):
+            def __init__(self, name, release):
+                super().__init__(name)
+                self.release = release
+                self.positions = [{'instrument_key': 'NSE_FO|1', 'strike': 24000.0, 'qty': 75, 'side': 'SELL'}]
+
+            def open_legs(self):
+                return [dict(p) for p in self.positions]
+
+            def held_keys(self):
+                return [p['instrument_key'] for p in self.positions]
+
+            def update(self, market_data, order_callback):
+                self.positions.append({'instrument_key': 'NSE_FO|2', 'strike': 23500.0, 'qty': 75, 'side': 'BUY'})
+                self.release.wait(5)              # mid-adjustment: waiting for the fill of the new leg
+
+        strat = Adjuster('Batman', self.release)
+        executor = StrategyExecutor([strat], parallel=True, deadline=0.1)
+        try:
+            self.assertEqual(executor.held_keys(), ['NSE_FO|1'])
+            executor.run_tick({'tick': 1}, self.slow_order)
+            self.assertTrue(executor.busy('Batman'))
+            self.assertEqual([leg['instrument_key'] for leg in executor.open_legs()['Batman']], ['NSE_FO|1'])
+            self.release.set()
+            executor.run_tick({'tick': 2}, self.slow_order)
+        finally:
+            executor.stop()
+        self.assertEqual(executor.held_keys(), ['NSE_FO|1', 'NSE_FO|2', 'NSE_FO|2'])
+        with self.assertRaises(TypeError):
+            executor.open_legs()['Batman'][0]['qty'] = 0
+
+    def test_errors_are_contained(self):
+        class Broken(FakeStrategy):
+            def update(self, market_data, order_callback):
+                raise ValueError("bad chain")
+        ok = FakeStrategy('Ironfly')
+        executor = StrategyExecutor([Broken('Broken'), ok], parallel=True, deadline=1.0)
+        try:
+            self.assertEqual(executor.run_tick({'tick': 1}, self.slow_order), [])
+        finally:
+            executor.stop()
+        self.assertEqual(ok.seen, [1])
+        self.assertEqual(executor.stats()['Broken']['errors'], 1)
+
+    def test_sequential_mode_runs_inline(self):
+        strats = [FakeStrategy('A', order_key='NSE_FO|1'), FakeStrategy('B')]
+        executor = StrategyExecutor(strats, parallel=False, deadline=1.0)
+        self.release.set()
+        executor.run_tick({'tick': 1}, self.slow_order)
+        self.assertEqual([s.seen for s in strats], [[1], [1]])
+        self.assertEqual(executor.stats()['A']['orders'], 1)
+        self.assertTrue(all(w.thread is None for w in executor.workers.values()))
+
+
+if __name__ == '__main__':
+    unittest.main()
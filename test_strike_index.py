@@ -0,0 +1,68 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import date
+
+from instrument_manager import InstrumentMaster
+
+FEB_24 = 1771927199000   # 2026-02-24
+FEB_25 = 1772013599000   # 2026-02-25
+
+
+def option(key, strike, opt_type, expiry, name='NIFTY'):
+    return {'name': name, 'instrument_type': opt_type, 'instrument_key': key, 'strike_price': strike,
+            'expiry': expiry, 'trading_symbol': f'{name} {int(strike)} {opt_type}', 'segment': 'NSE_FO'}
+
+
+class TestStrikeIndex(unittest.TestCase):
+    def setUp(self):
+        self.data_dir = tempfile.mkdtemp()
+        records = []
+        # Shuffled strike order on purpose: the index must sort
+        for strike in [25000, 26000, 25500, 24500, 25050, 24950, 25550]:
+            records.append(option(f'NSE_FO|W{strike}PE', float(strike), 'PE', FEB_24))
+            records.append(option(f'NSE_FO|W{strike}CE', float(strike), 'CE', FEB_24))
+        records.append(option('NSE_FO|M25000PE', 25000.0, 'PE', FEB_25))
+        records.append(option('NSE_FO|BN50000PE', 50000.0, 'PE', FEB_24, name='BANKNIFTY'))
+        with open(os.path.join(self.data_dir, 'NSE_FO.json'), 'w') as f:
+            json.dump(records, f)
+        self.master = InstrumentMaster(data_dir=self.data_dir, auto_refresh=False)
+        self.master.load_master()
+        self.index = self.master.strike_index
+
+    def tearDown(self):
+        shutil.rmtree(self.data_dir, ignore_errors=True)
+
+    def test_series_sorted_and_window_inclusive(self):
+        series = self.index.get('NIFTY', date(2026, 2, 24), 'PE')
+        self.assertEqual(series.strikes, [24500, 24950, 25000, 25050, 25500, 25550, 26000])
+        strikes, keys = series.window(25000, 500)
+        self.assertEqual(strikes, [24500, 24950, 25000, 25050, 25500])
+        self.assertEqual(keys[0], 'NSE_FO|W24500PE')
+        self.assertEqual(series.window_keys(25000, 50), ['NSE_FO|W24950PE', 'NSE_FO|W25000PE', 'NSE_FO|W25050PE'])
+        self.assertEqual(series.window_keys(30000, 500), [])
+
+    def test_select_keys_across_expiries_with_extra_keys(self):
+        keys = self.index.select_keys('NIFTY', [date(2026, 2, 24), date(2026, 2, 25), None], 25000, 0,
+                                      extra_keys=['NSE_FO|HELD'])
+        self.assertEqual(set(keys), {'NSE_FO|W25000PE', 'NSE_FO|W25000CE', 'NSE_FO|M25000PE', 'NSE_FO|HELD'})
+        by_expiry = self.index.keys_by_expiry('NIFTY', [date(2026, 2, 25)], 25000, 1000)
+        self.assertEqual(by_expiry, {date(2026, 2, 25): {'NSE_FO|M25000PE'}})
+
+    def test_only_traded_underlyings_indexed(self):
+        self.assertIsNone(self.index.get('BANKNIFTY', date(2026, 2, 24), 'PE'))
+        self.assertEqual(self.index.expiries('NIFTY'), [date(2026, 2, 24), date(2026, 2, 25)])
+
+    def test_get_option_symbols_served_from_index(self):
+        frame = self.master.get_option_symbols('NIFTY', date(2026, 2, 24), 'CE')
+        self.assertEqual(list(frame.columns), ['instrument_key', 'trading_symbol', 'strike', 'expiry_dt'])
+        self.assertEqual(frame['strike'].tolist(), [24500, 24950, 25000, 25050, 25500, 25550, 26000])
+        self.assertTrue((frame['expiry_dt'] == date(2026, 2, 24)).all())
+        # Non-traded underlyings are not loaded from the master at all
+        self.assertTrue(self.master.get_option_symbols('BANKNIFTY', date(2026, 2, 24), 'PE').empty)
+
+
+if __name__ == '__main__':
+    unittest.main()
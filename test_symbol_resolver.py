@@ -0,0 +1,86 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import date
+from unittest.mock import patch
+
+import pandas as pd
+
+from instrument_manager import InstrumentMaster
+from symbol_resolver import build_symbol_map
+
+# Epoch ms as in the Upstox master (expiry at 15:29:59 IST)
+FEB_24 = 1771927199000   # 2026-02-24 (weekly)
+FEB_MONTHLY = 1772013599000  # 2026-02-25
+OCT_06 = 1791280799000   # 2026-10-06 (weekly, month char O)
+
+
+def master_records():
+    return [
+        {'name': 'NIFTY', 'instrument_type': 'PE', 'instrument_key': 'NSE_FO|40476', 'strike_price': 26200.0,
+         'expiry': FEB_MONTHLY, 'trading_symbol': 'NIFTY 26200 PE 25 FEB 26', 'segment': 'NSE_FO'},
+        {'name': 'NIFTY', 'instrument_type': 'CE', 'instrument_key': 'NSE_FO|40477', 'strike_price': 26150.0,
+         'expiry': FEB_24, 'trading_symbol': 'NIFTY 26150 CE 24 FEB 26', 'segment': 'NSE_FO'},
+        {'name': 'NIFTY', 'instrument_type': 'PE', 'instrument_key': 'NSE_FO|50001', 'strike_price': 25000.0,
+         'expiry': OCT_06, 'trading_symbol': 'NIFTY 25000 PE 06 OCT 26', 'segment': 'NSE_FO'},
+        {'name': 'BANKNIFTY', 'instrument_type': 'PE', 'instrument_key': 'NSE_FO|60000', 'strike_price': 50000.0,
+         'expiry': FEB_MONTHLY, 'trading_symbol': 'BANKNIFTY 50000 PE 25 FEB 26', 'segment': 'NSE_FO'},
+        {'name': 'USDINR', 'instrument_type': 'CE', 'instrument_key': 'NCD_FO|1', 'strike_price': 85.0,
+         'expiry': None, 'trading_symbol': 'USDINR 85 CE', 'segment': 'NCD_FO'},
+    ]
+
+
+class TestSymbolResolver(unittest.TestCase):
+    def setUp(self):
+        self.data_dir = tempfile.mkdtemp()
+        with open(os.path.join(self.data_dir, 'NSE_FO.json'), 'w') as f:
+            json.dump(master_records(), f)
+
+    def tearDown(self):
+        shutil.rmtree(self.data_dir, ignore_errors=True)
+
+    def _master(self):
+        master = InstrumentMaster(data_dir=self.data_dir, auto_refresh=False)
+        master.load_master()
+        return master
+
+    def test_weekly_monthly_and_trading_symbol_formats(self):
+        master = self._master()
+        self.assertEqual(master.resolve_symbol('NSE_FO|NIFTY26FEB26200PE'), 'NSE_FO|40476')
+        self.assertEqual(master.resolve_symbol('NSE_FO|NIFTY2622426150CE'), 'NSE_FO|40477')
+        self.assertEqual(master.resolve_symbol('NSE_FO|NIFTY26O0625000PE'), 'NSE_FO|50001')
+        self.assertEqual(master.resolve_symbol('NSE_FO|NIFTY26200PE25FEB26'), 'NSE_FO|40476')
+        self.assertIsNone(master.resolve_symbol('NSE_FO|BANKNIFTY26FEB50000PE'))  # not a traded underlying
+
+    def test_remap_adds_token_keys(self):
+        master = self._master()
+        greeks = {'NSE_FO|NIFTY26FEB26200PE': {'delta': -0.4}, 'NSE_FO|99999': {'delta': 0.1}}
+        master.remap_symbol_keys(greeks)
+        self.assertEqual(greeks['NSE_FO|40476'], {'delta': -0.4})
+        self.assertEqual(len(greeks), 3)
+
+    def test_persisted_map_reused_until_master_changes(self):
+        self.assertEqual(len(self._master().symbol_resolver), 9)  # 3 NIFTY contracts x 3 symbol formats
+        self.assertTrue(os.path.exists(os.path.join(self.data_dir, 'symbol_map.json')))
+
+        with patch('symbol_resolver.build_symbol_map') as build:
+            self.assertEqual(self._master().resolve_symbol('NSE_FO|NIFTY26FEB26200PE'), 'NSE_FO|40476')
+            build.assert_not_called()
+
+        records = master_records()
+        records[0]['instrument_key'] = 'NSE_FO|41000'
+        with open(os.path.join(self.data_dir, 'NSE_FO.json'), 'w') as f:
+            json.dump(records, f)
+        self.assertEqual(self._master().resolve_symbol('NSE_FO|NIFTY26FEB26200PE'), 'NSE_FO|41000')
+
+    def test_build_handles_empty_master(self):
+        self.assertEqual(build_symbol_map(pd.DataFrame(), ['NIFTY']), {})
+        df = pd.DataFrame({'name': ['NIFTY'], 'instrument_type': ['CE'], 'instrument_key': ['k'], 'strike_price': [1.0],
+                           'expiry_dt': [date(2026, 2, 24)], 'trading_symbol': ['X']})
+        self.assertEqual(build_symbol_map(df, ['BANKNIFTY']), {})
+
+
+if __name__ == '__main__':
+    unittest.main()
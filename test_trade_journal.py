@@ -0,0 +1,130 @@
+import csv
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import datetime
+from unittest.mock import patch
+
+import config
+from journal_db import JournalDB, parse_log_name
+from trade_logger import TradeJournal
+
+HEADER = "timestamp,instrument_key,side,qty,price,expiry,tag,pnl\n"
+
+
+class TestTradeJournal(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.dir, 'trade_journal.db')
+        self.csv_path = os.path.join(self.dir, 'trade_log_calendar_live.csv')
+        patches = [patch.object(config, 'TRADING_MODE', 'LIVE'),
+                   patch.object(config, 'TRADE_JOURNAL_DB', self.db_path, create=True),
+                   patch('trade_logger.git_utils.request_push'),
+                   patch('builtins.print')]
+        for p in patches:
+            p.start()
+            self.addCleanup(p.stop)
+
+    def tearDown(self):
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+    def journal(self):
+        j = TradeJournal(filename=os.path.join(self.dir, 'trade_log_calendar.csv'))
+        self.addCleanup(lambda: j.db and j.db.close())
+        return j
+
+    def rows(self):
+        with open(self.csv_path, newline='') as f:
+            return list(csv.DictReader(f))
+
+    def test_migrates_csv_and_imports_appended_rows(self):
+        with open(self.csv_path, 'w', newline='') as f:
+            f.write(HEADER)
+            f.write("2026-01-02 10:00:00,NSE_FO|1,SELL,65,71.75,2026-01-06,WEEKLY_ENTRY,\n")
+            f.write("2026-01-05 14:07:32,NSE_FO|1,BUY,65,40.0,2026-01-06,WEEKLY_EXIT_ADJ,2072.5\n")
+            f.write("2026-01-05 14:08:00,NSE_FO|2,SELL,65,90.0,2026-02-24,EXIT_SL,None\n")
+        self.assertEqual(parse_log_name(self.csv_path), ('calendar', 'live'))
+        j = self.journal()
+        self.assertEqual((j.db.count('calendar', 'live'), j.closed_pnl), (3, 2072.5))
+
+        with open(self.csv_path, 'a', newline='') as f:     # pulled from the other machine
+            f.write("2026-01-06 09:20:00,NSE_FO|2,SELL,65,120.0,2026-02-24,MONTHLY_EXIT_ADJ,-500.0\n")
+        j = self.journal()
+        self.assertEqual((j.db.count('calendar', 'live'), j.closed_pnl), (4, 1572.5))
+        self.assertEqual(self.journal().db.count('calendar', 'live'), 4)    # nothing imported twice
+        self.assertEqual(j.db.daily_pnl('calendar'), [('calendar', 'live', '2026-01-05', 2072.5, 1),
+                                                     ('calendar', 'live', '2026-01-06', -500.0, 1)])
+
+    def test_log_trade_dedupe_and_daily_pnl(self):
+        j = self.journal()
+        for _ in range(3):
+            j.log_trade('NSE_FO|1', 'SELL', 65, 71.75, 'SYNC_EXISTING', expiry='2026-01-06', check_duplicate=True)
+        j.log_trade('NSE_FO|1', 'BUY', 65, 50.0, 'WEEKLY_EXIT_ADJ', pnl=1413.75)
+        j.log_trade('NSE_FO|1', 'BUY', 65, 50.0, 'WEEKLY_EXIT_ADJ', pnl=-13.75, check_duplicate=True)
+        self.assertEqual([r['tag'] for r in self.rows()], ['SYNC_EXISTING', 'WEEKLY_EXIT_ADJ'])
+        self.assertEqual(j.today_closed_pnl(), 1413.75)
+
+        restarted = self.journal()        # our own rows are not read back from the CSV
+        self.assertEqual((restarted.db.count('calendar', 'live'), restarted.closed_pnl), (2, 1413.75))
+        other = TradeJournal(filename=os.path.join(self.dir, 'trade_log_batman.csv'))
+        self.addCleanup(other.db.close)
+        other.log_trade('NSE_FO|1', 'SELL', 65, 71.75, 'SYNC_EXISTING', check_duplicate=True)   # other strategy
+        self.assertEqual(other.db.count('batman', 'live'), 1)
+        self.assertEqual(other.closed_pnl, 0.0)
+
+    def test_rewritten_csv_is_reimported_not_resumed(self):
+        with open(self.csv_path, 'w', newline='') as f:
+            f.write(HEADER)
+            f.write("2026-01-05 14:07:32,NSE_FO|1,BUY,65,40.0,2026-01-06,WEEKLY_EXIT_ADJ,2072.5\n")
+        self.assertEqual(self.journal().closed_pnl, 2072.5)
+        with open(self.csv_path, 'w', newline='') as f:     # a rebase rewrote the earlier row, and the file grew
+            f.write(HEADER)
+            f.write("2026-01-05 14:07:32,NSE_FO|1,BUY,65,40.0,2026-01-06,WEEKLY_EXIT_ADJUSTMENT,1999.25\n")
+            f.write("2026-01-06 09:20:00,NSE_FO|2,SELL,65,120.0,2026-02-24,MONTHLY_EXIT_ADJ,-500.0\n")
+        j = self.journal()
+        self.assertEqual((j.db.count('calendar', 'live'), j.closed_pnl), (2, 1499.25))
+        self.assertEqual([r[2] for r in j.db.daily_pnl('calendar')], ['2026-01-05', '2026-01-06'])
+
+    def test_log_trade_imports_rows_pulled_in_first(self):
+        j = self.journal()
+        j.log_trade('NSE_FO|1', 'SELL', 65, 71.75, 'WEEKLY_ENTRY')
+        with open(self.csv_path, 'a', newline='') as f:     # pulled from the other machine, not imported yet
+            f.write("2026-01-06 09:20:00,NSE_FO|2,SELL,65,120.0,2026-02-24,MONTHLY_EXIT_ADJ,-500.0\n")
+        j.log_trade('NSE_FO|1', 'BUY', 65, 50.0, 'WEEKLY_EXIT_ADJ', pnl=1413.75)
+        self.assertEqual((j.db.count('calendar', 'live'), j.closed_pnl), (3, 913.75))
+        restarted = self.journal()                           # nothing skipped, nothing read twice
+        self.assertEqual((restarted.db.count('calendar', 'live'), restarted.closed_pnl), (3, 913.75))
+
+    def test_dedupe_uses_index(self):
+        db = JournalDB(self.db_path)
+        self.addCleanup(db.close)
+        plan = db._conn.execute("EXPLAIN QUERY PLAN SELECT 1 FROM trades WHERE date = ? AND instrument_key = ? AND tag = ? "
+                                "AND strategy = ? AND mode = ? LIMIT 1", ('2026-01-05', 'k', 't', 's', 'live')).fetchall()
+        self.assertIn('idx_trades_dedupe', str(plan))
+        self.assertEqual(db._conn.execute("PRAGMA journal_mode").fetchone()[0], 'wal')
+
+    def test_csv_export_and_replaced_csv(self):
+        j = self.journal()
+        j.log_trade('NSE_FO|1', 'SELL', 65, 71.75, 'WEEKLY_ENTRY', expiry='2026-01-06')
+        j.log_trade('NSE_FO|1', 'BUY', 65, 50.0, 'EXIT_TARGET', expiry='2026-01-06', pnl=1413.75)
+        before = self.rows()
+        os.remove(self.csv_path)
+        j = self.journal()                    # CSV gone: written back from the DB
+        self.assertEqual(self.rows(), before)
+        self.assertEqual(j.closed_pnl, 1413.75)
+
+        with open(self.csv_path, 'w', newline='') as f:     # replaced by a shorter version (Git checkout)
+            f.write(HEADER)
+            f.write(f"{datetime.now():%Y-%m-%d} 09:30:00,NSE_FO|3,BUY,65,10.0,N/A,EXIT_SL,-100.0\n")
+        j = self.journal()
+        self.assertEqual((j.db.count('calendar', 'live'), j.closed_pnl), (1, -100.0))
+
+        with patch.object(config, 'TRADE_JOURNAL_DB', None):
+            legacy = self.journal()
+        self.assertIsNone(legacy.db)
+        self.assertEqual(legacy.closed_pnl, -100.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
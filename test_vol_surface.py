@@ -0,0 +1,101 @@
+import unittest
+from datetime import date, datetime
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+
+from bench_vol_surface import make_chain, true_iv
+from chain_fixtures import make_chain as make_master_chain
+from greeks import bs_greeks
+from option_chain import build_chain
+from strike_index import StrikeIndex
+from vol_surface import VolSurface, fit_svi
+
+R = 0.07
+SPOT = 24000.0
+T = 7 / 365
+EXPIRY = date(2026, 11, 8)   # make_chain's label for 7 days
+
+
+def master_index(strikes):
+    rows = [{'name': 'NIFTY', 'expiry_dt': EXPIRY, 'instrument_type': t, 'strike_price': k,
+             'instrument_key': f'NSE_FO|{t}{int(k)}', 'trading_symbol': f'NIFTY {int(k)} {t}'}
+            for k in strikes for t in ('CE', 'PE')]
+    return StrikeIndex.from_master(pd.DataFrame(rows))
+
+
+class TestVolSurface(unittest.TestCase):
+    def test_fit_recovers_smile_beyond_the_window(self):
+        surface = VolSurface(r=R)
+        fitted = surface.update(make_chain(SPOT, T, R, 500), SPOT)
+        self.assertEqual(list(fitted), [EXPIRY])
+        far = np.arange(SPOT - 2000, SPOT + 2001, 100.0)
+        np.testing.assert_allclose(surface.iv(EXPIRY, far), true_iv(far, SPOT, T, R), atol=2e-3)
+        self.assertLess(fitted[EXPIRY].fit_ms, 20)
+
+        # Next tick: warm start from the previous parameters
+        cold_iters = fitted[EXPIRY].iterations
+        warm = surface.update(make_chain(SPOT * 1.001, T, R, 500, shift=0.002), SPOT * 1.001)[EXPIRY]
+        self.assertLessEqual(warm.iterations, cold_iters)
+        self.assertLess(warm.rmse, 1e-3)
+
+    def test_fits_broker_iv_chain(self):
+        """Broker IV arrives in percent (14.2): build_chain hands the surface decimals."""
+        pe, ce, quotes, greeks = make_master_chain(n_strikes=60, n_expiries=1, broker_greeks=True)
+        self.assertGreater(min(g['iv'] for g in greeks.values()), 10)
+        chain = build_chain(pe, ce, quotes, greeks, SPOT, datetime(2026, 10, 19, 10, 30), r=R)
+        surface = VolSurface(r=R)
+        fitted = surface.update(chain, SPOT)
+        self.assertEqual((surface.fits, len(fitted)), (1, 1))
+        expiry = next(iter(fitted))
+        self.assertIsNotNone(surface.get(expiry))
+        self.assertAlmostEqual(float(surface.iv(expiry, [SPOT])[0]), 0.13, delta=0.02)
+
+    def test_noisy_quotes_and_too_few_quotes(self):
+        k = np.linspace(-0.03, 0.03, 25)
+        iv = 0.13 + 2.0 * k ** 2 - 0.3 * k + np.random.default_rng(3).normal(0, 0.003, k.size)
+        params, rmse, _ = fit_svi(k, iv, T)
+        self.assertLess(rmse, 0.005)
+        self.assertGreaterEqual(params[1], 0)
+        self.assertLess(abs(params[2]), 1)
+
+        chain = make_chain(SPOT, T, R, 100)
+        self.assertEqual(VolSurface(r=R).update(chain, SPOT), {})   # 2 OTM strikes each side: no fit
+
+    def test_option_by_delta_uses_master_strikes(self):
+        index = master_index(np.arange(21000.0, 27001.0, 100.0))
+        surface = VolSurface(index, 'NIFTY', r=R)
+        surface.update(make_chain(SPOT, T, R, 500), SPOT)
+        opt = surface.option_by_delta('2026-11-08', 'PE', 0.05, SPOT)
+        self.assertEqual(opt['source'], 'surface')
+        self.assertEqual(opt['instrument_key'], f"NSE_FO|PE{int(opt['strike'])}")
+        self.assertLess(opt['strike'], SPOT - 500)          # outside the fetched window
+        exact = bs_greeks('p', SPOT, opt['strike'], T, R, true_iv(np.array([opt['strike']]), SPOT, T, R))['delta'][0]
+        self.assertAlmostEqual(opt['delta'], exact, delta=0.005)
+        self.assertAlmostEqual(abs(opt['delta']), 0.05, delta=0.02)
+
+        surface.max_rmse = 0.0
+        self.assertIsNone(surface.option_by_delta(EXPIRY, 'PE', 0.05, SPOT))
+
+    def test_batman_hedge_falls_back_to_surface(self):
+        from strategies.batman_strategy import BatmanStrategy
+        with patch('strategies.batman_strategy.EventLogger'), patch('strategies.batman_strategy.TradeJournal'):
+            strat = BatmanStrategy()
+        chain = make_chain(SPOT, T, R, 500)
+        g = bs_greeks(chain.type, SPOT, chain.strike, T, R, chain.iv)
+        chain.delta[:] = chain.calculated_delta[:] = g['delta']
+        rows = list(chain)
+
+        self.assertEqual(strat.select_strike_by_delta(rows, 0.05, 'PE', SPOT)['strike'], SPOT - 500)  # window edge
+        strat.vol_surface = VolSurface(master_index(np.arange(21000.0, 27001.0, 50.0)), 'NIFTY', r=R)
+        strat.vol_surface.update(chain, SPOT)
+        hedge = strat.select_strike_by_delta(rows, 0.05, 'PE', SPOT)
+        self.assertEqual(hedge['source'], 'surface')
+        self.assertLess(hedge['strike'], SPOT - 500)
+        # Target reachable inside the chain: chain row wins
+        self.assertNotIn('source', strat.select_strike_by_delta(rows, 0.3, 'PE', SPOT))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -8,6 +8,7 @@ import logging
 from logging.handlers import RotatingFileHandler
 from collections import deque
 import git_utils
+from journal_db import JournalDB
 
 class EventLogger:
     _instance = None
@@ -79,18 +80,48 @@ class TradeJournal:
         base_name = filename.replace('.csv', '')
         self.filename = f"{base_name}_{mode}.csv"
         self.headers = ['timestamp', 'instrument_key', 'side', 'qty', 'price', 'expiry', 'tag', 'pnl']
+        # Journal key in the SQLite DB: trade_log_calendar.csv -> ('calendar', 'live')
+        self.strategy = os.path.basename(base_name).replace('trade_log_', '', 1)
+        self.mode = mode
+        self.db = self._open_db()
         self._initialize_file()
         self.closed_pnl = 0.0
         self._calculate_fixed_pnl()
 
+    def _open_db(self):
+        """SQLite journal (config.TRADE_JOURNAL_DB); None keeps the CSV-only journal."""
+        path = getattr(config, 'TRADE_JOURNAL_DB', None)
+        if not path:
+            return None
+        try:
+            return JournalDB(path)
+        except Exception as e:
+            print(f"{Fore.YELLOW}Trade journal DB unavailable ({e}). Using {self.filename} only.{Style.RESET_ALL}")
+            return None
+
     def _initialize_file(self):
         if not os.path.exists(self.filename):
+            if self.db is not None and self.db.count(self.strategy, self.mode):
+                # CSV deleted / never pulled here: export it again from the DB
+                self.db.export_csv(self.filename, self.strategy, self.mode)
+                return
             with open(self.filename, 'w', newline='') as f:
                 writer = csv.DictWriter(f, fieldnames=self.headers)
                 writer.writeheader()
 
     def _calculate_fixed_pnl(self):
         """Pre-calculate P&L from historical closed trades if file exists."""
+        if self.db is not None:
+            try:
+                # Migrates the CSV on first run, afterwards only rows appended to it elsewhere (Git pull)
+                imported = self.db.import_csv(self.filename, self.strategy, self.mode)
+                if imported:
+                    print(f"Trade journal: imported {imported} rows from {self.filename}")
+                self.closed_pnl = self.db.closed_pnl(self.strategy, self.mode)
+                return
+            except Exception as e:
+                print(f"{Fore.YELLOW}Trade journal DB import failed ({e}). Using {self.filename} only.{Style.RESET_ALL}")
+                self.db = None
         # Simple implementation: sum of all 'pnl' columns that are numeric
         try:
             with open(self.filename, 'r') as f:
@@ -101,49 +132,82 @@ class TradeJournal:
         except Exception:
             pass
 
+    def _is_duplicate(self, date_today, instrument_key, tag):
+        if self.db is not None:
+            try:
+                return self.db.exists(self.strategy, self.mode, date_today, instrument_key, tag)
+            except Exception as e:
+                print(f"Log dedupe error: {e}")
+                return False
+        try:
+            # Optimized for small files. For large files, cache this.
+            if os.path.exists(self.filename):
+                with open(self.filename, 'r') as f:
+                    reader = csv.DictReader(f)
+                    for row in reader:
+                        # Check entries from TODAY
+                        if row['timestamp'].startswith(date_today):
+                            if (row['instrument_key'] == instrument_key and 
+                                row['tag'] == tag):
+                                # Already Logged Today
+                                return True
+        except Exception as e:
+            print(f"Log dedupe error: {e}")
+        return False
+
     def log_trade(self, instrument_key, side, qty, price, tag, expiry='N/A', pnl=None, check_duplicate=False):
         timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         date_today = datetime.now().strftime("%Y-%m-%d")
         
         # Deduplication Logic
-        if check_duplicate:
-            try:
-                # Optimized for small files. For large files, cache this.
-                if os.path.exists(self.filename):
-                    with open(self.filename, 'r') as f:
-                        reader = csv.DictReader(f)
-                        for row in reader:
-                            # Check entries from TODAY
-                            if row['timestamp'].startswith(date_today):
-                                if (row['instrument_key'] == instrument_key and 
-                                    row['tag'] == tag):
-                                    # Already Logged Today
-                                    return
-            except Exception as e:
-                print(f"Log dedupe error: {e}")
+        if check_duplicate and self._is_duplicate(date_today, instrument_key, tag):
+            return
 
+        row = {
+            'timestamp': timestamp,
+            'instrument_key': instrument_key,
+            'side': side,
+            'qty': qty,
+            'price': price,
+            'expiry': expiry,
+            'tag': tag,
+            'pnl': pnl
+        }
+        span = None
         try:
             with open(self.filename, 'a', newline='') as f:
+                start = f.tell()
                 writer = csv.DictWriter(f, fieldnames=self.headers)
-                writer.writerow({
-                    'timestamp': timestamp,
-                    'instrument_key': instrument_key,
-                    'side': side,
-                    'qty': qty,
-                    'price': price,
-                    'expiry': expiry,
-                    'tag': tag,
-                    'pnl': pnl
-                })
+                writer.writerow(row)
+                f.flush()
+                span = (start, f.tell())
         except PermissionError:
             print(f"{Fore.RED}WARNING: Could not write to log file {self.filename}. File might be open in another application.{Style.RESET_ALL}")
         except Exception as e:
             print(f"Log write error: {e}")
-        if pnl is not None:
+        booked = False
+        if self.db is not None:
+            try:
+                # Where our own row went in the CSV: rows pulled in before it are imported first, ours isn't read back
+                self.db.insert(self.strategy, self.mode, row, self.filename, span)
+                self.closed_pnl = self.db.closed_pnl(self.strategy, self.mode)   # with any rows imported just now
+                booked = True
+            except Exception as e:
+                print(f"Log DB write error: {e}")
+        if pnl is not None and not booked:
             self.closed_pnl += pnl
 
-        # Sync Log to Git
-        git_utils.sync_push(self.filename)
+        # Sync Log to Git (queued; pushed with the state files of the same interval)
+        git_utils.request_push(self.filename)
+
+    def today_closed_pnl(self):
+        """Closed P&L booked today (None without the DB: the CSV journal doesn't track it)."""
+        if self.db is None:
+            return None
+        try:
+            return self.db.closed_pnl(self.strategy, self.mode, datetime.now().strftime("%Y-%m-%d"))
+        except Exception:
+            return None
 
     def print_summary(self, open_pnl, strategy_state, broker_pnl=None):
         manual_adj = getattr(config, 'MANUAL_PNL_OFFSET', 0.0)
@@ -154,6 +218,9 @@ class TradeJournal:
         print(f"{Fore.CYAN}TRADE SESSION SUMMARY{Style.RESET_ALL}")
         print("="*50)
         print(f"Closed P&L:    {Fore.WHITE}INR {self.closed_pnl:,.2f}{Style.RESET_ALL}")
+        today_pnl = self.today_closed_pnl()
+        if today_pnl:
+            print(f"  (today):     {Fore.WHITE}INR {today_pnl:,.2f}{Style.RESET_ALL}")
         print(f"Open P&L:      {Fore.WHITE}INR {open_pnl:,.2f}{Style.RESET_ALL}")
         if manual_adj != 0:
             adj_col = Fore.GREEN if manual_adj >= 0 else Fore.RED
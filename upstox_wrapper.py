@@ -1,10 +1,12 @@
 import os
 import time
 import random
+from concurrent.futures import TimeoutError as FutureTimeout
 import upstox_client
 from upstox_client.rest import ApiException
 import config
-import threading
+from rate_limiter import RateLimiter
+from order_stream import OrderTracker, OrderUpdateStream, is_order_final
 
 class UpstoxWrapper:
     def __init__(self, access_token=None):
@@ -30,21 +32,29 @@ class UpstoxWrapper:
         self.market_quote_api = upstox_client.MarketQuoteApi(self.api_client)
         self.portfolio_api = upstox_client.PortfolioApi(self.api_client)
         self.market_quote_v3_api = upstox_client.MarketQuoteV3Api(self.api_client)
+        self.options_api = upstox_client.OptionsApi(self.api_client)
         
-        # Rate limiting state
-        self._last_call_time = 0
-        self._rate_limit_lock = threading.Lock()
-        self._mandatory_delay = 1.0 # 1 second between any two API calls
+        # Rate limiting state: one token-bucket budget per endpoint family (see config.API_RATE_LIMITS)
+        self.rate_limiter = RateLimiter()
 
-    def _wait_for_rate_limit(self):
-        """Ensures at least _mandatory_delay seconds have passed since the last API call."""
-        with self._rate_limit_lock:
-            now = time.time()
-            elapsed = now - self._last_call_time
-            if elapsed < self._mandatory_delay:
-                wait_to_sleep = self._mandatory_delay - elapsed
-                time.sleep(wait_to_sleep)
-            self._last_call_time = time.time()
+        # Order fills: pushed by the portfolio stream when it is running, REST polling otherwise
+        self.order_tracker = OrderTracker()
+        self.order_stream = None
+
+    def start_order_stream(self, url=None, wait=5):
+        """Starts the order-update stream. Returns True if it connected within `wait` seconds."""
+        if self.order_stream is None:
+            self.order_stream = OrderUpdateStream(access_token=self.access_token, url=url, tracker=self.order_tracker)
+        self.order_stream.start()
+        return self.order_stream.wait_connected(wait)
+
+    def stop_order_stream(self):
+        if self.order_stream:
+            self.order_stream.stop()
+
+    def _wait_for_rate_limit(self, family='quote'):
+        """Blocks until the given endpoint family has budget for one more call. Other families are unaffected."""
+        self.rate_limiter.acquire(family)
 
     def _chunk_list(self, input_list, chunk_size):
         """Yield successive chunk_size-sized chunks from input_list."""
@@ -54,11 +64,11 @@ class UpstoxWrapper:
     def _safe_ltp_call(self, symbol, max_retries=5):
         """
         Helper to call the ltp API with aggressive retry logic for 429 (Too Many Requests).
-        Uses exponential backoff with jitter and mandatory inter-call delay.
+        Uses exponential backoff with jitter. A 429 only throttles the 'quote' budget.
         """
         retries = 0
         while retries <= max_retries:
-            self._wait_for_rate_limit()
+            self._wait_for_rate_limit('quote')
             try:
                 return self.market_quote_api.ltp(symbol=symbol, api_version='2.0')
             except ApiException as e:
@@ -71,6 +81,7 @@ class UpstoxWrapper:
                     # More aggressive backoff: 5, 10, 20, 40, 80...
                     wait_time = (5 * (2 ** (retries - 1))) + (random.randint(0, 2000) / 1000)
                     print(f"CRITICAL WARNING: 429 Too Many Requests. Burst detected. Retrying in {wait_time:.2f}s (Attempt {retries}/{max_retries})...")
+                    self.rate_limiter.penalize('quote', wait_time)
                     time.sleep(wait_time)
                 elif e.status == 401:
                     print("CRITICAL: Unauthorized. Check your UPSTOX_ACCESS_TOKEN.")
@@ -139,12 +150,69 @@ class UpstoxWrapper:
             print(f"Error getting quotes: {e}")
             return {}
 
+    def get_put_call_option_chain(self, underlying_key, expiry_date, max_retries=3):
+        """
+        Fetch the full put/call option chain of one expiry in a single call.
+        expiry_date: date or 'YYYY-MM-DD'.
+        Returns a list of per-option dicts (instrument_key, strike, type, ltp, close_price, oi, delta, theta, gamma, vega, iv),
+        or None if the call failed (caller falls back to the LTP + Greeks APIs).
+        """
+        expiry_str = expiry_date.strftime('%Y-%m-%d') if hasattr(expiry_date, 'strftime') else str(expiry_date)
+        retries = 0
+        while True:
+            self._wait_for_rate_limit('option_chain')
+            try:
+                api_response = self.options_api.get_put_call_option_chain(underlying_key, expiry_str)
+                break
+            except ApiException as e:
+                if (e.status == 429 or e.status >= 500) and retries < max_retries:
+                    retries += 1
+                    wait_time = (2 * (2 ** (retries - 1))) + (random.randint(0, 1000) / 1000)
+                    print(f"WARNING: Option Chain API Error {e.status}. Retrying in {wait_time:.2f}s...")
+                    if e.status == 429:
+                        self.rate_limiter.penalize('option_chain', wait_time)
+                    time.sleep(wait_time)
+                    continue
+                print(f"Error fetching option chain for {expiry_str}: {e}")
+                return None
+            except Exception as e:
+                print(f"Error fetching option chain for {expiry_str}: {e}")
+                return None
+
+        if not api_response or api_response.status != 'success' or not api_response.data:
+            return None
+
+        def _f(val):
+            return float(val) if val is not None else None
+
+        rows = []
+        for strike_data in api_response.data:
+            for side, opt_type in [(strike_data.call_options, 'CE'), (strike_data.put_options, 'PE')]:
+                if side is None or not side.instrument_key:
+                    continue
+                md = side.market_data
+                og = side.option_greeks
+                rows.append({
+                    'instrument_key': side.instrument_key.replace(':', '|'),
+                    'strike': _f(strike_data.strike_price),
+                    'type': opt_type,
+                    'ltp': _f(md.ltp) if md else None,
+                    'close_price': _f(md.close_price) if md else None,
+                    'oi': _f(md.oi) if md else None,
+                    'delta': _f(og.delta) if og else None,
+                    'theta': _f(og.theta) if og else None,
+                    'gamma': _f(og.gamma) if og else None,
+                    'vega': _f(og.vega) if og else None,
+                    'iv': _f(og.iv) if og else None,
+                })
+        return rows
+
     def cancel_order(self, order_id):
         """
         Cancel a pending order.
         """
         try:
-            self._wait_for_rate_limit()
+            self._wait_for_rate_limit('order')
             api_response = self.order_api.cancel_order(order_id, api_version='2.0')
             if api_response.status == 'success':
                 print(f"Order {order_id} cancelled successfully.")
@@ -205,18 +273,16 @@ class UpstoxWrapper:
             is_amo=False
         )
         try:
-            self._wait_for_rate_limit()
+            self._wait_for_rate_limit('order')
             api_response = self.order_api.place_order(body, api_version='2.0')
             if api_response.status == 'success':
                 order_id = api_response.data.order_id
                 print(f"Order Placed Successfully. ID: {order_id}. Waiting for fill...")
                 
-                # Polling for status (increased to 60s: 120 * 0.5s)
-                max_retries = 120
-                for attempt in range(max_retries):
-                    time.sleep(0.5)
-                    status_resp = self.get_order_details(order_id)
-                    
+                # Wait for the fill: pushed by the order stream, REST polling as the fallback
+                status_resp = self._await_fill(order_id, timeout=getattr(config, 'ORDER_FILL_TIMEOUT_SECONDS', 60))
+                self.order_tracker.forget(order_id)
+                if status_resp is not None:
                     filled_qty = status_resp.get('filled_quantity', 0)
                     total_qty = status_resp.get('quantity', 0)
                     is_filled_by_qty = (total_qty > 0 and filled_qty >= total_qty)
@@ -232,7 +298,7 @@ class UpstoxWrapper:
                     elif status_resp['status'] == 'cancelled':
                         print(f"CRITICAL: Order {order_id} CANCELLED.")
                         return {'status': 'error', 'message': "Order Cancelled"}
-                
+
                 # TIMEOUT: Mandatory Cancellation to prevent ghost positions
                 print(f"WARNING: Order {order_id} TIMEOUT. Attempting immediate cancellation.")
                 cancel_res = self.cancel_order(order_id)
@@ -281,7 +347,7 @@ class UpstoxWrapper:
                     
                     # return {'status': 'error', 'message': f"Order {order_id} was already {final_status['status']} when cancellation was attempted."}
 
-                return {'status': 'error', 'message': f"Order Timeout: Not filled within 60 seconds. Cancellation of {order_id} requested."}
+                return {'status': 'error', 'message': f"Order Timeout: Not filled within {getattr(config, 'ORDER_FILL_TIMEOUT_SECONDS', 60)} seconds. Cancellation of {order_id} requested."}
             else:
                 return {'status': 'error', 'message': getattr(api_response, 'message', 'Unknown API Error')}
         except ApiException as e:
@@ -299,12 +365,43 @@ class UpstoxWrapper:
             print(f"CRITICAL UNKNOWN ERROR: {e}")
             return {'status': 'error', 'message': str(e)}
 
+    def _await_fill(self, order_id, timeout=60):
+        """
+        Blocks until the order is complete / rejected / cancelled (or fully filled by quantity) and returns its details,
+        or None on timeout.
+        With the order stream connected the fill resolves as soon as the broker pushes it; a REST check still runs
+        every ORDER_STREAM_REST_CHECK_SECONDS in case an update was lost. Without the stream it polls every 0.5s.
+        """
+        fill = self.order_tracker.track(order_id)
+        deadline = time.monotonic() + timeout
+        last_rest_check = time.monotonic()
+        while True:
+            streaming = self.order_stream is not None and self.order_stream.is_connected()
+            rest_interval = getattr(config, 'ORDER_STREAM_REST_CHECK_SECONDS', 5) if streaming else 0.5
+            remaining = min(last_rest_check + rest_interval, deadline) - time.monotonic()
+            if remaining > 0:
+                # Short slices so a stream drop switches to fast polling straight away; a pushed fill wakes us immediately
+                try:
+                    return fill.result(timeout=min(0.5, remaining))
+                except FutureTimeout:
+                    continue
+
+            last_rest_check = time.monotonic()
+            status_resp = self.get_order_details(order_id)
+            if is_order_final(status_resp):
+                if streaming:
+                    print(f"[ORDERS] {order_id} settled via REST check ('{status_resp['status']}'); stream update missing.")
+                self.order_tracker.resolve(order_id, status_resp)
+                return status_resp
+            if time.monotonic() >= deadline:
+                return None
+
     def get_order_details(self, order_id):
         """
         Fetch details of a specific order to check its status and average price.
         """
         try:
-            self._wait_for_rate_limit()
+            self._wait_for_rate_limit('order_status')
             api_response = self.order_api.get_order_details(order_id=order_id, api_version='2.0')
             if api_response.status == 'success':
                 # Upstox order_details can be a list or single object
@@ -343,7 +440,7 @@ class UpstoxWrapper:
         Get available margin/funds for the user.
         """
         try:
-            self._wait_for_rate_limit()
+            self._wait_for_rate_limit('funds')
             api_response = self.user_api.get_user_fund_margin(api_version='2.0')
             if api_response.status == 'success':
                 # Upstox SDK returns objects. 
@@ -362,7 +459,7 @@ class UpstoxWrapper:
         Fetch active positions from the portfolio.
         """
         try:
-            self._wait_for_rate_limit()
+            self._wait_for_rate_limit('portfolio')
             api_response = self.portfolio_api.get_positions(api_version='2.0')
             if api_response.status == 'success':
                 return api_response.data
@@ -377,7 +474,7 @@ class UpstoxWrapper:
         """
         retries = 0
         while retries <= max_retries:
-            self._wait_for_rate_limit()
+            self._wait_for_rate_limit('greeks')
             try:
                 return self.market_quote_v3_api.get_market_quote_option_greek(instrument_key=symbols_str)
             except ApiException as e:
@@ -390,6 +487,8 @@ class UpstoxWrapper:
                     
                     wait_time = (2 * (2 ** (retries - 1))) + (random.randint(0, 1000) / 1000)
                     print(f"WARNING: Greeks API Error {e.status}. Retrying in {wait_time:.2f}s...")
+                    if e.status == 429:
+                        self.rate_limiter.penalize('greeks', wait_time)
                     time.sleep(wait_time)
                 else:
                     raise e
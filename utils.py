@@ -1,78 +1,37 @@
-import numpy as np
-from scipy.stats import norm
 from datetime import datetime, timedelta
+from greeks import bs_greeks
+from iv_solver import solve_iv
 
 def get_ist_now():
     """Returns current IST datetime (UTC+5:30)"""
     return datetime.utcnow() + timedelta(hours=5, minutes=30)
 
 def black_scholes_price(flag, S, K, t, r, sigma):
-    # Clamp sigma to prevent overflow (max ~10 = 1000% IV)
-    sigma = np.clip(sigma, 0.001, 10.0)
-    if t <= 0:
-        t = 0.0001
-    
-    d1 = (np.log(S / K) + (r + 0.5 * sigma ** 2) * t) / (sigma * np.sqrt(t))
-    d2 = d1 - sigma * np.sqrt(t)
-    
-    if flag == 'c':
-        price = S * norm.cdf(d1) - K * np.exp(-r * t) * norm.cdf(d2)
-    else:
-        price = K * np.exp(-r * t) * norm.cdf(-d2) - S * norm.cdf(-d1)
-    
-    return price
+    # t <= 0 is priced at a tiny positive t (as before) rather than at intrinsic
+    return float(bs_greeks(flag, S, K, t if t > 0 else 0.0001, r, sigma)['price'])
 
 def _vega(S, K, t, r, sigma):
-    # Clamp sigma to prevent overflow
-    sigma = np.clip(sigma, 0.001, 10.0)
-    if t <= 0:
-        t = 0.0001
-    
-    d1 = (np.log(S / K) + (r + 0.5 * sigma ** 2) * t) / (sigma * np.sqrt(t))
-    return S * norm.pdf(d1) * np.sqrt(t)
+    return float(bs_greeks('c', S, K, t if t > 0 else 0.0001, r, sigma)['vega'])
 
 def calculate_implied_volatility(price, S, K, t, r, flag='p'):
     """
-    Calculate Implied Volatility (IV) using Newton-Raphson method.
+    Calculate Implied Volatility (IV) of one option (safeguarded Newton-Raphson, see iv_solver.solve_iv).
     """
-    if t <= 0:
-        return 0.001
-    
-    # Intrinsic check
-    intrinsic = 0
-    if flag == 'p':
-        intrinsic = max(K - S, 0)
-    else:
-        intrinsic = max(S - K, 0)
-        
-    if price < intrinsic:
-        return 0.001
-        
-    # Initial Guess
-    sigma = 0.5
-    
-    # Newton-Raphson
-    for i in range(100):
-        bs_price = black_scholes_price(flag, S, K, t, r, sigma)
-        diff = price - bs_price
-        
-        if abs(diff) < 1e-5:
-            return sigma
-            
-        v = _vega(S, K, t, r, sigma)
-        
-        if v == 0:
-            break
-            
-        sigma = sigma + diff / v
-        
-        # Clamp sigma during iterations to prevent overflow
-        sigma = np.clip(sigma, 0.001, 10.0)
-        
-    return sigma
+    return float(solve_iv(price, S, K, t, r, flag == 'c').iv)
+
+def calculate_implied_volatility_array(price, S, K, t, r, is_call):
+    """
+    Vectorized calculate_implied_volatility over a whole chain (iv_solver.solve_iv without the diagnostics).
+    Returns 0.001 where t <= 0 or price is below intrinsic, NaN where price is missing.
+    """
+    return solve_iv(price, S, K, t, r, is_call).iv
 
 import config
 
+def is_trading_day(day, holidays=None):
+    """False on weekends and NSE_HOLIDAYS (or the given 'YYYY-MM-DD' holidays)."""
+    return day.weekday() < 5 and str(day) not in (config.NSE_HOLIDAYS if holidays is None else holidays)
+
 def get_next_trading_day(start_date=None):
     """
     Returns the next valid trading date (skips Weekends and NSE_HOLIDAYS).
@@ -83,15 +42,7 @@ def get_next_trading_day(start_date=None):
     next_day = start_date + timedelta(days=1)
     
     # Loop until we find a valid day
-    while True:
-        # Check Weekend (5=Sat, 6=Sun)
-        if next_day.weekday() >= 5:
-            next_day += timedelta(days=1)
-            continue
-            
-        # Check Holiday
-        if str(next_day) in config.NSE_HOLIDAYS:
-            next_day += timedelta(days=1)
-            continue
+    while not is_trading_day(next_day):
+        next_day += timedelta(days=1)
             
-        return next_day
+    return next_day
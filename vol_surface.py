@@ -0,0 +1,225 @@
+import math
+import time
+from datetime import date
+import numpy as np
+import config
+from greeks import bs_greeks
+
+MIN_QUOTES = 6          # fewer usable quotes than this on an expiry: no fit
+MAX_ITER_COLD = 60
+MAX_ITER_WARM = 15
+
+
+def svi_total_variance(params, k):
+    """Raw SVI: w(k) = a + b * (rho * (k - m) + sqrt((k - m)^2 + sigma^2)), k = log(K / F)."""
+    a, b, rho, m, sigma = params
+    x = k - m
+    return a + b * (rho * x + np.sqrt(x * x + sigma * sigma))
+
+
+def _project(params):
+    """Keeps SVI parameters in the valid region (non-negative variance, |rho| < 1, Lee's wing bound b(1+|rho|) <= 2)."""
+    a, b, rho, m, sigma = params
+    rho = min(max(rho, -0.999), 0.999)
+    b = min(max(b, 1e-8), 2.0 / (1 + abs(rho)))
+    sigma = max(sigma, 1e-4)
+    a = max(a, -b * sigma * math.sqrt(1 - rho * rho) + 1e-10)
+    return np.array([a, b, rho, m, sigma])
+
+
+def _initial_params(k, w):
+    """Cold start: vertex at the lowest-variance quote, wings from the ends of the smile."""
+    i = int(np.argmin(w))
+    spread = max(float(k.max() - k.min()), 1e-3)
+    left = (w[0] - w[i]) / max(k[i] - k[0], 1e-6)
+    right = (w[-1] - w[i]) / max(k[-1] - k[i], 1e-6)
+    b = max((left + right) / 2, 1e-4)
+    rho = float(np.clip((right - left) / (right + left + 1e-12), -0.9, 0.9))
+    sigma = spread / 4
+    return _project([w[i] - b * sigma * math.sqrt(1 - rho * rho), b, rho, k[i], sigma])
+
+
+def fit_svi(k, iv, t, params=None, max_iter=None, tol=1e-10):
+    """
+    Levenberg-Marquardt fit of a raw SVI smile to (log-moneyness, IV) quotes of one expiry, in vol terms.
+    Warm-starts from `params` (the previous fit) when given - the incremental refit, usually 2-4 iterations.
+    Returns (params, rmse in vol, iterations).
+    """
+    k = np.asarray(k, dtype=float)
+    iv = np.asarray(iv, dtype=float)
+    order = np.argsort(k)
+    k, iv = k[order], iv[order]
+    w_obs = iv * iv * t
+    p = _project(params) if params is not None else _initial_params(k, w_obs)
+    max_iter = max_iter or (MAX_ITER_WARM if params is not None else MAX_ITER_COLD)
+
+    def residuals(q):
+        return np.sqrt(np.maximum(svi_total_variance(q, k), 1e-12) / t) - iv
+
+    r = residuals(p)
+    cost = float(r @ r)
+    lam = 1e-3
+    iterations = 0
+    for iterations in range(1, max_iter + 1):
+        a, b, rho, m, sigma = p
+        x = k - m
+        root = np.sqrt(x * x + sigma * sigma)
+        w = np.maximum(a + b * (rho * x + root), 1e-12)
+        # d iv / d w = 1 / (2 sqrt(w t))
+        scale = 1.0 / (2.0 * np.sqrt(w * t))
+        J = np.column_stack([np.ones_like(k), rho * x + root, b * x, -b * (rho + x / root), b * sigma / root]) * scale[:, None]
+        A = J.T @ J
+        g = J.T @ r
+        improved = False
+        for _ in range(10):
+            try:
+                step = np.linalg.solve(A + lam * np.diag(np.diag(A) + 1e-12), -g)
+            except np.linalg.LinAlgError:
+                lam *= 10
+                continue
+            q = _project(p + step)
+            r_new = residuals(q)
+            new_cost = float(r_new @ r_new)
+            if new_cost < cost:
+                improved = True
+                done = cost - new_cost < tol * max(cost, 1e-12) or cost - new_cost < 1e-14
+                p, r, cost = q, r_new, new_cost
+                lam = max(lam / 3, 1e-9)
+                break
+            lam *= 4
+        if not improved or done:
+            break
+    return p, math.sqrt(cost / len(k)), iterations
+
+
+class SVISlice:
+    """Fitted smile of one expiry: IV at any strike from the SVI parameters, the forward and time to expiry."""
+    __slots__ = ('expiry', 'params', 't', 'forward', 'rmse', 'n_quotes', 'iterations', 'fit_ms', 'k_range')
+
+    def __init__(self, expiry, params, t, forward, rmse, n_quotes, iterations, fit_ms, k_range):
+        self.expiry = expiry
+        self.params = params
+        self.t = t
+        self.forward = forward
+        self.rmse = rmse
+        self.n_quotes = n_quotes
+        self.iterations = iterations
+        self.fit_ms = fit_ms
+        self.k_range = k_range
+
+    def iv(self, strikes):
+        k = np.log(np.asarray(strikes, dtype=float) / self.forward)
+        return np.sqrt(np.maximum(svi_total_variance(self.params, k), 1e-12) / self.t)
+
+    def __repr__(self):
+        return f"SVISlice({self.expiry}, {self.n_quotes} quotes, rmse {self.rmse:.4f}, {self.fit_ms:.2f} ms)"
+
+
+class VolSurface:
+    """
+    Per-expiry SVI smiles fitted from each tick's chains (OTM quotes with a solved IV), refitted incrementally
+    from the previous tick's parameters. Gives IV / delta / model price at any strike of the instrument master,
+    so strikes outside the fetched ±STRIKE_WINDOW_POINTS window can be picked without fetching their quotes.
+
+        surface.update(chain, spot)
+        opt = surface.option_by_delta(expiry, 'PE', 0.05, spot)   # chain-shaped dict, or None
+    """
+    def __init__(self, strike_index=None, underlying=None, r=None, max_rmse=None):
+        self.strike_index = strike_index
+        self.underlying = underlying or config.UNDERLYING_NAME
+        self.r = r if r is not None else getattr(config, 'RISK_FREE_RATE', 0.05)
+        self.max_rmse = max_rmse if max_rmse is not None else getattr(config, 'VOL_SURFACE_MAX_RMSE', 0.02)
+        self.slices = {}
+        self.fits = 0
+        self.fit_ms_total = 0.0
+        self.fit_ms_max = 0.0
+
+    def update(self, chain, spot):
+        """Refits every expiry present in `chain` (an OptionChain). Returns {expiry: SVISlice} of the slices fitted."""
+        fitted = {}
+        if chain is None or not len(chain):
+            return fitted
+        labels = chain.expiry_dt
+        for label in set(labels.tolist()):
+            rows = labels == label
+            t = float(np.median(chain.time_to_expiry[rows]))
+            forward = spot * math.exp(self.r * t)
+            strikes = chain.strike[rows]
+            iv = chain.iv[rows]
+            is_call = chain.type[rows] == 'c'
+            # OTM side only (ITM quotes carry little vol information), with a solved, sane IV
+            use = np.isfinite(iv) & (iv > 0.005) & (iv < 5.0) & np.where(is_call, strikes >= forward, strikes < forward)
+            if use.sum() < MIN_QUOTES:
+                continue
+            expiry = _as_date(label)
+            previous = self.slices.get(expiry)
+            start = time.perf_counter()
+            k = np.log(strikes[use] / forward)
+            params, rmse, iterations = fit_svi(k, iv[use], t, previous.params if previous is not None and previous.rmse <= self.max_rmse else None)
+            fit_ms = (time.perf_counter() - start) * 1000
+            self.slices[expiry] = fitted[expiry] = SVISlice(expiry, params, t, forward, rmse, int(use.sum()), iterations,
+                                                            fit_ms, (float(k.min()), float(k.max())))
+            self.fits += 1
+            self.fit_ms_total += fit_ms
+            self.fit_ms_max = max(self.fit_ms_max, fit_ms)
+        return fitted
+
+    def get(self, expiry):
+        """Usable slice (fit within max_rmse) of an expiry, or None."""
+        s = self.slices.get(_as_date(expiry))
+        return s if s is not None and s.rmse <= self.max_rmse else None
+
+    def iv(self, expiry, strikes):
+        s = self.get(expiry)
+        return s.iv(strikes) if s is not None else None
+
+    def greeks(self, expiry, strikes, option_type, spot):
+        """bs_greeks dict (price, delta, ...) at `strikes` from the fitted smile, plus 'iv'; None without a usable fit."""
+        s = self.get(expiry)
+        if s is None:
+            return None
+        strikes = np.asarray(strikes, dtype=float)
+        iv = s.iv(strikes)
+        g = bs_greeks('c' if option_type.upper() in ('CE', 'C') else 'p', spot, strikes, s.t, self.r, iv)
+        g['iv'] = iv
+        return g
+
+    def option_by_delta(self, expiry, option_type, target_delta, spot):
+        """
+        Master strike of `expiry` whose surface |delta| is closest to target_delta, as a chain-style dict
+        ('ltp' is the model price, 'source': 'surface'); None without a strike index or a usable fit.
+        """
+        if self.strike_index is None:
+            return None
+        expiry = _as_date(expiry)
+        opt = 'CE' if option_type.upper() in ('CE', 'C') else 'PE'
+        series = self.strike_index.get(self.underlying, expiry, opt)
+        if series is None or not len(series):
+            return None
+        g = self.greeks(expiry, series.strikes, opt, spot)
+        if g is None:
+            return None
+        i = int(np.argmin(np.abs(np.abs(g['delta']) - target_delta)))
+        delta = float(g['delta'][i])
+        return {'strike': series.strikes[i], 'iv': float(g['iv'][i]), 'time_to_expiry': self.slices[expiry].t,
+                'expiry_dt': expiry.strftime('%Y-%m-%d'), 'instrument_key': series.keys[i], 'ltp': float(g['price'][i]),
+                'type': opt[0].lower(), 'delta': delta, 'calculated_delta': delta, 'source': 'surface'}
+
+    def frozen(self):
+        """
+        Copy with this tick's fitted slices, for strategy workers: the loop refits (replaces slices of) this one
+        every tick while a slow worker may still be reading. The slices themselves are never modified.
+        """
+        copy = VolSurface(self.strike_index, self.underlying, self.r, self.max_rmse)
+        copy.slices = dict(self.slices)
+        return copy
+
+    def stats(self):
+        return {'expiries': len(self.slices), 'fits': self.fits, 'max_fit_ms': self.fit_ms_max,
+                'avg_fit_ms': self.fit_ms_total / self.fits if self.fits else 0.0}
+
+
+def _as_date(expiry):
+    if isinstance(expiry, date):
+        return expiry
+    return date.fromisoformat(str(expiry)[:10])